@@ -1,16 +1,12 @@
 #!/usr/bin/python3
 
-import numpy as np
 import matplotlib.pyplot as plt
 import sys
+from supsisim.viewer import DataViewer
 
 def dataplt(fn):
     try:
-        x = np.loadtxt(fn)
-        t = x[:,0]
-        y = x[:,1:]
-        plt.plot(t,y)
-        plt.grid()
+        v = DataViewer(fn)
         plt.show()
     except:
         pass
@@ -0,0 +1,193 @@
+/*
+COPYRIGHT (C) 2016  Roberto Bucher (roberto.bucher@supsi.ch)
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+*/
+
+#include <pyblock.h>
+#include <aggregate.h>
+#include <matop.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <math.h>
+
+static const char *agg_stat_names[] = {"mean", "min", "max", "rms", "last"};
+
+/* New aggregation of n channels over window samples, NULL if the
+   window is shorter than 2 samples or the mask is empty */
+agg_state *agg_new(int n, int window, int stats)
+{
+  agg_state *a;
+  int k;
+
+  stats &= AGG_ALL;
+  if ((window < 2) || (stats == 0) || (n < 1)) return NULL;
+  a = (agg_state *) calloc(1, sizeof(agg_state));
+  if (a == NULL) return NULL;
+  a->n = n;
+  a->window = window;
+  a->stats = stats;
+  for (k=0;k<5;k++) if (stats & (1 << k)) a->nstat++;
+  a->sum = (double *) calloc(5*n, sizeof(double));
+  a->out = (double *) calloc(n*a->nstat, sizeof(double));
+  if ((a->sum == NULL) || (a->out == NULL)) {
+    agg_free(a);
+    return NULL;
+  }
+  a->sum2 = a->sum + n;
+  a->mn = a->sum2 + n;
+  a->mx = a->mn + n;
+  a->last = a->mx + n;
+  return a;
+}
+
+/* Aggregation given by intPar[k] (window) and intPar[k+1] (mask, all
+   the statistics if missing), NULL if not given */
+agg_state *agg_from_par(int n, const int *intPar, int intParNum, int k)
+{
+  agg_state *a;
+
+  if (intParNum <= k) return NULL;
+  a = agg_new(n, intPar[k], (intParNum > k+1) ? intPar[k+1] : AGG_ALL);
+  if ((a == NULL) && (intPar[k] > 1)) {
+    fprintf(stderr, "Aggregation of %d channels over %d samples not valid\n", n, intPar[k]);
+    exit(1);
+  }
+  return a;
+}
+
+/* Add one sample of the n channels, returns 1 at the end of a window
+   (results in a->out), 0 otherwise */
+int agg_put(agg_state *a, const double *u)
+{
+  int i, k, j;
+  double v;
+
+  if (a->count == 0) {
+    for (i=0;i<a->n;i++) {
+      a->sum[i] = a->sum2[i] = 0.0;
+      a->mn[i] = a->mx[i] = u[i];
+    }
+  }
+  for (i=0;i<a->n;i++) {
+    v = u[i];
+    a->sum[i] += v;
+    a->sum2[i] += v*v;
+    if (v < a->mn[i]) a->mn[i] = v;
+    if (v > a->mx[i]) a->mx[i] = v;
+    a->last[i] = v;
+  }
+  if (++a->count < a->window) return 0;
+
+  j = 0;
+  for (i=0;i<a->n;i++) {
+    for (k=0;k<5;k++) {
+      if (!(a->stats & (1 << k))) continue;
+      switch (1 << k) {
+      case AGG_MEAN: a->out[j++] = a->sum[i] / a->count; break;
+      case AGG_MIN:  a->out[j++] = a->mn[i]; break;
+      case AGG_MAX:  a->out[j++] = a->mx[i]; break;
+      case AGG_RMS:  a->out[j++] = sqrt(a->sum2[i] / a->count); break;
+      case AGG_LAST: a->out[j++] = a->last[i]; break;
+      }
+    }
+  }
+  a->count = 0;
+  return 1;
+}
+
+/* Number of results of a window */
+int agg_width(const agg_state *a)
+{
+  return a->n*a->nstat;
+}
+
+/* Names of the results ("<channel>_<stat>", comma separated) from the
+   comma separated names of the channels ("u<k>" if missing) */
+void agg_names(const agg_state *a, const char *names, char *buf, size_t len)
+{
+  char name[64];
+  const char *p = (names != NULL) ? names : "";
+  size_t pos = 0, m;
+  int i, k;
+
+  buf[0] = '\0';
+  for (i=0;i<a->n;i++) {
+    m = 0;
+    while ((*p != '\0') && (*p != ',')) {
+      if (m < sizeof(name)-1) name[m++] = *p;
+      p++;
+    }
+    name[m] = '\0';
+    if (*p == ',') p++;
+    if (m == 0) snprintf(name, sizeof(name), "u%d", i);
+    for (k=0;k<5;k++) {
+      if (!(a->stats & (1 << k))) continue;
+      if (pos + strlen(name) + strlen(agg_stat_names[k]) + 3 >= len) return;
+      pos += sprintf(buf + pos, "%s%s_%s", (pos != 0) ? "," : "", name, agg_stat_names[k]);
+    }
+  }
+}
+
+void agg_free(agg_state *a)
+{
+  if (a == NULL) return;
+  free(a->sum);
+  free(a->out);
+  free(a);
+}
+
+/* Aggregate block: the statistics of the elements of the inputs over
+   windows of intPar[0] samples, held on the output until the end of
+   the next window.
+
+   intPar: [window, stats, n]  (n: elements of the inputs) */
+
+typedef struct {
+  agg_state *a;
+  double *u;
+} agg_block;
+
+void aggregate(int flag, python_block *block)
+{
+  agg_block *b = (agg_block *) block->ptrPar;
+
+  switch (flag) {
+  case CG_INIT:
+    b = (agg_block *) calloc(1, sizeof(agg_block));
+    if (b == NULL) exit(1);
+    b->a = agg_new(block->intPar[2], block->intPar[0], block->intPar[1]);
+    b->u = (double *) calloc(block->intPar[2] > 0 ? block->intPar[2] : 1, sizeof(double));
+    if ((b->a == NULL) || (b->u == NULL)) {
+      fprintf(stderr, "Aggregate: window %d and stats %d not valid\n",
+              block->intPar[0], block->intPar[1]);
+      exit(1);
+    }
+    block->ptrPar = b;
+    setOutputs(block, b->a->out, agg_width(b->a));
+    break;
+  case CG_OUT:
+    getInputs(block, b->u, b->a->n);
+    if (agg_put(b->a, b->u)) setOutputs(block, b->a->out, agg_width(b->a));
+    break;
+  case CG_END:
+    agg_free(b->a);
+    free(b->u);
+    free(b);
+    block->ptrPar = NULL;
+    break;
+  }
+}
@@ -17,6 +17,7 @@ Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
 */
 
 #include <pyblock.h>
+#include <matop.h>
 #include <math.h>
 
 /****************************************************************************
@@ -24,16 +25,17 @@ Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
  *
  * Description:
  *   Computes forward Clarke transformation. It is possible to use both
- *   calculations for 2 and 3 inputs.
+ *   calculations for 2 and 3 inputs (scalar signals or one vector).
  *
  ****************************************************************************/
 
 void forward_clarke(int Flag, python_block *block)
 {
-  double *alpha = block->y[0];
-  double *beta = block->y[1];
-  double *cur1 = block->u[0];
-  double *cur2 = block->u[1];
+  double cur[3];
+  double *cur1 = &cur[0];
+  double *cur2 = &cur[1];
+  double out[2];
+  int n;
 
   double cur_alp;
   double cur_bet;
@@ -43,7 +45,8 @@ void forward_clarke(int Flag, python_block *block)
       case CG_OUT:
       case CG_INIT:
       case CG_END:
-        if (block->nin == 2)
+        n = getInputs(block, cur, 3);
+        if (n == 2)
           {
             /* Only two inputs are used */
 
@@ -54,7 +57,7 @@ void forward_clarke(int Flag, python_block *block)
           {
             /* We read data from all 3 inputs */
 
-            double *cur3 = block->u[2];
+            double *cur3 = &cur[2];
 
             cur_alp = (-cur2[0] - cur3[0] + 2 * cur1[0]) / 3;
             cur_bet = (cur2[0] - cur3[0]) + 2 * cur2[0] + cur1[0] - (2 * cur3[0] + cur1[0]);
@@ -68,8 +71,9 @@ void forward_clarke(int Flag, python_block *block)
 
         /* Save alpha and beta to outputs */
 
-        alpha[0] = cur_alp;
-        beta[0] = cur_bet;
+        out[0] = cur_alp;
+        out[1] = cur_bet;
+        setOutputs(block, out, 2);
         break;
       default:
         break;
@@ -86,20 +90,24 @@ void forward_clarke(int Flag, python_block *block)
 
 void inverse_clarke(int Flag, python_block *block)
 {
-  double *cur1 = block->y[0];
-  double *cur2 = block->y[1];
-  double *cur3 = block->y[2];
-  double *alpha = block->u[0];
-  double *beta = block->u[1];
+  double out[3];
+  double *cur1 = &out[0];
+  double *cur2 = &out[1];
+  double *cur3 = &out[2];
+  double in[2];
+  double *alpha = &in[0];
+  double *beta = &in[1];
 
   switch(Flag)
     {
       case CG_OUT:
       case CG_INIT:
       case CG_END:
+        getInputs(block, in, 2);
         cur1[0] = alpha[0];
         cur2[0] = -0.5f * alpha[0] + 0.5f * sqrt(3) * beta[0]; 
         cur3[0] = -0.5f * alpha[0] - 0.5f * sqrt(3) * beta[0]; 
+        setOutputs(block, out, 3);
         break;
       default:
         break;
@@ -118,6 +118,7 @@ void squareSignal(int Flag, python_block *block)
 
 void constant(int Flag, python_block *block)
 {
+  int j;
   double *y;
   
   y = (double *) block->y[0];
@@ -126,7 +127,7 @@ void constant(int Flag, python_block *block)
   case CG_OUT:
   case CG_INIT:
   case CG_END:
-    y[0] = block->realPar[0];
+    for(j=0;j<CG_DIMOUT(block, 0);j++) y[j] = block->realPar[j];
     break;
   default:
     break;
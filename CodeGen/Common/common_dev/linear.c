@@ -27,7 +27,6 @@ void css(int Flag, python_block *block)
   int * intPar    = block->intPar;
   int iA, iB, iC, iD, iX;
   int i;
-  double *y;
 
   ni = intPar[1];
   no = intPar[2];
@@ -47,11 +46,7 @@ void css(int Flag, python_block *block)
   double tmpX4[nx];
 
   double tmpU[ni];
-  double *U;
-  for (i=0;i<ni;i++) {
-    U = (double *) block->u[i];
-    tmpU[i] = U[0];
-  }
+  getInputs(block, tmpU, ni);
 
   switch(Flag){
   case CG_OUT:
@@ -60,15 +55,21 @@ void css(int Flag, python_block *block)
     iX = intPar[7];
     c = &realPar[iC];
     d = &realPar[iD];
-    X = &realPar[iX];
+    X = block->xc ? block->xc : &realPar[iX];
     matmult(c,no,nx,X,nx,1,tmpCX);
     matmult(d,no,ni,tmpU,ni,1,tmpDU);
     matsum(tmpCX,no,1,tmpDU,no,1,tmpY);
-    
-    for(i=0;i<no;i++){
-      y = (double *) block->y[i];
-      y[0] = tmpY[i];
-    }
+    setOutputs(block, tmpY, no);
+    break;
+  case CG_DERIV:
+    /* dx/dt = A*x + B*u for the variable step solver */
+    iA = intPar[3];
+    iB = intPar[4];
+    a = &realPar[iA];
+    b = &realPar[iB];
+    matmult(a,nx,nx,block->xc,nx,1,tmpAX);
+    matmult(b,nx,ni,tmpU,ni,1,tmpBU);
+    matsum(tmpAX,nx,1,tmpBU,nx,1,block->dxc);
     break;
   case CG_STUPD:
     iA = intPar[3];
@@ -110,6 +111,9 @@ void css(int Flag, python_block *block)
     for(i=0;i<nx;i++) X[i] = X[i] + tmpX1[i]/6 + tmpX2[i]/3 + tmpX3[i]/3 + tmpX4[i]/6;
     break;
   case CG_INIT:
+    /* Initial states in the state vector of the variable step solver */
+    if (block->xc) for(i=0;i<nx;i++) block->xc[i] = realPar[intPar[7]+i];
+    break;
   case CG_END:
     break;
   default:
@@ -128,7 +132,11 @@ void integral(int Flag, python_block *block)
   switch(Flag){
   case CG_OUT:
     y = (double *) block->y[0];
-    y[0] = realPar[1];
+    y[0] = block->xc ? block->xc[0] : realPar[1];
+    break;
+
+  case CG_DERIV:
+    block->dxc[0] = U[0];
     break;
 
   case CG_STUPD:
@@ -136,6 +144,8 @@ void integral(int Flag, python_block *block)
     realPar[1] = realPar[1] + U[0]*h;
     break;
   case CG_INIT:
+    if (block->xc) block->xc[0] = realPar[1];
+    break;
   case CG_END:
     break;
   default:
@@ -150,8 +160,6 @@ void dss(int Flag, python_block *block)
   double * realPar = block->realPar;
   int * intPar    = block->intPar;
   int iA, iB, iC, iD, iX;
-  int i;
-  double *y;
 
   ni = intPar[1];
   no = intPar[2];
@@ -164,11 +172,7 @@ void dss(int Flag, python_block *block)
   double tmpY[no];
 
   double tmpU[ni];
-  double *U;
-  for (i=0;i<ni;i++) {
-    U = (double *) block->u[i];
-    tmpU[i] = U[0];
-  }
+  getInputs(block, tmpU, ni);
 
   switch(Flag){
   case CG_OUT:
@@ -181,10 +185,7 @@ void dss(int Flag, python_block *block)
     matmult(c,no,nx,X,nx,1,tmpCX);
     matmult(d,no,ni,tmpU,ni,1,tmpDU);
     matsum(tmpCX,no,1,tmpDU,no,1,tmpY);
-    for(i=0;i<no;i++){
-      y = (double *) block->y[i];
-      y[0] = tmpY[i];
-    }
+    setOutputs(block, tmpY, no);
     break;
   case CG_STUPD:
     iA = intPar[3];
@@ -232,10 +233,6 @@ void mxmult(int Flag, python_block *block)
 
     /* blk = RCPblk('mxmult',pin,pout,0,realPar,[n,m]) */
 
-  int i;
-  double *y;
-  double *u;
-
   int nin = block->intPar[1];
   int nout = block->intPar[0];
   double tmpY[nout];
@@ -247,15 +244,9 @@ void mxmult(int Flag, python_block *block)
   case CG_OUT:
   case CG_INIT:
   case CG_END:
-    for (i=0; i<nin; i++) {
-      u = block->u[i];
-      tmpU[i]=u[0];
-    }
+    getInputs(block, tmpU, nin);
     matmult(gain,nout,nin,tmpU,nin,1,tmpY);
-    for(i=0; i<nout; i++){
-      y = block->y[i];
-      y[0] = tmpY[i];
-    }
+    setOutputs(block, tmpY, nout);
     break;
   default:
     break;
@@ -264,9 +255,10 @@ void mxmult(int Flag, python_block *block)
   
 void sum(int Flag, python_block *block)
 {
-  int i;
+  int i, j;
   double *y;
   double *u;
+  int n = CG_DIMOUT(block, 0);
   
   y = (double *) block->y[0];
 
@@ -274,10 +266,13 @@ void sum(int Flag, python_block *block)
   case CG_OUT:
   case CG_INIT:
   case CG_END:
-    y[0] = 0.0;
-    for (i=0;i<block->nin;i++){
-      u = (double *) block->u[i];
-      y[0] += block->realPar[i]*u[0];
+    /* Elementwise, scalar inputs are added to every element */
+    for (j=0;j<n;j++){
+      y[j] = 0.0;
+      for (i=0;i<block->nin;i++){
+        u = (double *) block->u[i];
+        y[j] += block->realPar[i]*u[CG_DIMIN(block, i) == 1 ? 0 : j];
+      }
     }
     break;
   default:
@@ -17,6 +17,7 @@ Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
 */
 
 #include <stdio.h>
+#include <pyblock.h>
 
 int matmult(double *a, int na, int ma, double *b, int nb, int mb, double* c)
 {
@@ -50,3 +51,30 @@ int matsum(double *a, int na, int ma, double *b, int nb, int mb, double* c)
   return 0;
 }
 
+/* Copy the elements of all the input ports into u (at most n values),
+   return the number of values copied */
+int getInputs(python_block *block, double *u, int n)
+{
+  int i, j, k = 0;
+  double *in;
+
+  for(i=0;i<block->nin;i++){
+    in = (double *) block->u[i];
+    for(j=0;j<CG_DIMIN(block, i) && k<n;j++) u[k++] = in[j];
+  }
+  return k;
+}
+
+/* Copy y (at most n values) into the elements of the output ports,
+   return the number of values copied */
+int setOutputs(python_block *block, double *y, int n)
+{
+  int i, j, k = 0;
+  double *out;
+
+  for(i=0;i<block->nout;i++){
+    out = (double *) block->y[i];
+    for(j=0;j<CG_DIMOUT(block, i) && k<n;j++) out[j] = y[k++];
+  }
+  return k;
+}
@@ -22,7 +22,7 @@ Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
 
 void absV(int Flag, python_block *block)
 {
-  int i;
+  int i, j;
   double *y;
   double *u;  
 
@@ -33,7 +33,7 @@ void absV(int Flag, python_block *block)
     for(i=0;i<block->nin;i++){
       u = (double *) block->u[i];
       y = (double *) block->y[i];
-      y[0] = fabs(u[0]);
+      for(j=0;j<CG_DIMIN(block, i);j++) y[j] = fabs(u[j]);
     }
     break;
   default:
@@ -43,6 +43,7 @@ void absV(int Flag, python_block *block)
   
 void saturation(int Flag, python_block *block)
 {
+  int j;
   double out;
   double satP = block->realPar[0];
   double satN = block->realPar[1];
@@ -53,10 +54,12 @@ void saturation(int Flag, python_block *block)
   case CG_OUT:
   case CG_INIT:
   case CG_END:
-    out = u[0];
-    if (out > satP) out = satP;
-    if (out < satN) out = satN;
-    y[0] = out;
+    for(j=0;j<CG_DIMIN(block, 0);j++){
+      out = u[j];
+      if (out > satP) out = satP;
+      if (out < satN) out = satN;
+      y[j] = out;
+    }
     break;
   default:
     break;
@@ -65,9 +68,10 @@ void saturation(int Flag, python_block *block)
   
 void prod(int Flag, python_block *block)
 {
-  int i;
+  int i, j;
   double *y;
   double *u;
+  int n = CG_DIMOUT(block, 0);
   
   y = (double *) block->y[0];
 
@@ -75,10 +79,13 @@ void prod(int Flag, python_block *block)
   case CG_OUT:
   case CG_INIT:
   case CG_END:
-    y[0] = 1.0;
-    for (i=0;i<block->nin;i++){
-      u = (double *) block->u[i];
-      y[0] *= u[0];
+    /* Elementwise, scalar inputs multiply every element */
+    for (j=0;j<n;j++){
+      y[j] = 1.0;
+      for (i=0;i<block->nin;i++){
+        u = (double *) block->u[i];
+        y[j] *= u[CG_DIMIN(block, i) == 1 ? 0 : j];
+      }
     }
     break;
   default:
@@ -0,0 +1,110 @@
+/*
+COPYRIGHT (C) 2016  Roberto Bucher (roberto.bucher@supsi.ch)
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+*/
+
+#include <math.h>
+#include <odesolver.h>
+
+/* Dormand-Prince 5(4) coefficients */
+static const double a2[1] = {1.0/5};
+static const double a3[2] = {3.0/40, 9.0/40};
+static const double a4[3] = {44.0/45, -56.0/15, 32.0/9};
+static const double a5[4] = {19372.0/6561, -25360.0/2187, 64448.0/6561, -212.0/729};
+static const double a6[5] = {9017.0/3168, -355.0/33, 46732.0/5247, 49.0/176, -5103.0/18656};
+static const double b[6]  = {35.0/384, 0.0, 500.0/1113, 125.0/192, -2187.0/6784, 11.0/84};
+/* Difference between the 5th and the 4th order solutions */
+static const double e[7]  = {71.0/57600, 0.0, -71.0/16695, 71.0/1920, -17253.0/339200, 22.0/525, -1.0/40};
+
+/* x = x0 + h*sum(a[j]*k[j]), dx = f(x), copied to kout */
+static void stage(ode_solver *s, double *x0, double **k, const double *a, int m, double h, double *kout)
+{
+  int i, j;
+
+  for(i=0;i<s->n;i++){
+    double v = 0.0;
+    for(j=0;j<m;j++) v += a[j]*k[j][i];
+    s->x[i] = x0[i] + h*v;
+  }
+  s->fcn();
+  for(i=0;i<s->n;i++) kout[i] = s->dx[i];
+}
+
+/* Integrate the states over the interval T (inputs held constant)
+
+   Returns the number of accepted steps */
+int ode_dopri5(ode_solver *s, double T)
+{
+  int n = s->n;
+  int i, nsteps = 0;
+  double *x0 = s->work;
+  double *k[7];
+  double t = 0.0;
+  double h = s->h;
+  double hmin = 1e-8*T;
+
+  for(i=0;i<7;i++) k[i] = &s->work[(i+1)*n];
+  if ((h <= 0.0) || (h > T)) h = T;
+
+  /* The discrete part of the model changed the inputs: new first stage */
+  for(i=0;i<n;i++) x0[i] = s->x[i];
+  s->fcn();
+  for(i=0;i<n;i++) k[0][i] = s->dx[i];
+
+  while(t < T){
+    double err = 0.0, fac, *tmp;
+    int last = (t + h >= T*(1.0 - 1e-12));
+
+    if (last) h = T - t;
+    stage(s, x0, k, a2, 1, h, k[1]);
+    stage(s, x0, k, a3, 2, h, k[2]);
+    stage(s, x0, k, a4, 3, h, k[3]);
+    stage(s, x0, k, a5, 4, h, k[4]);
+    stage(s, x0, k, a6, 5, h, k[5]);
+    stage(s, x0, k, b, 6, h, k[6]);   /* 5th order solution, derivative for the next step */
+
+    for(i=0;i<n;i++){
+      double d = 0.0, sc;
+      int j;
+      for(j=0;j<7;j++) d += e[j]*k[j][i];
+      sc = s->atol + s->rtol*fmax(fabs(x0[i]), fabs(s->x[i]));
+      err += (h*d/sc)*(h*d/sc);
+    }
+    err = (n > 0) ? sqrt(err/n) : 0.0;
+    /* Diverging states: continue as a fixed step method would */
+    if (!isfinite(err)) err = 0.0;
+
+    if ((err <= 1.0) || (h <= hmin)){
+      /* Accepted: x holds the new states, k[6] their derivative */
+      t += h;
+      nsteps++;
+      for(i=0;i<n;i++) x0[i] = s->x[i];
+      tmp = k[0]; k[0] = k[6]; k[6] = tmp;
+      fac = (err == 0.0) ? 5.0 : fmin(5.0, fmax(0.2, 0.9*pow(err, -0.2)));
+      /* The last step is shortened to reach T: keep the previous size */
+      if (!last || (s->h <= 0.0) || (h*fac < s->h)) s->h = h*fac;
+      h = fmax(s->h, hmin);
+    }
+    else{
+      s->rejected++;
+      for(i=0;i<n;i++) s->x[i] = x0[i];
+      h = fmax(h*fmax(0.2, 0.9*pow(err, -0.2)), hmin);
+      s->h = h;
+    }
+  }
+  s->steps += nsteps;
+  return(nsteps);
+}
@@ -23,7 +23,7 @@ double get_run_time(void);
 
 void print(int Flag, python_block *block)
 {
-  int i; 
+  int i, j; 
   double t;
   double *u;
 
@@ -33,7 +33,7 @@ void print(int Flag, python_block *block)
     printf("%lf\t",t);
     for(i=0;i<block->nin;i++){
       u = (double *) block->u[i];
-      printf("%lf\t",u[0]);
+      for(j=0;j<CG_DIMIN(block, i);j++) printf("%lf\t",u[j]);
     }
     printf("\n");
     break;
@@ -17,6 +17,7 @@ Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
 */
 
 #include <pyblock.h>
+#include <matop.h>
 #include <math.h>
 
 /****************************************************************************
@@ -29,19 +30,23 @@ Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
 
 void forward_park(int Flag, python_block *block)
 {
-  double *d = block->y[0];
-  double *q = block->y[1];
-  double *alpha = block->u[0];
-  double *beta = block->u[1];
-  double *rot_angle = block->u[2];
+  double out[2];
+  double *d = &out[0];
+  double *q = &out[1];
+  double in[3];
+  double *alpha = &in[0];
+  double *beta = &in[1];
+  double *rot_angle = &in[2];
 
   switch(Flag)
     {
       case CG_OUT:
       case CG_INIT:
       case CG_END:
+        getInputs(block, in, 3);
         d[0] = alpha[0] * cos(rot_angle[0]) + beta[0] * sin(rot_angle[0]);
         q[0] = -alpha[0] * sin(rot_angle[0]) + beta[0] * cos(rot_angle[0]);
+        setOutputs(block, out, 2);
         break;
       default:
         break;
@@ -58,19 +63,23 @@ void forward_park(int Flag, python_block *block)
 
 void inverse_park(int Flag, python_block *block)
 {
-  double *alpha = block->y[0];
-  double *beta= block->y[1];
-  double *d = block->u[0];
-  double *q = block->u[1];
-  double *rot_angle = block->u[2];
+  double out[2];
+  double *alpha = &out[0];
+  double *beta= &out[1];
+  double in[3];
+  double *d = &in[0];
+  double *q = &in[1];
+  double *rot_angle = &in[2];
 
   switch(Flag)
     {
       case CG_OUT:
       case CG_INIT:
       case CG_END:
+        getInputs(block, in, 3);
         alpha[0] = d[0] * cos(rot_angle[0]) - q[0] * sin(rot_angle[0]);
         beta[0] = d[0] * sin(rot_angle[0]) + q[0] * cos(rot_angle[0]);
+        setOutputs(block, out, 2);
         break;
       default:
         break;
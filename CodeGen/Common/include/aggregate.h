@@ -0,0 +1,41 @@
+#ifndef AGGREGATE_H
+#define AGGREGATE_H
+
+/* Windowed aggregation of signals, shared by the sink blocks (plot,
+   toFile, logger, scope, plotJuggler) and the aggregate block.
+
+   Over a window of n samples the statistics selected in a mask (mean,
+   min, max, RMS and last value) of every channel are computed, the
+   sink writes one row per window instead of one row per sample: the
+   I/O is reduced n times and the peaks are kept by min and max. The
+   results are ordered by channel, then by statistic in the order of
+   the mask bits (mean, min, max, rms, last). The window and the mask
+   are two integer parameters of the sinks, see agg_from_par. */
+
+#include <stddef.h>
+
+#define AGG_MEAN   1
+#define AGG_MIN    2
+#define AGG_MAX    4
+#define AGG_RMS    8
+#define AGG_LAST  16
+#define AGG_ALL   31
+
+typedef struct {
+  int n;              /* Channels */
+  int window;         /* Samples of a window */
+  int stats;          /* Mask of the statistics */
+  int nstat;          /* Statistics in the mask */
+  int count;          /* Samples in the current window */
+  double *sum, *sum2, *mn, *mx, *last;
+  double *out;        /* n*nstat results of the last window */
+} agg_state;
+
+agg_state *agg_new(int n, int window, int stats);
+agg_state *agg_from_par(int n, const int *intPar, int intParNum, int k);
+int agg_put(agg_state *a, const double *u);
+int agg_width(const agg_state *a);
+void agg_names(const agg_state *a, const char *names, char *buf, size_t len);
+void agg_free(agg_state *a);
+
+#endif /* AGGREGATE_H */
@@ -1,2 +1,6 @@
+#include <pyblock.h>
+
 int matmult(double *a, int na, int ma, double *b, int nb, int mb, double* c);
 int matsum(double *a, int na, int ma, double *b, int nb, int mb, double* c);
+int getInputs(python_block *block, double *u, int n);
+int setOutputs(python_block *block, double *y, int n);
@@ -0,0 +1,24 @@
+#ifndef ODESOLVER_H
+#define ODESOLVER_H
+
+/* Variable step solver for the continuous states of a model.
+   x holds the n states of all the continuous blocks (their xc fields
+   point into it), fcn computes the derivatives of the states in x and
+   stores them in dx (CG_OUT and CG_DERIV of the continuous blocks). */
+
+typedef struct {
+  int n;               /* Number of continuous states */
+  double *x;           /* States */
+  double *dx;          /* Derivatives of the states */
+  double *work;        /* Work array of 8*n doubles */
+  void (*fcn)(void);   /* Computes dx from x */
+  double rtol;         /* Relative tolerance */
+  double atol;         /* Absolute tolerance */
+  double h;            /* Step size (kept between the calls, 0 at start) */
+  long steps;          /* Accepted steps */
+  long rejected;       /* Rejected steps */
+} ode_solver;
+
+int ode_dopri5(ode_solver *s, double T);
+
+#endif /* ODESOLVER_H */
@@ -0,0 +1,52 @@
+#ifndef PARFILE_H
+#define PARFILE_H
+
+/* Parameter files of the generated code (genCode parFile=True).
+
+   genCode writes <model>.par, a binary image of the real and integer
+   parameters of all the blocks: a header followed by one record per
+   parameter, keyed by the block name and the parameter name
+   (realParNames/intParNames). The model defines <model>_par_load,
+   which calls par_load with the table of its blocks with parameters:
+   the parameters found in a file are set before the initialization of
+   the blocks (option -P of linux_main.c and linux_main_rt.c). The file
+   is written and patched by supsisim/parfile.py. */
+
+#include <stdint.h>
+
+#define PARFILE_MAGIC    "PYSIMPAR"
+#define PARFILE_VERSION  1
+#define PARFILE_BLKLEN   80
+#define PARFILE_NAMELEN  40
+
+#define PARFILE_REAL     0
+#define PARFILE_INT      1
+
+typedef struct {
+  char magic[8];                  /* PARFILE_MAGIC, not terminated */
+  uint32_t version;
+  uint32_t nrec;                  /* Number of records */
+  char model[48];                 /* Model name */
+} par_header;
+
+typedef struct {
+  char block[PARFILE_BLKLEN];     /* Block name (as in the generated code) */
+  char name[PARFILE_NAMELEN];     /* Parameter name */
+  int32_t type;                   /* PARFILE_REAL or PARFILE_INT */
+  int32_t index;                  /* Index in realPar/intPar */
+  double value;
+} par_record;
+
+typedef struct {
+  const char *name;
+  double *realPar;
+  int realParNum;
+  char **realParNames;
+  int *intPar;
+  int intParNum;
+  char **intParNames;
+} par_block;
+
+int par_load(const char *fname, const char *model, const par_block *blks, int n, int verbose);
+
+#endif /* PARFILE_H */
@@ -0,0 +1,59 @@
+#ifndef PROFILER_H
+#define PROFILER_H
+
+/* Execution time profiler of the generated code (genCode profile=True).
+
+   Every block call of the ISR is enclosed by PROF_BEGIN / PROF_END,
+   the time of all the calls of a block during one ISR is accumulated
+   in "cur" and added to the statistics by prof_commit at the end of
+   the ISR. The table is written as JSON by prof_dump. */
+
+#include <stdint.h>
+
+typedef uint64_t prof_tick_t;
+
+#if defined(__x86_64__) || defined(__i386__)
+#include <x86intrin.h>
+static inline prof_tick_t prof_now(void)
+{
+  return __rdtsc();
+}
+#elif defined(__aarch64__)
+static inline prof_tick_t prof_now(void)
+{
+  uint64_t t;
+  __asm__ volatile("mrs %0, cntvct_el0" : "=r" (t));
+  return t;
+}
+#else
+#include <time.h>
+static inline prof_tick_t prof_now(void)
+{
+  struct timespec ts;
+  clock_gettime(CLOCK_MONOTONIC, &ts);
+  return (prof_tick_t) ts.tv_sec*1000000000ULL + ts.tv_nsec;
+}
+#endif
+
+#define PROF_NBINS 32   /* Histogram bins: [2^k, 2^(k+1)) ticks */
+
+typedef struct {
+  const char *name;    /* Block name */
+  const char *path;    /* System path */
+  const char *fcn;     /* Block function */
+  prof_tick_t cur;     /* Ticks of the current ISR */
+  uint64_t count;      /* Number of ISR executing the block */
+  prof_tick_t sum;
+  prof_tick_t min;
+  prof_tick_t max;
+  uint32_t hist[PROF_NBINS];
+} prof_entry;
+
+#define PROF_BEGIN()      prof_tick_t prof_t0_ = prof_now()
+#define PROF_END(tab, n)  (tab)[n].cur += prof_now() - prof_t0_
+
+void prof_init(prof_entry *tab, int n);
+void prof_commit(prof_entry *tab, int n);
+int prof_dump(const char *fname, const char *model, prof_entry *tab, int n);
+
+#endif /* PROFILER_H */
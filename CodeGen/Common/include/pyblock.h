@@ -5,6 +5,7 @@
 #define CG_OUT   2
 #define CG_STUPD 3
 #define CG_END   4
+#define CG_DERIV 5   /* Derivatives of the cont. states (variable step solver) */
 
 typedef struct {
   int nin;             /* Number of inputs */
@@ -22,8 +23,15 @@ typedef struct {
   void * ptrPar;       /* Generic pointer */
   char **realParNames; /* Names of real parameters */
   char **intParNames;  /* Names of integer parameter */
+  double *xc;          /* Cont. states of the variable step solver, NULL otherwise */
+  double *dxc;         /* Derivatives of the cont. states (flag CG_DERIV) */
 } python_block;
 
+/* Dimension of the input/output port i; dimIn and dimOut are NULL when
+   all the signals of the model are scalar */
+#define CG_DIMIN(block, i)  ((block)->dimIn ? (block)->dimIn[i] : 1)
+#define CG_DIMOUT(block, i) ((block)->dimOut ? (block)->dimOut[i] : 1)
+
 /* SHV related structures */
 
 typedef struct {
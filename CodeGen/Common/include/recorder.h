@@ -0,0 +1,60 @@
+#ifndef RECORDER_H
+#define RECORDER_H
+
+/* Binary recording of signals (plot and toFile blocks in binary mode).
+
+   The file starts with rec_header, followed by the names of the columns
+   (strings terminated by '\0', padded with '\0' to a multiple of 8
+   bytes), followed by the rows of float64 values: time and the input
+   channels. The block copies every row into a lock-free single producer
+   single consumer ring, the rows are written to the file by a writer
+   thread (not real-time) with large buffers. If the ring is full the
+   block waits for the writer, or drops the row if the recorder is
+   opened with drop set: the number of dropped rows and the number of
+   overflows of the ring are written in the header at close, together
+   with the number of rows. The file is read by supsisim/recfile.py. */
+
+#include <stdint.h>
+#include <stdio.h>
+#include <stdatomic.h>
+#include <pthread.h>
+
+#define REC_MAGIC      "PYSIMREC"
+#define REC_VERSION    1
+#define REC_CLOSED     1          /* flags: counters written at close */
+#define REC_TIMEGEN    2          /* flags: time generated from Tsamp (recfile.py) */
+#define REC_ROWS       8192       /* Default rows of the ring */
+
+typedef struct {
+  char magic[8];                  /* REC_MAGIC, not terminated */
+  uint32_t version;
+  uint32_t ncol;                  /* Columns: time and the channels */
+  double Tsamp;
+  uint64_t nrow;                  /* Rows written (set at close) */
+  uint64_t dropped;               /* Rows dropped with the ring full */
+  uint64_t overflows;             /* Times the ring has been found full */
+  uint32_t nameLen;               /* Bytes of the names after the header */
+  uint32_t flags;
+  uint64_t reserved;
+} rec_header;
+
+typedef struct {
+  FILE *fp;
+  rec_header hd;
+  int ncol;
+  size_t rows;                    /* Rows of the ring */
+  double *ring;
+  atomic_size_t head;             /* Rows put by the block */
+  atomic_size_t tail;             /* Rows written by the writer */
+  atomic_int stop;
+  int drop;                       /* Drop the rows with the ring full */
+  int full;                       /* Ring full at the last row */
+  int error;                      /* Write error of the writer */
+  pthread_t thread;
+} rec_file;
+
+rec_file *rec_open(const char *fname, const char *names, int ncol, double Tsamp, int rows, int drop);
+void rec_put(rec_file *rec, const double *row);
+int rec_close(rec_file *rec);
+
+#endif /* RECORDER_H */
@@ -0,0 +1,41 @@
+#ifndef RTSTATS_H
+#define RTSTATS_H
+
+/* Timing statistics of the real-time loop (linux_main_rt.c).
+
+   The block is placed in the POSIX shared memory segment
+   "/pysim_<model>" and updated by the RT thread only (single writer).
+   seq is odd while the writer changes the block: a reader copies the
+   block and retries if seq was odd or changed during the copy
+   (supsictrl/rtstats.py). All the fields are 64 bit wide, the times
+   are in ns. */
+
+#include <stdint.h>
+
+#define RT_STATS_MAGIC   0x5453545250ULL   /* "PRTST" */
+#define RT_STATS_VERSION 1
+#define RT_STATS_NBINS   256               /* the last bin counts all the larger values */
+
+typedef struct {
+  uint64_t magic;
+  uint64_t version;
+  uint64_t nbins;
+  uint64_t seq;              /* Odd while the block is updated */
+  int64_t tsamp;             /* Base sampling time */
+  int64_t lat_bin;           /* Bin width of the latency histogram */
+  int64_t exec_bin;          /* Bin width of the execution time histogram */
+  uint64_t periods;          /* Executed periods */
+  uint64_t overruns;         /* Base rate overruns */
+  uint64_t rate_overruns;    /* Slower rates not released (option -m) */
+  int64_t overrun_max;       /* Maximal delay of an overrun */
+  int64_t lat_min;           /* Wake-up latency */
+  int64_t lat_max;
+  int64_t lat_sum;
+  int64_t exec_min;          /* Execution time of a period */
+  int64_t exec_max;
+  int64_t exec_sum;
+  uint64_t lat_hist[RT_STATS_NBINS];
+  uint64_t exec_hist[RT_STATS_NBINS];
+} rt_stats;
+
+#endif /* RTSTATS_H */
@@ -0,0 +1,206 @@
+/*
+COPYRIGHT (C) 2016  Roberto Bucher (roberto.bucher@supsi.ch)
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+*/
+
+/* Triggered capture (oscilloscope-like recording)
+
+   The rows (time and all the elements of the inputs) of the last pre
+   samples are kept in a circular buffer in memory. When the trigger
+   condition on the first element of the first input is met, the pre
+   samples, the sample of the trigger and the next post samples are
+   written to a binary recording (recorder.h), by the writer thread of
+   the recorder: columns t, event, k (sample from the trigger, -pre
+   to post) and the channels. The trigger is armed again after the
+   last post sample.
+
+   realPar: [level, low, high]
+   intPar:  [mode, pre, post, events, drop]
+   mode     0: u >= level        1: u <= level
+            2: rising edge across level      3: falling edge across level
+            4: both edges        5: u outside [low, high]   6: u inside [low, high]
+   events   maximum number of events (0: no limit)
+   drop     drop the rows if the writer is late (see rec_open)
+   str:     "<file name>" or "<file name>|<channel names, comma separated>" */
+
+#include <pyblock.h>
+#include <recorder.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+double get_run_time(void);
+double get_Tsamp(void);
+
+#define CAP_ABOVE    0
+#define CAP_BELOW    1
+#define CAP_RISING   2
+#define CAP_FALLING  3
+#define CAP_EDGE     4
+#define CAP_OUTSIDE  5
+#define CAP_INSIDE   6
+
+typedef struct {
+  rec_file *rec;
+  int nch;            /* Columns of the buffer: time and channels */
+  int pre, post;
+  double *buf;        /* Circular buffer, pre rows */
+  long nbuf;          /* Rows put into the buffer */
+  int post_left;      /* Post samples still to write, -1: armed */
+  long events;
+  double last;        /* Trigger input at the previous sample */
+  int first;
+  double *row;        /* Row of the recording */
+  double *cur;        /* Current row (time and channels) */
+} capture_data;
+
+static int trigger(python_block *block, capture_data *c, double u)
+{
+  double level = block->realPar[0];
+  double low = block->realPar[1];
+  double high = block->realPar[2];
+  int fire = 0;
+
+  switch(block->intPar[0]){
+  case CAP_ABOVE:   fire = (u >= level); break;
+  case CAP_BELOW:   fire = (u <= level); break;
+  case CAP_RISING:  fire = !c->first && (c->last < level) && (u >= level); break;
+  case CAP_FALLING: fire = !c->first && (c->last > level) && (u <= level); break;
+  case CAP_EDGE:    fire = !c->first && (((c->last < level) && (u >= level)) ||
+                                         ((c->last > level) && (u <= level))); break;
+  case CAP_OUTSIDE: fire = (u < low) || (u > high); break;
+  case CAP_INSIDE:  fire = (u >= low) && (u <= high); break;
+  }
+  c->last = u;
+  c->first = 0;
+  return fire;
+}
+
+/* One row of the recording: time, event, sample from the trigger, channels */
+static void put(capture_data *c, const double *src, int k)
+{
+  c->row[0] = src[0];
+  c->row[1] = c->events;
+  c->row[2] = k;
+  memcpy(&c->row[3], &src[1], sizeof(double)*(c->nch-1));
+  rec_put(c->rec, c->row);
+}
+
+static void init(python_block *block)
+{
+  capture_data *c;
+  char fname[256];
+  char names[512];
+  char *chn;
+  int i, size;
+
+  snprintf(fname, sizeof(fname), "%s", block->str);
+  chn = strchr(fname, '|');
+  if(chn!=NULL) *chn++ = '\0';
+
+  c = (capture_data *) calloc(1, sizeof(capture_data));
+  if(c==NULL) exit(1);
+  c->nch = 1;
+  for(i=0;i<block->nin;i++) c->nch += CG_DIMIN(block, i);
+  if(chn!=NULL) snprintf(names, sizeof(names), "event,k,%s", chn);
+  else {
+    strcpy(names, "event,k");
+    for(i=0;(i<c->nch-1) && (strlen(names) < sizeof(names)-16);i++)
+      sprintf(names+strlen(names), ",u%d", i);
+  }
+  c->pre = block->intPar[1];
+  c->post = block->intPar[2];
+  c->buf = (double *) malloc(sizeof(double)*c->nch*(c->pre+1));
+  c->row = (double *) malloc(sizeof(double)*(c->nch+2));
+  c->cur = (double *) malloc(sizeof(double)*c->nch);
+  if((c->buf==NULL) || (c->row==NULL) || (c->cur==NULL)) exit(1);
+  c->post_left = -1;
+  c->first = 1;
+
+  /* Ring of the recorder large enough for two events */
+  size = 2*(c->pre + 1 + c->post);
+  c->rec = rec_open(fname, names, c->nch+2, get_Tsamp(), (size > REC_ROWS) ? size : REC_ROWS,
+                    block->intPar[4]);
+  if(c->rec==NULL){
+    fprintf(stderr, "Capture: cannot write %s\n", fname);
+    exit(1);
+  }
+  block->ptrPar = c;
+}
+
+static void inout(python_block *block)
+{
+  capture_data *c = (capture_data *) block->ptrPar;
+  double *u;
+  int i, j, k, n;
+  long r;
+
+  c->cur[0] = get_run_time();
+  k = 1;
+  for(i=0;i<block->nin;i++){
+    u = (double *) block->u[i];
+    for(j=0;j<CG_DIMIN(block, i);j++) c->cur[k++] = u[j];
+  }
+
+  if(c->post_left > 0){
+    put(c, c->cur, c->post - c->post_left + 1);
+    c->post_left--;
+    if(c->post_left == 0){
+      c->post_left = -1;
+      c->events++;
+    }
+    c->last = c->cur[1];
+  }
+  else if(((block->intPar[3] == 0) || (c->events < block->intPar[3])) &&
+          trigger(block, c, c->cur[1])){
+    /* Pre samples from the buffer, oldest first */
+    n = (c->nbuf < c->pre) ? c->nbuf : c->pre;
+    for(r=c->nbuf-n;r<c->nbuf;r++)
+      put(c, &c->buf[(r % (c->pre+1))*c->nch], (int) (r - c->nbuf));
+    put(c, c->cur, 0);
+    if(c->post > 0) c->post_left = c->post;
+    else c->events++;
+  }
+
+  if(c->pre > 0){
+    memcpy(&c->buf[(c->nbuf % (c->pre+1))*c->nch], c->cur, sizeof(double)*c->nch);
+    c->nbuf++;
+  }
+}
+
+static void end(python_block *block)
+{
+  capture_data *c = (capture_data *) block->ptrPar;
+
+  rec_close(c->rec);
+  free(c->buf);
+  free(c->row);
+  free(c->cur);
+  free(c);
+}
+
+void capture(int flag, python_block *block)
+{
+  if (flag==CG_OUT){          /* get input */
+    inout(block);
+  }
+  else if (flag==CG_END){     /* termination */
+    end(block);
+  }
+  else if (flag ==CG_INIT){    /* initialisation */
+    init(block);
+  }
+}
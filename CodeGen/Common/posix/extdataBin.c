@@ -0,0 +1,201 @@
+/*
+COPYRIGHT (C) 2016  Roberto Bucher (roberto.bucher@supsi.ch)
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+*/
+
+/* External data from a binary recording (extdataBlk format 'bin')
+
+   The file (recorder.h: time and channels as float64 rows) is mapped
+   in memory, nothing is read at the initialization. The rows are
+   reached through a sliding window of EXT_WINDOW bytes: the next window
+   is requested in advance, the pages of the windows already passed are
+   released. The outputs are the channels at the time of the model,
+   held from the last row or interpolated linearly between two rows.
+
+   intPar: [ch, 0, 0, interp, periodic]
+   interp    0: hold, 1: linear
+   periodic  1: the data are repeated (period: rows * Tsamp of the file)
+             0: the last row is held at the end
+   str:      file name */
+
+#include <pyblock.h>
+#include <recorder.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <math.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+
+double get_run_time(void);
+
+#define EXT_WINDOW  (1 << 20)
+
+typedef struct {
+  void *map;
+  size_t len;
+  const double *rows;     /* First row */
+  long nrow;
+  int ncol;
+  long idx;               /* Row at or before the last time */
+  size_t win;             /* Start of the current window (bytes from rows) */
+  double period;
+  double eps;             /* Tolerance on the time (rounding of k*Tsamp) */
+} ext_bin;
+
+#define EXT_T(e, i)  ((e)->rows[(size_t) (i)*(e)->ncol])
+
+/* Move the window when the row idx leaves it */
+static void slide(ext_bin *e)
+{
+  size_t pos = (size_t) e->idx*e->ncol*sizeof(double);
+  size_t win = pos - pos % EXT_WINDOW;
+  size_t off = (const char *) e->rows - (const char *) e->map;
+  long page = sysconf(_SC_PAGESIZE);
+  size_t a, b;
+
+  if (win == e->win) return;
+  if (win > e->win) {
+    /* Release the pages of the windows passed */
+    a = off + e->win;
+    b = off + win;
+    a -= a % page;
+    b -= b % page;
+    if (b > a) posix_madvise((char *) e->map + a, b - a, POSIX_MADV_DONTNEED);
+  }
+  a = off + win + EXT_WINDOW;
+  a -= a % page;
+  if (a < e->len)
+    posix_madvise((char *) e->map + a, (e->len - a < EXT_WINDOW) ? e->len - a : EXT_WINDOW,
+                  POSIX_MADV_WILLNEED);
+  e->win = win;
+}
+
+/* Row i with EXT_T(i) <= t < EXT_T(i+1), searched forward from the
+   last row (one step per sample), by bisection if t goes back */
+static long find(ext_bin *e, double t)
+{
+  long lo, hi, mid;
+
+  if (t < EXT_T(e, e->idx)) {
+    lo = 0;
+    hi = e->idx;
+    if (t < EXT_T(e, 0)) return 0;
+    while (hi - lo > 1) {
+      mid = (lo + hi) / 2;
+      if (EXT_T(e, mid) <= t) lo = mid;
+      else hi = mid;
+    }
+    e->idx = lo;
+  }
+  while ((e->idx + 1 < e->nrow) && (EXT_T(e, e->idx + 1) <= t)) e->idx++;
+  return e->idx;
+}
+
+static void init(python_block *block)
+{
+  ext_bin *e;
+  rec_header hd;
+  struct stat st;
+  int fd;
+
+  e = (ext_bin *) calloc(1, sizeof(ext_bin));
+  if (e == NULL) exit(1);
+  fd = open(block->str, O_RDONLY);
+  if ((fd < 0) || (fstat(fd, &st) != 0) || (read(fd, &hd, sizeof(hd)) != sizeof(hd)) ||
+      (memcmp(hd.magic, REC_MAGIC, 8) != 0) || (hd.version != REC_VERSION)) {
+    fprintf(stderr, "Extdata: %s is not a binary recording (version %d)\n", block->str, REC_VERSION);
+    exit(1);
+  }
+  e->ncol = hd.ncol;
+  e->nrow = (hd.flags & REC_CLOSED) ? (long) hd.nrow :
+    (long) ((st.st_size - sizeof(hd) - hd.nameLen) / (sizeof(double)*hd.ncol));
+  if ((e->nrow < 1) || (e->ncol - 1 < block->intPar[0])) {
+    fprintf(stderr, "Extdata: %s has %ld rows and %d channels, %d needed\n",
+            block->str, e->nrow, e->ncol - 1, block->intPar[0]);
+    exit(1);
+  }
+  e->len = st.st_size;
+  e->map = mmap(NULL, e->len, PROT_READ, MAP_PRIVATE, fd, 0);
+  close(fd);
+  if (e->map == MAP_FAILED) {
+    perror("mmap");
+    exit(1);
+  }
+  posix_madvise(e->map, e->len, POSIX_MADV_SEQUENTIAL);
+  e->rows = (const double *) ((const char *) e->map + sizeof(hd) + hd.nameLen);
+  if (hd.Tsamp > 0) e->period = e->nrow*hd.Tsamp;
+  else if (e->nrow > 1) e->period = (EXT_T(e, e->nrow-1) - EXT_T(e, 0))*e->nrow/(e->nrow-1);
+  else e->period = 0.0;
+  e->eps = 1e-9*((e->nrow > 1) ? (EXT_T(e, e->nrow-1) - EXT_T(e, 0))/(e->nrow-1) : 1.0);
+  block->ptrPar = e;
+}
+
+static void inout(python_block *block)
+{
+  ext_bin *e = (ext_bin *) block->ptrPar;
+  double t = get_run_time();
+  double t0 = EXT_T(e, 0);
+  double *y;
+  const double *r0, *r1;
+  double a = 0.0;
+  long i;
+  int k;
+
+  if (block->intPar[4] && (e->period > 0))
+    t = t0 + fmod(t - t0 + e->eps, e->period) - e->eps;
+  i = find(e, t + e->eps);
+  slide(e);
+  r0 = &e->rows[(size_t) i*e->ncol];
+  r1 = r0;
+  if ((block->intPar[3] == 1) && (i + 1 < e->nrow) && (t > r0[0])) {
+    r1 = r0 + e->ncol;
+    a = (t - r0[0]) / (r1[0] - r0[0]);
+  }
+  for (k=0;k<block->intPar[0];k++) {
+    y = (double *) block->y[k];
+    y[0] = r0[k+1] + a*(r1[k+1] - r0[k+1]);
+  }
+}
+
+static void end(python_block *block)
+{
+  ext_bin *e = (ext_bin *) block->ptrPar;
+  double *y;
+  int k;
+
+  for (k=0;k<block->intPar[0];k++) {
+    y = (double *) block->y[k];
+    y[0] = 0.0;
+  }
+  munmap(e->map, e->len);
+  free(e);
+}
+
+void extdataBin(int flag, python_block *block)
+{
+  if (flag==CG_OUT){          /* get input */
+    inout(block);
+  }
+  else if (flag==CG_END){     /* termination */
+    end(block);
+  }
+  else if (flag ==CG_INIT){    /* initialisation */
+    init(block);
+  }
+}
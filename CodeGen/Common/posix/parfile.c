@@ -0,0 +1,94 @@
+/*
+COPYRIGHT (C) 2016  Roberto Bucher (roberto.bucher@supsi.ch)
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+*/
+
+#include <parfile.h>
+#include <stdio.h>
+#include <string.h>
+
+/* Index of the parameter name in names[0..n-1], the index of the
+   record is tried first, -1 if not found */
+static int par_index(char **names, int n, const char *name, int index)
+{
+  int k;
+
+  if (names == NULL) return -1;
+  if ((index >= 0) && (index < n) && (strncmp(names[index], name, PARFILE_NAMELEN) == 0))
+    return index;
+  for(k=0;k<n;k++){
+    if (strncmp(names[k], name, PARFILE_NAMELEN) == 0) return k;
+  }
+  return -1;
+}
+
+/* Set the parameters of the records of fname in the blocks blks[0..n-1],
+   the records of unknown blocks or parameters are skipped with a
+   warning. Returns the number of parameters set, -1 if the file
+   cannot be read. */
+int par_load(const char *fname, const char *model, const par_block *blks, int n, int verbose)
+{
+  FILE *fp;
+  par_header hd;
+  par_record rec;
+  uint32_t r;
+  int i, k, set = 0;
+
+  fp = fopen(fname, "rb");
+  if (fp == NULL) {
+    fprintf(stderr, "Parameter file %s not found\n", fname);
+    return -1;
+  }
+  if ((fread(&hd, sizeof(hd), 1, fp) != 1) || (memcmp(hd.magic, PARFILE_MAGIC, 8) != 0) ||
+      (hd.version != PARFILE_VERSION)) {
+    fprintf(stderr, "%s is not a parameter file (version %d)\n", fname, PARFILE_VERSION);
+    fclose(fp);
+    return -1;
+  }
+  hd.model[sizeof(hd.model)-1] = 0;
+  if (strcmp(hd.model, model) != 0)
+    fprintf(stderr, "Parameter file %s written for the model %s\n", fname, hd.model);
+
+  for(r=0;r<hd.nrec;r++){
+    if (fread(&rec, sizeof(rec), 1, fp) != 1) {
+      fprintf(stderr, "Parameter file %s truncated after %u records\n", fname, r);
+      fclose(fp);
+      return -1;
+    }
+    rec.block[PARFILE_BLKLEN-1] = 0;
+    rec.name[PARFILE_NAMELEN-1] = 0;
+    for(i=0;(i<n) && (strcmp(blks[i].name, rec.block) != 0);i++);
+    k = -1;
+    if (i < n) {
+      if (rec.type == PARFILE_REAL)
+        k = par_index(blks[i].realParNames, blks[i].realParNum, rec.name, rec.index);
+      else
+        k = par_index(blks[i].intParNames, blks[i].intParNum, rec.name, rec.index);
+    }
+    if (k < 0) {
+      fprintf(stderr, "Parameter %s.%s not found in the model\n", rec.block, rec.name);
+      continue;
+    }
+    if (rec.type == PARFILE_REAL)
+      blks[i].realPar[k] = rec.value;
+    else
+      blks[i].intPar[k] = (int) rec.value;
+    if (verbose) printf("%s.%s = %g\n", rec.block, rec.name, rec.value);
+    set++;
+  }
+  fclose(fp);
+  return set;
+}
@@ -17,6 +17,7 @@
 */
 
 #include <pyblock.h>
+#include <aggregate.h>
 #include<stdio.h> 
 #include<unistd.h>
 #include<stdlib.h> 
@@ -28,9 +29,19 @@
 
 double get_run_time(void);
 
+/* intPar: [port, socket, window, stats]
+   window  samples aggregated in one message (aggregate.h, 0 or 1: none)
+   stats   statistics of the window (aggregate.h, AGG_ALL if missing)
+   str:    host name or address */
+
+typedef struct {
+  struct sockaddr_in server;
+  agg_state *agg;
+} pj_sink;
+
 static void init(python_block *block)
 {
-  static struct sockaddr_in server;
+  pj_sink *pj;
   int s;
 
   char * IPbuf;
@@ -63,19 +74,23 @@ static void init(python_block *block)
   if ((s = socket(AF_INET, SOCK_DGRAM, 0)) < 0) exit(1);
   block->intPar[1] = s;
 
-  server.sin_family      = AF_INET;
-  server.sin_port         = htons(block->intPar[0]);
-  server.sin_addr.s_addr = inet_addr(IPbuf);
-  block->ptrPar = (void *) &server;
+  pj = (pj_sink *) calloc(1, sizeof(pj_sink));
+  if (pj == NULL) exit(1);
+  pj->server.sin_family      = AF_INET;
+  pj->server.sin_port         = htons(block->intPar[0]);
+  pj->server.sin_addr.s_addr = inet_addr(IPbuf);
+  pj->agg = agg_from_par(block->nin, block->intPar, block->intParNum, 2);
+  block->ptrPar = (void *) pj;
 }
 
 static void inout(python_block *block)
 {
-  int i;
+  int i, n = block->nin;
   int * intPar    = block->intPar;
+  pj_sink *pj = (pj_sink *) block->ptrPar;
   double *u;
-  double data[block->nin];
-  char databuffer[15*block->nin+25];
+  double in[block->nin];
+  double *data = in;
 
   int s = intPar[1];
   double t = get_run_time();
@@ -85,9 +100,15 @@ static void inout(python_block *block)
     u = block->u[i];
     data[i] = u[0];
   }
+  if(pj->agg != NULL){
+    if(!agg_put(pj->agg, in)) return;
+    data = pj->agg->out;
+    n = agg_width(pj->agg);
+  }
 
+  char databuffer[15*n+25];
   sprintf(databuffer, "{\"ts\":%.3lf, \"y\":[", t);
-  for(i=0;i<block->nin-1;i++){
+  for(i=0;i<n-1;i++){
     sprintf(strVal,"%.3lf, ", data[i]);
     strcat(databuffer, strVal);
   }
@@ -95,14 +116,18 @@ static void inout(python_block *block)
   strcat(databuffer, strVal);
   /* printf("%s\n", databuffer); */
   
-  sendto(s, databuffer, sizeof(databuffer) , 0 , (struct sockaddr *) block->ptrPar, sizeof(struct sockaddr_in));
+  sendto(s, databuffer, sizeof(databuffer) , 0 , (struct sockaddr *) &pj->server, sizeof(struct sockaddr_in));
 }
 
 static void end(python_block *block)
 {
   int * intPar    = block->intPar;
 
+  pj_sink *pj = (pj_sink *) block->ptrPar;
+
   close(intPar[1]);
+  agg_free(pj->agg);
+  free(pj);
 }
 
 void plotJuggler(int flag, python_block *block)
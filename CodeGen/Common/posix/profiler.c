@@ -0,0 +1,122 @@
+/*
+COPYRIGHT (C) 2016  Roberto Bucher (roberto.bucher@supsi.ch)
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+*/
+
+#include <profiler.h>
+#include <stdio.h>
+#include <string.h>
+#include <time.h>
+
+/* Reference points for the conversion of the ticks in ns */
+static struct timespec prof_ts0;
+static prof_tick_t prof_tick0;
+
+static double elapsed_ns(void)
+{
+  struct timespec ts;
+
+  clock_gettime(CLOCK_MONOTONIC, &ts);
+  return (ts.tv_sec - prof_ts0.tv_sec)*1e9 + (ts.tv_nsec - prof_ts0.tv_nsec);
+}
+
+/* Reset the statistics (the names are kept) */
+void prof_init(prof_entry *tab, int n)
+{
+  int i;
+
+  for(i=0;i<n;i++){
+    tab[i].cur = 0;
+    tab[i].count = 0;
+    tab[i].sum = 0;
+    tab[i].min = (prof_tick_t) -1;
+    tab[i].max = 0;
+    memset(tab[i].hist, 0, sizeof(tab[i].hist));
+  }
+  clock_gettime(CLOCK_MONOTONIC, &prof_ts0);
+  prof_tick0 = prof_now();
+}
+
+/* Add the time of the current ISR to the statistics of the blocks
+   executed in it; the last entry holds the whole ISR */
+void prof_commit(prof_entry *tab, int n)
+{
+  int i, k;
+  prof_tick_t total = 0;
+
+  for(i=0;i<n;i++){
+    prof_tick_t t = (i == n-1) ? total : tab[i].cur;
+
+    if ((t == 0) && (i != n-1)) continue;
+    total += t;
+    tab[i].count++;
+    tab[i].sum += t;
+    if (t < tab[i].min) tab[i].min = t;
+    if (t > tab[i].max) tab[i].max = t;
+    for(k=0;(k<PROF_NBINS-1) && ((t >> (k+1)) != 0);k++);
+    tab[i].hist[k]++;
+    tab[i].cur = 0;
+  }
+}
+
+static void json_str(FILE *fp, const char *s)
+{
+  fputc('"', fp);
+  for(;*s;s++){
+    if ((*s == '"') || (*s == '\\')) fputc('\\', fp);
+    fputc(*s, fp);
+  }
+  fputc('"', fp);
+}
+
+/* Write the statistics as JSON, the times are given in ns */
+int prof_dump(const char *fname, const char *model, prof_entry *tab, int n)
+{
+  FILE *fp;
+  int i, k;
+  double ns = elapsed_ns();
+  prof_tick_t ticks = prof_now() - prof_tick0;
+  double scale = (ticks != 0) ? ns/ticks : 1.0;
+
+  fp = fopen(fname, "w");
+  if (fp == NULL) return -1;
+  fprintf(fp, "{\n  \"model\": ");
+  json_str(fp, model);
+  fprintf(fp, ",\n  \"unit\": \"ns\",\n  \"ns_per_tick\": %.6g,\n", scale);
+  fprintf(fp, "  \"hist_edges\": [");
+  for(k=0;k<=PROF_NBINS;k++) fprintf(fp, "%s%.6g", k ? ", " : "", (k == 0) ? 0.0 : scale*(double)(1ULL << k));
+  fprintf(fp, "],\n  \"blocks\": [\n");
+  for(i=0;i<n;i++){
+    fprintf(fp, "    {\"index\": %d, \"name\": ", (i == n-1) ? -1 : i);
+    json_str(fp, tab[i].name);
+    fprintf(fp, ", \"sysPath\": ");
+    json_str(fp, tab[i].path);
+    fprintf(fp, ", \"fcn\": ");
+    json_str(fp, tab[i].fcn);
+    fprintf(fp, ", \"count\": %llu", (unsigned long long) tab[i].count);
+    if (tab[i].count != 0)
+      fprintf(fp, ", \"min\": %.6g, \"mean\": %.6g, \"max\": %.6g",
+              scale*tab[i].min, scale*tab[i].sum/tab[i].count, scale*tab[i].max);
+    else
+      fprintf(fp, ", \"min\": 0, \"mean\": 0, \"max\": 0");
+    fprintf(fp, ", \"hist\": [");
+    for(k=0;k<PROF_NBINS;k++) fprintf(fp, "%s%u", k ? ", " : "", tab[i].hist[k]);
+    fprintf(fp, "]}%s\n", (i == n-1) ? "" : ",");
+  }
+  fprintf(fp, "  ]\n}\n");
+  fclose(fp);
+  return 0;
+}
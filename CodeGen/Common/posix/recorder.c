@@ -0,0 +1,175 @@
+/*
+COPYRIGHT (C) 2016  Roberto Bucher (roberto.bucher@supsi.ch)
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Lesser General Public
+License as published by the Free Software Foundation; either
+version 2 of the License, or (at your option) any later version.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public
+License along with this library; if not, write to the Free Software
+Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
+*/
+
+#include <recorder.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+#include <sched.h>
+
+#define REC_BUFSIZE  (1 << 20)    /* Buffer of the file */
+#define REC_POLL_NS  2000000      /* Sleep of the writer with the ring empty */
+
+/* Writer thread: the rows of the ring are written to the file, at most
+   up to the end of the ring at once */
+static void *rec_writer(void *arg)
+{
+  rec_file *rec = (rec_file *) arg;
+  struct timespec ts = {0, REC_POLL_NS};
+  size_t head, tail, n, idx;
+
+  tail = atomic_load_explicit(&rec->tail, memory_order_relaxed);
+  while(1){
+    head = atomic_load_explicit(&rec->head, memory_order_acquire);
+    if (head != tail) {
+      idx = tail % rec->rows;
+      n = head - tail;
+      if (n > rec->rows - idx) n = rec->rows - idx;
+      if (fwrite(&rec->ring[idx*rec->ncol], sizeof(double)*rec->ncol, n, rec->fp) != n)
+        rec->error = 1;
+      tail += n;
+      atomic_store_explicit(&rec->tail, tail, memory_order_release);
+    }
+    else if (atomic_load_explicit(&rec->stop, memory_order_acquire)) break;
+    else nanosleep(&ts, NULL);
+  }
+  return NULL;
+}
+
+/* Names of the columns: "t" and the comma separated names of the
+   channels, "u<k>" for the missing ones. Returns the bytes written in
+   buf (padded to a multiple of 8), buf NULL to get the size only. */
+static size_t rec_names(char *buf, const char *names, int ncol)
+{
+  char name[64];
+  const char *p = (names != NULL) ? names : "";
+  size_t len = 0, k, pad;
+  int col;
+
+  for(col=0;col<ncol;col++){
+    if (col == 0) strcpy(name, "t");
+    else {
+      k = 0;
+      while((*p != '\0') && (*p != ',')){
+        if (k < sizeof(name)-1) name[k++] = *p;
+        p++;
+      }
+      name[k] = '\0';
+      if (*p == ',') p++;
+      if (k == 0) sprintf(name, "u%d", col-1);
+    }
+    k = strlen(name) + 1;
+    if (buf != NULL) memcpy(buf+len, name, k);
+    len += k;
+  }
+  pad = (8 - len % 8) % 8;
+  if (buf != NULL) memset(buf+len, 0, pad);
+  return len + pad;
+}
+
+/* Open the file fname with ncol columns (time and the channels) and
+   start the writer. Returns NULL if the file cannot be written. */
+rec_file *rec_open(const char *fname, const char *names, int ncol, double Tsamp, int rows, int drop)
+{
+  rec_file *rec;
+  char *buf;
+  size_t len;
+
+  rec = (rec_file *) calloc(1, sizeof(rec_file));
+  if (rec == NULL) return NULL;
+  rec->ncol = ncol;
+  rec->rows = (rows > 0) ? rows : REC_ROWS;
+  rec->drop = drop;
+  rec->ring = (double *) malloc(sizeof(double)*rec->ncol*rec->rows);
+  len = rec_names(NULL, names, ncol);
+  buf = (char *) malloc(len);
+  rec->fp = fopen(fname, "wb");
+  if ((rec->ring == NULL) || (buf == NULL) || (rec->fp == NULL)) {
+    if (rec->fp != NULL) fclose(rec->fp);
+    free(buf);
+    free(rec->ring);
+    free(rec);
+    return NULL;
+  }
+  setvbuf(rec->fp, NULL, _IOFBF, REC_BUFSIZE);
+
+  memcpy(rec->hd.magic, REC_MAGIC, 8);
+  rec->hd.version = REC_VERSION;
+  rec->hd.ncol = ncol;
+  rec->hd.Tsamp = Tsamp;
+  rec->hd.nameLen = rec_names(buf, names, ncol);
+  fwrite(&rec->hd, sizeof(rec_header), 1, rec->fp);
+  fwrite(buf, 1, len, rec->fp);
+  free(buf);
+
+  atomic_init(&rec->head, 0);
+  atomic_init(&rec->tail, 0);
+  atomic_init(&rec->stop, 0);
+  if (pthread_create(&rec->thread, NULL, rec_writer, rec) != 0) {
+    fclose(rec->fp);
+    free(rec->ring);
+    free(rec);
+    return NULL;
+  }
+  return rec;
+}
+
+/* Put one row (ncol values) into the ring, called by the block: no
+   system call unless the ring is full and the rows are not dropped */
+void rec_put(rec_file *rec, const double *row)
+{
+  size_t head = atomic_load_explicit(&rec->head, memory_order_relaxed);
+
+  if (head - atomic_load_explicit(&rec->tail, memory_order_acquire) >= rec->rows) {
+    if (!rec->full) rec->hd.overflows++;
+    rec->full = 1;
+    if (rec->drop) {
+      rec->hd.dropped++;
+      return;
+    }
+    while(head - atomic_load_explicit(&rec->tail, memory_order_acquire) >= rec->rows)
+      sched_yield();
+  }
+  else rec->full = 0;
+  memcpy(&rec->ring[(head % rec->rows)*rec->ncol], row, sizeof(double)*rec->ncol);
+  atomic_store_explicit(&rec->head, head+1, memory_order_release);
+}
+
+/* Stop the writer after the last rows, write the counters in the
+   header and close the file. Returns 0, -1 on write errors. */
+int rec_close(rec_file *rec)
+{
+  int err;
+
+  if (rec == NULL) return -1;
+  atomic_store_explicit(&rec->stop, 1, memory_order_release);
+  pthread_join(rec->thread, NULL);
+
+  rec->hd.nrow = atomic_load(&rec->tail);
+  rec->hd.flags |= REC_CLOSED;
+  err = rec->error;
+  if ((fseek(rec->fp, 0, SEEK_SET) != 0) ||
+      (fwrite(&rec->hd, sizeof(rec_header), 1, rec->fp) != 1)) err = 1;
+  if (fclose(rec->fp) != 0) err = 1;
+  if (rec->hd.dropped != 0)
+    fprintf(stderr, "Recorder: %llu rows dropped, %llu overflows\n",
+            (unsigned long long) rec->hd.dropped, (unsigned long long) rec->hd.overflows);
+  free(rec->ring);
+  free(rec);
+  return err ? -1 : 0;
+}
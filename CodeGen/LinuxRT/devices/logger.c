@@ -3,10 +3,16 @@
 #include <string.h>
 
 #include <pyblock.h>
+#include <aggregate.h>
+
+/* intPar (optional): [window, stats]
+   window  samples aggregated in one record (aggregate.h, 0 or 1: none)
+   stats   statistics of the window (aggregate.h, AGG_ALL if missing) */
 
 struct _logger {
 	double * buff;
 	FILE * fp;
+	agg_state * agg;
 };
 
 static void logger_init(python_block * blk);
@@ -45,10 +51,12 @@ static void logger_init(python_block * blk)
 		free(logger);
 		exit(EXIT_FAILURE);
 	}
+	logger->agg = agg_from_par(blk->nin, blk->intPar, blk->intParNum, 0);
 	/* open log-file */
 	if (!blk->str) {
 		fprintf(stderr, "Error in logger init, "
 		                "no log-file specified\n");
+		agg_free(logger->agg);
 		free(logger->buff);
 		free(logger);
 		exit(EXIT_FAILURE);
@@ -56,6 +64,7 @@ static void logger_init(python_block * blk)
 	logger->fp = fopen(blk->str, "w");
 	if (!logger->fp) {
 		perror("fopen");
+		agg_free(logger->agg);
 		free(logger->buff);
 		free(logger);
 		exit(EXIT_FAILURE);
@@ -73,6 +82,13 @@ static void logger_out(python_block * blk)
 	/* write u's */
 	for (unsigned i = 0; nin > i; i++)
 		buff[i] = *(double *)blk->u[i];
+	/* aggregate, write only at the end of the window */
+	if (logger->agg) {
+		if (!agg_put(logger->agg, buff))
+			return;
+		buff = logger->agg->out;
+		nin = agg_width(logger->agg);
+	}
 	/* write to file */
 	if (fwrite((const void *)buff, sizeof(*buff), nin, fp) != nin) {
 		fprintf(stderr, "Error in "
@@ -89,6 +105,7 @@ static void logger_clean_up(struct _logger * logger)
 		perror("fclose");
 	/* free internal buffer */
 	free(logger->buff);
+	agg_free(logger->agg);
 	/* free logger struct */
 	free(logger);
 }
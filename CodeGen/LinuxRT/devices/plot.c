@@ -17,43 +17,114 @@ Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA.
 */
 
 #include <pyblock.h>
+#include <recorder.h>
+#include <aggregate.h>
 #include <stdio.h>
 #include <stdlib.h>
+#include <string.h>
 
-double get_run_time();
+double get_run_time(void);
+double get_Tsamp(void);
+
+/* intPar (optional): [format, drop, rows, window, stats]
+   format  0: text, 1: binary (recorder.h)
+   drop    binary: drop the rows with the ring of the recorder full
+   rows    binary: rows of the ring (0: REC_ROWS)
+   window  samples aggregated in one row (aggregate.h, 0 or 1: none)
+   stats   statistics of the window (aggregate.h, AGG_ALL if missing)
+   str:    "<file name>" or "<file name>|<channel names, comma separated>" */
+
+typedef struct {
+  FILE *fp;
+  rec_file *rec;
+  agg_state *agg;
+  int n;              /* Inputs in a row */
+  double row[];       /* Time and inputs (or results of the window) */
+} file_sink;
+
+static int binary(python_block *block)
+{
+  return (block->intParNum > 0) && (block->intPar[0] == 1);
+}
 
 static void init(python_block *block)
 {
-  FILE * fp;
+  file_sink *f;
+  char fname[256];
+  char aggNames[1024];
+  char *names;
+  agg_state *agg;
+  int i, n = 0, ncol;
 
-  char fname[50];
+  snprintf(fname, sizeof(fname), "/tmp/%s", block->str);
+  names = strchr(fname, '|');
+  if(names!=NULL) *names++ = '\0';
 
-  sprintf(fname,"/tmp/%s", block->str);
-  fp=fopen(fname,"w");
-  if(fp==NULL) exit(1);
-  block->ptrPar = fp;
+  if(binary(block)) for(i=0;i<block->nin;i++) n += CG_DIMIN(block, i);
+  else n = block->nin;
+  agg = agg_from_par(n, block->intPar, block->intParNum, 3);
+  ncol = 1 + ((agg!=NULL) ? agg_width(agg) : n);
+  if(agg!=NULL){
+    agg_names(agg, names, aggNames, sizeof(aggNames));
+    names = aggNames;
+  }
+
+  f = (file_sink *) calloc(1, sizeof(file_sink) + sizeof(double)*ncol);
+  if(f==NULL) exit(1);
+  f->agg = agg;
+  f->n = n;
+  block->ptrPar = f;
+
+  if(binary(block)){
+    f->rec = rec_open(fname, names, ncol, get_Tsamp()*((agg!=NULL) ? agg->window : 1),
+                      (block->intParNum > 2) ? block->intPar[2] : 0,
+                      (block->intParNum > 1) ? block->intPar[1] : 0);
+    if(f->rec==NULL) exit(1);
+    return;
+  }
+
+  f->fp=fopen(fname,"w");
+  if(f->fp==NULL) exit(1);
+  if(names!=NULL) fprintf(f->fp, "# t\t%s\n", names);
 }
 
 static void inout(python_block *block)
 {
-  double t;
-  int i;
-  double *u = block->u[0];
-  FILE * fp = (FILE *) block->ptrPar;
+  int i, j, k, ncol;
+  double *u;
+  file_sink *f = (file_sink *) block->ptrPar;
 
-  t = get_run_time();
-  fprintf(fp,"%lf\t", t);
+  f->row[0] = get_run_time();
+  k = 1;
   for(i=0;i<block->nin;i++){
     u = (double *) block->u[i];
-    fprintf(fp, "%lf\t", u[0]);
+    if(binary(block)) for(j=0;j<CG_DIMIN(block, i);j++) f->row[k++] = u[j];
+    else f->row[k++] = u[0];
+  }
+  ncol = 1 + f->n;
+  if(f->agg!=NULL){
+    if(!agg_put(f->agg, &f->row[1])) return;
+    memcpy(&f->row[1], f->agg->out, sizeof(double)*agg_width(f->agg));
+    ncol = 1 + agg_width(f->agg);
+  }
+
+  if(binary(block)){
+    rec_put(f->rec, f->row);
+    return;
   }
-  fprintf(fp, "\n"); 
+
+  for(k=0;k<ncol;k++) fprintf(f->fp, "%lf\t", f->row[k]);
+  fprintf(f->fp, "\n"); 
 }
 
 static void end(python_block *block)
 {
-  FILE * fp = (FILE *) block->ptrPar;
-  fclose(fp);
+  file_sink *f = (file_sink *) block->ptrPar;
+
+  if(binary(block)) rec_close(f->rec);
+  else fclose(f->fp);
+  agg_free(f->agg);
+  free(f);
 }
 
 void plot(int flag, python_block *block)
@@ -68,5 +139,3 @@ void plot(int flag, python_block *block)
     init(block);
   }
 }
-
-
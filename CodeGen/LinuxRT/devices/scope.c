@@ -11,6 +11,7 @@
 #include <sched.h>
 
 #include <pyblock.h>
+#include <aggregate.h>
 
 /* sth to convert number macros to strings */
 #define STR_HELPER(x) #x
@@ -29,12 +30,21 @@
 #define PLOTTER_COMMAND_ARGV_NUM 5
 /* when compiling define PLOTTER_SCRIPT */
 
+/* intPar: [timed, decim, counter, window, stats]
+   window  samples aggregated in one value of each stream (aggregate.h,
+           0 or 1: none), the decimation is used only without window
+   stats   statistics of the window (aggregate.h, AGG_ALL if missing),
+           every statistic is sent to the plotter as one stream */
+
 struct _scope {
   int sock;
   size_t buff_pos;
   size_t buff_len;
   char sock_name[SOCK_NAME_MAX_LEN];
   char * buff;
+  agg_state * agg;
+  double * in;
+  unsigned nstream;
 };
 
 static int scope_init(python_block * blk);
@@ -74,7 +84,7 @@ static char * unsigned_to_str(unsigned u)
   return str;
 }
 
-static void start_plotter(unsigned nin, int sock, int timed, const char * sock_name)
+static void start_plotter(unsigned nin, int sock, int timed, int window, const char * sock_name)
 {
   /* fork off process that will NOT run as rt */
   pid_t pid = fork();
@@ -89,8 +99,8 @@ static void start_plotter(unsigned nin, int sock, int timed, const char * sock_n
     }
     /* start plotter with sock_name and packet num as args */
     char * packet_num_str = unsigned_to_str(PACKET_NUM);
-    char dtime[10];
-    if(timed) sprintf(dtime, "%9.6lf", get_Tsamp());
+    char dtime[32];
+    if(timed) snprintf(dtime, sizeof(dtime), "%9.6lf", get_Tsamp()*window);
     else        sprintf(dtime, "1");
 	    
     if (!packet_num_str) {
@@ -149,9 +159,14 @@ static int scope_init(python_block * blk)
     fprintf(stderr, "Memory error in scope_init\n");
     exit(EXIT_FAILURE);
   }
-  sc->buff_len = blk->nin * PACKET_NUM * DOUBLE_SIZE;
+  sc->agg = agg_from_par(blk->nin, intPar, blk->intParNum, 3);
+  sc->nstream = sc->agg ? agg_width(sc->agg) : blk->nin;
+  sc->in = malloc(blk->nin * DOUBLE_SIZE);
+  sc->buff_len = sc->nstream * PACKET_NUM * DOUBLE_SIZE;
   sc->buff = malloc(sc->buff_len * sizeof(*sc->buff));
-  if (!sc->buff) {
+  if (!sc->buff || !sc->in) {
+    free(sc->in);
+    free(sc->buff);
     free(sc);
     fprintf(stderr, "Memory error in scope_init\n");
     exit(EXIT_FAILURE);
@@ -202,7 +217,7 @@ static int scope_init(python_block * blk)
   }
 
   /* try to start plotter process */
-  start_plotter(blk->nin, sock, intPar[0], sc->sock_name);
+  start_plotter(sc->nstream, sock, intPar[0], sc->agg ? sc->agg->window : 1, sc->sock_name);
 
   /* accept (blocking call) plotter */
   int conn = accept(sock, 0, 0);
@@ -229,12 +244,21 @@ static void scope_out(python_block * blk)
   int send_ret2 = 0;
   size_t buff_len = sc->buff_len;
   unsigned nin = blk->nin;
+  const double * val = sc->in;
+  int send_now;
+
+  for (unsigned i = 0; nin > i; i++)
+    sc->in[i] = *(double *)blk->u[i];
+  if (sc->agg) {
+    send_now = agg_put(sc->agg, sc->in);
+    val = sc->agg->out;
+  } else
+    send_now = (intPar[2] % intPar[1]) == 0;
+  nin = sc->nstream;
   /* write values to buffer */
 	
-  if((intPar[2] % intPar[1]) == 0){
-    for (unsigned i = 0; nin > i; i++)
-      memcpy((void *)(buff + (sc->buff_pos + i) * DOUBLE_SIZE),
-	     blk->u[i], DOUBLE_SIZE);
+  if(send_now){
+    memcpy((void *)(buff + sc->buff_pos * DOUBLE_SIZE), val, nin * DOUBLE_SIZE);
     sc->buff_pos += nin;
     /* if we are to send this tick, well send buffer contents */
     if (PACKET_NUM * nin == sc->buff_pos) {
@@ -261,6 +285,8 @@ static void scope_end(python_block * blk)
   int sock = sc->sock;
   close(sock);
   unlink(sc->sock_name);
+  agg_free(sc->agg);
+  free(sc->in);
   free(sc->buff);
   free(sc);
 }
@@ -11,6 +11,8 @@ int NAME(MODEL,_init)(void);
 int NAME(MODEL,_isr)(double);
 int NAME(MODEL,_end)(void);
 double NAME(MODEL,_get_tsamp)(void);
+/* Provided by the models generated with parFile=True */
+int NAME(MODEL,_par_load)(const char *fname, int verbose) __attribute__((weak));
 
 static volatile int end = 0;
 static double T = 0.0;
@@ -23,6 +25,9 @@ static int verbose = 0;
 static int extclock = 0;
 static int wait = 0;
 double FinalTime = 0.0;
+#define MAX_PARFILES 16
+static char *parFiles[MAX_PARFILES];
+static int nparFiles = 0;
 
 double get_run_time(void)
 {
@@ -51,13 +56,15 @@ void print_usage(void)
 	 "  -e  external clock\n"
 	 "  -w  wait to start\n"
 	 "  -V  print version\n"
+	 "  -P <file>  load the parameters of a parameter file (<model>.par),\n"
+	 "      more files are applied in order\n"
 	 "\n");
 }
 
 static void proc_opt(int argc, char *argv[])
 {
   int i;
-  while((i=getopt(argc,argv,"ef:hp:vVw"))!=-1){
+  while((i=getopt(argc,argv,"ef:hP:p:vVw"))!=-1){
     switch(i){
     case 'h':
       print_usage();
@@ -79,6 +86,13 @@ static void proc_opt(int argc, char *argv[])
       printf("Version %s\n",rtversion);
       exit(0);
       break;
+    case 'P':
+      if (nparFiles == MAX_PARFILES) {
+        printf("-> Too many parameter files.\n");
+        exit(1);
+      }
+      parFiles[nparFiles++] = optarg;
+      break;
     case 'f':
       if (strstr(optarg, "inf")) {
         FinalTime = 0.0;
@@ -91,11 +105,27 @@ static void proc_opt(int argc, char *argv[])
   }
 }
 
+/* Parameter files (option -P), applied in order */
+static void load_parameters(void)
+{
+  int k;
+
+  if (nparFiles == 0) return;
+  if (NAME(MODEL,_par_load) == NULL) {
+    printf("-> Model without parameter file, option -P ignored\n");
+    return;
+  }
+  for(k=0;k<nparFiles;k++){
+    if (NAME(MODEL,_par_load)(parFiles[k], verbose) < 0) exit(1);
+  }
+}
+
 int main(int argc,char** argv)
 {
   Tsamp = NAME(MODEL,_get_tsamp)();
 
   proc_opt(argc, argv);
+  load_parameters();
 
   signal(SIGINT,endme);
   signal(SIGKILL,endme);
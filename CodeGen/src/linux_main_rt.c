@@ -1,3 +1,4 @@
+#define _GNU_SOURCE
 #include <stdlib.h>
 #include <stdio.h>
 #include <time.h>
@@ -8,6 +9,11 @@
 #include <string.h>
 #include <fcntl.h>
 #include <pthread.h>
+#include <semaphore.h>
+#include <stdint.h>
+#include <sys/stat.h>
+
+#include <rtstats.h>
 
 #ifdef CG_WITH_IOPL
 #include <sys/io.h>
@@ -19,12 +25,29 @@ void canopen_synch(void);
 
 #define XNAME(x,y)  x##y
 #define NAME(x,y)   XNAME(x,y)
+#define XSTR(x)     #x
+#define STR(x)      XSTR(x)
 
 int NAME(MODEL,_init)(void);
 int NAME(MODEL,_isr)(double);
 int NAME(MODEL,_end)(void);
 double NAME(MODEL,_get_tsamp)(void);
 
+/* Provided by the models generated with parFile=True */
+int NAME(MODEL,_par_load)(const char *fname, int verbose) __attribute__((weak));
+
+/* Provided by the models generated with rateTasks=True */
+int NAME(MODEL,_get_nrates)(void) __attribute__((weak));
+int NAME(MODEL,_get_rate_factor)(int) __attribute__((weak));
+void NAME(MODEL,_isr_rate)(int, double) __attribute__((weak));
+void NAME(MODEL,_rate_publish)(int) __attribute__((weak));
+void NAME(MODEL,_rate_fetch)(int) __attribute__((weak));
+
+/* Provided by the models generated with partitions > 1 */
+int NAME(MODEL,_get_nparts)(void) __attribute__((weak));
+int NAME(MODEL,_part_sync)(int) __attribute__((weak));
+void NAME(MODEL,_part_step)(int, int) __attribute__((weak));
+
 #define NSEC_PER_SEC    1000000000
 #define USEC_PER_SEC	1000000
 
@@ -38,8 +61,37 @@ static int prio = 99;
 static int verbose = 0;
 static int wait = 0;
 static int extclock = 0;
+static int multirate = 0;
+static int partitioned = 0;
 double FinalTime = 0.0;
-
+#define MAX_PARFILES 16
+static char *parFiles[MAX_PARFILES];
+static int nparFiles = 0;
+
+/* Rate tasks (option -m) */
+#define MAX_RATES 16
+static int nrates = 1;
+static int rate_factor[MAX_RATES];
+static long rate_hyper = 1;
+static long rate_cnt = 0;
+static pthread_t rate_thrd[MAX_RATES];
+static sem_t rate_sem[MAX_RATES];
+static int rate_busy[MAX_RATES];
+static double rate_T[MAX_RATES];
+
+/* Partitions (option -c) */
+#define MAX_PARTS 64
+static int nparts = 1;
+static int part_sync[3];
+static volatile int part_end = 0;
+static pthread_t part_thrd[MAX_PARTS];
+static pthread_barrier_t part_start, part_mid[3], part_done;
+
+/* Timing statistics, shared with the monitors (supsictrl/rtstats.py) */
+#define RT_STATS_SHM "/pysim_" STR(MODEL)
+static rt_stats stats_local;
+static rt_stats *stats = &stats_local;
+static int stats_shm = 0;
 
 double get_run_time(void)
 {
@@ -71,6 +123,11 @@ static inline void tsnorm(struct timespec *ts)
   }
 }
 
+static inline int64_t tsdiff(struct timespec t1, struct timespec t2)
+{
+  return (int64_t)(t1.tv_sec - t2.tv_sec) * NSEC_PER_SEC + (t1.tv_nsec - t2.tv_nsec);
+}
+
 static inline double calcdiff(struct timespec t1, struct timespec t2)
 {
   long diff;
@@ -79,9 +136,284 @@ static inline double calcdiff(struct timespec t1, struct timespec t2)
   return (1e-6*diff);
 }
 
+static void *rate_task(void *p)
+{
+  int k = (int)(long) p;
+  struct sched_param param;
+
+  /* Slower rates get lower priorities */
+  if (prio >= 0) {
+    param.sched_priority = (prio - k > 1) ? prio - k : 1;
+    if(sched_setscheduler(0, SCHED_FIFO, &param)==-1) {
+      perror("sched_setscheduler failed");
+      exit(-1);
+    }
+  }
+
+  while(1){
+    sem_wait(&rate_sem[k]);
+    if (end) break;
+    NAME(MODEL,_isr_rate)(k, rate_T[k]);
+    __atomic_store_n(&rate_busy[k], 0, __ATOMIC_RELEASE);
+  }
+  return NULL;
+}
+
+static long lcm(long a, long b)
+{
+  long x = a, y = b, r;
+
+  while (y != 0) {
+    r = x % y;
+    x = y;
+    y = r;
+  }
+  return a / x * b;
+}
+
+static void rate_start(void)
+{
+  int k;
+
+  nrates = NAME(MODEL,_get_nrates)();
+  if (nrates > MAX_RATES) {
+    fprintf(stderr, "Too many rates (%d)\n", nrates);
+    exit(1);
+  }
+  rate_hyper = 1;
+  for(k=0;k<nrates;k++){
+    rate_factor[k] = NAME(MODEL,_get_rate_factor)(k);
+    rate_hyper = lcm(rate_hyper, rate_factor[k]);
+  }
+  for(k=1;k<nrates;k++){
+    sem_init(&rate_sem[k], 0, 0);
+    rate_busy[k] = 0;
+    pthread_create(&rate_thrd[k], NULL, rate_task, (void *)(long) k);
+  }
+}
+
+static void rate_stop(void)
+{
+  int k;
+
+  end = 1;
+  for(k=1;k<nrates;k++){
+    sem_post(&rate_sem[k]);
+    pthread_join(rate_thrd[k], NULL);
+    sem_destroy(&rate_sem[k]);
+  }
+}
+
+/* Base rate step: the rate k task is released every rate_factor[k] ticks
+   if its previous step is completed, the transition buffers are copied
+   while the task is idle */
+static void rate_step(double t)
+{
+  int k;
+  int rel[MAX_RATES];
+
+  for(k=1;k<nrates;k++){
+    rel[k] = 0;
+    if (rate_cnt % rate_factor[k] != 0) continue;
+    if (__atomic_load_n(&rate_busy[k], __ATOMIC_ACQUIRE)) {
+      stats->rate_overruns++;
+      continue;
+    }
+    rel[k] = 1;
+    NAME(MODEL,_rate_publish)(k);
+  }
+  if (rate_cnt % rate_factor[0] == 0) NAME(MODEL,_isr_rate)(0, t);
+  for(k=1;k<nrates;k++){
+    if (!rel[k]) continue;
+    NAME(MODEL,_rate_fetch)(k);
+    rate_T[k] = t;
+    __atomic_store_n(&rate_busy[k], 1, __ATOMIC_RELEASE);
+    sem_post(&rate_sem[k]);
+  }
+  rate_cnt = (rate_cnt + 1) % rate_hyper;
+}
+
+static void set_cpu(int cpu)
+{
+  cpu_set_t set;
+  long ncpu = sysconf(_SC_NPROCESSORS_ONLN);
+
+  CPU_ZERO(&set);
+  CPU_SET(cpu % (ncpu > 0 ? ncpu : 1), &set);
+  if (pthread_setaffinity_np(pthread_self(), sizeof(set), &set) != 0)
+    fprintf(stderr, "Partition CPU affinity not set\n");
+}
+
+/* The statistics are placed in shared memory if possible, otherwise
+   they are only reported at the end of the execution */
+static void stats_open(void)
+{
+  int fd;
+  void *p;
+
+  fd = shm_open(RT_STATS_SHM, O_CREAT | O_RDWR, 0644);
+  if (fd >= 0 && ftruncate(fd, sizeof(rt_stats)) == 0) {
+    p = mmap(NULL, sizeof(rt_stats), PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+    if (p != MAP_FAILED) {
+      stats = (rt_stats *) p;
+      stats_shm = 1;
+    }
+  }
+  if (fd >= 0) close(fd);
+  if (!stats_shm) {
+    if (fd >= 0) shm_unlink(RT_STATS_SHM);
+    fprintf(stderr, "Timing statistics not shared\n");
+  }
+
+  memset(stats, 0, sizeof(rt_stats));
+  stats->version = RT_STATS_VERSION;
+  stats->nbins = RT_STATS_NBINS;
+  stats->tsamp = (int64_t)(1e9*Tsamp);
+  stats->lat_bin = 1000;
+  stats->exec_bin = stats->tsamp / 128 > 1000 ? stats->tsamp / 128 : 1000;
+  stats->lat_min = INT64_MAX;
+  stats->exec_min = INT64_MAX;
+  __atomic_store_n(&stats->magic, RT_STATS_MAGIC, __ATOMIC_RELEASE);
+}
+
+static inline void stats_hist(uint64_t *hist, int64_t val, int64_t bin)
+{
+  int64_t k = val / bin;
+
+  if (k < 0) k = 0;
+  if (k >= RT_STATS_NBINS) k = RT_STATS_NBINS - 1;
+  hist[k]++;
+}
+
+/* Called by the rt task only, no stdio and no locks */
+static void stats_update(int64_t lat, int64_t exec, int64_t overrun)
+{
+  uint64_t seq = stats->seq;
+
+  __atomic_store_n(&stats->seq, seq + 1, __ATOMIC_RELAXED);
+  __atomic_thread_fence(__ATOMIC_RELEASE);
+  stats->periods++;
+  if (overrun > 0) {
+    stats->overruns++;
+    if (overrun > stats->overrun_max) stats->overrun_max = overrun;
+  }
+  if (lat >= 0) {             /* Not measured in the first period */
+    if (lat < stats->lat_min) stats->lat_min = lat;
+    if (lat > stats->lat_max) stats->lat_max = lat;
+    stats->lat_sum += lat;
+    stats_hist(stats->lat_hist, lat, stats->lat_bin);
+  }
+  if (exec < stats->exec_min) stats->exec_min = exec;
+  if (exec > stats->exec_max) stats->exec_max = exec;
+  stats->exec_sum += exec;
+  stats_hist(stats->exec_hist, exec, stats->exec_bin);
+  __atomic_store_n(&stats->seq, seq + 2, __ATOMIC_RELEASE);
+}
+
+static void stats_close(void)
+{
+  uint64_t n = stats->periods;
+
+  if (n > 1) {
+    fprintf(stderr, "Periods: %llu, overruns: %llu (max %.1f us), rate overruns: %llu\n",
+            (unsigned long long) n, (unsigned long long) stats->overruns,
+            1e-3*stats->overrun_max, (unsigned long long) stats->rate_overruns);
+    fprintf(stderr, "Latency   [us]: min %.1f mean %.1f max %.1f\n",
+            1e-3*stats->lat_min, 1e-3*stats->lat_sum/(n > 1 ? n-1 : 1), 1e-3*stats->lat_max);
+    fprintf(stderr, "Execution [us]: min %.1f mean %.1f max %.1f\n",
+            1e-3*stats->exec_min, 1e-3*stats->exec_sum/n, 1e-3*stats->exec_max);
+  }
+  if (stats_shm) {
+    munmap(stats, sizeof(rt_stats));
+    shm_unlink(RT_STATS_SHM);
+    stats = &stats_local;
+    stats_shm = 0;
+  }
+}
+
+/* Outputs without feed-through, outputs with feed-through, state
+   updates; a barrier is needed only if signals of the other partitions
+   are read after the previous phase. The step ends when all the
+   partitions have completed their updates */
+static void part_phases(int p)
+{
+  int phase;
+
+  for(phase=0;phase<3;phase++){
+    if (part_sync[phase]) pthread_barrier_wait(&part_mid[phase]);
+    NAME(MODEL,_part_step)(p, phase);
+  }
+  pthread_barrier_wait(&part_done);
+}
+
+static void *part_task(void *arg)
+{
+  int p = (int)(long) arg;
+  struct sched_param param;
+
+  set_cpu(p);
+  if (prio >= 0) {
+    param.sched_priority = prio;
+    if(sched_setscheduler(0, SCHED_FIFO, &param)==-1) {
+      perror("sched_setscheduler failed");
+      exit(-1);
+    }
+  }
+
+  while(1){
+    pthread_barrier_wait(&part_start);
+    if (part_end) break;
+    part_phases(p);
+  }
+  return NULL;
+}
+
+static void part_start_threads(void)
+{
+  int p;
+
+  nparts = NAME(MODEL,_get_nparts)();
+  if (nparts > MAX_PARTS) {
+    fprintf(stderr, "Too many partitions (%d)\n", nparts);
+    exit(1);
+  }
+  pthread_barrier_init(&part_start, NULL, nparts);
+  pthread_barrier_init(&part_done, NULL, nparts);
+  for(p=0;p<3;p++){
+    part_sync[p] = NAME(MODEL,_part_sync)(p);
+    pthread_barrier_init(&part_mid[p], NULL, nparts);
+  }
+  set_cpu(0);
+  for(p=1;p<nparts;p++)
+    pthread_create(&part_thrd[p], NULL, part_task, (void *)(long) p);
+}
+
+static void part_stop_threads(void)
+{
+  int p;
+
+  part_end = 1;
+  pthread_barrier_wait(&part_start);
+  for(p=1;p<nparts;p++)
+    pthread_join(part_thrd[p], NULL);
+  pthread_barrier_destroy(&part_start);
+  pthread_barrier_destroy(&part_done);
+  for(p=0;p<3;p++)
+    pthread_barrier_destroy(&part_mid[p]);
+}
+
+/* One step, partition 0 runs in the rt task, returns when all the
+   partitions are done */
+static void part_step(void)
+{
+  pthread_barrier_wait(&part_start);
+  part_phases(0);
+}
+
 static void *rt_task(void *p)
 {
-  struct timespec t_next, t_current, t_isr, T0;
+  struct timespec t_next, t_current, t_isr, T0, t_wake, t_end;
+  int64_t lat = -1, overrun;
   struct sched_param param;
 
   if (prio >= 0) {
@@ -102,7 +434,11 @@ static void *rt_task(void *p)
 
   T=0;
 
+  stats_open();
+
   NAME(MODEL,_init)();
+  if (multirate) rate_start();
+  if (partitioned) part_start_threads();
   
 #ifdef CANOPEN
   canopen_synch();
@@ -111,12 +447,15 @@ static void *rt_task(void *p)
   /* get current time */
   clock_gettime(CLOCK_MONOTONIC,&t_current);
   T0 = t_current;
+  t_wake = t_current;
   
   while(!end){
 
     /* periodic task */
     T = calcdiff(t_current,T0);
-    NAME(MODEL,_isr)(T);
+    if (multirate) rate_step(T);
+    else if (partitioned) part_step();
+    else NAME(MODEL,_isr)(T);
 
 #ifdef CANOPEN
     canopen_synch();
@@ -129,18 +468,21 @@ static void *rt_task(void *p)
     tsnorm(&t_next);
 
     /* Check if Overrun */
-    clock_gettime(CLOCK_MONOTONIC,&t_current);
-    if (t_current.tv_sec > t_next.tv_sec ||
-	(t_current.tv_sec == t_next.tv_sec && t_current.tv_nsec > t_next.tv_nsec)) {
-      int usec = (t_current.tv_sec - t_next.tv_sec) * 1000000 + (t_current.tv_nsec -
-								 t_next.tv_nsec)/1000;
-      fprintf(stderr, "Base rate overrun by %d us\n", usec);
-      t_next= t_current;
-    }
+    clock_gettime(CLOCK_MONOTONIC,&t_end);
+    overrun = tsdiff(t_end, t_next);
+    stats_update(lat, tsdiff(t_end, t_wake), overrun);
+    if (overrun > 0) t_next = t_end;
     clock_nanosleep(CLOCK_MONOTONIC, TIMER_ABSTIME, &t_next, NULL);
+
+    /* Wake-up latency */
+    clock_gettime(CLOCK_MONOTONIC,&t_wake);
+    lat = tsdiff(t_wake, t_next);
     t_current = t_next;
   }
+  if (multirate) rate_stop();
+  if (partitioned) part_stop_threads();
   NAME(MODEL,_end)();
+  stats_close();
   pthread_exit(0);
 }
 
@@ -159,8 +501,14 @@ void print_usage(void)
 	 "  -v  verbose output\n"
 	 "  -p <priority>  set rt task priority (default 99)\n"
 	 "  -e  external clock\n"
+	 "  -c  run the partitions in parallel on separate CPUs\n"
+	 "      (model generated with partitions > 1)\n"
+	 "  -m  run the slower rates in lower priority threads\n"
+	 "      (model generated with rateTasks=True)\n"
 	 "  -w  wait to start\n"
 	 "  -V  print version\n"
+	 "  -P <file>  load the parameters of a parameter file (<model>.par),\n"
+	 "      more files are applied in order\n"
    "  -D  command line parameters\n"
    "        SHV_BROKER=hostname:port\n"
 	 "\n");
@@ -191,7 +539,7 @@ static void proc_opt(int argc, char *argv[])
   int i;
   char *t;
 
-  while((i=getopt(argc,argv,"D:ef:hp:vVw"))!=-1){
+  while((i=getopt(argc,argv,"cD:ef:hmP:p:vVw"))!=-1){
     switch(i){
     case 'h':
       print_usage();
@@ -206,6 +554,12 @@ static void proc_opt(int argc, char *argv[])
     case 'e':
       extclock = 1;
       break;
+    case 'm':
+      multirate = 1;
+      break;
+    case 'c':
+      partitioned = 1;
+      break;
     case 'w':
       wait = 1;
       break;
@@ -213,6 +567,13 @@ static void proc_opt(int argc, char *argv[])
       printf("Version %s\n",rtversion);
       exit(0);
       break;
+    case 'P':
+      if (nparFiles == MAX_PARFILES) {
+        printf("-> Too many parameter files.\n");
+        exit(1);
+      }
+      parFiles[nparFiles++] = optarg;
+      break;
     case 'f':
       if (strstr(optarg, "inf")) {
         FinalTime = 0.0;
@@ -251,6 +612,21 @@ static void proc_opt(int argc, char *argv[])
   }
 }
 
+/* Parameter files (option -P), applied in order */
+static void load_parameters(void)
+{
+  int k;
+
+  if (nparFiles == 0) return;
+  if (NAME(MODEL,_par_load) == NULL) {
+    printf("-> Model without parameter file, option -P ignored\n");
+    return;
+  }
+  for(k=0;k<nparFiles;k++){
+    if (NAME(MODEL,_par_load)(parFiles[k], verbose) < 0) exit(1);
+  }
+}
+
 int main(int argc,char** argv)
 {
   pthread_t thrd;
@@ -259,6 +635,16 @@ int main(int argc,char** argv)
 
   proc_opt(argc, argv);
 
+  if (multirate && NAME(MODEL,_get_nrates) == NULL) {
+    printf("-> Model without rate tasks, option -m ignored\n");
+    multirate = 0;
+  }
+  if (partitioned && NAME(MODEL,_get_nparts) == NULL) {
+    printf("-> Model without partitions, option -c ignored\n");
+    partitioned = 0;
+  }
+  load_parameters();
+
   signal(SIGINT,endme);
   signal(SIGKILL,endme);
 
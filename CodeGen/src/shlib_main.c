@@ -0,0 +1,267 @@
+/* Main of the models built as shared library (template shlib.tmf)
+
+   The model is stepped from the caller (supsisim/shlib.py), the signals
+   and the parameters are read and written in place through the tables
+   exported by the generated code (<model>_signals, <model>_node_slot,
+   <model>_blk_realPar, ...).
+
+   The batch functions run K instances of the model in lockstep: the
+   real parameters, the signals, the ptrPar of the blocks and the state
+   outside the blocks (<model>_state) of the instances are kept by the
+   caller in arrays (K x npar, K x nsignals, K x nblocks, K x state
+   bytes), the blocks of the model are pointed to the instance before
+   its step. */
+
+#include <stdlib.h>
+#include <stdio.h>
+#include <string.h>
+#include <pyblock.h>
+
+#define XNAME(x,y)  x##y
+#define NAME(x,y)   XNAME(x,y)
+#define XSTR(x)     #x
+#define STR(x)      XSTR(x)
+
+int NAME(MODEL,_init)(void);
+int NAME(MODEL,_isr)(double);
+int NAME(MODEL,_end)(void);
+double NAME(MODEL,_get_tsamp)(void);
+
+extern python_block NAME(block_,MODEL)[];
+extern const int NAME(MODEL,_nblocks);
+extern const int NAME(MODEL,_nsignals);
+extern double * const NAME(MODEL,_signals);
+extern double * const NAME(MODEL,_blk_realPar)[];
+extern const int NAME(MODEL,_blk_realParNum)[];
+extern const int NAME(MODEL,_nstate);
+extern void * const NAME(MODEL,_state)[];
+extern const int NAME(MODEL,_state_size)[];
+
+static double T = 0.0;
+static double Tsamp;
+double FinalTime = 0.0;
+
+const char *pysim_model = STR(MODEL);
+
+double get_run_time(void)
+{
+  return(T);
+}
+
+double get_Tsamp(void)
+{
+  return(Tsamp);
+}
+
+int get_priority_for_com(void)
+{
+  return -1;
+}
+
+double pysim_time(void)
+{
+  return(T);
+}
+
+double pysim_tsamp(void)
+{
+  return(NAME(MODEL,_get_tsamp)());
+}
+
+void pysim_init(void)
+{
+  Tsamp = NAME(MODEL,_get_tsamp)();
+  T = 0.0;
+  NAME(MODEL,_init)();
+}
+
+/* n sampling periods */
+void pysim_step(long n)
+{
+  long k;
+
+  for(k=0;k<n;k++){
+    NAME(MODEL,_isr)(T);
+    T += Tsamp;
+  }
+}
+
+/* n sampling periods, the signals idx[0..nidx-1] are copied into the
+   row k of out (n x nidx) after the period k */
+void pysim_run(long n, const int *idx, int nidx, double *out)
+{
+  double *signals = NAME(MODEL,_signals);
+  long k;
+  int i;
+
+  for(k=0;k<n;k++){
+    NAME(MODEL,_isr)(T);
+    T += Tsamp;
+    for(i=0;i<nidx;i++) out[k*nidx+i] = signals[idx[i]];
+  }
+}
+
+void pysim_end(void)
+{
+  NAME(MODEL,_end)();
+}
+
+/* Batch of instances */
+
+static int bK = 0;
+static int bNpar, bNstate;
+static double *bPar;
+static double *bSig;
+static void **bPtr;
+static char *bState;
+
+static int npar(void)
+{
+  int i, n = 0;
+
+  for(i=0;i<NAME(MODEL,_nblocks);i++) n += NAME(MODEL,_blk_realParNum)[i];
+  return(n);
+}
+
+int pysim_batch_npar(void)
+{
+  return(npar());
+}
+
+int pysim_batch_nstate(void)
+{
+  int j, n = 0;
+
+  for(j=0;j<NAME(MODEL,_nstate);j++) n += NAME(MODEL,_state_size)[j];
+  return(n);
+}
+
+/* Copy the real parameters p of an instance into the model (dir=1)
+   or from the model (dir=0) */
+static void copy_par(double *p, int dir)
+{
+  int i, n;
+
+  for(i=0;i<NAME(MODEL,_nblocks);i++){
+    n = NAME(MODEL,_blk_realParNum)[i];
+    if(n == 0) continue;
+    if(dir) memcpy(NAME(MODEL,_blk_realPar)[i], p, n*sizeof(double));
+    else    memcpy(p, NAME(MODEL,_blk_realPar)[i], n*sizeof(double));
+    p += n;
+  }
+}
+
+/* Copy the state outside the blocks into st (dir=0) or from st (dir=1) */
+static void copy_state(char *st, int dir)
+{
+  int j, n;
+
+  for(j=0;j<NAME(MODEL,_nstate);j++){
+    n = NAME(MODEL,_state_size)[j];
+    if(dir) memcpy(NAME(MODEL,_state)[j], st, n);
+    else    memcpy(st, NAME(MODEL,_state)[j], n);
+    st += n;
+  }
+}
+
+/* Point the model to the instance k */
+static void batch_load(int k)
+{
+  python_block *blk = NAME(block_,MODEL);
+  double *par = bPar + (long) k*bNpar;
+  int i;
+
+  for(i=0;i<NAME(MODEL,_nblocks);i++){
+    if(NAME(MODEL,_blk_realParNum)[i] != 0){
+      blk[i].realPar = par;
+      par += NAME(MODEL,_blk_realParNum)[i];
+    }
+    blk[i].ptrPar = bPtr[(long) k*NAME(MODEL,_nblocks) + i];
+  }
+  memcpy(NAME(MODEL,_signals), bSig + (long) k*NAME(MODEL,_nsignals), NAME(MODEL,_nsignals)*sizeof(double));
+  copy_state(bState + (long) k*bNstate, 1);
+}
+
+/* Save the model into the instance k */
+static void batch_save(int k)
+{
+  python_block *blk = NAME(block_,MODEL);
+  int i;
+
+  for(i=0;i<NAME(MODEL,_nblocks);i++) bPtr[(long) k*NAME(MODEL,_nblocks) + i] = blk[i].ptrPar;
+  memcpy(bSig + (long) k*NAME(MODEL,_nsignals), NAME(MODEL,_signals), NAME(MODEL,_nsignals)*sizeof(double));
+  copy_state(bState + (long) k*bNstate, 0);
+}
+
+/* Initialize K instances, par holds their real parameters (K x npar),
+   sig, ptr and state are filled by the initialization */
+int pysim_batch_init(int K, double *par, double *sig, void **ptr, char *state)
+{
+  char *st0;
+  int k;
+
+  bNpar = npar();
+  bNstate = pysim_batch_nstate();
+  bPar = par;
+  bSig = sig;
+  bPtr = ptr;
+  bState = state;
+  Tsamp = NAME(MODEL,_get_tsamp)();
+  T = 0.0;
+
+  /* State outside the blocks at load time, the same for all the instances */
+  st0 = malloc(bNstate > 0 ? bNstate : 1);
+  if(st0 == NULL) return(-1);
+  copy_state(st0, 0);
+
+  for(k=0;k<K;k++){
+    /* The initialization points the blocks to the parameters of the model */
+    copy_par(par + (long) k*bNpar, 1);
+    memset(NAME(MODEL,_signals), 0, NAME(MODEL,_nsignals)*sizeof(double));
+    copy_state(st0, 1);
+    NAME(MODEL,_init)();
+    copy_par(par + (long) k*bNpar, 0);
+    batch_save(k);
+  }
+  free(st0);
+  bK = K;
+  return(0);
+}
+
+/* n sampling periods of all the instances, the signals of the instance
+   k after the period s are copied into out[k][s] (K x n x nsignals) if
+   out is not NULL */
+void pysim_batch_run(long n, double *out)
+{
+  long s;
+  int k, nsig = NAME(MODEL,_nsignals);
+
+  for(s=0;s<n;s++){
+    for(k=0;k<bK;k++){
+      batch_load(k);
+      NAME(MODEL,_isr)(T);
+      batch_save(k);
+      if(out != NULL) memcpy(out + ((long) k*n + s)*nsig, NAME(MODEL,_signals), nsig*sizeof(double));
+    }
+    T += Tsamp;
+  }
+}
+
+/* Terminate the instances, the blocks are pointed back to the
+   parameters of the model */
+void pysim_batch_end(void)
+{
+  python_block *blk = NAME(block_,MODEL);
+  int i, k;
+
+  for(k=0;k<bK;k++){
+    batch_load(k);
+    NAME(MODEL,_end)();
+    batch_save(k);
+  }
+  for(i=0;i<NAME(MODEL,_nblocks);i++){
+    blk[i].realPar = NAME(MODEL,_blk_realPar)[i];
+    blk[i].ptrPar = NULL;
+  }
+  bK = 0;
+}
@@ -0,0 +1,37 @@
+from supsisim.RCPblk import RCPblk
+from supsisim.aggregate import aggMask
+from numpy import size
+
+def aggregateBlk(pin, pout, window, stats='all', n=0):
+    """
+
+    Call:   aggregateBlk(pin, pout, window, stats, n)
+
+    Parameters
+    ----------
+       pin: connected input port(s)
+       pout: connected output port
+       window : Samples of a window
+       stats : Statistics of a window, 'all' or some of 'mean,min,max,rms,last'
+       n : Elements of the inputs (0: one per input)
+
+    Returns
+    -------
+        blk  : RCPblk
+
+    The output holds the statistics of the last complete window, ordered
+    by element and then by statistic (mean, min, max, rms, last).
+    """
+
+    if(size(pout) != 1):
+        raise ValueError("Block should have 1 output port; received %i." % size(pout))
+    if int(window) < 2:
+        raise ValueError("Window must be >= 2; received %i." % int(window))
+    mask = aggMask(stats)
+    if n <= 0:
+        n = size(pin)
+    nstat = bin(mask).count('1')
+    blk = RCPblk('aggregate',pin,pout,[0,0],1,[],[int(window), mask, int(n)])
+    blk.dimPin[:] = 0      # all the elements of vector signals
+    blk.dimPout[:] = n*nstat
+    return blk
@@ -17,9 +17,14 @@ def clarke_forwardBlk(pin, pout):
 
     """
 
-    if (size(pin) != 3 and size(pin) != 2):
+    if (size(pin) != 3 and size(pin) != 2 and size(pin) != 1):
         raise ValueError("Forward Clarke transformation has to have 2 or 3 inputs, current number of inputs is (%i)" % (size(pin)))
 
     blk = RCPblk('forward_clarke', pin, pout, [0,0], 1, [], [])
+    # One vector input with 2 or 3 currents, one vector output [alpha, beta]
+    if size(pin) == 1:
+        blk.dimPin[:] = 0
+    if size(pout) == 1:
+        blk.dimPout[:] = 2
     return blk
 
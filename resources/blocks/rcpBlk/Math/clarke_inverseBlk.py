@@ -18,5 +18,10 @@ def clarke_inverseBlk(pin, pout):
     """
 
     blk = RCPblk('inverse_clarke', pin, pout, [0,0], 1, [], [])
+    # One vector input [alpha, beta], one vector output with the 3 currents
+    if size(pin) == 1:
+        blk.dimPin[:] = 2
+    if size(pout) == 1:
+        blk.dimPout[:] = 3
     return blk
 
@@ -18,5 +18,10 @@ def park_forwardBlk(pin, pout):
     """
 
     blk = RCPblk('forward_park', pin, pout, [0,0], 1, [], [])
+    # Vectors [alpha, beta] and angle as inputs, one vector output [d, q]
+    if size(pin) == 2:
+        blk.dimPin[0] = 2
+    if size(pout) == 1:
+        blk.dimPout[:] = 2
     return blk
 
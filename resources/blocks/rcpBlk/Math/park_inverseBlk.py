@@ -18,5 +18,10 @@ def park_inverseBlk(pin, pout):
     """
 
     blk = RCPblk('inverse_park', pin, pout, [0,0], 1, [], [])
+    # Vectors [d, q] and angle as inputs, one vector output [alpha, beta]
+    if size(pin) == 2:
+        blk.dimPin[0] = 2
+    if size(pout) == 1:
+        blk.dimPout[:] = 2
     return blk
 
@@ -21,5 +21,8 @@ def prodBlk(pin, pout):
         raise ValueError("Block should have 1 output port; received %i." % size(pout))
 
     blk = RCPblk('prod',pin,pout,[0,0],1,[],[])
+    # Elementwise on vector signals
+    blk.dimPin[:] = 0
+    blk.dimPout[:] = 0
     return blk
 
@@ -24,5 +24,8 @@ def sumBlk(pin, pout, Gains):
         raise ValueError("Block should have 1 output port; received %i." % size(pout))
 
     blk = RCPblk('sum',pin,pout,[0,0],1,Gains,[])
+    # Elementwise on vector signals
+    blk.dimPin[:] = 0
+    blk.dimPout[:] = 0
     return blk
 
@@ -1,16 +1,11 @@
-import numpy as np
 import matplotlib.pyplot as plt
+from supsisim.viewer import DataViewer
 
 def plotDlg(nin, nout, pars, name):
     fn = '/tmp/'+name
 
     try:
-        x = np.loadtxt(fn)
-        t = x[:,0]
-        y = x[:,1:]
-        plt.plot(t,y)
-        plt.grid()
+        v = DataViewer(fn)
         plt.show()
     except:
         pass
-
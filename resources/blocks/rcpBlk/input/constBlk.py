@@ -9,7 +9,7 @@ def constBlk(pout, val):
     Parameters
     ----------
        pout: connected output port(s)
-       val : Value
+       val : Value (scalar or vector)
 
     Returns
     -------
@@ -20,5 +20,6 @@ def constBlk(pout, val):
     if(size(pout) != 1):
         raise ValueError("Block should have 1 output port; received %i." % size(pout))
     blk = RCPblk('constant',[],pout,[0,0],0,[val],[])
+    blk.dimPout[:] = size(val)
     return blk
 
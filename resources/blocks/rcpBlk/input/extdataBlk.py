@@ -1,17 +1,25 @@
 from supsisim.RCPblk import RCPblk
+from supsisim.recfile import isRecFile, textToRec
 from numpy import size
 
-def extdataBlk(pout, ch, datasize, fname):
+def extdataBlk(pout, ch, datasize, fname, fmt='txt', interp='hold', Tdata=0, periodic=1):
     """
 
-    Call:   extdataBlk(pout, ch, len, fname)
+    Call:   extdataBlk(pout, ch, len, fname, fmt, interp, Tdata, periodic)
 
     Parameters
     ----------
        pout: connected output port(s)
        ch : Channels
-       len : Data length
+       len : Data length (format 'txt')
        fname : File name
+       fmt : 'txt': the text file is read at start, one row per sample
+             'bin': binary recording (supsisim.recfile) mapped in memory,
+                    a text file is converted once into <fname>.rec
+       interp : 'hold' or 'linear' between the rows (format 'bin')
+       Tdata : Sample time of a text file without time column,
+               0 if the time is the first column (format 'bin')
+       periodic : Repeat the data (format 'bin')
 
     Returns
     -------
@@ -21,6 +29,15 @@ def extdataBlk(pout, ch, datasize, fname):
 
     if(size(pout) != ch):
         raise ValueError("Block should have %i output port; received %i." % (ch,size(pout)))
-    
-    blk = RCPblk('extdata', [], pout, [0,0], 0, [], [ch, datasize, 0], fname)
+
+    if fmt == 'txt':
+        blk = RCPblk('extdata', [], pout, [0,0], 0, [], [ch, datasize, 0], fname)
+        return blk
+    if fmt != 'bin':
+        raise ValueError("Format must be 'txt' or 'bin'")
+    if interp not in ('hold', 'linear'):
+        raise ValueError("Interpolation must be 'hold' or 'linear'")
+    if not isRecFile(fname):
+        fname = textToRec(fname, Tsamp=Tdata if Tdata > 0 else None)
+    blk = RCPblk('extdataBin', [], pout, [0,0], 0, [], [ch, 0, 0, ['hold', 'linear'].index(interp), int(periodic)], fname)
     return blk
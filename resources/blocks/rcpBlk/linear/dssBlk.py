@@ -27,12 +27,12 @@ def dssBlk(pin,pout,sys,X0=[]):
 
     nin = size(pin)
     ni = shape(sys.B)[1];
-    if (nin != ni):
+    if (nin != ni and nin != 1):
         raise ValueError("Block have %i inputs: received %i input ports" % (nin,ni))
     
     no = shape(sys.C)[0]
     nout = size(pout)
-    if(no != nout):
+    if(no != nout and nout != 1):
         raise ValueError("Block have %i outputs: received %i output ports" % (nout,no))
         
     a  = reshape(sys.A,(1,size(sys.A)),'C')
@@ -60,5 +60,10 @@ def dssBlk(pin,pout,sys,X0=[]):
         uy = 0
     
     blk = RCPblk('dss',pin,pout,[0,nx],uy,realPar,intPar)
+    # One vector port for all the inputs or outputs
+    if nin != ni:
+        blk.dimPin[:] = ni
+    if nout != no:
+        blk.dimPout[:] = no
     return blk
 
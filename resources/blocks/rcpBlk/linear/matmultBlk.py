@@ -23,11 +23,16 @@ def matmultBlk(pin, pout, Gains):
     
     Gains = asmatrix(Gains)
     n,m = shape(Gains)
-    if(size(pin) != m):
+    if(size(pin) != m and size(pin) != 1):
         raise ValueError("Block should have %i input port; received %i." % (m,size(pin)))
-    if(size(pout) != n):
+    if(size(pout) != n and size(pout) != 1):
         raise ValueError("Block should have %i output port; received %i." % (n,size(pout)))
     realPar  = reshape(Gains,(1,size(Gains)),'C')
     blk = RCPblk('mxmult',pin,pout,[0,0],1,realPar,[n,m])
+    # One vector port for all the inputs or outputs
+    if size(pin) != m:
+        blk.dimPin[:] = m
+    if size(pout) != n:
+        blk.dimPout[:] = n
     return blk
 
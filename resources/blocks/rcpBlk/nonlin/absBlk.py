@@ -20,5 +20,8 @@ def absBlk(pin, pout):
     if(size(pout) != size(pin)):
         raise ValueError("Block should have same input and output port sizes; received %i %i." % (size(pin),size(pout)))
     blk = RCPblk('absV',pin,pout,[0,0],1,[],[])
+    # Elementwise on vector signals
+    blk.dimPin[:] = 0
+    blk.dimPout[:] = 0
     return blk
 
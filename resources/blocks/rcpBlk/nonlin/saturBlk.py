@@ -24,5 +24,8 @@ def saturBlk(pin, pout, satP, satN):
     if(size(pout) != 1):
         raise ValueError("Block should have 1 output port; received %i." % size(pout))
     blk = RCPblk('saturation',pin,pout,[0,0],1,[satP, satN],[])
+    # Elementwise on vector signals
+    blk.dimPin[:] = 0
+    blk.dimPout[:] = 0
     return blk
 
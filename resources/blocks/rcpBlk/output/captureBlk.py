@@ -0,0 +1,44 @@
+from supsisim.RCPblk import RCPblk
+from numpy import size
+
+def captureBlk(pin, fname, mode, level, pre, post, window=[0, 0], events=0, drop=1, names=''):
+    """
+
+    Call:   captureBlk(pin, fname, mode, level, pre, post, window, events, drop, names)
+
+    Parameters
+    ----------
+       pin: connected input port(s), the trigger is the first input
+       fname : File name (binary, read with supsisim.recfile.readEvents)
+       mode : Trigger 'above', 'below' (level), 'rising', 'falling', 'edge'
+              (crossing of level), 'outside', 'inside' (window)
+       level : Trigger level
+       pre : Samples recorded before the trigger
+       post : Samples recorded after the trigger
+       window : [low, high] of the window modes
+       events : Maximum number of events (0: no limit)
+       drop : Drop the samples if the writer is late (RT)
+       names : Names of the channels, comma separated (optional)
+
+    Returns
+    -------
+        blk  : RCPblk
+
+    """
+
+    modes = ['above', 'below', 'rising', 'falling', 'edge', 'outside', 'inside']
+    if mode not in modes:
+        raise ValueError('Trigger mode must be one of ' + ', '.join(modes))
+    if size(window) != 2:
+        raise ValueError('Window must be [low, high]')
+    if pre < 0 or post < 0:
+        raise ValueError('Pre and post samples must be >= 0')
+    if isinstance(names, (list, tuple)):
+        names = ','.join(names)
+    if names != '':
+        fname = fname + '|' + names
+    blk = RCPblk('capture',pin,[],[0,0],1,[level, window[0], window[1]],
+                 [modes.index(mode), int(pre), int(post), int(events), int(drop)], fname)
+    blk.dimPin[:] = 0      # all the elements of vector signals
+    return blk
+
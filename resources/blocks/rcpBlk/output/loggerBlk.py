@@ -1,8 +1,23 @@
 from supsisim.RCPblk import RCPblk
+from supsisim.aggregate import aggPars
 from numpy import size
 
-def loggerBlk(pin, log_file):
-    """Wrtie pin to log_file."""
-    blk = RCPblk("logger", pin, [], [0,0], 1, [], [], log_file)
-    return blk
+def loggerBlk(pin, log_file, window=1, stats='all'):
+    """Wrtie pin to log_file.
+
+    Call:   loggerBlk(pin, log_file, window, stats)
+
+    Parameters
+    ----------
+       pin: connected input port(s)
+       log_file : File name (float64 values of the inputs)
+       window : Samples aggregated in one record (0 or 1: every sample)
+       stats : Statistics of a window, 'all' or some of 'mean,min,max,rms,last'
 
+    Returns
+    -------
+       blk: RCPblk
+
+    """
+    blk = RCPblk("logger", pin, [], [0,0], 1, [], aggPars(window, stats), log_file)
+    return blk
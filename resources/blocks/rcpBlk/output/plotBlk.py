@@ -1,21 +1,40 @@
 from supsisim.RCPblk import RCPblk
+from supsisim.aggregate import aggPars
 from numpy import size
 
-def plotBlk(pin, fname):
+def plotBlk(pin, *args):
     """
 
-    Call:   plotBlk(pin)
+    Call:   plotBlk(pin, fmt, window, stats, fname)
 
     Parameters
     ----------
        pin: connected input port(s)
+       fmt : 'txt' (text) or 'bin' (binary, read with supsisim.recfile)
+       window : Samples aggregated in one row (0 or 1: every sample)
+       stats : Statistics of a window, 'all' or some of 'mean,min,max,rms,last'
+       fname : Name of the block (file /tmp/<fname>)
 
     Returns
     -------
         blk  : RCPblk
 
+    The name is always the last parameter (added by the code generator),
+    fmt, window and stats are optional: old diagrams call plotBlk(pin, fname)
+    (text format) or plotBlk(pin, fmt, fname).
     """
 
-    blk = RCPblk('plot',pin,[],[0,0],1,[],[], fname)
+    if len(args) < 1 or len(args) > 4:
+        raise TypeError('plotBlk(pin, fmt, window, stats, fname)')
+    fname = args[-1]
+    fmt, window, stats = (tuple(args[:-1]) + ('txt', 1, 'all')[len(args)-1:])
+    if fmt not in ('txt', 'bin'):
+        raise ValueError("Format must be 'txt' or 'bin'")
+    ipar = [1, 0] if fmt == 'bin' else []
+    agg = aggPars(window, stats)
+    if agg != []:
+        ipar = (ipar + [0, 0, 0])[:3] + agg
+    blk = RCPblk('plot',pin,[],[0,0],1,[],ipar, fname)
+    if fmt == 'bin':
+        blk.dimPin[:] = 0      # all the elements of vector signals
     return blk
-
@@ -1,14 +1,17 @@
 from supsisim.RCPblk import RCPblk
+from supsisim.aggregate import aggPars
 
-def plotJugglerBlk(pin, IP, port):
+def plotJugglerBlk(pin, IP, port, window=1, stats='all'):
     """Create an interactive scope.
-    Call:   UDPsocketTxBlk(pin, IP, port)
+    Call:   plotJugglerBlk(pin, IP, port, window, stats)
 
     Parameters
     ----------
        pin: connected input port(s)
        IP : IP Addr
        port :  Port
+       window : Samples aggregated in one message (0 or 1: every sample)
+       stats : Statistics of a window, 'all' or some of 'mean,min,max,rms,last'
 
     Returns
     -------
@@ -16,6 +19,6 @@ def plotJugglerBlk(pin, IP, port):
 
     """
 
-    blk = RCPblk("plotJuggler", pin, [], [0,0], 1, [], [port, 0], IP)
+    blk = RCPblk("plotJuggler", pin, [], [0,0], 1, [], [port, 0] + aggPars(window, stats), IP)
     return blk
 
@@ -17,5 +17,7 @@ def printBlk(pin):
     """
 
     blk = RCPblk('print',pin,[],[0,0],1,[],[])
+    # Vector signals are printed element by element
+    blk.dimPin[:] = 0
     return blk
 
@@ -1,11 +1,28 @@
 from supsisim.RCPblk import RCPblk
+from supsisim.aggregate import aggPars
 from numpy import size
 
-def scopeStream(pin, timed=1, decim=1):
-    """Create an interactive scope."""
+def scopeStream(pin, timed=1, decim=1, window=1, stats='all'):
+    """Create an interactive scope.
+
+    Call:   scopeStream(pin, timed, decim, window, stats)
+
+    Parameters
+    ----------
+       pin: connected input port(s)
+       timed : Sample (0) or time (1) based
+       decim : Decimation (not used with window)
+       window : Samples aggregated in one point (0 or 1: every sample)
+       stats : Statistics of a window, 'all' or some of 'mean,min,max,rms,last',
+               every statistic is a trace
+
+    Returns
+    -------
+       blk: RCPblk
+
+    """
 
     decim = int(decim)
     
-    blk = RCPblk("scope", pin, [], [0,0], 1, [], [timed, decim, 0])
+    blk = RCPblk("scope", pin, [], [0,0], 1, [], [timed, decim, 0] + aggPars(window, stats))
     return blk
-
@@ -1,15 +1,21 @@
 from supsisim.RCPblk import RCPblk
+from supsisim.aggregate import aggPars
 from numpy import size
 
-def toFileBlk(pin, fname):
+def toFileBlk(pin, fname, fmt='txt', names='', drop=0, window=1, stats='all'):
     """
 
-    Call:   toFileBlk(pin, fname)
+    Call:   toFileBlk(pin, fname, fmt, names, drop, window, stats)
 
     Parameters
     ----------
        pin: connected input port(s)
        fname : File name
+       fmt : 'txt' (text) or 'bin' (binary, read with supsisim.recfile)
+       names : Names of the channels, comma separated (optional)
+       drop : Binary: drop the samples if the writer is late (RT)
+       window : Samples aggregated in one row (0 or 1: every sample)
+       stats : Statistics of a window, 'all' or some of 'mean,min,max,rms,last'
 
     Returns
     -------
@@ -17,6 +23,18 @@ def toFileBlk(pin, fname):
 
     """
 
-    blk = RCPblk('toFile',pin,[],[0,0],1,[],[], fname)
+    if fmt not in ('txt', 'bin'):
+        raise ValueError("Format must be 'txt' or 'bin'")
+    if isinstance(names, (list, tuple)):
+        names = ','.join(names)
+    if names != '':
+        fname = fname + '|' + names
+    ipar = [1, int(drop)] if fmt == 'bin' else []
+    agg = aggPars(window, stats)
+    if agg != []:
+        ipar = (ipar + [0, 0, 0])[:3] + agg
+    blk = RCPblk('toFile',pin,[],[0,0],1,[],ipar, fname)
+    if fmt == 'bin':
+        blk.dimPin[:] = 0      # all the elements of vector signals
     return blk
 
@@ -0,0 +1,166 @@
+"""
+This is a procedural interface to the timing statistics of the
+real-time executables (CodeGen/src/linux_main_rt.c)
+
+The RT task of a running model publishes its statistics in the shared
+memory segment /dev/shm/pysim_<model> (see CodeGen/Common/include/rtstats.h)
+
+The following commands are provided:
+    open_stats    -  Map the statistics of a running model
+    close_stats   -  Unmap the statistics
+    read_stats    -  Consistent copy of the statistics
+    format_stats  -  Text summary of the statistics
+
+Live monitor:
+    python -m supsictrl.rtstats <model> [period]
+"""
+
+import os
+import sys
+import time
+import mmap
+import struct
+
+import numpy as np
+
+RT_STATS_MAGIC = 0x5453545250
+RT_STATS_VERSION = 1
+SHM_DIR = '/dev/shm'
+
+_HEAD = struct.Struct('<4Q3q3Q7q')
+_FIELDS = ('magic', 'version', 'nbins', 'seq', 'tsamp', 'lat_bin', 'exec_bin',
+           'periods', 'overruns', 'rate_overruns', 'overrun_max',
+           'lat_min', 'lat_max', 'lat_sum', 'exec_min', 'exec_max', 'exec_sum')
+
+def open_stats(model):
+    """Map the timing statistics of a running model
+
+    Call:
+    mm = open_stats(model)
+
+    Parameters
+    ----------
+    model : name of the generated model (ex. 'dc_motor')
+
+    Returns
+    -------
+    mm : mmap object with the statistics
+
+    """
+
+    fd = os.open(os.path.join(SHM_DIR, 'pysim_' + os.path.basename(model)), os.O_RDONLY)
+    try:
+        mm = mmap.mmap(fd, 0, prot=mmap.PROT_READ)
+    finally:
+        os.close(fd)
+    if len(mm) < _HEAD.size:
+        mm.close()
+        raise ValueError('Invalid statistics segment')
+    magic, version = struct.unpack_from('<2Q', mm)
+    if magic != RT_STATS_MAGIC or version != RT_STATS_VERSION:
+        mm.close()
+        raise ValueError('Invalid statistics segment')
+    return mm
+
+def close_stats(mm):
+    """Unmap the timing statistics
+
+    Call:
+    close_stats(mm)
+
+    Parameters
+    ----------
+    mm : mmap object returned by open_stats
+
+    Returns
+    -------
+
+    """
+
+    mm.close()
+
+def read_stats(mm, retries = 1000):
+    """Consistent copy of the timing statistics
+
+    The block is copied again while the RT task is updating it
+
+    Call:
+    st = read_stats(mm)
+
+    Parameters
+    ----------
+    mm      : mmap object returned by open_stats
+    retries : maximal number of copies
+
+    Returns
+    -------
+    st : dict with the fields of rtstats.h (times in ns),
+         lat_hist and exec_hist are numpy arrays, the last bin
+         counts all the larger values
+
+    """
+
+    for n in range(retries):
+        seq0 = struct.unpack_from('<Q', mm, 24)[0]
+        if seq0 & 1:
+            time.sleep(0)
+            continue
+        data = bytes(mm)
+        seq1 = struct.unpack_from('<Q', mm, 24)[0]
+        if seq0 == seq1:
+            break
+    else:
+        raise RuntimeError('Statistics not readable')
+
+    st = dict(zip(_FIELDS, _HEAD.unpack_from(data)))
+    nbins = st['nbins']
+    hist = np.frombuffer(data, dtype='<u8', count=2*nbins, offset=_HEAD.size)
+    st['lat_hist'] = hist[:nbins].copy()
+    st['exec_hist'] = hist[nbins:].copy()
+    return st
+
+def format_stats(st):
+    """Text summary of the timing statistics
+
+    Call:
+    txt = format_stats(st)
+
+    Parameters
+    ----------
+    st : dict returned by read_stats
+
+    Returns
+    -------
+    txt : summary string (times in us)
+
+    """
+
+    n = st['periods']
+    txt = 'Periods: %d, overruns: %d (max %.1f us), rate overruns: %d\n' % \
+        (n, st['overruns'], 1e-3*st['overrun_max'], st['rate_overruns'])
+    for name, key in (('Latency  ', 'lat'), ('Execution', 'exec')):
+        hist = st[key + '_hist']
+        cnt = int(hist.sum())
+        if cnt == 0:
+            continue
+        cum = np.cumsum(hist)
+        k = min(int(np.searchsorted(cum, 0.99*cum[-1])), len(hist)-1)
+        p99 = 1e-3*min((k+1)*st[key + '_bin'], st[key + '_max'])
+        txt += '%s [us]: min %.1f mean %.1f p99 %.1f max %.1f\n' % \
+            (name, 1e-3*st[key + '_min'], 1e-3*st[key + '_sum']/cnt, p99,
+             1e-3*st[key + '_max'])
+    return txt
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print('Usage: python -m supsictrl.rtstats <model> [period]')
+        sys.exit(1)
+    period = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    mm = open_stats(sys.argv[1])
+    try:
+        while True:
+            print(format_stats(read_stats(mm)))
+            time.sleep(period)
+    except KeyboardInterrupt:
+        pass
+    close_stats(mm)
@@ -25,8 +25,8 @@ class RCPblk:
         self.fcn = fcn
         self.pin = array(pin)
         self.pout = array(pout)
-        self.dimPin = ones(self.pin.shape)
-        self.dimPout = ones(self.pout.shape)
+        self.dimPin = ones(self.pin.shape, dtype=int)
+        self.dimPout = ones(self.pout.shape, dtype=int)
         self.nx = array(nx)
         self.uy = array(uy)
         self.realPar = array(realPar)
@@ -36,6 +36,7 @@ class RCPblk:
         self.str = str
         self.sysPath = ''
         self.no_fcn_call = False
+        self.tsamp = 0.0
 
     def __str__(self):
         """String representation of the Block"""
@@ -53,5 +54,6 @@ class RCPblk:
         str += "Integer parameters : " + self.intPar.__str__() + "\n"
         str += "Names of integer parameters : " + self.intParNames.__str__() + "\n"
         str += "String Parameter   : " + self.str.__str__() + "\n"
+        str += "Sample time        : " + self.tsamp.__str__() + "\n"
         return str
 
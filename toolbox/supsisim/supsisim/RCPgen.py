@@ -14,6 +14,16 @@ The following commands are provided:
   genCode        - Create  C code from BlockDiagram
   genMake        - Generate the Makefile for the C code
   detBlkSeq      - Get the right block sequence for simulation and RT
+  detSCC         - Find the algebraic loops (strongly connected components)
+  detSignals     - Place the signals in a contiguous array (with slot reuse)
+  detRates       - Determine the rate of each block (multi-rate models)
+  detPartitions  - Split the block list in partitions executed in parallel
+  detDims        - Determine the dimension of the signals (vector signals)
+  detDerivPath   - Blocks between the continuous blocks (variable step solver)
+  detVarStep     - Place the continuous states in one vector (variable step solver)
+  detPartInputs  - Signals read from other partitions
+  detRateBuffers - Signals crossing the rate tasks
+  resolveOpts    - Turn off the options not compatible with the model
   sch2blks       - Generate block list fron schematic
   
 """
@@ -22,12 +32,21 @@ from numpy import nonzero, ones, asmatrix, size, array, zeros
 from os import environ
 import copy
 import sys
+import io
+import json
+import hashlib
+from collections import deque
+import heapq
+from math import gcd
 from supsisim.RCPblk import RCPblk
 
 import importlib.util
 import os
 
 from .shv import ShvTreeGenerator
+from supsisim.inlineblk import canInline, inlineBlk
+from supsisim.optimize import optBlocks, isPure
+from supsisim.parfile import writeParFile, parRecords
 
 
 def load_module(module_path):
@@ -158,10 +177,513 @@ def run_plugin(model, template, function_name=None, function_args=None):
         print(f"An unexpected error occurred: {e}")
 
 
-def genCode(model, Tsamp, blocks, template, rkstep=10):
+def fmtPar(par):
+    """Format a parameter array as body of a C initializer
+
+    The values are converted in bulk and keep the full Python (repr)
+    precision, e.g. [1.0, 1e-05] -> '1.0, 1e-05'.
+    """
+    return ', '.join(map(repr, array(par).ravel().tolist()))
+
+def fmtNames(prefix, names):
+    """Format a list of parameter names as body of a C string array"""
+    return ', '.join(['"' + prefix + str(name) + '"' for name in names])
+
+def cStr(txt):
+    """C string literal of a text"""
+    return '"' + str(txt).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def nodeRef(node):
+    """C address of a node (one static array for each node)"""
+    return '&Node_' + node
+
+def dimDecl(dim):
+    """C array size of a node declaration ("[]" for a scalar signal)"""
+    return '[]' if dim == 1 else '[' + str(dim) + ']'
+
+def nodeCopy(dst, src, dim, indent='  '):
+    """C statement copying a signal of dimension dim"""
+    if dim == 1:
+        return indent + dst + '[0] = ' + src + '[0];\n'
+    return indent + 'for(int i_=0;i_<' + str(dim) + ';i_++) ' + dst + '[i_] = ' + src + '[i_];\n'
+
+def blkRecords(model, Blocks, nodeAddr=nodeRef, inAddr=None, dims=None, xc=None):
+    """Precompute the C strings of every block used by genCode
+
+    Call: blkRecords(model, Blocks, nodeAddr, inAddr, dims, xc)
+
+    Parameters
+    ----------
+    model     : Model name
+    Blocks    : Ordered block list
+    nodeAddr  : Function returning the C address of a node (string)
+    inAddr    : Function (block index, node) returning the C address read
+                by an input, None to use nodeAddr
+    dims      : (dimIn, dimOut) returned by detDims to fill the port
+                dimensions, None for a model with scalar signals only
+    xc        : dict block index -> offset of its continuous states in the
+                state vector of the variable step solver, None if not used
+
+    Returns
+    -------
+    recs      : List of dict with the C text fragments of each block
+    """
+    recs = []
+    for n, blk in enumerate(Blocks):
+        sn = str(n)
+        ref = 'block_' + model + '[' + sn + ']'
+        pin = [str(p) for p in array(blk.pin).ravel().tolist()]
+        pout = [str(p) for p in array(blk.pout).ravel().tolist()]
+        nreal = size(blk.realPar)
+        nint = size(blk.intPar)
+
+        pars = []
+        if nreal != 0:
+            pars.append('static double realPar_' + sn + '[] = {' + fmtPar(blk.realPar) + '};\n')
+            if nreal != size(blk.realParNames):
+                names = fmtNames('double', range(0, nreal))
+            else:
+                names = fmtNames('', blk.realParNames)
+            pars.append('static char *realParNames_' + sn + '[] = {' + names + '};\n')
+        if nint != 0:
+            pars.append('static int intPar_' + sn + '[] = {' + fmtPar(blk.intPar) + '};\n')
+            pars.append('static char *intParNames_' + sn + '[] = {' + fmtNames('int', range(0, nint)) + '};\n')
+        pars.append('static int nx_' + sn + '[] = {' + fmtPar(blk.nx) + '};\n')
+        dimIn, dimOut = 'NULL', 'NULL'
+        if dims is not None and len(pin) != 0:
+            pars.append('static int dimIn_' + sn + '[] = {' + fmtPar(dims[0][n]) + '};\n')
+            dimIn = 'dimIn_' + sn
+        if dims is not None and len(pout) != 0:
+            pars.append('static int dimOut_' + sn + '[] = {' + fmtPar(dims[1][n]) + '};\n')
+            dimOut = 'dimOut_' + sn
+
+        ptrs = []
+        if len(pin) != 0:
+            if inAddr is None:
+                ptrs.append('static void *inptr_' + sn + '[]  = {' + ','.join(map(nodeAddr, pin)) + '};\n')
+            else:
+                addr = [inAddr(n, p) or nodeAddr(p) for p in pin]
+                ptrs.append('static void *inptr_' + sn + '[]  = {' + ','.join(addr) + '};\n')
+        if len(pout) != 0:
+            ptrs.append('static void *outptr_' + sn + '[] = {' + ','.join(map(nodeAddr, pout)) + '};\n')
+
+        if nreal != 0:
+            realPar, realNames = 'realPar_' + sn, 'realParNames_' + sn
+        else:
+            realPar, realNames = 'NULL', 'NULL'
+        if nint != 0:
+            intPar, intNames = 'intPar_' + sn, 'intParNames_' + sn
+        else:
+            intPar, intNames = 'NULL', 'NULL'
+
+        fields = [('nin  ', str(len(pin))),
+                  ('nout ', str(len(pout))),
+                  ('nx   ', 'nx_' + sn),
+                  ('u    ', 'inptr_' + sn if len(pin) != 0 else 'NULL'),
+                  ('y    ', 'outptr_' + sn if len(pout) != 0 else 'NULL'),
+                  ('realPar ', realPar),
+                  ('realParNum ', str(nreal)),
+                  ('realParNames ', realNames),
+                  ('intPar ', intPar),
+                  ('intParNum ', str(nint)),
+                  ('intParNames ', intNames),
+                  ('str ', '"' + blk.str + '"'),
+                  ('ptrPar ', 'NULL')]
+        if dims is not None:
+            fields[2:2] = [('dimIn ', dimIn), ('dimOut ', dimOut)]
+        if xc is not None and n in xc:
+            fields += [('xc ', '&contX[' + str(xc[n]) + ']'), ('dxc ', '&contDX[' + str(xc[n]) + ']')]
+        defs = ''.join(['  ' + ref + '.' + fld + '= ' + val + ';\n' for fld, val in fields])
+
+        recs.append({'blk'   : blk,
+                     'ref'   : ref,
+                     'pars'  : ''.join(pars),
+                     'io'    : ''.join(ptrs),
+                     'defs'  : defs + '\n',
+                     'call'  : blk.fcn + '(%s, &' + ref + ');\n',
+                     'nxc'   : blk.nx[0],
+                     'nxd'   : blk.nx[1]})
+    return recs
+
+CACHE_VERSION = 1
+
+def blkDigest(blk):
+    """Content hash of the code generation relevant data of a block"""
+    data = [blk.fcn, fmtPar(blk.pin), fmtPar(blk.pout), fmtPar(blk.nx), fmtPar(blk.uy),
+            fmtPar(blk.realPar), fmtPar(blk.intPar), blk.str, list(blk.realParNames),
+            list(blk.intParNames), blk.name, blk.sysPath, blk.tsamp,
+            fmtPar(blk.dimPin), fmtPar(blk.dimPout)]
+    return hashlib.sha1(repr(data).encode()).hexdigest()
+
+def cgDigests(model, Tsamp, blocks, template, **opts):
+    """Compute the digests used by the code generation cache
+
+    Call: cgDigests(model, Tsamp, blocks, template, **opts)
+
+    Parameters
+    ----------
+    model     : Model name
+    Tsamp     : Sampling Time
+    blocks    : Block list
+    template  : Template makefile
+    opts      : Other code generation options
+
+    Returns
+    -------
+    digests   : dict with the global digest and the digest of each block
+    """
+    shv = [environ.get(key, '') for key in ('SHV_USED', 'SHV_TREE_TYPE', 'SHV_BROKER_IP',
+                                             'SHV_BROKER_PORT', 'SHV_BROKER_USER',
+                                             'SHV_BROKER_PASSWORD', 'SHV_BROKER_DEV_ID',
+                                             'SHV_BROKER_MOUNT')]
+    try:
+        with open(environ.get('PYSUPSICTRL', '') + '/CodeGen/templates/' + template, 'rb') as f:
+            tmf = hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        tmf = ''
+    glob = [CACHE_VERSION, model, str(Tsamp), template, tmf, sorted(opts.items()), shv]
+    return {'global' : hashlib.sha1(repr(glob).encode()).hexdigest(),
+            'blocks' : {blkDigest(blk) : blk.name.__str__() for blk in blocks}}
+
+def loadCache(model):
+    """Load the code generation cache of the model (None if not available)"""
+    try:
+        with open('.' + model + '.cgcache', 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def saveCache(model, digests):
+    """Save the code generation cache of the model"""
+    with open('.' + model + '.cgcache', 'w') as f:
+        json.dump(digests, f)
+
+def fileDigest(fname):
+    """Hash of a file content (None if the file does not exist)"""
+    try:
+        with open(fname, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return None
+
+def writeIfChanged(fname, txt):
+    """Write txt into fname only if the content differs
+
+    The modification time of an unchanged file is preserved, so that
+    make does not rebuild the corresponding object.
+
+    Returns True if the file has been written.
+    """
+    try:
+        with open(fname, 'r') as f:
+            if f.read() == txt:
+                return False
+    except OSError:
+        pass
+    with open(fname, 'w') as f:
+        f.write(txt)
+    return True
+
+def rateGuard(entries, indent='  '):
+    """Join the code of the blocks of a section
+
+    The entries are (rate factor, code, block index); the code of consecutive blocks
+    with a factor f > 1 is executed only every f base ticks.
+    """
+    txt = ''
+    n = 0
+    while n < len(entries):
+        fac = entries[n][0]
+        m = n
+        while m < len(entries) and entries[m][0] == fac:
+            m += 1
+        body = ''.join([e[1] for e in entries[n:m]])
+        if fac == 1:
+            txt += body
+        else:
+            txt += indent + 'if (rateCnt % ' + str(fac) + ' == 0) {\n'
+            txt += ''.join(['  ' + ln for ln in body.splitlines(True)])
+            txt += indent + '}\n'
+        n = m
+    return txt
+
+# Solvers of the continuous states and blocks providing their derivatives (flag CG_DERIV)
+SOLVERS = ('fixed', 'dopri5')
+VARSTEP_BLOCKS = ('css', 'integral')
+
+SHLIB_TEMPLATE = 'shlib.tmf'
+PARFILE_EXT = '.par'
+
+def shlibTables(model, Blocks, slots, nslots, dims, maxNode):
+    """C tables of the models built as shared library
+
+    The signals (one array, see detSignals) and the real parameters of
+    the blocks are exported with their layout, so that the caller can
+    map them without copy (supsisim/shlib.py):
+
+      <model>_nblocks, <model>_nsignals, <model>_nnodes
+      <model>_signals           : address of the signal array
+      <model>_node_slot/_dim    : offset and dimension of the nodes 0..nnodes (-1/0 if unused)
+      <model>_blk_name/_path    : name and system path of the blocks
+      <model>_blk_realPar/_realParNum/_realParNames : real parameters of the blocks
+      <model>_blk_nout/_pout    : number of outputs of the blocks, output nodes of all the blocks
+    """
+    N = len(Blocks)
+    pout = [array(blk.pout).ravel().tolist() for blk in Blocks]
+    slot = [slots.get(n, -1) for n in range(0, maxNode+1)]
+    dim = [dims.get(n, 1) if n in slots else 0 for n in range(0, maxNode+1)]
+    real = ['realPar_' + str(n) if size(blk.realPar) != 0 else 'NULL' for n, blk in enumerate(Blocks)]
+    names = ['realParNames_' + str(n) if size(blk.realPar) != 0 else 'NULL' for n, blk in enumerate(Blocks)]
+    allOut = sum(pout, [])
+
+    txt = "/* Shared library interface (" + SHLIB_TEMPLATE + ") */\n\n"
+    txt += "const int " + model + "_nblocks = " + str(N) + ";\n"
+    txt += "const int " + model + "_nsignals = " + str(max(nslots, 1)) + ";\n"
+    txt += "const int " + model + "_nnodes = " + str(maxNode) + ";\n"
+    txt += "double * const " + model + "_signals = signals;\n"
+    txt += "const int " + model + "_node_slot[] = {" + fmtPar(slot) + "};\n"
+    txt += "const int " + model + "_node_dim[] = {" + fmtPar(dim) + "};\n"
+    txt += "const char * const " + model + "_blk_name[] = {" + ', '.join([cStr(blk.name) for blk in Blocks]) + "};\n"
+    txt += "const char * const " + model + "_blk_path[] = {" + ', '.join([cStr(blk.sysPath) for blk in Blocks]) + "};\n"
+    txt += "double * const " + model + "_blk_realPar[] = {" + ', '.join(real) + "};\n"
+    txt += "const int " + model + "_blk_realParNum[] = {" + fmtPar([size(blk.realPar) for blk in Blocks]) + "};\n"
+    txt += "char ** const " + model + "_blk_realParNames[] = {" + ', '.join(names) + "};\n"
+    txt += "const int " + model + "_blk_nout[] = {" + fmtPar([len(p) for p in pout]) + "};\n"
+    txt += "const int " + model + "_blk_pout[] = {" + (fmtPar(allOut) if len(allOut) != 0 else '0') + "};\n\n"
+    return txt
+
+def shlibState(model, solver, multirate):
+    """State of the models built as shared library outside the blocks
+
+    The variables of the variable step solver and the base rate counter
+    are exported as memory regions, saved and restored with the signals
+    by the batch of instances of supsisim/shlib.py:
+
+      <model>_nstate            : number of regions
+      <model>_state/_state_size : address and size in bytes of the regions
+    """
+    regions = []
+    if solver:
+        regions += ['contX', 'contDX', 'contWork', 'solver']
+    if multirate:
+        regions += ['rateCnt']
+    txt = "/* State outside the blocks (" + SHLIB_TEMPLATE + ") */\n\n"
+    txt += "const int " + model + "_nstate = " + str(len(regions)) + ";\n"
+    if len(regions) != 0:
+        txt += "void * const " + model + "_state[] = {" + ', '.join(['&' + r for r in regions]) + "};\n"
+        txt += "const int " + model + "_state_size[] = {" + ', '.join(['sizeof(' + r + ')' for r in regions]) + "};\n\n"
+    else:
+        txt += "void * const " + model + "_state[] = {NULL};\n"
+        txt += "const int " + model + "_state_size[] = {0};\n\n"
+    return txt
+
+def parTable(model, Blocks):
+    """C table of the blocks with parameters (parameter file, parfile.h)
+
+    The records of a parameter file are searched by block name and
+    parameter name in the table by <model>_par_load (option -P of the
+    executable, called before the initialization of the blocks).
+    """
+    rows = []
+    for n, blk in enumerate(Blocks):
+        nreal, nint = size(blk.realPar), size(blk.intPar)
+        if nreal == 0 and nint == 0:
+            continue
+        real = ['realPar_' + str(n), str(nreal), 'realParNames_' + str(n)] if nreal != 0 else ['NULL', '0', 'NULL']
+        intp = ['intPar_' + str(n), str(nint), 'intParNames_' + str(n)] if nint != 0 else ['NULL', '0', 'NULL']
+        rows.append('  {' + ', '.join([cStr(blk.name)] + real + intp) + '},\n')
+    nblk = len(rows)
+    if nblk == 0:
+        rows.append('  {"", NULL, 0, NULL, NULL, 0, NULL}\n')
+    txt = "/* Blocks with parameters (parameter file, option -P) */\n\n"
+    txt += "static const par_block parBlocks[] = {\n" + ''.join(rows) + "};\n\n"
+    txt += "int " + model + "_par_load(const char *fname, int verbose)\n{\n"
+    txt += "  return (par_load(fname, " + cStr(model) + ", parBlocks, " + str(nblk) + ", verbose));\n}\n\n"
+    return txt
+
+def profWrap(model, n, txt):
+    """Enclose the code of block n by the timestamps of the profiler"""
+    if txt == '':
+        return txt
+    indent = txt[0:len(txt) - len(txt.lstrip(' '))]
+    return indent + '{ PROF_BEGIN();\n' + txt + indent + 'PROF_END(prof_' + model + ', ' + str(n) + '); }\n'
+
+def isrBody(model, isrOut, isrUpd, contH, contOut, contUpd, rkstep, pre=''):
+    """Body of the ISR function
+
+    The sections are lists of (rate factor, code, block index), pre is
+    code executed before the blocks.
+    """
+    txt = ''
+    if len(contH) != 0:
+        txt += "int i;\ndouble h;\n\n"
+    txt += pre
+    txt += rateGuard(isrOut) + "\n" + rateGuard(isrUpd) + "\n"
+    if len(contH) != 0:
+        txt += "  h = " + model + "_get_tsamp()/" + str(rkstep) + ";\n\n"
+        txt += rateGuard(contH)
+        txt += "  for(i=0;i<" + str(rkstep) + ";i++){\n"
+        txt += rateGuard(contOut, '    ') + rateGuard(contUpd, '    ')
+        txt += "  }\n"
+    return txt
+
+# Settings not compatible with an option: (option, condition, message),
+# the option is turned off when the condition holds (see resolveOpts)
+OPT_CONFLICTS = [
+    ('optimize', 'shv', 'Block optimization not used with SHV'),
+    ('optimize', 'vector', 'Block optimization not used with vector signals'),
+    ('optimize', 'parFile', 'Block optimization not used with the parameter file'),
+    ('optimize', 'shlib', 'Block optimization not used with the shared library'),
+    ('partitions', 'multirate', 'Partitions not used with multiple rates'),
+    ('varstep', 'rateTasks', 'Variable step solver not used with rate tasks'),
+    ('varstep', 'partitions', 'Variable step solver not used with partitions'),
+    ('reuse', 'shv', 'Signal slot reuse not used with SHV'),
+    ('reuse', 'shlib', 'Signal slot reuse not used with the shared library'),
+    ('reuse', 'multirate', 'Signal slot reuse not used with multiple rates'),
+    ('reuse', 'partitions', 'Signal slot reuse not used with partitions'),
+    ('reuse', 'varstep', 'Signal slot reuse not used with the variable step solver'),
+    ('inline', 'shv', 'Inline code generation not used with SHV'),
+    ('inline', 'shlib', 'Inline code generation not used with the shared library'),
+    ('inline', 'parFile', 'Inline code generation not used with the parameter file'),
+    ('inline', 'rateTasks', 'Inline code generation not used with rate tasks'),
+    ('inline', 'partitions', 'Inline code generation not used with partitions'),
+    ('profile', 'rateTasks', 'Profiling not used with rate tasks'),
+    ('profile', 'partitions', 'Profiling not used with partitions'),
+]
+
+def resolveOpts(opts, conds):
+    """Turn off the options not compatible with the model or the other settings
+
+    Call: resolveOpts(opts, conds)
+
+    The options are resolved in stages, as the conditions become known
+    (e.g. 'multirate' after detRates): only the rows of OPT_CONFLICTS
+    with the option in opts and the condition in conds are applied, in
+    the order of the table. A message is printed for every option
+    turned off.
+
+    Parameters
+    ----------
+    opts      : dict option -> requested value
+    conds     : dict condition -> True if it holds
+
+    Returns
+    -------
+    opts      : dict option -> resolved value (False if turned off)
+    """
+    opts = dict(opts)
+    for opt, cond, msg in OPT_CONFLICTS:
+        if opt in opts and opts[opt] and conds.get(cond, False):
+            print(msg)
+            opts[opt] = False
+    return opts
+
+def varstepCode(model, nxc, derivOut, deriv, rtol, atol):
+    """State vector, derivative function and data of the variable step solver
+
+    derivOut holds the output code of the continuous blocks and of the
+    blocks between them (dict block index -> code), deriv the code of the
+    derivatives of the continuous blocks.
+    """
+    NX = str(nxc)
+    txt = "/* Variable step solver */\n\n"
+    txt += "static double contX[" + NX + "];\n"
+    txt += "static double contDX[" + NX + "];\n"
+    txt += "static double contWork[" + str(8*nxc) + "];\n\n"
+    txt += "static void " + model + "_deriv(void)\n{\n" + ''.join([derivOut[n] for n in sorted(derivOut)]) + \
+           ''.join(deriv) + "}\n\n"
+    txt += "static ode_solver solver = {" + NX + ", contX, contDX, contWork, " + model + "_deriv, " + \
+           repr(float(rtol)) + ", " + repr(float(atol)) + ", 0.0, 0, 0};\n\n"
+    return txt
+
+def rateTasksCode(model, factors, group, producer, pubs, ins, dims, sections, rkstep):
+    """Rate transition buffers and one ISR function per rate (rateTasks=True)
+
+    The sections are (isrOut, isrUpd, contH, contOut, contUpd), lists of
+    (rate factor, code, block index); pubs and ins are given by
+    detRateBuffers.
+    """
+    R = str(len(factors))
+    txt = "/* Rate tasks */\n\n"
+    txt += "static const int rateFactor[" + R + "] = {" + fmtPar(factors) + "};\n\n"
+    txt += "int " + model + "_get_nrates(void)\n{\n  return (" + R + ");\n}\n\n"
+    txt += "int " + model + "_get_rate_factor(int k)\n{\n  return (rateFactor[k]);\n}\n\n"
+    for name, copies in [('publish', [(p, nodeCopy('RtPub_' + str(node), 'Node_' + str(node),
+                                                   dims.get(node, 1), ''))
+                                      for p, node in pubs]),
+                         ('fetch', [(k, nodeCopy('RtIn_' + str(k) + '_' + str(node),
+                                                 ('RtPub_' if group[producer[node]] != 0 else 'Node_') +
+                                                 str(node), dims.get(node, 1), '')) for k, node in ins])]:
+        txt += "void " + model + "_rate_" + name + "(int k)\n{\n  switch(k){\n"
+        for k in range(1, len(factors)):
+            lines = [ln for g, ln in copies if g == k]
+            if len(lines) != 0:
+                txt += "  case " + str(k) + ":\n" + ''.join(['    ' + ln for ln in lines]) + "    break;\n"
+        txt += "  default:\n    break;\n  }\n}\n\n"
+    for k, fac in enumerate(factors):
+        sel = [[(1, code, n) for g, code, n in sec if g == fac] for sec in sections]
+        txt += "static void isr_rate_" + str(k) + "(void)\n{\n"
+        txt += isrBody(model, *sel, rkstep)
+        txt += "}\n\n"
+    txt += "void " + model + "_isr_rate(int k, double t)\n{\n  switch(k){\n"
+    for k in range(0, len(factors)):
+        txt += "  case " + str(k) + ":\n    isr_rate_" + str(k) + "();\n    break;\n"
+    txt += "  default:\n    break;\n  }\n}\n\n"
+    return txt
+
+def partCode(model, Blocks, part, nparts, producer, ins, dims, sections, rkstep):
+    """Functions of the phases of the partitions (partitions > 1)
+
+    The sections are (isrOut, isrUpd, contH, contOut, contUpd), lists of
+    (rate factor, code, block index); ins is given by detPartInputs.
+    """
+    isrOut, isrUpd, contH, contOut, contUpd = sections
+    P = str(nparts)
+    # Barrier before a phase reading signals of the other partitions; the
+    # continuous blocks write again their outputs during the integration
+    cont = lambda node: array(Blocks[producer[node]].nx).ravel()[0] != 0
+    sync = [0, int(any([ph == 1 for p, node, ph in ins])),
+            int(any([ph == 2 or cont(node) for p, node, ph in ins]))]
+    txt = "/* Partitions */\n\n"
+    txt += "int " + model + "_get_nparts(void)\n{\n  return (" + P + ");\n}\n\n"
+    txt += "int " + model + "_part_sync(int phase)\n{\n"
+    txt += "  static const int sync[3] = {" + fmtPar(sync) + "};\n\n  return (sync[phase]);\n}\n\n"
+    for k in range(0, nparts):
+        sel = lambda sec, uy=None: [e for e in sec if part[e[2]] == k and
+                                    (uy is None or (Blocks[e[2]].uy != 0) == uy)]
+        imports = ['', '', '']
+        for p, node, ph in ins:
+            if p == k:
+                imports[ph] += nodeCopy('PtIn_' + str(k) + '_' + str(node), 'Node_' + str(node),
+                                        dims.get(node, 1))
+        txt += "static void part_" + str(k) + "_0(void)\n{\n" + rateGuard(sel(isrOut, False)) + "}\n\n"
+        txt += "static void part_" + str(k) + "_1(void)\n{\n" + imports[1] + \
+               rateGuard(sel(isrOut, True)) + "}\n\n"
+        txt += "static void part_" + str(k) + "_2(void)\n{\n"
+        txt += isrBody(model, [], sel(isrUpd), sel(contH), sel(contOut), sel(contUpd), rkstep, imports[2])
+        txt += "}\n\n"
+    txt += "void " + model + "_part_step(int p, int phase)\n{\n  switch(3*p + phase){\n"
+    for k in range(0, nparts):
+        for ph in range(0, 3):
+            txt += "  case " + str(3*k + ph) + ":\n    part_" + str(k) + "_" + str(ph) + "();\n    break;\n"
+    txt += "  default:\n    break;\n  }\n}\n\n"
+    return txt
+
+def genCode(model, Tsamp, blocks, template, rkstep=10, cache=True, signals=False, reuse=False,
+            inline=False, optimize=False, rateTasks=False, partitions=0, solver='fixed',
+            rtol=1e-6, atol=1e-8, profile=False, shlib=False, parFile=False):
     """Generate C-Code
 
-    Call: genCode(model, Tsamp, Blocks, template, rkstep)
+    Call: genCode(model, Tsamp, Blocks, template, rkstep, cache, signals, reuse, inline, optimize,
+                  rateTasks, partitions, solver, rtol, atol, profile, shlib, parFile)
+
+    The C file is built in memory (one buffer per section, filled in a
+    single pass over the precomputed block records) and written at once.
+    With cache=True the content hashes of the blocks and of the settings
+    are stored in .<model>.cgcache: if nothing changed the generation is
+    skipped, otherwise <model>.c is rewritten only if its text differs.
+    The options not compatible with the model or with the other settings
+    are turned off with a message (see OPT_CONFLICTS and resolveOpts).
 
     Parameters
     ----------
@@ -170,276 +692,387 @@ def genCode(model, Tsamp, blocks, template, rkstep=10):
     Blocks    : Block list
     template  : Template makefile
     rkstep    : step division per sample time for fixed step solver
+    cache     : use the incremental code generation cache
+    signals   : place all the signals in one aligned array "signals[]",
+                ordered by execution (Node_N are defined as macros)
+    reuse     : with signals=True, share the array slots of signals with
+                disjoint lifetimes (see detSignals, not used with SHV)
+    inline    : emit inline C code with folded parameters for the common
+                blocks (see inlineblk.py); the parameters of these blocks
+                cannot be changed at run time, not used with SHV
+    optimize  : fold the constants, merge the duplicated blocks and remove
+                the unused ones before the generation (see optimize.py),
+                not used with SHV, the parameter file and the shared library
+    rateTasks : with blocks at different rates (attribute tsamp of RCPblk,
+                see detRates), generate one function per rate with rate
+                transition buffers, so that the slower rates can run in
+                their own threads (option -m of linux_main_rt.c)
+    partitions: maximal number of partitions executed in parallel (see
+                detPartitions and option -c of linux_main_rt.c), 0 or 1
+                for a serial execution, not used with multiple rates
+    solver    : 'fixed' to integrate each continuous block with rkstep
+                steps per sample time, 'dopri5' to integrate all the
+                continuous states together with the variable step
+                Dormand-Prince solver (odesolver.c); the stateless blocks
+                between the continuous blocks are evaluated at every stage
+                (see detDerivPath), the inputs of the continuous blocks
+                from the discrete part are held during the sample time.
+                Only for blocks with the flag CG_DERIV (VARSTEP_BLOCKS)
+                and pure blocks on the paths, not used with rate tasks or
+                partitions; the signal slots are not reused
+    rtol      : relative tolerance of the variable step solver
+    atol      : absolute tolerance of the variable step solver
+    profile   : measure the execution time of every block in the ISR
+                (profiler.h); min/mean/max and a histogram per block and
+                for the whole ISR are written at the end of the run to
+                <model>_prof.json, not used with rate tasks or partitions
+    shlib     : export the tables of the signals and of the parameters
+                for the models built as shared library (see shlibTables
+                and supsisim/shlib.py), always set with the template
+                shlib.tmf; the signals are placed in one array without
+                slot reuse and the blocks are not inlined
+    parFile   : write the parameters of the blocks to the parameter file
+                <model>.par (see supsisim/parfile.py) and export the table
+                of the blocks, so that the executable can load them at
+                start-up (option -P); the blocks are not inlined
 
     Returns
     -------
-    -
+    changed   : True if <model>.c has been written
     """
 
+    if solver not in SOLVERS:
+        raise ValueError('Unknown solver ' + str(solver) + ', expected one of ' + str(list(SOLVERS)))
+    shlib = shlib or os.path.basename(template) == SHLIB_TEMPLATE
+
+    fn = model + '.c'
+    if cache:
+        digests = cgDigests(model, Tsamp, blocks, template, rkstep=rkstep,
+                            signals=signals, reuse=reuse, inline=inline,
+                            optimize=optimize, rateTasks=rateTasks,
+                            partitions=partitions, solver=solver, rtol=rtol, atol=atol,
+                            profile=profile, shlib=shlib, parFile=parFile)
+        oldDigests = loadCache(model)
+        if oldDigests is not None and fileDigest(fn) == oldDigests.get('c') and \
+           (not parFile or os.path.isfile(model + PARFILE_EXT)):
+            if oldDigests['global'] == digests['global'] and oldDigests['blocks'] == digests['blocks']:
+                print(fn + ' is up to date')
+                run_plugin(model, template, 'create_project_structure', [model, blocks])
+                return False
+            changed = [name for key, name in digests['blocks'].items() if key not in oldDigests['blocks']]
+            print('Code generation: ' + str(len(changed)) + ' block(s) changed ' + str(sorted(changed)))
+
     maxNode = 0
+    outnodes = set()
     for blk in blocks:
-        for n in range(0, size(blk.pin)):
-            if blk.pin[n] > maxNode:
-                maxNode = blk.pin[n]
-        for n in range(0, size(blk.pout)):
-            if blk.pout[n] > maxNode:
-                maxNode = blk.pout[n]
-
-    # Check outputs not connected together!
-    outnodes = zeros(maxNode + 1)
-    for blk in blocks:
-        for n in range(0, size(blk.pout)):
-            if outnodes[blk.pout[n]] == 0:
-                outnodes[blk.pout[n]] = 1
-            else:
+        pin = array(blk.pin).ravel().tolist()
+        pout = array(blk.pout).ravel().tolist()
+        maxNode = max([maxNode] + pin + pout)
+
+        # Check outputs not connected together!
+        for node in pout:
+            if node in outnodes:
                 raise ValueError('Problem in diagram: outputs connected together!')
+            outnodes.add(node)
 
     Blocks = detBlkSeq(maxNode, blocks)
     if size(Blocks) == 0:
         raise ValueError('No possible to determine the block sequence')
 
-    fn = model + '.c'
-    f = open(fn, 'w')
-    strLn = "#include <pyblock.h>\n#include <stdio.h>\n#include <stdlib.h>\n\n"
-    f.write(strLn)
+    # Vector signals: the node arrays and the port dimensions are sized
+    dimIn, dimOut, dims = detDims(Blocks)
+    vector = any([d != 1 for d in dims.values()])
+
+    # Settings not compatible with some options (see OPT_CONFLICTS)
+    conds = {'shv' : environ["SHV_USED"] == "True", 'vector' : vector, 'parFile' : parFile, 'shlib' : shlib}
+    if resolveOpts({'optimize' : optimize}, conds)['optimize']:
+        Blocks, msgs = optBlocks(Blocks)
+        for msg in msgs:
+            print(msg)
+        dimIn, dimOut, dims = detDims(Blocks)
 
     N = size(Blocks)
+    rates = detRates(Blocks, Tsamp)
+    factors = sorted(set(rates))
+    multirate = factors != [1]
+    hyper = 1
+    for fac in factors:
+        hyper = hyper * fac // gcd(hyper, fac)
+    if multirate:
+        print('Multi-rate: ' + str(len(factors)) + ' rates, sample times ' +
+              str([fac * Tsamp for fac in factors]))
+    rateTasks = rateTasks and multirate
+    conds['multirate'] = multirate
+    conds['rateTasks'] = rateTasks
+
+    # Partitions executed in parallel, the blocks are grouped by partition
+    part, nparts = [0] * N, 1
+    if resolveOpts({'partitions' : partitions > 1}, conds)['partitions']:
+        part, nparts = detPartitions(Blocks, partitions, rkstep)
+        if nparts == 1:
+            print('Partitions: the model cannot be split')
+        else:
+            order = sorted(range(0, N), key=lambda n: (part[n], n))
+            Blocks = [Blocks[n] for n in order]
+            part = [part[n] for n in order]
+            dimIn = [dimIn[n] for n in order]
+            dimOut = [dimOut[n] for n in order]
+            costs = [sum([blkCost(blk, rkstep) for blk, p in zip(Blocks, part) if p == k]) for k in range(0, nparts)]
+            print('Partitions: ' + str(nparts) + ', estimated costs ' + str(costs))
+    conds['partitions'] = nparts > 1
+
+    # Variable step solver: one state vector for all the continuous blocks
+    xc, nxc, path = None, 0, []
+    cont = [n for n, blk in enumerate(Blocks) if array(blk.nx).ravel()[0] != 0]
+    if resolveOpts({'varstep' : solver == 'dopri5' and len(cont) != 0}, conds)['varstep']:
+        xc, nxc, path = detVarStep(Blocks, rates)
+    conds['varstep'] = xc is not None
+
+    # The shared library exports the signals of one array
+    if shlib:
+        signals = True
+    opts = resolveOpts({'reuse' : reuse and signals, 'inline' : inline, 'profile' : profile}, conds)
+    reuse, inline, profile = opts['reuse'], opts['inline'], opts['profile']
+
+    # Signals exchanged between the partitions or the rate tasks
+    pubs, ins = [], []
+    if nparts > 1:
+        producer, ins = detPartInputs(Blocks, part)
+    elif rateTasks:
+        group = [factors.index(fac) for fac in rates]
+        producer, pubs, ins = detRateBuffers(Blocks, group)
+
+    def exchAddr(n, node):
+        # Address of the copy of a signal produced by another partition or rate task
+        node = int(node)
+        if node not in producer:
+            return None
+        if nparts > 1:
+            if part[producer[node]] != part[n]:
+                return '&PtIn_' + str(part[n]) + '_' + str(node)
+        elif (group[n], node) in ins:
+            return '&RtIn_' + str(group[n]) + '_' + str(node)
+        elif group[producer[node]] != group[n]:
+            return '&RtPub_' + str(node)
+        return None
+
+    inAddr = exchAddr if (nparts > 1 or rateTasks) else None
+
+    if signals:
+        slots, nslots = detSignals(Blocks, reuse, dims)
+        if reuse:
+            print('Signals: ' + str(len(slots)) + ' nodes in ' + str(nslots) + ' slots')
+        recs = blkRecords(model, Blocks, lambda node: '&signals[' + str(slots[int(node)]) + ']', inAddr,
+                          (dimIn, dimOut) if vector else None, xc)
+    else:
+        recs = blkRecords(model, Blocks, inAddr=inAddr, dims=(dimIn, dimOut) if vector else None, xc=xc)
+
+    # Sections filled in a single pass over the blocks
+    pars, ios, defs = [], [], []
+    init, isrOut, isrUpd, contH, contOut, contUpd, end = [], [], [], [], [], [], []
+    derivOut, deriv = {}, []
+    nInline = 0
+    for n, rec in enumerate(recs):
+        call = rec['call']
+        fac = rates[n]
+        pars.append(rec['pars'])
+        ios.append(rec['io'])
+        defs.append(rec['defs'])
+        if inline and canInline(rec['blk']) and set(dimIn[n] + dimOut[n]) <= {1}:
+            nInline += 1
+            init.append(inlineBlk(rec['blk'], str(n), 'CG_INIT'))
+            isrOut.append((fac, inlineBlk(rec['blk'], str(n), 'CG_OUT'), n))
+            if n in path and xc is not None:
+                derivOut[n] = isrOut[-1][1]
+            if rec['nxd'] != 0:
+                isrUpd.append((fac, inlineBlk(rec['blk'], str(n), 'CG_STUPD'), n))
+            end.append(inlineBlk(rec['blk'], str(n), 'CG_END'))
+            continue
+        init.append('  ' + call % 'CG_INIT')
+        isrOut.append((fac, '  ' + call % 'CG_OUT', n))
+        if rec['nxd'] != 0:
+            isrUpd.append((fac, '  ' + call % 'CG_STUPD', n))
+        if rec['nxc'] != 0 and xc is not None:
+            derivOut[n] = '  ' + call % 'CG_OUT'
+            deriv.append('  ' + call % 'CG_DERIV')
+        elif n in path and xc is not None:
+            derivOut[n] = '  ' + call % 'CG_OUT'
+        elif rec['nxc'] != 0:
+            h = 'h' if fac == 1 else str(fac) + '*h'
+            contH.append((fac, '  ' + rec['ref'] + '.realPar[0] = ' + h + ';\n', n))
+            contOut.append((fac, '    ' + call % 'CG_OUT', n))
+            contUpd.append((fac, '    ' + call % 'CG_STUPD', n))
+        end.append('  ' + call % 'CG_END')
+
+    if profile:
+        wrap = lambda sec: [(fac, profWrap(model, n, txt), n) for fac, txt, n in sec]
+        isrOut, isrUpd, contOut, contUpd = wrap(isrOut), wrap(isrUpd), wrap(contOut), wrap(contUpd)
+        derivOut = {n : profWrap(model, n, txt) for n, txt in derivOut.items()}
+        deriv = [profWrap(model, n, txt) for n, txt in zip(sorted(xc or {}), deriv)]
+
+    if inline:
+        print('Inline code generation: ' + str(nInline) + ' of ' + str(N) + ' blocks inlined')
+
+    f = io.StringIO()
+    f.write("#include <pyblock.h>\n")
+    if xc is not None:
+        f.write("#include <odesolver.h>\n")
+    if parFile:
+        f.write("#include <parfile.h>\n")
+    if profile:
+        f.write("#include <profiler.h>\n")
+    if nInline != 0:
+        f.write("#include <stdio.h>\n#include <stdlib.h>\n#include <math.h>\n\n")
+    else:
+        f.write("#include <stdio.h>\n#include <stdlib.h>\n\n")
 
     shv_generator = ShvTreeGenerator(f, model, Blocks)
     shv_generator.generate_header()
 
-    totContBlk = 0
-    for blk in Blocks:
-        totContBlk += blk.nx[0]
-
     f.write("/* Function prototypes */\n\n")
-
-    prototypes = []
-    
-    for blk in Blocks:
-        prototypes.append("void " + blk.fcn + "(int Flag, python_block *block);\n")
-    setProto = set(prototypes)
-    for el in setProto:
-        f.write(el)
-
+    prototypes = sorted(set(["void " + blk.fcn + "(int Flag, python_block *block);\n" for blk in Blocks]))
+    f.write(''.join(prototypes))
+    if nInline != 0:
+        f.write("double get_run_time(void);\n")
     f.write("\n")
 
-    strLn = "double " + model + "_get_tsamp(void)\n"
-    strLn += "{\n"
-    strLn += "  return (" + str(Tsamp) + ");\n"
-    strLn += "}\n\n"
-    f.write(strLn)
-
-    strLn = "python_block block_" + model + "[" + str(N) + "];\n\n"
-    f.write(strLn)
-
-    for n in range(0, N):
-        blk = Blocks[n]
-        if (size(blk.realPar) != 0):
-            strLn = "static double realPar_" + str(n) +"[] = {"
-            strLn += str(asmatrix(blk.realPar).tolist())[2:-2] + "};\n"
-            strLn += "static char *realParNames_" + str(n) + "[] = {"
-            tmp = 0
-            if (size(blk.realPar) != size(blk.realParNames)):
-                for i in range(0, size(blk.realPar)):
-                    strLn += "\"double" + str(i) + "\""
-                    if ((tmp + 1) != size(blk.realPar)):
-                        strLn += ", "
-                    tmp += 1
-            else:
-                for i in range(0, size(blk.realPar)):
-                    strLn += "\"" + str(blk.realParNames[i]) + "\""
-                    if ((tmp + 1) != size(blk.realPar)):
-                        strLn += ", "
-                    tmp += 1
-            strLn += "};\n"
-            f.write(strLn)
-        if (size(blk.intPar) != 0):
-            strLn = "static int intPar_" + str(n) +"[] = {"
-            strLn += str(asmatrix(blk.intPar).tolist())[2:-2] + "};\n"
-            strLn += "static char *intParNames_" + str(n) + "[] = {"
-            tmp = 0
-            for i in range(0, size(blk.intPar)):
-                strLn += "\"int" + str(i) + "\""
-                if ((tmp + 1) != size(blk.intPar)):
-                    strLn += ", "
-                tmp += 1
-            strLn += "};\n"
-            f.write(strLn)
-        strLn = "static int nx_" + str(n) +"[] = {"
-        strLn += str(asmatrix(blk.nx).tolist())[2:-2] + "};\n"
-        f.write(strLn)
+    f.write("double " + model + "_get_tsamp(void)\n{\n  return (" + str(Tsamp) + ");\n}\n\n")
+    f.write("python_block block_" + model + "[" + str(N) + "];\n\n")
+    f.write(''.join(pars))
     f.write("\n")
 
-    f.write("/* Nodes */\n")
-    for n in range(1, maxNode+1):
-        strLn = "static double Node_" + str(n) + "[] = {0.0};\n"
-        f.write(strLn)
+    if signals:
+        f.write("/* Signals */\n")
+        f.write("#if defined(__GNUC__)\n#define CG_SIGNALS_ALIGN __attribute__((aligned(64)))\n")
+        f.write("#else\n#define CG_SIGNALS_ALIGN\n#endif\n\n")
+        f.write("static double signals[" + str(max(nslots, 1)) + "] CG_SIGNALS_ALIGN;\n\n")
+        f.write(''.join(["#define Node_" + str(n) + " (&signals[" + str(slots[n]) + "])\n" for n in sorted(slots)]))
+        f.write("\n")
+    else:
+        f.write("/* Nodes */\n")
+        f.write(''.join(["static double Node_" + str(n) + dimDecl(dims.get(n, 1)) + " = {0.0};\n"
+                         for n in range(1, maxNode+1)]))
+        f.write("\n")
+
+    if nparts > 1:
+        f.write("/* Signals of the other partitions */\n")
+        f.write(''.join(["static double PtIn_" + str(p) + "_" + str(node) + dimDecl(dims.get(node, 1)) +
+                         " = {0.0};\n" for p, node, ph in ins]))
+        f.write("\n")
 
-    f.write("\n")
+    if rateTasks:
+        f.write("/* Rate transition buffers */\n")
+        f.write(''.join(["static double RtPub_" + str(node) + dimDecl(dims.get(node, 1)) + " = {0.0};\n"
+                         for p, node in pubs]))
+        f.write(''.join(["static double RtIn_" + str(k) + "_" + str(node) + dimDecl(dims.get(node, 1)) +
+                         " = {0.0};\n" for k, node in ins]))
+        f.write("\n")
 
     f.write("/* Input and outputs */\n")
-    for n in range(0, N):
-        blk = Blocks[n]
-        nin = size(blk.pin)
-        nout = size(blk.pout)
-        if nin != 0:
-            strLn = "static void *inptr_" + str(n) + "[]  = {"
-            for m in range(0, nin):
-                strLn += "&Node_" + str(blk.pin[m]) + ","
-            strLn = strLn[0:-1] + "};\n"
-            f.write(strLn)
-        if nout != 0:
-            strLn = "static void *outptr_" + str(n) + "[] = {"
-            for m in range(0, nout):
-                strLn += "&Node_" + str(blk.pout[m]) + ","
-            strLn = strLn[0:-1] + "};\n"
-            f.write(strLn)
-
+    f.write(''.join(ios))
     f.write("\n\n")
 
     if (environ["SHV_TREE_TYPE"] == "GSA_STATIC") and (environ["SHV_USED"] == "True"):
         shv_generator.generate_tree()
 
-    f.write("/* Initialization function */\n\n")
-    strLn = "void " + model + "_init(void)\n"
-    strLn += "{\n\n"
-    f.write(strLn)
+    if profile:
+        f.write("/* Profiler: one entry per block and one for the whole ISR */\n\n")
+        f.write("static prof_entry prof_" + model + "[" + str(N+1) + "] = {\n")
+        f.write(''.join(['  {' + cStr(blk.name) + ', ' + cStr(blk.sysPath) + ', ' + cStr(blk.fcn) + '},\n'
+                         for blk in Blocks]))
+        f.write('  {"ISR", "", "isr"}\n};\n\n')
 
-    f.write("/* Block definition */\n\n")
-    for n in range(0, N):
-        blk = Blocks[n]
-        nin = size(blk.pin)
-        nout = size(blk.pout)
-        num = 0
+    if shlib:
+        f.write(shlibTables(model, Blocks, slots, nslots, dims, maxNode))
 
-        strLn = "  block_" + model + "[" + str(n) + "].nin  = " + str(nin) + ";\n"
-        strLn += "  block_" + model + "[" + str(n) + "].nout = " + str(nout) + ";\n"
+    if parFile:
+        f.write(parTable(model, Blocks))
 
-        port = "nx_" + str(n)
-        strLn += "  block_" + model + "[" + str(n) + "].nx   = " + port + ";\n"
+    if xc is not None:
+        f.write(varstepCode(model, nxc, derivOut, deriv, rtol, atol))
 
-        if nin == 0:
-            port = "NULL"
-        else:
-            port = "inptr_" + str(n)
-        strLn += "  block_" + model + "[" + str(n) + "].u    = " + port + ";\n"
-        if nout == 0:
-            port = "NULL"
-        else:
-            port = "outptr_" + str(n)
-        strLn += "  block_" + model + "[" + str(n) + "].y    = " + port + ";\n"
-        if size(blk.realPar) != 0:
-            par = "realPar_" + str(n)
-            parNames = "realParNames_" + str(n)
-            num = size(blk.realPar)
-        else:
-            par = "NULL"
-            parNames = "NULL"
-            num = 0
-        strLn += "  block_" + model + "[" + str(n) + "].realPar = " + par + ";\n"
-        strLn += "  block_" + model + "[" + str(n) + "].realParNum = " + str(num) + ";\n"
-        strLn += "  block_" + model + "[" + str(n) + "].realParNames = " + parNames + ";\n"
-        if size(blk.intPar) != 0:
-            par = "intPar_" + str(n)
-            parNames = "intParNames_" + str(n)
-            num = size(blk.intPar)
-        else:
-            par = "NULL"
-            parNames = "NULL"
-            num = 0
-        strLn += "  block_" + model + "[" + str(n) + "].intPar = " + par + ";\n"
-        strLn += "  block_" + model + "[" + str(n) + "].intParNum = " + str(num) + ";\n"
-        strLn += "  block_" + model + "[" + str(n) + "].intParNames = " + parNames + ";\n"
-        strLn += "  block_" + model + "[" + str(n) + "].str = " +'"' + blk.str + '"' + ";\n"
-        strLn += "  block_" + model + "[" + str(n) + "].ptrPar = NULL;\n"
-        f.write(strLn)
-        f.write("\n")
+    if multirate:
+        f.write("/* Base rate counter */\n")
+        f.write("static int rateCnt = 0;\n\n")
+
+    if shlib:
+        f.write(shlibState(model, xc is not None, multirate))
+
+    sections = (isrOut, isrUpd, contH, contOut, contUpd)
+    if rateTasks:
+        f.write(rateTasksCode(model, factors, group, producer, pubs, ins, dims, sections, rkstep))
+
+    if nparts > 1:
+        f.write(partCode(model, Blocks, part, nparts, producer, ins, dims, sections, rkstep))
+
+    f.write("/* Initialization function */\n\n")
+    f.write("void " + model + "_init(void)\n{\n\n")
+    f.write("/* Block definition */\n\n")
+    f.write(''.join(defs))
     f.write("\n")
 
     if environ["SHV_USED"] == "True":
         shv_generator.generate_code()
 
     f.write("/* Set initial outputs */\n\n")
-
-    for n in range(0, N):
-        blk = Blocks[n]
-        strLn = "  " + blk.fcn + "(CG_INIT, &block_" + model + "[" + str(n) + "]);\n"
-        f.write(strLn)
+    f.write(''.join(init))
+    if profile:
+        f.write("\n  prof_init(prof_" + model + ", " + str(N+1) + ");\n")
+    if rateTasks:
+        f.write("\n  for(int k=1;k<" + str(len(factors)) + ";k++){\n")
+        f.write("    " + model + "_rate_publish(k);\n")
+        f.write("    " + model + "_rate_fetch(k);\n  }\n")
     f.write("}\n\n")
 
     f.write("/* ISR function */\n\n")
-    strLn = "void " + model + "_isr(double t)\n"
-    strLn += "{\n"
-    f.write(strLn)
-
-    if totContBlk != 0:
-        f.write("int i;\n")
-        f.write("double h;\n\n")
-
-    for n in range(0, N):
-        blk = Blocks[n]
-        strLn = "  " + blk.fcn + "(CG_OUT, &block_" + model + "[" + str(n) + "]);\n"
-        f.write(strLn)
-    f.write("\n")
-
-    for n in range(0, N):
-        blk = Blocks[n]
-        if blk.nx[1] != 0:
-            strLn = "  " + blk.fcn + "(CG_STUPD, &block_" + model + "[" + str(n) + "]);\n"
-            f.write(strLn)
-    f.write("\n")
-
-    if totContBlk != 0:
-        strLn = "  h = " + model + "_get_tsamp()/" + str(rkstep) + ";\n\n"
-        f.write(strLn)
-
-        for n in range(0, N):
-            blk = Blocks[n]
-            if blk.nx[0] != 0:
-                strLn = "  block_" + model + "[" + str(n) + "].realPar[0] = h;\n"
-                f.write(strLn)
-
-        strLn = "  for(i=0;i<" + str(rkstep) + ";i++){\n"
-        f.write(strLn)
-        for n in range(0, N):
-            blk = Blocks[n]
-            if blk.nx[0] != 0:
-                strLn = "    " + blk.fcn + "(CG_OUT, &block_" + model + "[" + str(n) + "]);\n"
-                f.write(strLn)
-
-        for n in range(0, N):
-            blk = Blocks[n]
-            if blk.nx[0] != 0:
-                strLn = "    " + blk.fcn + "(CG_STUPD, &block_" + model + "[" + str(n) + "]);\n"
-                f.write(strLn)
-
-        f.write("  }\n")
-
+    f.write("void " + model + "_isr(double t)\n{\n")
+    if nparts > 1:
+        f.write("  int p, phase;\n\n")
+        f.write("  for(phase=0;phase<3;phase++)\n")
+        f.write("    for(p=0;p<" + str(nparts) + ";p++) " + model + "_part_step(p, phase);\n")
+    elif rateTasks:
+        f.write("  int k;\n\n")
+        f.write("  for(k=1;k<" + str(len(factors)) + ";k++)\n")
+        f.write("    if (rateCnt % rateFactor[k] == 0) " + model + "_rate_publish(k);\n")
+        f.write("  if (rateCnt % rateFactor[0] == 0) isr_rate_0();\n")
+        f.write("  for(k=1;k<" + str(len(factors)) + ";k++)\n")
+        f.write("    if (rateCnt % rateFactor[k] == 0) {\n")
+        f.write("      " + model + "_rate_fetch(k);\n")
+        f.write("      " + model + "_isr_rate(k, t);\n    }\n")
+    else:
+        f.write(isrBody(model, isrOut, isrUpd, contH, contOut, contUpd, rkstep))
+    if xc is not None:
+        f.write("  ode_dopri5(&solver, " + model + "_get_tsamp());\n")
+    if profile:
+        f.write("  prof_commit(prof_" + model + ", " + str(N+1) + ");\n")
+    if multirate:
+        f.write("  rateCnt = (rateCnt + 1) % " + str(hyper) + ";\n")
     f.write("}\n")
 
     f.write("/* Termination function */\n\n")
-
-    strLn = "void " + model + "_end(void)\n"
-    strLn += "{\n"
-    f.write(strLn)
-
+    f.write("void " + model + "_end(void)\n{\n")
     if environ["SHV_USED"] == "True":
         shv_generator.generate_end()
-
-    for n in range(0, N):
-        blk = Blocks[n]
-        strLn = "  " + blk.fcn + "(CG_END, &block_" + model + "[" + str(n) + "]);\n"
-        f.write(strLn)
+    if profile:
+        f.write("  prof_dump(\"" + model + "_prof.json\", \"" + model + "\", prof_" + model + ", " + str(N+1) + ");\n")
+    f.write(''.join(end))
     f.write("}\n\n")
-    f.close()
+
+    written = writeIfChanged(fn, f.getvalue())
+    if parFile:
+        skipped = writeParFile(model + PARFILE_EXT, model, parRecords(Blocks))
+        for blk, name, typ, idx, val in skipped:
+            print('Parameter ' + blk + '.' + name + ' not written to ' + model + PARFILE_EXT + ': name too long')
+    if cache:
+        digests['c'] = fileDigest(fn)
+        saveCache(model, digests)
 
     # If the create_project_structure function exists, execute it.
     # If the function does not exist, the .py script associated with the .tmf is executed.
     # If there is no .py script associated with the .tmf nothing happens.
     run_plugin(model, template, 'create_project_structure', [model, blocks])
 
-
+    return written
 
 def genMake(model, template, addObj=''):
     """Generate the Makefile
@@ -454,7 +1087,8 @@ def genMake(model, template, addObj=''):
 
     Returns
     -------
-    -
+    changed   : True if the Makefile has been written (objects must be
+                rebuilt with "make clean")
     """
 
     template_path = environ.get('PYSUPSICTRL')
@@ -464,15 +1098,40 @@ def genMake(model, template, addObj=''):
     f.close()
     mf = mf.replace('$$MODEL$$', model)
     mf = mf.replace('$$ADD_FILES$$', addObj)
-    f = open('Makefile', 'w')
-    f.write(mf)
-    f.close()
+    return writeIfChanged('Makefile', mf)
+
+class AlgebraicLoopError(ValueError):
+    """Raised by detBlkSeq when direct feed-through blocks form a loop
+
+    The attribute "loops" contains one list of RCPblk for each
+    strongly connected component found in the diagram.
+    """
+    def __init__(self, loops):
+        self.loops = loops
+        txt = 'Algebraic loop!'
+        for n, loop in enumerate(loops):
+            txt += '\n  Loop ' + str(n+1) + ': '
+            txt += ' -> '.join([blkLabel(blk) for blk in loop])
+        super(AlgebraicLoopError, self).__init__(txt)
+
+def blkLabel(blk):
+    """Return a readable label (name, system path and function) of a block"""
+    txt = blk.name.__str__()
+    if blk.sysPath != '':
+        txt += ' [' + blk.sysPath + ']'
+    txt += ' (' + blk.fcn + ')'
+    return txt
 
 def detBlkSeq(Nodes, blocks):
     """Generate the Block sequence for simulation and RT
 
     Call: detBlkSeq(Nodes, Blocks)
 
+    Blocks without direct feed-through (uy=0) are placed first, the
+    remaining blocks are sorted with the Kahn algorithm in O(V+E).
+    Algebraic loops are detected with the Tarjan algorithm and reported
+    as AlgebraicLoopError.
+
     Parameters
     ----------
     Nodes     : Number of total nodes in diagram
@@ -482,65 +1141,9 @@ def detBlkSeq(Nodes, blocks):
     -------
     Blocks    : List with the ordered blocks
     """
-    class blkDep:
-        def __init__(self, block, blkL, nodeL):
-            self.block = block
-            self.block_in = []
-
-            if len(block.pin) != 0:
-                for node in block.pin:
-                    if nodeL[node].block_in[0].uy == 1:
-                        self.block_in.append(nodeL[node].block_in[0])
-  
-
-        def __str__(self):
-            txt  = 'Block: ' + self.block.fcn.__str__() + '\n'
-            txt += 'Inputs\n'
-            for item in self.block_in:
-                txt += item.fcn + '\n'
-            txt += '\n'
-            return txt
-
-    class nodeClass:
-        def __init__(self, N):
-            self.PN = N
-            self.block_in = []
-            self.block_out = []
-
-        def __str__(self):
-            txt  = 'Node: ' + self.PN.__str__() + '\n'
-            txt += ' Blocks in:\n'
-            for item in self.block_in:
-                try:
-                    txt += item.fcn + '\n'
-                except:
-                    txt += 'None\n'
-            txt += ' Blocks out:\n'
-            for item in self.block_out:
-                try:
-                    txt += item.fcn + '\n'
-                except:
-                    txt += 'None\n'
-            return txt
-
-    def fillNodeList(nN,blks):
-        nL = []
-        nL.append(nodeClass(0))
-        for n in range(1, nN+1):
-            node = nodeClass(n)
-            nL.append(node)
-        for blk in blks:
-            for n in blk.pin:
-                nL[n].block_out.append(blk)
-            for n in blk.pout:
-                nL[n].block_in.append(blk)
-        return nL
-
     blks = []
     blks2order = []
 
-    nodes = fillNodeList(Nodes, blocks)
-
     # First search block with no input and no output
 
     for blk in blocks:
@@ -550,35 +1153,531 @@ def detBlkSeq(Nodes, blocks):
             else:
                 blks.append(blk)
         else:
-            block = blkDep(blk, blocks, nodes)
-            blks2order.append(block)
+            blks2order.append(blk)
+
+    # Node -> index of the feed-through block driving it
+    N = len(blks2order)
+    nodeSrc = {}
+    for n in range(0, N):
+        for node in blks2order[n].pout:
+            nodeSrc[int(node)] = n
+
+    # Edges between feed-through blocks only
+    succ = [[] for n in range(0, N)]
+    nIn = [0] * N
+    for n in range(0, N):
+        for node in blks2order[n].pin:
+            m = nodeSrc.get(int(node))
+            if m is not None:
+                succ[m].append(n)
+                nIn[n] += 1
 
     # Order the remaining blocks
+    ready = deque([n for n in range(0, N) if nIn[n] == 0])
+    while ready:
+        n = ready.popleft()
+        blks.append(blks2order[n])
+        for m in succ[n]:
+            nIn[m] -= 1
+            if nIn[m] == 0:
+                ready.append(m)
+
+    # Check if remain blocks -> Algebraic loop!
+    if len(blks) != len(blocks):
+        remaining = [n for n in range(0, N) if nIn[n] != 0]
+        loops = [[blks2order[n] for n in scc] for scc in detSCC(remaining, succ)]
+        raise AlgebraicLoopError(loops)
+
+    return blks
+
+def detSCC(vertices, succ):
+    """Find the cycles of a graph (iterative Tarjan algorithm)
+
+    Call: detSCC(vertices, succ)
+
+    Parameters
+    ----------
+    vertices  : Indexes of the vertices to analyse
+    succ      : List with the successors of each vertex
+
+    Returns
+    -------
+    scc       : List of the strongly connected components with a cycle
+    """
+    vset = set(vertices)
+    index = {}
+    low = {}
+    stack = []
+    onStack = set()
+    scc = []
     counter = 0
-    while len(blks2order) != counter:
-        blk = blks2order.pop(0)
-        if len(blk.block_in) == 0:
-            blks.append(blk.block)
-            counter = 0
 
-            try:
-                for node in blk.block.pout:
-                    for bk in nodes[node].block_out:
-                        el = [el for el in blks2order if el.block == bk]
-                        try:
-                            el[0].block_in.remove(blk.block)
-                        except:
-                            pass
-            except:
-                pass
+    for root in vertices:
+        if root in index:
+            continue
+        work = [(root, 0)]
+        while work:
+            v, i = work.pop()
+            if i == 0:
+                index[v] = low[v] = counter
+                counter += 1
+                stack.append(v)
+                onStack.add(v)
+            recurse = False
+            next_succ = succ[v]
+            while i < len(next_succ):
+                w = next_succ[i]
+                i += 1
+                if w not in vset:
+                    continue
+                if w not in index:
+                    work.append((v, i))
+                    work.append((w, 0))
+                    recurse = True
+                    break
+                elif w in onStack:
+                    low[v] = min(low[v], index[w])
+            if recurse:
+                continue
+            if low[v] == index[v]:
+                comp = []
+                while True:
+                    w = stack.pop()
+                    onStack.discard(w)
+                    comp.append(w)
+                    if w == v:
+                        break
+                comp.reverse()
+                if len(comp) > 1 or v in succ[v]:
+                    scc.append(comp)
+            if work:
+                u = work[-1][0]
+                low[u] = min(low[u], low[v])
+
+    return scc
+
+# Blocks writing all their outputs at CG_INIT, CG_OUT and CG_END, without
+# states and without keeping references to their inputs
+PURE_BLOCKS = {'absV', 'constant', 'deadzone', 'mxmult', 'prod', 'saturation',
+               'sinus', 'squareSignal', 'step', 'sum', 'trigo'}
+
+def detSignals(Blocks, reuse=False, dims=None):
+    """Place the signals of an ordered block list in a contiguous array
+
+    Call: detSignals(Blocks, reuse, dims)
+
+    The slots are assigned in the order of execution of the producing
+    blocks. With reuse=True a slot is shared by signals whose lifetimes
+    in the step do not overlap. Only the signals produced and used by
+    blocks of PURE_BLOCKS, with every reader executed after the writer,
+    are considered, the other ones get their own slot. Vector signals
+    always get their own slots.
+
+    Parameters
+    ----------
+    Blocks    : Block list ordered by detBlkSeq
+    reuse     : Share the slots of the signals with disjoint lifetimes
+    dims      : dict node -> dimension of the signal (see detDims),
+                None for scalar signals
+
+    Returns
+    -------
+    slots     : dict node -> index in the array
+    nslots    : Size of the array
+    """
+    if dims is None:
+        dims = {}
+    prod = {}
+    cons = {}
+    nodes = []
+    for n, blk in enumerate(Blocks):
+        for node in array(blk.pout).ravel().tolist():
+            prod[node] = n
+            nodes.append(node)
+    for n, blk in enumerate(Blocks):
+        for node in array(blk.pin).ravel().tolist():
+            cons.setdefault(node, []).append(n)
+            if node not in prod and node not in nodes:
+                nodes.append(node)
+
+    def isPure(n):
+        blk = Blocks[n]
+        return blk.fcn in PURE_BLOCKS and array(blk.nx).ravel().tolist() == [0, 0]
+
+    slots = {}
+    nslots = 0
+    free = []
+    for node in nodes:
+        start = prod.get(node)
+        readers = cons.get(node, [])
+        dim = dims.get(node, 1)
+        if reuse and dim == 1 and start is not None and isPure(start) and \
+           all(n > start and isPure(n) for n in readers):
+            end = max(readers, default=start)
+            if len(free) != 0 and free[0][0] < start:
+                slot = heapq.heappop(free)[1]
+            else:
+                slot = nslots
+                nslots += 1
+            heapq.heappush(free, (end, slot))
+            slots[node] = slot
         else:
-            blks2order.append(blk)
-            counter += 1
+            slots[node] = nslots
+            nslots += dim
+    return slots, nslots
+
+def detRates(Blocks, Tsamp):
+    """Determine the rate of every block of an ordered block list
+
+    Call: detRates(Blocks, Tsamp)
+
+    The rate factor of a block is the ratio between its sample time
+    (attribute tsamp of RCPblk) and the base sampling time. Blocks with
+    tsamp=0 inherit the fastest rate of the blocks driving their inputs,
+    the sources without sample time run at the base rate.
+
+    Parameters
+    ----------
+    Blocks    : Block list ordered by detBlkSeq
+    Tsamp     : Base sampling time
+
+    Returns
+    -------
+    rates     : List with the rate factor (integer >= 1) of each block
+    """
+    producer = {}
+    for n, blk in enumerate(Blocks):
+        for node in array(blk.pout).ravel().tolist():
+            producer[node] = n
+
+    rates = [None] * len(Blocks)
+    for n, blk in enumerate(Blocks):
+        if blk.tsamp != 0:
+            k = blk.tsamp / Tsamp
+            fac = int(round(k))
+            if fac < 1 or abs(k - fac) > 1e-6 * k:
+                raise ValueError('Sample time ' + str(blk.tsamp) + ' of ' + blkLabel(blk) +
+                                 ' is not a multiple of the base sampling time ' + str(Tsamp))
+            rates[n] = fac
+        elif size(blk.pin) == 0:
+            rates[n] = 1
+
+    # Blocks without feed-through read nodes computed later: iterate, the
+    # blocks of loops without any rate run at the base rate
+    for it in range(0, 2):
+        changed = True
+        while changed:
+            changed = False
+            for n, blk in enumerate(Blocks):
+                if blk.tsamp != 0:
+                    continue
+                inp = [rates[producer[node]] for node in array(blk.pin).ravel().tolist()
+                       if node in producer and rates[producer[node]] is not None]
+                if len(inp) != 0 and min(inp) != rates[n]:
+                    rates[n] = min(inp)
+                    changed = True
+        rates = [1 if r is None else r for r in rates]
+    return rates
+
+def detDerivPath(Blocks, rates):
+    """Blocks on the algebraic paths between the continuous blocks
+
+    Call: detDerivPath(Blocks, rates)
+
+    The variable step solver evaluates the derivatives at every stage of
+    a step: the blocks without states and with feed-through at the base
+    rate between the output of a continuous block and the input of a
+    continuous block must be evaluated too. The blocks with discrete
+    states or at a slower rate break the paths, their outputs are held.
+
+    Parameters
+    ----------
+    Blocks    : Block list ordered by detBlkSeq
+    rates     : Rate factors of the blocks (see detRates)
+
+    Returns
+    -------
+    path      : Indices of the blocks on the paths, in execution order
+    """
+    producer, consumers = {}, {}
+    for n, blk in enumerate(Blocks):
+        for node in array(blk.pout).ravel().tolist():
+            producer[node] = n
+        for node in array(blk.pin).ravel().tolist():
+            consumers.setdefault(node, []).append(n)
+    cont = [array(blk.nx).ravel()[0] != 0 for blk in Blocks]
+    alg = [not cont[n] and array(blk.nx).ravel().tolist() == [0, 0] and blk.uy != 0 and rates[n] == 1
+           for n, blk in enumerate(Blocks)]
+
+    # Reached from the continuous outputs
+    fwd = set()
+    todo = [n for n in range(len(Blocks)) if cont[n]]
+    while len(todo) != 0:
+        n = todo.pop()
+        for node in array(Blocks[n].pout).ravel().tolist():
+            for m in consumers.get(node, []):
+                if alg[m] and m not in fwd:
+                    fwd.add(m)
+                    todo.append(m)
+
+    # Reaching the continuous inputs
+    bwd = set()
+    todo = [n for n in range(len(Blocks)) if cont[n]]
+    while len(todo) != 0:
+        n = todo.pop()
+        for node in array(Blocks[n].pin).ravel().tolist():
+            m = producer.get(node)
+            if m is not None and alg[m] and m not in bwd:
+                bwd.add(m)
+                todo.append(m)
+    return sorted(fwd & bwd)
+
+def detVarStep(Blocks, rates):
+    """Place the continuous states in one vector for the variable step solver
+
+    Call: detVarStep(Blocks, rates)
+
+    The continuous blocks must provide their derivatives (flag CG_DERIV,
+    VARSTEP_BLOCKS) and run at the base rate, the blocks between them
+    (see detDerivPath) must be pure; otherwise a message is printed and
+    the fixed step solver is kept.
+
+    Parameters
+    ----------
+    Blocks    : Block list ordered by detBlkSeq
+    rates     : Rate factor of every block (see detRates)
 
-    # Check if remain blocks in blks2order -> Algeabric loop!
-    if len(blks2order) != 0:
-        for item in blks2order:
-            print(item.block)
-        raise ValueError("Algeabric loop!")
+    Returns
+    -------
+    xc        : dict block index -> offset of its states in the vector,
+                None for the fixed step solver
+    nxc       : Size of the state vector
+    path      : Blocks evaluated at every stage (see detDerivPath)
+    """
+    cont = [n for n, blk in enumerate(Blocks) if array(blk.nx).ravel()[0] != 0]
+    other = [blkLabel(Blocks[n]) for n in cont if Blocks[n].fcn not in VARSTEP_BLOCKS]
+    if len(other) != 0:
+        print('Variable step solver not used: no derivatives for ' + ', '.join(other))
+        return None, 0, []
+    if any([rates[n] != 1 for n in cont]):
+        print('Variable step solver not used with slower continuous blocks')
+        return None, 0, []
+    path = detDerivPath(Blocks, rates)
+    other = [blkLabel(Blocks[n]) for n in path if not isPure(Blocks[n])]
+    if len(other) != 0:
+        print('Variable step solver not used: blocks between the continuous blocks '
+              'cannot be evaluated at every stage: ' + ', '.join(other))
+        return None, 0, []
+    xc, nxc = {}, 0
+    for n in cont:
+        xc[n] = nxc
+        nxc += int(array(Blocks[n].nx).ravel()[0])
+    print('Variable step solver: ' + str(nxc) + ' continuous states')
+    return xc, nxc, path
+
+def detPartInputs(Blocks, part):
+    """Signals read from other partitions
+
+    Call: detPartInputs(Blocks, part)
+
+    A partition reads a copy of the signals of the other partitions,
+    taken after the outputs without feed-through (phase 1) or after all
+    the outputs (phase 2).
+
+    Parameters
+    ----------
+    Blocks    : Block list grouped by partition
+    part      : Partition of every block (see detPartitions)
 
-    return blks
\ No newline at end of file
+    Returns
+    -------
+    producer  : dict node -> index of the block writing it
+    ins       : List of (partition, node, phase) of the copies
+    """
+    producer = {}
+    for n, blk in enumerate(Blocks):
+        for node in array(blk.pout).ravel().tolist():
+            producer[node] = n
+    ins = []
+    for n, blk in enumerate(Blocks):
+        for node in array(blk.pin).ravel().tolist():
+            if node not in producer or part[producer[node]] == part[n]:
+                continue
+            phase = 1 if Blocks[producer[node]].uy == 0 else 2
+            if (part[n], node, phase) not in ins:
+                ins.append((part[n], node, phase))
+    return producer, ins
+
+def detRateBuffers(Blocks, group):
+    """Signals crossing the rate tasks (rate transition buffers)
+
+    Call: detRateBuffers(Blocks, group)
+
+    Parameters
+    ----------
+    Blocks    : Block list ordered by detBlkSeq
+    group     : Rate task of every block (0 for the base rate)
+
+    Returns
+    -------
+    producer  : dict node -> index of the block writing it
+    pubs      : List of (task, node) published by the slower tasks
+    ins       : List of (task, node) fetched by the slower tasks
+    """
+    producer = {}
+    for n, blk in enumerate(Blocks):
+        for node in array(blk.pout).ravel().tolist():
+            producer[node] = n
+    pubs, ins = [], []
+    for n, blk in enumerate(Blocks):
+        for node in array(blk.pin).ravel().tolist():
+            if node not in producer or group[producer[node]] == group[n]:
+                continue
+            p = group[producer[node]]
+            if p != 0 and (p, node) not in pubs:
+                pubs.append((p, node))
+            if group[n] != 0 and (group[n], node) not in ins:
+                ins.append((group[n], node))
+    return producer, pubs, ins
+
+def blkCost(blk, rkstep=10):
+    """Rough execution cost of a block (continuous states are integrated rkstep times)"""
+    nx = array(blk.nx).ravel().tolist()
+    cost = 1 + nx[0] + nx[1]
+    if nx[0] != 0:
+        cost += 2 * rkstep * (1 + nx[0])
+    return cost
+
+def detPartitions(Blocks, nparts, rkstep=10):
+    """Split an ordered block list into partitions executed in parallel
+
+    Call: detPartitions(Blocks, nparts, rkstep)
+
+    The step is executed in 3 phases: outputs of the blocks without
+    feed-through (uy=0), outputs of the blocks with feed-through, state
+    updates. Blocks with feed-through reading the output of another block
+    with feed-through must be computed in sequence and are kept in the
+    same partition (connected components of this graph), like the
+    continuous blocks connected together (integrated jointly) and the
+    continuous blocks with feed-through with all the blocks reading them
+    (their outputs are written again during the integration of phase 2,
+    while the copies of the signals of feed-through blocks are taken);
+    all the other signals can cross the partitions and are exchanged
+    between the phases. The components are distributed on the partitions with the
+    largest-first heuristic using blkCost.
+
+    Parameters
+    ----------
+    Blocks    : Block list ordered by detBlkSeq
+    nparts    : Maximal number of partitions
+    rkstep    : Integration steps of the continuous blocks (for the cost)
+
+    Returns
+    -------
+    part      : List with the partition of each block
+    nparts    : Number of partitions used
+    """
+    N = len(Blocks)
+    parent = list(range(0, N))
+
+    def find(n):
+        while parent[n] != n:
+            parent[n] = parent[parent[n]]
+            n = parent[n]
+        return n
+
+    producer = {}
+    for n, blk in enumerate(Blocks):
+        for node in array(blk.pout).ravel().tolist():
+            producer[node] = n
+    cont = [array(blk.nx).ravel()[0] != 0 for blk in Blocks]
+    for n, blk in enumerate(Blocks):
+        for node in array(blk.pin).ravel().tolist():
+            if node not in producer:
+                continue
+            m = producer[node]
+            if (blk.uy != 0 and Blocks[m].uy != 0) or (cont[n] and cont[m]) or \
+               (cont[m] and Blocks[m].uy != 0):
+                parent[find(m)] = find(n)
+
+    comps = {}
+    for n in range(0, N):
+        comps.setdefault(find(n), []).append(n)
+    comps = sorted(comps.values(), key=lambda c: (-sum([blkCost(Blocks[n], rkstep) for n in c]), c[0]))
+
+    nparts = max(1, min(nparts, len(comps)))
+    load = [(0, p) for p in range(0, nparts)]
+    part = [0] * N
+    for comp in comps:
+        cost, p = heapq.heappop(load)
+        for n in comp:
+            part[n] = p
+        heapq.heappush(load, (cost + sum([blkCost(Blocks[n], rkstep) for n in comp]), p))
+    return part, nparts
+
+def dimList(dim, n):
+    """Port dimensions of a block as a list of n int"""
+    dim = [int(d) for d in array(dim).ravel().tolist()]
+    if len(dim) != n:
+        raise ValueError('Port dimensions ' + str(dim) + ' do not match ' + str(n) + ' port(s)')
+    return dim
+
+def detDims(Blocks):
+    """Determine the dimension of the signals of a block list
+
+    Call: detDims(Blocks)
+
+    The dimension of a signal is given by the output port of the block
+    writing it (attribute dimPout of RCPblk). An output dimension 0 is
+    inherited from the widest input of the block (elementwise blocks),
+    an input dimension 0 accepts any signal; all the other input
+    dimensions must match the connected signal. The inputs of a block
+    with inherited outputs must be scalar or as wide as the outputs.
+
+    Parameters
+    ----------
+    Blocks    : Block list
+
+    Returns
+    -------
+    dimIn     : List with the input dimensions of each block
+    dimOut    : List with the output dimensions of each block
+    dims      : dict node -> dimension of the signal
+    """
+    dims = {}
+    pending = []
+    for n, blk in enumerate(Blocks):
+        pout = array(blk.pout).ravel().tolist()
+        for node, dim in zip(pout, dimList(blk.dimPout, len(pout))):
+            if dim > 0:
+                dims[node] = dim
+            else:
+                pending.append((n, node))
+
+    changed = True
+    while changed:
+        changed = False
+        for n, node in pending:
+            pin = array(Blocks[n].pin).ravel().tolist()
+            if node not in dims and all([p in dims for p in pin]):
+                dims[node] = max([dims[p] for p in pin], default=1)
+                changed = True
+    # Inherited dimensions in a loop
+    for n, node in pending:
+        dims.setdefault(node, 1)
+
+    dimIn, dimOut = [], []
+    for n, blk in enumerate(Blocks):
+        pin = array(blk.pin).ravel().tolist()
+        pout = array(blk.pout).ravel().tolist()
+        din = [dims.get(node, 1) for node in pin]
+        dout = [dims[node] for node in pout]
+        for k, dim in enumerate(dimList(blk.dimPin, len(pin))):
+            if dim != 0 and dim != din[k]:
+                raise ValueError('Block ' + blkLabel(blk) + ': input ' + str(k+1) + ' has dimension ' +
+                                 str(din[k]) + ', ' + str(dim) + ' expected')
+        if 0 in dimList(blk.dimPout, len(pout)) and any([dim not in (1, max(dout)) for dim in din]):
+            raise ValueError('Block ' + blkLabel(blk) + ': incompatible input dimensions ' + str(din))
+        dimIn.append(din)
+        dimOut.append(dout)
+    return dimIn, dimOut, dims
@@ -0,0 +1,116 @@
+"""
+Windowed aggregation of the logging and streaming sinks
+
+The sinks (plot, toFile, logger, scope, plotJuggler) and the aggregate
+block can reduce their inputs over windows of N samples (see
+CodeGen/Common/include/aggregate.h): one row per window holds the
+selected statistics of every channel, ordered by channel and then by
+statistic (mean, min, max, rms, last). The window and the mask of the
+statistics are the last two integer parameters of the blocks.
+
+The following commands are provided:
+
+  aggMask        - Mask of the statistics
+  aggPars        - Integer parameters of a sink
+  aggNames       - Names of the aggregated channels
+  aggregate      - Aggregation of recorded data (same results as the blocks)
+
+"""
+
+import numpy as np
+
+AGG_STATS = ('mean', 'min', 'max', 'rms', 'last')
+AGG_ALL = 31
+
+def aggMask(stats):
+    """Mask of the statistics
+
+    Call: aggMask(stats)
+
+    Parameters
+    ----------
+    stats     : 'all', names separated by comma ('mean,max'), list of names or mask
+
+    Returns
+    -------
+    mask      : Sum of 1 (mean), 2 (min), 4 (max), 8 (rms), 16 (last)
+    """
+    if isinstance(stats, (int, np.integer)):
+        mask = int(stats)
+    else:
+        if isinstance(stats, str):
+            stats = [s.strip() for s in stats.split(',') if s.strip() != '']
+        if list(stats) == ['all']:
+            return AGG_ALL
+        mask = 0
+        for s in stats:
+            if s not in AGG_STATS:
+                raise ValueError('Statistics must be in ' + ', '.join(AGG_STATS) + "; received '%s'" % s)
+            mask |= 1 << AGG_STATS.index(s)
+    if mask <= 0 or mask > AGG_ALL:
+        raise ValueError('Mask of the statistics must be in 1..%d; received %d' % (AGG_ALL, mask))
+    return mask
+
+def aggPars(window, stats='all'):
+    """Integer parameters of a sink
+
+    Call: aggPars(window, stats)
+
+    Parameters
+    ----------
+    window    : Samples of a window (0 or 1: no aggregation)
+    stats     : Statistics (see aggMask)
+
+    Returns
+    -------
+    ipar      : [window, mask], [] without aggregation
+    """
+    window = int(window)
+    if window < 0:
+        raise ValueError('Window must be >= 0; received %d' % window)
+    if window <= 1:
+        return []
+    return [window, aggMask(stats)]
+
+def aggNames(names, stats='all'):
+    """Names of the aggregated channels
+
+    Call: aggNames(names, stats)
+
+    Parameters
+    ----------
+    names     : Names of the channels (list)
+    stats     : Statistics (see aggMask)
+
+    Returns
+    -------
+    names     : ['<name>_<stat>', ...] in the order of the blocks
+    """
+    mask = aggMask(stats)
+    return [n + '_' + s for n in names for k, s in enumerate(AGG_STATS) if mask & (1 << k)]
+
+def aggregate(x, window, stats='all'):
+    """Aggregation of recorded data (same results as the blocks)
+
+    Call: aggregate(x, window, stats)
+
+    Parameters
+    ----------
+    x         : Samples (rows) of the channels (columns)
+    window    : Samples of a window
+    stats     : Statistics (see aggMask)
+
+    Returns
+    -------
+    y         : One row per complete window, the incomplete window at the end is dropped
+    """
+    mask = aggMask(stats)
+    x = np.asarray(x, dtype=float)
+    if x.ndim == 1:
+        x = x[:, None]
+    nw = x.shape[0] // window
+    w = x[:nw*window].reshape(nw, window, x.shape[1])
+    res = {'mean': w.mean(axis=1), 'min': w.min(axis=1), 'max': w.max(axis=1),
+           'rms': np.sqrt((w*w).mean(axis=1)), 'last': w[:, -1, :]}
+    cols = [res[s] for k, s in enumerate(AGG_STATS) if mask & (1 << k)]
+    return np.stack(cols, axis=2).reshape(nw, -1)
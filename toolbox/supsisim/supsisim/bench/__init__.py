@@ -0,0 +1,17 @@
+"""
+Benchmark suite of pysimCoder
+
+  synth          - Synthetic diagrams (chains, fan-out trees, MIMO css
+                   blocks, nested subsystems) of configurable size
+  run            - Time of detBlkSeq, genCode and make, simulated steps
+                   per second of the executables, JSON results
+
+Usage from the command line:
+
+  python3 -m supsisim.bench -o results.json
+  python3 -m supsisim.bench -o new.json --compare results.json
+
+"""
+
+from .synth import synthDgm, writeDgm
+from .run import benchDgm, benchSuite, compare, fixtures, noScopes
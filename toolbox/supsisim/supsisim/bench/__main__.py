@@ -0,0 +1,5 @@
+import sys
+
+from supsisim.bench.run import main
+
+sys.exit(main())
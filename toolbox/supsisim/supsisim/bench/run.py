@@ -0,0 +1,321 @@
+"""
+Benchmarks of the code generation, of the build and of the generated code
+
+Every diagram is measured in 4 phases: block sequence (detBlkSeq), code
+generation (genCode, without cache), build (make) and simulated steps per
+second of the executable built with the sim.tmf template. The results
+are plain dicts, written as JSON for the regression tracking.
+The following commands are provided:
+
+  fixtures       - Shipped diagrams used as realistic benchmarks
+  noScopes       - Replace the interactive outputs of a diagram with null blocks
+  benchDgm       - Benchmark one diagram
+  benchSuite     - Benchmark the synthetic diagrams and the fixtures
+  compare        - Compare two benchmark results
+  main           - Command line interface
+
+Usage from the command line:
+
+  python3 -m supsisim.bench [-o results.json] [-w DIR] [--topologies chain,tree,mimo,subsys]
+                            [--sizes 10,100,1000] [--steps N] [--repeat N] [-n] [--no-fixtures]
+                            [--compare ref.json [--tol 0.2]]
+
+"""
+
+import os
+import io
+import sys
+import copy
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import contextlib
+
+from numpy import array
+
+from supsisim.bench.synth import TOPOLOGIES, synthDgm, writeDgm
+
+FIXTURES = ('Disks/disk_sim.dgm', 'InvertedPendulum/invPSim.dgm', 'BallOnWheel/BoWsim.dgm')
+
+# Outputs waiting for an external viewer
+INTERACTIVE = ('scopeStream', 'ledStream')
+
+# Time metrics (lower is better) and throughput metrics (higher is better)
+TIMES = ('detBlkSeq', 'genCode', 'make')
+RATES = ('steps_per_s',)
+
+def fixtures():
+    """Shipped diagrams used as realistic benchmarks (Tests/ControlDesign)"""
+    base = os.path.join(os.environ.get('PYSUPSICTRL', ''), 'Tests', 'ControlDesign')
+    return [os.path.join(base, name) for name in FIXTURES]
+
+def noScopes(data):
+    """Copy of the diagram with the interactive outputs replaced by null blocks
+
+    The scopes wait for the connection of their viewer, the executable
+    would never start without it.
+    """
+    data = copy.deepcopy(data)
+    scopes = [data] + [item['subitems'] for item in data.get('subsystems', [])]
+    while scopes:
+        sc = scopes.pop()
+        for blk in sc.get('blocks', []):
+            if blk['params'].split('|')[0] in INTERACTIVE:
+                blk['params'] = 'nullBlk'
+                blk['icon'] = 'NULL'
+        scopes += [item['subitems'] for item in sc.get('subsystems', [])]
+    return data
+
+def best(fcn, repeat):
+    """Shortest execution time of fcn() in repeat runs"""
+    dt = []
+    for n in range(0, max(1, repeat)):
+        t0 = time.perf_counter()
+        fcn()
+        dt.append(time.perf_counter() - t0)
+    return min(dt)
+
+def runMake(outdir):
+    """Build the model in outdir, return the build time"""
+    subprocess.run(['make', 'clean'], cwd=outdir, capture_output=True)
+    t0 = time.perf_counter()
+    res = subprocess.run(['make'], cwd=outdir, capture_output=True, text=True)
+    dt = time.perf_counter() - t0
+    if res.returncode != 0:
+        raise RuntimeError('make failed: ' + res.stderr.strip()[-500:])
+    return dt
+
+def runModel(exe, Tf, timeout=600):
+    """Run the executable until Tf, return the execution time"""
+    t0 = time.perf_counter()
+    res = subprocess.run([exe, '-f', repr(Tf)], cwd=os.path.dirname(exe),
+                         capture_output=True, text=True, timeout=timeout)
+    dt = time.perf_counter() - t0
+    if res.returncode != 0:
+        raise RuntimeError(exe + ' exit code ' + str(res.returncode) + ': ' + res.stderr.strip()[-500:])
+    return dt
+
+def benchDgm(fname, data=None, workdir='.', build=True, steps=100000, repeat=3, template='sim.tmf'):
+    """Benchmark one diagram
+
+    Call: benchDgm(fname, data, workdir, build, steps, repeat, template)
+
+    Parameters
+    ----------
+    fname     : .dgm file (its folder is the working folder of the script)
+    data      : Content of the diagram (read from fname if None)
+    workdir   : Folder of the executable, the code is generated in <model>_gen
+    build     : Run make and the executable
+    steps     : Number of simulated sampling periods
+    repeat    : Number of runs of detBlkSeq and genCode (the best is kept)
+    template  : Template makefile (the main of sim.tmf runs without real-time waits)
+
+    Returns
+    -------
+    res       : dict with 'name', 'blocks', the times in s of 'detBlkSeq',
+                'genCode' and 'make', 'steps', 'steps_per_s' and 'error'
+                (None for the phases not executed)
+    """
+    from supsisim.headless import dgmToDiagram
+    from supsisim.build import blkNamespace, instantiateBlocks, shvEnviron
+    from supsisim.RCPgen import detBlkSeq, genCode, genMake
+
+    model = os.path.basename(fname).split('.')[0]
+    res = {'name' : model, 'file' : os.path.abspath(fname), 'blocks' : 0,
+           'detBlkSeq' : None, 'genCode' : None, 'make' : None,
+           'steps' : None, 'steps_per_s' : None, 'error' : ''}
+    workdir = os.path.abspath(workdir)
+    outdir = os.path.join(workdir, model + '_gen')
+    cwd = os.getcwd()
+    try:
+        diagram = dgmToDiagram(fname, data, {'cache' : False})
+        os.makedirs(outdir, exist_ok=True)
+        os.chdir(diagram['cwd'])
+        with contextlib.redirect_stdout(io.StringIO()):
+            ns = blkNamespace(diagram)
+            blks = instantiateBlocks(diagram, ns)
+            Ts = eval(diagram['Ts'], ns)
+            os.environ.update(shvEnviron(diagram['shv']))
+            res['blocks'] = len(blks)
+
+            maxNode = 0
+            for blk in blks:
+                maxNode = max([maxNode] + array(blk.pin).ravel().tolist() + array(blk.pout).ravel().tolist())
+            res['detBlkSeq'] = best(lambda: detBlkSeq(maxNode, blks), repeat)
+
+            os.chdir(outdir)
+            res['genCode'] = best(lambda: genCode(model, Ts, blks, template, **diagram['cgOpts']), repeat)
+            genMake(model, template, addObj = diagram['addObj'])
+        os.chdir(cwd)
+
+        if build:
+            res['make'] = runMake(outdir)
+            dt = runModel(os.path.join(workdir, model), steps*Ts)
+            res['steps'] = steps
+            res['steps_per_s'] = steps/dt
+    except Exception as e:
+        res['error'] = str(e)
+    finally:
+        os.chdir(cwd)
+    return res
+
+def benchSuite(workdir, topologies=TOPOLOGIES, sizes=(10, 100, 1000), build=True,
+               steps=100000, repeat=3, withFixtures=True, log=None):
+    """Benchmark the synthetic diagrams and the fixtures
+
+    Call: benchSuite(workdir, topologies, sizes, build, steps, repeat, withFixtures, log)
+
+    Parameters
+    ----------
+    workdir   : Folder for the diagrams, the generated code and the executables
+    topologies: Topologies of the synthetic diagrams (see synth.synthDgm)
+    sizes     : Number of blocks of the synthetic diagrams
+    build     : Run make and the executables
+    steps     : Number of simulated sampling periods
+    repeat    : Number of runs of detBlkSeq and genCode
+    withFixtures : Benchmark also the shipped diagrams (see fixtures)
+    log       : Function called with every result (e.g. to print it)
+
+    Returns
+    -------
+    results   : dict with the description of the host and the list 'results'
+    """
+    os.makedirs(workdir, exist_ok=True)
+    results = []
+    for topology in topologies:
+        for n in sizes:
+            model = topology + str(n)
+            data, script = synthDgm(topology, n, model)
+            fname = writeDgm(os.path.join(workdir, model + '.dgm'), data, script)
+            res = benchDgm(fname, data, workdir, build, steps, repeat)
+            res['topology'] = topology
+            res['size'] = n
+            results.append(res)
+            if log is not None:
+                log(res)
+
+    if withFixtures:
+        for fname in fixtures():
+            try:
+                with open(fname, 'r') as f:
+                    data = noScopes(json.load(f))
+            except Exception as e:
+                res = {'name' : os.path.basename(fname).split('.')[0], 'file' : fname, 'error' : str(e)}
+            else:
+                res = benchDgm(fname, data, workdir, build, steps, repeat)
+            res['topology'] = 'fixture'
+            res['size'] = res.get('blocks', 0)
+            results.append(res)
+            if log is not None:
+                log(res)
+
+    return {'version' : 1,
+            'date' : time.strftime('%Y-%m-%d %H:%M:%S'),
+            'host' : platform.node(),
+            'platform' : platform.platform(),
+            'python' : platform.python_version(),
+            'cpus' : os.cpu_count(),
+            'steps' : steps,
+            'repeat' : repeat,
+            'results' : results}
+
+def compare(ref, new, tol=0.2):
+    """Compare two benchmark results
+
+    Call: compare(ref, new, tol)
+
+    Parameters
+    ----------
+    ref, new  : dicts returned by benchSuite (or read from the JSON files)
+    tol       : Relative change accepted before reporting a regression
+
+    Returns
+    -------
+    rows      : List of (name, metric, ref value, new value, ratio, regression),
+                ratio > 1 means slower (times) or less throughput (steps_per_s)
+    """
+    old = {res['name'] : res for res in ref['results']}
+    rows = []
+    for res in new['results']:
+        if res['name'] not in old:
+            continue
+        for key in TIMES + RATES:
+            v0 = old[res['name']].get(key)
+            v1 = res.get(key)
+            if not v0 or not v1:
+                continue
+            ratio = v1/v0 if key in TIMES else v0/v1
+            rows.append((res['name'], key, v0, v1, ratio, ratio > 1 + tol))
+    return rows
+
+def fmtResult(res):
+    """One line summary of a result"""
+    if res.get('error', '') != '':
+        return '%-16s FAILED %s' % (res['name'], res['error'].splitlines()[0])
+    txt = '%-16s %6d blocks  detBlkSeq %9.3f ms  genCode %9.3f ms' % \
+        (res['name'], res['blocks'], 1e3*res['detBlkSeq'], 1e3*res['genCode'])
+    if res.get('make') is not None:
+        txt += '  make %7.2f s  %10.0f steps/s' % (res['make'], res['steps_per_s'])
+    return txt
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m supsisim.bench',
+                                     description='Benchmark the code generation, the build and the generated code')
+    parser.add_argument('-o', '--output', default=None,
+                        help='JSON file for the results (default: standard output)')
+    parser.add_argument('-w', '--workdir', default=None,
+                        help='folder for the diagrams and the builds (default: temporary folder)')
+    parser.add_argument('--topologies', default=','.join(TOPOLOGIES),
+                        help='synthetic topologies (default: ' + ','.join(TOPOLOGIES) + ')')
+    parser.add_argument('--sizes', default='10,100,1000',
+                        help='number of blocks of the synthetic diagrams (default: 10,100,1000)')
+    parser.add_argument('--steps', type=int, default=100000,
+                        help='simulated sampling periods of every executable (default: 100000)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs of detBlkSeq and genCode, the best is kept (default: 3)')
+    parser.add_argument('-n', '--no-make', action='store_true',
+                        help='measure only detBlkSeq and genCode')
+    parser.add_argument('--no-fixtures', action='store_true',
+                        help='skip the shipped diagrams of Tests/ControlDesign')
+    parser.add_argument('--compare', default=None, metavar='REF',
+                        help='JSON file of a previous run, exit code 1 on regressions')
+    parser.add_argument('--tol', type=float, default=0.2,
+                        help='relative change accepted by --compare (default: 0.2)')
+    args = parser.parse_args(argv)
+
+    topologies = [t for t in args.topologies.split(',') if t != '']
+    for t in topologies:
+        if t not in TOPOLOGIES:
+            parser.error('unknown topology ' + t)
+    sizes = [int(n) for n in args.sizes.split(',') if n != '']
+
+    log = lambda res: print(fmtResult(res), file=sys.stderr)
+    if args.workdir is None:
+        with tempfile.TemporaryDirectory() as workdir:
+            results = benchSuite(workdir, topologies, sizes, not args.no_make, args.steps,
+                                 args.repeat, not args.no_fixtures, log)
+    else:
+        results = benchSuite(args.workdir, topologies, sizes, not args.no_make, args.steps,
+                             args.repeat, not args.no_fixtures, log)
+
+    txt = json.dumps(results, indent=2)
+    if args.output is None:
+        print(txt)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(txt + '\n')
+
+    err = 0
+    if args.compare is not None:
+        with open(args.compare, 'r') as f:
+            ref = json.load(f)
+        for name, key, v0, v1, ratio, reg in compare(ref, results, args.tol):
+            print('%-16s %-12s %12.4g -> %12.4g  x%.2f%s' % (name, key, v0, v1, ratio,
+                                                             '  REGRESSION' if reg else ''),
+                  file=sys.stderr)
+            if reg:
+                err = 1
+    return err
@@ -0,0 +1,237 @@
+"""
+Synthetic block diagrams for the benchmarks
+
+The diagrams are plain dicts with the content of a .dgm file; the
+connections are placed on the port positions used by the editor and
+by headless.py. The following commands are provided:
+
+  chainDgm       - Source -> chain of n sum blocks -> null block
+  treeDgm        - Fan-out tree of n sum blocks, every leaf into a null block
+  mimoDgm        - Chain of n MIMO css blocks (nio inputs/outputs, order states)
+  subsysDgm      - Chain of n sum blocks split over nested subsystems
+  synthDgm       - Diagram of a given topology and size
+  writeDgm       - Write a diagram (and its parameter script) to disk
+
+"""
+
+import os
+import json
+
+from supsisim.const import PD, VERSION
+from supsisim.headless import portPos
+
+TOPOLOGIES = ('chain', 'tree', 'mimo', 'subsys')
+
+COLS = 20
+DX = 200
+
+def dgmBlk(name, inp, outp, icon, params, k, maxPorts=1):
+    """Block entry of a .dgm file at the place k of a grid of COLS columns"""
+    dy = max(DX, PD*(maxPorts+1))
+    return {'name' : name, 'inp' : inp, 'outp' : outp, 'inset' : False, 'outset' : False,
+            'icon' : icon, 'params' : params, 'help' : '', 'width' : 80, 'flip' : False,
+            'pos' : [float(DX*(k % COLS)), float(dy*(k // COLS))]}
+
+def dgmConn(src, n, dst, m):
+    """Connection from the output n of src to the input m of dst"""
+    pos1 = portPos(src, True, n)
+    pos2 = portPos(dst, False, m)
+    return {'pos1' : [pos1[0], pos1[1]], 'pos2' : [pos2[0], pos2[1]], 'points' : []}
+
+def dgmData(scope, Ts, Tf, script=''):
+    """Complete .dgm content for the scope (blocks, connections, subsystems)"""
+    return {'init' : {'code' : 'pysimCoder', 'ver' : VERSION, 'date' : ''},
+            'simulate' : {'template' : 'sim.tmf', 'Ts' : str(Ts), 'AddObj' : '',
+                          'script' : script, 'Tf' : str(Tf), 'prio' : ''},
+            'blocks' : scope['blocks'], 'connections' : scope['connections'],
+            'subsystems' : scope['subsystems']}
+
+def newScope():
+    return {'blocks' : [], 'connections' : [], 'subsystems' : []}
+
+def sineBlk(k):
+    return dgmBlk('Sine', 0, 1, 'SINUS', 'sineBlk|Amplitude: 1: double|Freq [Hz]: 1: double|' +
+                  'Phase: 0: double|Bias: 0: double|Delay: 0: double', k)
+
+def sumBlk(name, k):
+    return dgmBlk(name, 1, 1, 'SUM', 'sumBlk|Gains: [0.999]', k)
+
+def nullBlk(name, k, inp=1):
+    return dgmBlk(name, inp, 0, 'NULL', 'nullBlk', k, inp)
+
+def chainDgm(n, Ts=0.001, Tf=10):
+    """Source -> chain of n sum blocks -> null block
+
+    Call: chainDgm(n, Ts, Tf)
+
+    Returns
+    -------
+    data      : Content of the .dgm file
+    script    : Parameter script of the diagram ('' if not needed)
+    """
+    sc = newScope()
+    src = sineBlk(0)
+    sc['blocks'].append(src)
+    for k in range(1, n+1):
+        blk = sumBlk('Sum' + str(k), k)
+        sc['blocks'].append(blk)
+        sc['connections'].append(dgmConn(src, 0, blk, 0))
+        src = blk
+    blk = nullBlk('Null', n+1)
+    sc['blocks'].append(blk)
+    sc['connections'].append(dgmConn(src, 0, blk, 0))
+    return dgmData(sc, Ts, Tf), ''
+
+def treeDgm(n, fanout=2, Ts=0.001, Tf=10):
+    """Fan-out tree of n sum blocks, every leaf into a null block
+
+    Call: treeDgm(n, fanout, Ts, Tf)
+
+    Every block drives fanout blocks of the next level (breadth first)
+
+    Returns
+    -------
+    data      : Content of the .dgm file
+    script    : Parameter script of the diagram ('' if not needed)
+    """
+    sc = newScope()
+    root = sineBlk(0)
+    sc['blocks'].append(root)
+    nodes = []
+    for k in range(0, n):
+        blk = sumBlk('Sum' + str(k+1), k+1)
+        src = root if k == 0 else nodes[(k-1) // fanout]
+        sc['blocks'].append(blk)
+        sc['connections'].append(dgmConn(src, 0, blk, 0))
+        nodes.append(blk)
+    leaves = [blk for k, blk in enumerate(nodes) if k*fanout + 1 >= n] or [root]
+    for m, src in enumerate(leaves):
+        blk = nullBlk('Null' + str(m+1), n+1+m)
+        sc['blocks'].append(blk)
+        sc['connections'].append(dgmConn(src, 0, blk, 0))
+    return dgmData(sc, Ts, Tf), ''
+
+def mimoDgm(n, nio=2, order=4, Ts=0.001, Tf=10, model='mimo'):
+    """Chain of n MIMO css blocks with nio inputs and outputs
+
+    Call: mimoDgm(n, nio, order, Ts, Tf, model)
+
+    The system of the blocks (sysM, order states) is defined in the
+    script <model>_par.py of the diagram
+
+    Returns
+    -------
+    data      : Content of the .dgm file
+    script    : Parameter script of the diagram
+    """
+    sc = newScope()
+    src = sineBlk(0)
+    sc['blocks'].append(src)
+    for k in range(1, n+1):
+        blk = dgmBlk('LTI' + str(k), nio, nio, 'CSS', 'cssBlk|System: sysM|Initial conditions: 0', k, nio)
+        sc['blocks'].append(blk)
+        for m in range(0, nio):
+            sc['connections'].append(dgmConn(src, 0 if k == 1 else m, blk, m))
+        src = blk
+    blk = nullBlk('Null', n+1, nio)
+    sc['blocks'].append(blk)
+    for m in range(0, nio):
+        sc['connections'].append(dgmConn(src, m if n > 0 else 0, blk, m))
+
+    script = ('from numpy import eye, ones, zeros, diag\n'
+              'from control import ss\n\n'
+              'order = ' + str(order) + '\n'
+              'nio = ' + str(nio) + '\n'
+              'sysM = ss(-eye(order) + 0.5*diag(ones(order-1), 1), ones((order, nio))/nio,\n'
+              '          ones((nio, order))/order, zeros((nio, nio)))\n')
+    return dgmData(sc, Ts, Tf, model + '_par.py'), script
+
+def subsysChain(sc, src, n, depth, k, p):
+    """Sum blocks Sum<k>... after src (grid places from p), the last part
+    of the chain in depth nested subsystems; return the last block"""
+    per = n // (depth+1) if depth > 0 else n
+    for m in range(0, per):
+        blk = sumBlk('Sum' + str(k+m), p+m)
+        sc['blocks'].append(blk)
+        sc['connections'].append(dgmConn(src, 0, blk, 0))
+        src = blk
+    if depth == 0:
+        return src
+
+    subs = dgmBlk('Subsystem' + str(depth), 1, 1, 'SUBSYSTEM', 'SubsystemBlk', p+per)
+    subs['help'] = 'Superblock'
+    inner = newScope()
+    inp = dgmBlk('in_1', 0, 1, 'IO', 'IOBlk', 0)
+    inner['blocks'].append(inp)
+    last = subsysChain(inner, inp, n-per, depth-1, k+per, 1)
+    out = dgmBlk('out_1', 1, 0, 'IO', 'IOBlk', n-per+2)
+    inner['blocks'].append(out)
+    inner['connections'].append(dgmConn(last, 0, out, 0))
+    sc['subsystems'].append({'block' : subs, 'subitems' : inner})
+    sc['connections'].append(dgmConn(src, 0, subs, 0))
+    return subs
+
+def subsysDgm(n, depth=2, Ts=0.001, Tf=10):
+    """Chain of n sum blocks split over depth nested subsystems
+
+    Call: subsysDgm(n, depth, Ts, Tf)
+
+    Returns
+    -------
+    data      : Content of the .dgm file
+    script    : Parameter script of the diagram ('' if not needed)
+    """
+    sc = newScope()
+    src = sineBlk(0)
+    sc['blocks'].append(src)
+    last = subsysChain(sc, src, n, depth, 1, 1)
+    blk = nullBlk('Null', n+2)
+    sc['blocks'].append(blk)
+    sc['connections'].append(dgmConn(last, 0, blk, 0))
+    return dgmData(sc, Ts, Tf), ''
+
+def synthDgm(topology, n, model=None, Ts=0.001, Tf=10, **kw):
+    """Diagram of a given topology and size
+
+    Call: synthDgm(topology, n, model, Ts, Tf, **kw)
+
+    Parameters
+    ----------
+    topology  : 'chain', 'tree', 'mimo' or 'subsys'
+    n         : Number of sum (css for 'mimo') blocks
+    model     : Model name (default: <topology><n>)
+    Ts, Tf    : Sampling time and final time of the diagram
+    kw        : fanout ('tree'), nio and order ('mimo'), depth ('subsys')
+
+    Returns
+    -------
+    data      : Content of the .dgm file
+    script    : Parameter script of the diagram ('' if not needed)
+    """
+    if model is None:
+        model = topology + str(n)
+    if topology == 'chain':
+        return chainDgm(n, Ts, Tf)
+    elif topology == 'tree':
+        return treeDgm(n, kw.get('fanout', 2), Ts, Tf)
+    elif topology == 'mimo':
+        return mimoDgm(n, kw.get('nio', 2), kw.get('order', 4), Ts, Tf, model)
+    elif topology == 'subsys':
+        return subsysDgm(n, kw.get('depth', 2), Ts, Tf)
+    raise ValueError('Unknown topology ' + str(topology) + ' (' + ', '.join(TOPOLOGIES) + ')')
+
+def writeDgm(fname, data, script=''):
+    """Write a diagram and its parameter script
+
+    Call: writeDgm(fname, data, script)
+
+    The script is written into the folder of the .dgm file with the name
+    given in the simulation settings of the diagram
+    """
+    with open(fname, 'w') as f:
+        json.dump(data, f, indent=2)
+    if script != '':
+        name = os.path.join(os.path.dirname(os.path.abspath(fname)), data['simulate']['script'])
+        with open(name, 'w') as f:
+            f.write(script)
+    return fname
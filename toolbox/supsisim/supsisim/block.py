@@ -15,6 +15,8 @@ class Block(QGraphicsPathItem):
         self.scene.addItem(self)
         self.syspath = ''
         self.ident = -1
+        self.tsamp = ''
+        self.dims = ''
 
         self.roundedBlocks = True
         
@@ -40,6 +42,7 @@ class Block(QGraphicsPathItem):
 
         self.line_color = Qt.GlobalColor.black
         self.fill_color = Qt.GlobalColor.black
+        self.cost_color = None
         self.setup()
         try:
             self.scene.blocks.add(self)
@@ -105,6 +108,8 @@ class Block(QGraphicsPathItem):
             pen.setStyle(Qt.PenStyle.DotLine)
         
         painter.setPen(pen)
+        if self.cost_color is not None:
+            painter.setBrush(self.cost_color)
 
         if self.roundedBlocks:
             painter.drawRoundedRect(self.boundingRect(), 10, 10)
@@ -120,6 +125,16 @@ class Block(QGraphicsPathItem):
         where_to: QRectF = QRectF(new_left, new_top, svg_size.width(), svg_size.height())
         self.renderer.render(painter, where_to)
 
+    def setCost(self, cost, rgb):
+        # Execution time of the block from the profile (None to clear)
+        if cost is None:
+            self.cost_color = None
+            self.setToolTip('')
+        else:
+            self.cost_color = QColor(rgb[0], rgb[1], rgb[2], 140)
+            self.setToolTip('Mean execution time: %.0f ns' % cost)
+        self.update()
+
     def itemChange(self, change, value):
         return value
 
@@ -144,6 +159,8 @@ class Block(QGraphicsPathItem):
     def clone(self, pt):
         b = Block(None, self.scene, self.name, self.inp, self.outp, 
                       self.insetble, self.outsetble, self.icon, self.params, self.helpTxt, self.width, self.flip)
+        b.tsamp = self.tsamp
+        b.dims = self.dims
         b.setPos(self.scenePos().__add__(pt))
 
     def setFlip(self, flip=None):
@@ -203,7 +220,12 @@ class Block(QGraphicsPathItem):
         vals = [self.name, self.inp, self.outp, self.insetble, self.outsetble, 
                 self.icon, self.params, self.helpTxt, self.width, self.flip, pos]
         keys = ['name', 'inp', 'outp', 'inset', 'outset', 'icon', 'params', 'help', 'width', 'flip', 'pos']
-        return dict(zip(keys, vals))
+        dct = dict(zip(keys, vals))
+        if self.tsamp != '':
+            dct['tsamp'] = self.tsamp
+        if self.dims != '':
+            dct['dims'] = self.dims
+        return dct
 
     def getPorts(self):
         InP = []
@@ -226,6 +248,8 @@ class Block(QGraphicsPathItem):
                       self.insetble, self.outsetble, self.icon, self.params,
                       self.helpTxt, self.width, self.flip)
         b.name = self.name
+        b.tsamp = self.tsamp
+        b.dims = self.dims
 
         inp1, outp1 = self.getPorts()
         inp2, outp2 = b.getPorts()
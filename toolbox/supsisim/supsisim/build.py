@@ -0,0 +1,382 @@
+"""
+In-process interface for the model generation
+
+roberto.bucher@supsi.ch
+
+The diagram is described by a plain dict (see diagramDict) which can be
+sent to another process. The following commands are provided:
+
+  diagramDict    - Create the dict describing a diagram to build
+  solverOpts     - Options of genCode for the solver settings of a diagram
+  build_model    - Instantiate the RCPblk objects, generate the code and
+                   build the executable in the current process
+  exportScript   - Export the diagram as stand-alone python script (tmp.py)
+  BuildWorker    - Worker process reused for many builds
+  worker         - Get the shared BuildWorker of the application
+  shutdown       - Stop the shared BuildWorker
+
+"""
+
+import os
+import sys
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from numpy import array
+
+from supsisim.RCPgen import genCode, genMake
+from supsisim.registry import blkDir, factoriesIn, blkRegistry, importModule
+
+def diagramDict(model, Ts, template, blocks, addObj='', script='', shv=None, cwd=None, cgOpts=None):
+    """Create the dict describing a diagram
+
+    Call: diagramDict(model, Ts, template, blocks, addObj, script, shv, cwd, cgOpts)
+
+    Parameters
+    ----------
+    model     : Model name
+    Ts        : Sampling time (string, evaluated in the script namespace)
+    template  : Template makefile
+    blocks    : List of dict with the keys
+                'name'         : block name in the code (e.g. 'Sum_3')
+                'call'         : factory call (e.g. 'sumBlk([1,2],[3], [1,-1])')
+                'realParNames' : names of the real parameters
+                'intParNames'  : names of the integer parameters
+                'sysPath'      : system path of the block
+                'tsamp'        : optional sample time of the block
+                                 (string evaluated in the script namespace)
+                'dims'         : optional dimensions of the output ports
+                                 (string evaluated in the script namespace)
+    addObj    : Additional object files
+    script    : Python script with the parameters of the diagram
+    shv       : dict with the SHV settings ('used', 'ip', 'port', 'user',
+                'passw', 'devid', 'mount', 'tree')
+    cwd       : Working folder of the diagram (default: current folder)
+    cgOpts    : dict with additional keyword arguments of genCode
+                (e.g. {'signals' : True, 'reuse' : True})
+
+    Returns
+    -------
+    diagram   : dict
+    """
+    if shv is None:
+        shv = {'used' : False, 'ip' : '127.0.0.1', 'port' : '3755', 'user' : 'admin',
+               'passw' : 'admin!123', 'devid' : model, 'mount' : 'test', 'tree' : 'GAVL'}
+    if cwd is None:
+        cwd = os.getcwd()
+    if cgOpts is None:
+        cgOpts = {}
+    return {'model' : model,
+            'Ts' : str(Ts),
+            'template' : template,
+            'addObj' : addObj,
+            'script' : script,
+            'shv' : dict(shv),
+            'blocks' : list(blocks),
+            'cwd' : os.path.abspath(cwd),
+            'cgOpts' : dict(cgOpts)}
+
+def solverOpts(sim):
+    """Options of genCode for the solver settings of a diagram
+
+    Call: solverOpts(sim)
+
+    Parameters
+    ----------
+    sim       : dict with the optional keys 'solver' ('fixed' or 'dopri5'),
+                'rtol' and 'atol' (strings, empty for the default values)
+
+    Returns
+    -------
+    cgOpts    : dict with the keyword arguments of genCode (empty for the
+                fixed step solver)
+    """
+    solver = sim.get('solver', 'fixed') or 'fixed'
+    if solver == 'fixed':
+        return {}
+    opts = {'solver' : solver}
+    for key in ('rtol', 'atol'):
+        val = str(sim.get(key, '')).strip()
+        if val != '':
+            opts[key] = float(val)
+    return opts
+
+def shvEnviron(shv):
+    """Return the environment variables used by the SHV code generation"""
+    return {'SHV_USED' : str(shv['used']),
+            'SHV_BROKER_IP' : shv['ip'],
+            'SHV_BROKER_PORT' : shv['port'],
+            'SHV_BROKER_USER' : shv['user'],
+            'SHV_BROKER_PASSWORD' : shv['passw'],
+            'SHV_BROKER_DEV_ID' : shv['devid'],
+            'SHV_BROKER_MOUNT' : shv['mount'] + '/' + shv['devid'],
+            'SHV_TREE_TYPE' : shv['tree']}
+
+def importStar(ns, module):
+    """Equivalent of "from module import *" into the dict ns"""
+    names = getattr(module, '__all__', None)
+    if names is None:
+        names = [name for name in vars(module) if not name.startswith('_')]
+    for name in names:
+        ns[name] = getattr(module, name)
+
+def loadFactories(ns, names=None):
+    """Import the block factories into the dict ns
+
+    Call: loadFactories(ns, names)
+
+    With names=None all the factory modules are imported ("from module
+    import *"), otherwise only the modules defining the given factories
+    are imported, using the registry of supsisim.registry.
+    """
+    dir1 = blkDir()
+    if dir1 not in sys.path:
+        sys.path.append(dir1)
+
+    if names is None:
+        modules = []
+        for el in sorted(os.listdir(dir1)):
+            if not os.path.isdir(os.path.join(dir1, el)):
+                continue
+            for f in sorted(os.listdir(os.path.join(dir1, el))):
+                if f.endswith('.py'):
+                    modules.append((el + '.' + f[:-3], None))
+    else:
+        reg = blkRegistry(dir1)
+        modules = [(reg[name], name) for name in names if name in reg]
+
+    for modName, name in modules:
+        try:
+            module = importModule(modName)
+        except Exception as e:
+            print('import of block class failed ' + modName + ': ' + str(e))
+            continue
+        if name is None:
+            importStar(ns, module)
+        else:
+            ns[name] = getattr(module, name)
+
+def blkNamespace(diagram):
+    """Namespace for the block instantiation (same content as tmp.py)
+
+    Only the factories used by the blocks of the diagram are imported;
+    if a factory is neither in the registry nor in the script, all the
+    factory modules are imported as in the original tmp.py.
+    """
+    ns = {'__name__' : '__pysim_diagram__'}
+    script = diagram['script']
+    if script != '' and os.path.isfile(script):
+        with open(script, 'r') as f:
+            exec(compile(f.read(), script, 'exec'), ns)
+    ns['os'] = os
+    exec('from supsisim.RCPblk import RCPblk', ns)
+    names = factoriesIn([item['call'] for item in diagram['blocks']])
+    reg = blkRegistry()
+    if all(name in reg or name in ns for name in names):
+        loadFactories(ns, [name for name in names if name in reg])
+    else:
+        loadFactories(ns)
+    exec('from supsisim.RCPgen import *', ns)
+    exec('from control import *', ns)
+    return ns
+
+def instantiateBlocks(diagram, ns):
+    """Create the RCPblk objects of the diagram
+
+    Call: instantiateBlocks(diagram, ns)
+
+    Parameters
+    ----------
+    diagram   : dict created by diagramDict
+    ns        : Namespace for the evaluation of the factory calls
+
+    Returns
+    -------
+    blks      : List of RCPblk
+    """
+    blks = []
+    for item in diagram['blocks']:
+        try:
+            blk = eval(item['call'], ns)
+        except Exception as e:
+            raise ValueError('Block ' + item['name'] + ': ' + item['call'] + ' -> ' + str(e))
+        blk.name = item['name']
+        for par in item['realParNames']:
+            blk.realParNames.append(par)
+        for par in item['intParNames']:
+            blk.intParNames.append(par)
+        blk.sysPath = item['sysPath']
+        if item.get('tsamp', '') != '':
+            blk.tsamp = eval(str(item['tsamp']), ns)
+        if item.get('dims', '') != '':
+            blk.dimPout = array(eval(str(item['dims']), ns), dtype=int).reshape(blk.pout.shape)
+        blks.append(blk)
+    return blks
+
+def make(outdir, clean=False):
+    """Run make (and optionally make clean) in outdir, return the make exit code"""
+    if clean:
+        subprocess.run(['make', 'clean'], cwd=outdir)
+    return subprocess.run(['make'], cwd=outdir).returncode
+
+def build_model(diagram, outdir, template=None, build=True):
+    """Generate the code of a diagram and build it in the current process
+
+    Call: build_model(diagram, outdir, template, build)
+
+    Parameters
+    ----------
+    diagram   : dict created by diagramDict
+    outdir    : Folder for the generated files (created if needed),
+                relative to the working folder of the diagram
+    template  : Template makefile (default: template of the diagram)
+    build     : Run make after the code generation
+
+    Returns
+    -------
+    res       : make exit code (0 if build=False)
+    """
+    if template is None:
+        template = diagram['template']
+
+    cwd = os.getcwd()
+    os.chdir(diagram['cwd'])
+    try:
+        outdir = os.path.abspath(outdir)
+        os.makedirs(outdir, exist_ok=True)
+
+        ns = blkNamespace(diagram)
+        blks = instantiateBlocks(diagram, ns)
+        Ts = eval(diagram['Ts'], ns)
+        os.environ.update(shvEnviron(diagram['shv']))
+
+        os.chdir(outdir)
+        genCode(diagram['model'], Ts, blks, template, **diagram.get('cgOpts', {}))
+        clean = genMake(diagram['model'], template, addObj = diagram['addObj'])
+    finally:
+        os.chdir(cwd)
+
+    if build:
+        return make(outdir, clean)
+    return 0
+
+def exportScript(diagram, outdir, fname='tmp.py'):
+    """Export the diagram as stand-alone python script
+
+    Call: exportScript(diagram, outdir, fname)
+
+    The script generates the code into outdir and runs make when executed
+    with "python3 tmp.py".
+    """
+    txt = ''
+    script = diagram['script']
+    if script != '' and os.path.isfile(script):
+        with open(script, 'r') as f:
+            txt = f.read() + '\n'
+
+    txt += 'import os\n\n'
+    txt += 'from supsisim.RCPblk import RCPblk\n'
+    reg = blkRegistry()
+    names = factoriesIn([item['call'] for item in diagram['blocks']])
+    if all(name in reg for name in names):
+        for name in names:
+            txt += 'from ' + reg[name] + ' import ' + name + '\n'
+    else:
+        txt += 'from supsisim.build import loadFactories\n'
+        txt += 'loadFactories(globals())\n'
+    txt += 'from supsisim.RCPgen import *\n'
+    txt += 'from control import *\n'
+    dims = [item for item in diagram['blocks'] if item.get('dims', '') != '']
+    if len(dims) != 0:
+        txt += 'from numpy import array\n'
+    txt += '\n'
+
+    for item in diagram['blocks']:
+        txt += item['name'] + ' = ' + item['call'] + '\n'
+    txt += '\n'
+    for item in diagram['blocks']:
+        txt += item['name'] + '.name = \'' + item['name'] + '\'\n'
+
+    txt += '\nblks = [' + ','.join([item['name'] for item in diagram['blocks']]) + ']\n\n'
+    txt += 'realParNames = ' + str(tuple([tuple(item['realParNames']) for item in diagram['blocks']])) + '\n'
+    txt += 'intParNames = ' + str(tuple([tuple(item['intParNames']) for item in diagram['blocks']])) + '\n'
+    txt += 'sysPath = ' + str([item['sysPath'] for item in diagram['blocks']]) + '\n\n'
+    txt += 'for blk, real, ints, spath in zip(blks, realParNames, intParNames, sysPath):\n'
+    txt += '    blk.realParNames += list(real)\n'
+    txt += '    blk.intParNames += list(ints)\n'
+    txt += '    blk.sysPath = spath\n\n'
+    tsamp = [item for item in diagram['blocks'] if item.get('tsamp', '') != '']
+    for item in tsamp:
+        txt += item['name'] + '.tsamp = ' + str(item['tsamp']) + '\n'
+    for item in dims:
+        txt += item['name'] + '.dimPout = array(' + str(item['dims']) + ', dtype=int).reshape(' + \
+            item['name'] + '.pout.shape)\n'
+    if len(tsamp) + len(dims) != 0:
+        txt += '\n'
+
+    for key, val in shvEnviron(diagram['shv']).items():
+        txt += 'os.environ["' + key + '"] = "' + val + '"\n'
+    txt += '\n'
+
+    txt += 'fname = \'' + diagram['model'] + '\'\n'
+    txt += 'os.chdir("' + outdir + '")\n'
+    opts = ''.join([', ' + key + ' = ' + repr(val) for key, val in diagram.get('cgOpts', {}).items()])
+    txt += 'genCode(fname, ' + diagram['Ts'] + ', blks, "' + diagram['template'] + '"' + opts + ')\n'
+    txt += "if genMake(fname, '" + diagram['template'] + "', addObj = '" + diagram['addObj'] + "'):\n"
+    txt += '    os.system("make clean")\n'
+    txt += 'os.system("make")\n'
+    txt += 'os.chdir("..")\n'
+
+    with open(fname, 'w') as f:
+        f.write(txt)
+
+class BuildWorker:
+    """Process reused for the code generation of many diagrams
+
+    numpy, control, supsisim and the block factories are imported only
+    once, at the first build submitted to the worker. A factory module
+    whose source was modified since is reloaded at the next build (see
+    supsisim.registry.importModule).
+    """
+    def __init__(self):
+        self.pool = None
+
+    def submit(self, diagram, outdir, template=None, build=True):
+        """Start build_model in the worker, return a Future"""
+        if self.pool is None:
+            ctx = multiprocessing.get_context('spawn')
+            self.pool = ProcessPoolExecutor(max_workers=1, mp_context=ctx)
+        outdir = os.path.join(diagram['cwd'], outdir)
+        return self.pool.submit(build_model, diagram, outdir, template, build)
+
+    def build(self, diagram, outdir, template=None, build=True):
+        """Run build_model in the worker and wait for the result"""
+        try:
+            return self.submit(diagram, outdir, template, build).result()
+        except BrokenProcessPool:
+            # The worker died: a new one is started at the next build
+            self.shutdown()
+            raise
+
+    def shutdown(self):
+        """Stop the worker process"""
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+_worker = None
+
+def worker():
+    """Return the BuildWorker shared by the application"""
+    global _worker
+    if _worker is None:
+        _worker = BuildWorker()
+    return _worker
+
+def shutdown():
+    """Stop the shared BuildWorker"""
+    global _worker
+    if _worker is not None:
+        _worker.shutdown()
+        _worker = None
@@ -10,22 +10,32 @@ class IO_Dialog(QDialog):
         super(IO_Dialog, self).__init__(parent)
         layout = QGridLayout()
         self.setWindowModality(Qt.WindowModality.ApplicationModal)
-        self.resize(380, 180)
+        self.resize(380, 210)
         self.spbInput = QSpinBox()
         self.spbOutput = QSpinBox()
         self.spbInput.setValue(1)
         self.spbOutput.setValue(1)
+        self.tsamp = QLineEdit()
+        self.tsamp.setPlaceholderText('e.g. 0.01 (empty: inherited)')
+        self.dims = QLineEdit()
+        self.dims.setPlaceholderText('e.g. [3, 1] (empty: from the block)')
 
         label2 = QLabel('Number of inputs:')
         label3 = QLabel('Number of outputs')
+        label4 = QLabel('Output dimensions')
+        label5 = QLabel('Sample time')
         self.pbOK = QPushButton('OK')
         self.pbCANCEL = QPushButton('CANCEL')
         layout.addWidget(self.spbInput,0,1)
         layout.addWidget(self.spbOutput,1,1)
+        layout.addWidget(self.dims,2,1)
         layout.addWidget(label2,0,0)
         layout.addWidget(label3,1,0)
-        layout.addWidget(self.pbOK,2,0)
-        layout.addWidget(self.pbCANCEL,2,1)
+        layout.addWidget(label4,2,0)
+        layout.addWidget(self.tsamp,3,1)
+        layout.addWidget(label5,3,0)
+        layout.addWidget(self.pbOK,4,0)
+        layout.addWidget(self.pbCANCEL,4,1)
         self.setLayout(layout)
         self.pbOK.clicked.connect(self.accept)
         self.pbCANCEL.clicked.connect(self.reject)
@@ -70,6 +80,21 @@ class RTgenDlg(QDialog):
         self.Tf = QLineEdit('')
         lab6 = QLabel('Priority')
         self.prio = QLineEdit('')
+        lab7 = QLabel('ODE solver')
+        self.solver = QComboBox()
+        self.solver.addItems(['fixed', 'dopri5'])
+        self.solver.setToolTip('fixed: Runge-Kutta per block with fixed step\n'
+                               'dopri5: variable step Dormand-Prince for all the continuous states')
+        lab8 = QLabel('Rel. tolerance')
+        self.rtol = QLineEdit('')
+        lab9 = QLabel('Abs. tolerance')
+        self.atol = QLineEdit('')
+        lab10 = QLabel('Profile blocks')
+        self.profile = QCheckBox('')
+        self.profile.setToolTip('Measure the execution time of every block (<model>_prof.json)')
+        lab11 = QLabel('Parameter file')
+        self.parfile = QCheckBox('')
+        self.parfile.setToolTip('Write the parameters to <model>.par, loaded by the executable with -P <file>')
 
         self.btnConfigure = QPushButton('Configure')
         self.btnConfigure.hide()  # Initially hidden
@@ -95,15 +120,30 @@ class RTgenDlg(QDialog):
         grid.addWidget(self.Ts, 4, 1)
         grid.addWidget(lab5, 5, 0)
         grid.addWidget(self.Tf, 5, 1)
-        grid.addWidget(pbOK, 6, 0)
-        grid.addWidget(pbCANCEL, 6, 1)
+        grid.addWidget(lab7, 6, 0)
+        grid.addWidget(self.solver, 6, 1)
+        grid.addWidget(lab8, 7, 0)
+        grid.addWidget(self.rtol, 7, 1)
+        grid.addWidget(lab9, 8, 0)
+        grid.addWidget(self.atol, 8, 1)
+        grid.addWidget(lab10, 9, 0)
+        grid.addWidget(self.profile, 9, 1)
+        grid.addWidget(lab11, 10, 0)
+        grid.addWidget(self.parfile, 10, 1)
+        grid.addWidget(pbOK, 11, 0)
+        grid.addWidget(pbCANCEL, 11, 1)
         pbOK.clicked.connect(self.accept)
         pbCANCEL.clicked.connect(self.reject)
         btn_template.clicked.connect(self.getTemplate)
         btn_addObjs.clicked.connect(self.getObjs)
         btn_script.clicked.connect(self.getScript)
+        self.solver.currentTextChanged.connect(self.solverChanged)
         self.setLayout(grid)
 
+    def solverChanged(self, solver):
+        self.rtol.setEnabled(solver == 'dopri5')
+        self.atol.setEnabled(solver == 'dopri5')
+
     def getTemplate(self):
         fname = QFileDialog.getOpenFileName(self,'Open Template Makefile',
                                                   path+'CodeGen/templates', 'Template (*.tmf)')
@@ -0,0 +1,351 @@
+"""
+Headless code generation of .dgm files (no Qt needed)
+
+The JSON block diagram is parsed into plain dicts, the subsystems are
+flattened and the node IDs are assigned as done by the editor (scene.py).
+The following commands are provided:
+
+  blkInstance    - Factory call and parameter list of a block
+  blkEntry       - Block entry of the dict created by build.diagramDict
+  dgmToDiagram   - Translate a .dgm file into the dict of build.diagramDict
+  buildDgm       - Generate the code of a .dgm file and build it
+  buildAll       - Build many .dgm files in parallel
+  main           - Command line interface
+
+Usage from the command line:
+
+  python3 -m supsisim.headless [-j N] [-o DIR] [-t TEMPLATE] [-n] [--signals [--reuse]] [--inline] [--optimize] [--rate-tasks] file1.dgm ...
+
+"""
+
+import os
+import sys
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from supsisim.const import GRID, PD
+
+def blkInstance(codeName, params, inNodes, outNodes):
+    """Return the factory call of a block and its parameter list
+
+    Call: blkInstance(codeName, params, inNodes, outNodes)
+
+    Parameters
+    ----------
+    codeName  : Name of the block in the code (e.g. 'Sum_3')
+    params    : Parameter string of the block ('sumBlk|Gains: [1,-1]')
+    inNodes   : Node IDs (strings) of the inputs
+    outNodes  : Node IDs (strings) of the outputs
+
+    Returns
+    -------
+    txt       : 'Sum_3 = sumBlk([1,2],[3], [1,-1])'
+    parArr    : List of (name, value, type) of the parameters
+    """
+    ln = params.split('|')
+    txt = codeName + ' = ' + ln[0] + '('
+    if len(inNodes) != 0:
+        txt += '[' + ','.join(inNodes) + '],'
+    if len(outNodes) != 0:
+        txt += '[' + ','.join(outNodes) + '],'
+    txt = txt.rstrip(',')
+    N = len(ln)
+    parArr = []
+    for n in range(1,N):
+        par = ln[n].split(':')
+        txt += ', ' + par[1].__str__()
+        parType = ""
+        try:
+            parType = str(par[2])
+            parType = parType.replace(' ','')
+        except:
+            parType = None
+
+        parArr.append((par[0], par[1], parType))
+
+    # Check if Block is PLOT
+    if ln[0] == 'plotBlk':
+        txt += ", '" + codeName + "'"
+
+    txt += ')'
+    txt = txt.replace('(, ', '(')
+    return txt, parArr
+
+def blkEntry(codeName, params, inNodes, outNodes, sysPath):
+    """Return the dict describing a block for build.diagramDict"""
+    blkText, blkPar = blkInstance(codeName, params, inNodes, outNodes)
+    name, call = blkText.split(' = ', 1)
+
+    blkRealNames = []
+    blkIntNames = []
+    for par in blkPar:
+        if (par[2] == "double"):
+            blkRealNames.append(par[0])
+        elif (par[2] == "int"):
+            blkIntNames.append(par[0])
+
+    return {'name' : name,
+            'call' : call,
+            'realParNames' : tuple(blkRealNames),
+            'intParNames' : tuple(blkIntNames),
+            'sysPath' : sysPath}
+
+def gridPos(x, y):
+    gr = GRID
+    return (gr * ((x + gr/2) // gr), gr * ((y + gr/2) // gr))
+
+def portPos(blk, out, n):
+    """Scene position of the input (out=False) or output (out=True) port n"""
+    x0, y0 = gridPos(blk['pos'][0], blk['pos'][1])
+    N = blk['outp'] if out else blk['inp']
+    x = blk['width']/2 if out else -blk['width']/2
+    if blk['flip']:
+        x = -x
+    y = -PD*(N-1)/2 + n*PD
+    return gridPos(x0 + x, y0 + y)
+
+def parseScope(dataDict, parent=None, subs=None):
+    """Parse the blocks and the connections of a (sub)diagram"""
+    scope = {'blocks' : [], 'srcOf' : {}, 'outAt' : {}, 'parent' : parent, 'subs' : subs}
+    for item in dataDict.get('blocks', []):
+        blk = dict(item)
+        blk['kind'] = 'io' if item['params'] == 'IOBlk' else 'blk'
+        scope['blocks'].append(blk)
+    for item in dataDict.get('subsystems', []):
+        blk = dict(item['block'])
+        blk['kind'] = 'subs'
+        blk['inner'] = parseScope(item['subitems'], scope, blk)
+        scope['blocks'].append(blk)
+
+    for blk in scope['blocks']:
+        blk['scope'] = scope
+        for n in range(0, blk['outp']):
+            scope['outAt'][portPos(blk, True, n)] = (blk, n)
+
+    for item in dataDict.get('connections', []):
+        pos1 = gridPos(item['pos1'][0], item['pos1'][1])
+        pos2 = gridPos(item['pos2'][0], item['pos2'][1])
+        scope['srcOf'].setdefault(pos2, pos1)
+    return scope
+
+def innerBlocks(scope, sysPath=None):
+    """Flatten the blocks of the diagram (same system path as the editor)"""
+    items = []
+    for blk in scope['blocks']:
+        if blk['kind'] == 'subs':
+            path = '/' + blk['name'] if sysPath is None else sysPath
+            items += innerBlocks(blk['inner'], path)
+        else:
+            base = '' if sysPath is None else sysPath
+            blk['sysPath'] = base + '/' + blk['name']
+            items.append(blk)
+    return items
+
+def sourcePort(scope, blk, n):
+    """Find the block output driving the input port n of blk"""
+    pos = portPos(blk, False, n)
+    if pos not in scope['srcOf'] or scope['srcOf'][pos] not in scope['outAt']:
+        raise ValueError('Problem in diagram: input signals probably not connected! (' + blk['name'] + ')')
+    src, k = scope['outAt'][scope['srcOf'][pos]]
+    if src['kind'] == 'subs':
+        name = 'out_' + str(k+1)
+        io = [b for b in src['inner']['blocks'] if b['kind'] == 'io' and b['name'] == name]
+        if len(io) == 0:
+            raise ValueError('Problem in diagram: missing ' + name + ' in ' + src['name'])
+        return sourcePort(src['inner'], io[0], 0)
+    elif src['kind'] == 'io':
+        k = int(src['name'].lstrip('in_'))
+        return sourcePort(scope['parent'], scope['subs'], k-1)
+    return src, k
+
+def dgmToDiagram(fname, dataDict=None, cgOpts=None):
+    """Translate a .dgm file into the dict created by build.diagramDict
+
+    Call: dgmToDiagram(fname, dataDict, cgOpts)
+
+    Parameters
+    ----------
+    fname     : .dgm file
+    dataDict  : Content of the file (read from fname if None)
+    cgOpts    : Additional keyword arguments of genCode (they override
+                the solver settings of the diagram)
+
+    Returns
+    -------
+    diagram   : dict (see build.diagramDict), the working folder is the
+                folder of the .dgm file
+    """
+    from supsisim.build import diagramDict, solverOpts
+
+    if dataDict is None:
+        with open(fname, 'r') as f:
+            dataDict = json.load(f)
+
+    scope = parseScope(dataDict)
+    items = innerBlocks(scope)
+    items.sort(key=lambda p: p['name'])
+    items = [blk for blk in items if blk['kind'] == 'blk']
+
+    nodes = {}
+    nid = 1
+    for ident, blk in enumerate(items):
+        blk['ident'] = ident
+        for n in range(0, blk['outp']):
+            nodes[(id(blk), n)] = str(nid)
+            nid += 1
+
+    blocks = []
+    for blk in items:
+        inNodes = []
+        for n in range(0, blk['inp']):
+            src, k = sourcePort(blk['scope'], blk, n)
+            inNodes.append(nodes[(id(src), k)])
+        outNodes = [nodes[(id(blk), n)] for n in range(0, blk['outp'])]
+        codeName = (blk['name'] + '_' + str(blk['ident'])).replace(' ','_')
+        entry = blkEntry(codeName, blk['params'], inNodes, outNodes, blk['sysPath'])
+        if blk.get('tsamp', '') != '':
+            entry['tsamp'] = str(blk['tsamp'])
+        if blk.get('dims', '') != '':
+            entry['dims'] = str(blk['dims'])
+        blocks.append(entry)
+
+    sim = dataDict.get('simulate', {})
+    opts = solverOpts(sim)
+    opts.update(cgOpts or {})
+    model = os.path.basename(fname).split('.')[0]
+    shv = None
+    if 'SHV' in dataDict:
+        s = dataDict['SHV']
+        shv = {'used' : s['used'], 'ip' : s['ip'], 'port' : s['port'], 'user' : s['user'],
+               'passw' : s['passwd'], 'devid' : s['devid'], 'mount' : s['mount'], 'tree' : s['tree']}
+
+    return diagramDict(model, sim.get('Ts', '0.01'), sim.get('template', 'rt.tmf'), blocks,
+                       addObj = sim.get('AddObj', ''), script = sim.get('script', ''), shv = shv,
+                       cwd = os.path.dirname(os.path.abspath(fname)), cgOpts = opts)
+
+def buildDgm(fname, outdir=None, template=None, build=True, cgOpts=None):
+    """Generate the code of a .dgm file and build it
+
+    Call: buildDgm(fname, outdir, template, build, cgOpts)
+
+    Parameters
+    ----------
+    fname     : .dgm file
+    outdir    : Folder for the generated files
+                (default: <model>_gen in the folder of the .dgm file)
+    template  : Template makefile (default: template of the diagram)
+    build     : Run make after the code generation
+    cgOpts    : Additional keyword arguments of genCode (they override
+                the solver settings of the diagram)
+
+    Returns
+    -------
+    res       : (fname, make exit code, error message)
+    """
+    from supsisim.build import build_model
+
+    try:
+        diagram = dgmToDiagram(fname, cgOpts = cgOpts)
+        if outdir is None:
+            outdir = os.path.join(diagram['cwd'], diagram['model'] + '_gen')
+        return (fname, build_model(diagram, outdir, template, build), '')
+    except Exception as e:
+        return (fname, -1, str(e))
+
+def buildAll(files, outdir=None, template=None, build=True, jobs=None, cgOpts=None):
+    """Build many .dgm files in parallel
+
+    Call: buildAll(files, outdir, template, build, jobs, cgOpts)
+
+    Every diagram is built in its own folder: <outdir>/<model>_gen if
+    outdir is given, else <model>_gen in the folder of the .dgm file.
+
+    Returns
+    -------
+    results   : List of (fname, make exit code, error message)
+    """
+    outdirs = []
+    for fname in files:
+        if outdir is None:
+            outdirs.append(None)
+        else:
+            model = os.path.basename(fname).split('.')[0]
+            outdirs.append(os.path.abspath(os.path.join(outdir, model + '_gen')))
+
+    if len(set(d for d in outdirs if d is not None)) != len([d for d in outdirs if d is not None]):
+        raise ValueError('Diagrams with the same name cannot share the output folder ' + outdir)
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = max(1, min(jobs, len(files)))
+
+    if jobs == 1:
+        return [buildDgm(f, d, template, build, cgOpts) for f, d in zip(files, outdirs)]
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(buildDgm, files, outdirs,
+                             [template]*len(files), [build]*len(files), [cgOpts]*len(files)))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m supsisim.headless',
+                                     description='Generate and build pysimCoder diagrams without GUI')
+    parser.add_argument('files', nargs='+', help='.dgm files')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of parallel builds (default: number of cores)')
+    parser.add_argument('-o', '--outdir', default=None,
+                        help='folder for the <model>_gen folders (default: folder of each .dgm file)')
+    parser.add_argument('-t', '--template', default=None,
+                        help='template makefile (default: template of each diagram)')
+    parser.add_argument('-n', '--no-make', action='store_true',
+                        help='generate the code without running make')
+    parser.add_argument('--signals', action='store_true',
+                        help='place the signals in one contiguous array')
+    parser.add_argument('--reuse', action='store_true',
+                        help='with --signals, reuse the slots of signals with disjoint lifetimes')
+    parser.add_argument('--inline', action='store_true',
+                        help='inline C code with folded parameters for the common blocks')
+    parser.add_argument('--optimize', action='store_true',
+                        help='fold the constants, merge the duplicated blocks and remove the unused ones')
+    parser.add_argument('--rate-tasks', action='store_true',
+                        help='one function per rate, for the rate threads of the RT template (-m)')
+    parser.add_argument('--partitions', type=int, default=0, metavar='N',
+                        help='split the model in up to N partitions, for the CPU threads of the RT template (-c)')
+    parser.add_argument('--profile', action='store_true',
+                        help='measure the execution time of every block (<model>_prof.json)')
+    parser.add_argument('--parfile', action='store_true',
+                        help='write the parameters to <model>.par, loaded by the executable with -P')
+    parser.add_argument('--solver', choices=['fixed', 'dopri5'], default=None,
+                        help='solver of the continuous states (default: solver of each diagram)')
+    args = parser.parse_args(argv)
+
+    cgOpts = {}
+    if args.signals:
+        cgOpts['signals'] = True
+        cgOpts['reuse'] = args.reuse
+    if args.inline:
+        cgOpts['inline'] = True
+    if args.optimize:
+        cgOpts['optimize'] = True
+    if args.rate_tasks:
+        cgOpts['rateTasks'] = True
+    if args.partitions > 1:
+        cgOpts['partitions'] = args.partitions
+    if args.profile:
+        cgOpts['profile'] = True
+    if args.parfile:
+        cgOpts['parFile'] = True
+    if args.solver is not None:
+        cgOpts['solver'] = args.solver
+    results = buildAll(args.files, args.outdir, args.template, not args.no_make, args.jobs, cgOpts)
+    err = 0
+    for fname, res, msg in results:
+        if res == 0:
+            print(fname + ': OK')
+        else:
+            print(fname + ': FAILED ' + (msg if msg != '' else 'make exit code ' + str(res)))
+            err = 1
+    return err
+
+if __name__ == '__main__':
+    sys.exit(main())
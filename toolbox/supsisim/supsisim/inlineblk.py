@@ -0,0 +1,198 @@
+"""
+Inline C code for the common blocks of CodeGen/Common/common_dev
+
+The blocks listed in INLINE_BLOCKS are translated into C statements
+with their constant parameters folded, instead of calling the generic
+"fcn(flag, &block)" function. The state of the blocks (discretePID,
+dss, switcher latch) stays in the realPar_n / intPar_n arrays of the
+generated code. The following commands are provided:
+
+  canInline      - Check if a block can be inlined
+  inlineBlk      - C code of a block for a given flag ('' for no-op)
+  linComb        - C expression of a linear combination
+
+"""
+
+from numpy import array, isfinite
+
+INLINE_BLOCKS = ('constant', 'step', 'sinus', 'sum', 'prod', 'saturation', 'absV',
+                 'switcher', 'discretePID', 'dss')
+
+# Maximal order (states, inputs, outputs) of the inlined dss blocks
+DSS_MAX_ORDER = 4
+
+def num(val):
+    """C literal of a double"""
+    return repr(float(val))
+
+def node(n):
+    return 'Node_' + str(n) + '[0]'
+
+def linComb(coefs, terms):
+    """C expression of sum(coefs[i]*terms[i]), without the null terms"""
+    txt = ''
+    for c, t in zip(coefs, terms):
+        c = float(c)
+        if c == 0.0:
+            continue
+        if c == 1.0:
+            txt += (' + ' if txt != '' else '') + t
+        elif c == -1.0:
+            txt += (' - ' if txt != '' else '-') + t
+        elif txt != '' and c < 0:
+            txt += ' - ' + num(-c) + '*' + t
+        else:
+            txt += (' + ' if txt != '' else '') + num(c) + '*' + t
+    if txt == '':
+        return '0.0'
+    return txt
+
+def canInline(blk):
+    """Return True if the block can be inlined"""
+    if blk.fcn not in INLINE_BLOCKS:
+        return False
+    realPar = array(blk.realPar, dtype=float).ravel()
+    if not isfinite(realPar).all():
+        return False
+    pin = array(blk.pin).ravel()
+    pout = array(blk.pout).ravel()
+    if blk.fcn in ('constant', 'step', 'sinus', 'saturation', 'discretePID') and len(pout) != 1:
+        return False
+    if blk.fcn == 'sum':
+        return len(pout) == 1 and len(realPar) >= len(pin)
+    if blk.fcn == 'prod':
+        return len(pout) == 1
+    if blk.fcn == 'absV':
+        return len(pout) >= len(pin)
+    if blk.fcn == 'switcher':
+        intPar = array(blk.intPar).ravel().tolist()
+        return len(pin) == 3 and len(pout) == 1 and intPar[0] in (0, 1)
+    if blk.fcn == 'dss':
+        nx, ni, no = array(blk.intPar).ravel().tolist()[0:3]
+        return nx <= DSS_MAX_ORDER and ni <= DSS_MAX_ORDER and no <= DSS_MAX_ORDER
+    return True
+
+def inlineBlk(blk, sn, flag):
+    """C code of a block for a flag
+
+    Call: inlineBlk(blk, sn, flag)
+
+    Parameters
+    ----------
+    blk       : RCPblk (canInline(blk) must be True)
+    sn        : Index of the block in the generated code (string)
+    flag      : 'CG_INIT', 'CG_OUT', 'CG_STUPD' or 'CG_END'
+
+    Returns
+    -------
+    txt       : C statements (indented by 2 spaces), '' for a no-op
+    """
+    fcn = blk.fcn
+    pin = [node(n) for n in array(blk.pin).ravel().tolist()]
+    pout = [node(n) for n in array(blk.pout).ravel().tolist()]
+    realPar = array(blk.realPar, dtype=float).ravel().tolist()
+    intPar = array(blk.intPar).ravel().tolist()
+    head = '  /* ' + fcn + ' ' + str(blk.name) + ' */\n'
+
+    if flag == 'CG_STUPD' and fcn != 'dss':
+        return ''
+
+    if fcn == 'constant':
+        return head + '  ' + pout[0] + ' = ' + num(realPar[0]) + ';\n'
+
+    elif fcn == 'step':
+        if flag != 'CG_OUT':
+            return head + '  ' + pout[0] + ' = 0.0;\n'
+        return head + '  ' + pout[0] + ' = (get_run_time() < ' + num(realPar[0]) + ') ? ' + \
+            num(realPar[1]) + ' : ' + num(realPar[2]) + ';\n'
+
+    elif fcn == 'sinus':
+        if flag != 'CG_OUT':
+            return head + '  ' + pout[0] + ' = 0.0;\n'
+        Amp, Freq, Phase, Bias, Delay = realPar[0:5]
+        w = 2*3.1415927*Freq
+        txt = head + '  {\n    double t_ = get_run_time();\n'
+        txt += '    if (t_ < ' + num(Delay) + ') ' + pout[0] + ' = 0.0;\n'
+        txt += '    else ' + pout[0] + ' = ' + num(Amp) + '*sin(' + num(w) + '*(t_ - ' + num(Delay) + ') - ' + \
+            num(Phase) + ') + ' + num(Bias) + ';\n  }\n'
+        return txt
+
+    elif fcn == 'sum':
+        return head + '  ' + pout[0] + ' = ' + linComb(realPar, pin) + ';\n'
+
+    elif fcn == 'prod':
+        return head + '  ' + pout[0] + ' = ' + (' * '.join(pin) if len(pin) != 0 else '1.0') + ';\n'
+
+    elif fcn == 'saturation':
+        txt = head + '  {\n    double v_ = ' + pin[0] + ';\n'
+        txt += '    if (v_ > ' + num(realPar[0]) + ') v_ = ' + num(realPar[0]) + ';\n'
+        txt += '    if (v_ < ' + num(realPar[1]) + ') v_ = ' + num(realPar[1]) + ';\n'
+        txt += '    ' + pout[0] + ' = v_;\n  }\n'
+        return txt
+
+    elif fcn == 'absV':
+        return head + ''.join(['  ' + y + ' = fabs(' + u + ');\n' for u, y in zip(pin, pout)])
+
+    elif fcn == 'switcher':
+        if flag != 'CG_OUT':
+            return ''
+        latch = 'intPar_' + sn + '[1]'
+        cond = ' < ' if intPar[0] == 0 else ' >= '
+        txt = head + '  if (' + latch + ' == 2) ' + pout[0] + ' = ' + pin[1] + ';\n'
+        txt += '  else if (' + pin[2] + cond + num(realPar[0]) + ') {\n'
+        txt += '    ' + pout[0] + ' = ' + pin[1] + ';\n'
+        txt += '    if (' + latch + ') ' + latch + ' = 2;\n  }\n'
+        txt += '  else ' + pout[0] + ' = ' + pin[0] + ';\n'
+        return txt
+
+    elif fcn == 'discretePID':
+        if flag != 'CG_OUT':
+            return ''
+        Kp, Ki, Kd, umin, umax = realPar[0:5]
+        par = 'realPar_' + sn
+        txt = head + '  {\n    double e_ = ' + pin[0] + ';\n'
+        if Ki == 0:
+            txt += '    double i_ = 0.0;\n'
+        else:
+            txt += '    double i_ = ' + par + '[6] + e_ * ' + num(Ki) + ';\n'
+        act = 'i_'
+        if Kp != 0:
+            act = num(Kp) + ' * e_ + ' + act
+        if Kd != 0:
+            act += ' + ' + num(Kd) + ' * (e_ - ' + par + '[5])'
+        txt += '    double a_ = ' + act + ';\n'
+        txt += '    ' + par + '[5] = e_;\n'
+        txt += '    if (a_ > ' + num(umax) + ') {\n      i_ = i_ - (a_ - ' + num(umax) + ');\n      a_ = ' + num(umax) + ';\n    }\n'
+        txt += '    else if (a_ < ' + num(umin) + ') {\n      i_ = i_ - (a_ - ' + num(umin) + ');\n      a_ = ' + num(umin) + ';\n    }\n'
+        txt += '    ' + par + '[6] = i_;\n'
+        txt += '    ' + pout[0] + ' = a_;\n  }\n'
+        return txt
+
+    elif fcn == 'dss':
+        if flag in ('CG_INIT', 'CG_END'):
+            return ''
+        nx, ni, no, iA, iB, iC, iD, iX = intPar[0:8]
+        X = ['realPar_' + sn + '[' + str(iX+k) + ']' for k in range(0, nx)]
+        if flag == 'CG_OUT':
+            txt = head
+            for i in range(0, no):
+                cx = linComb(realPar[iC+i*nx:iC+(i+1)*nx], X)
+                du = linComb(realPar[iD+i*ni:iD+(i+1)*ni], pin)
+                if du == '0.0':
+                    expr = cx
+                elif cx == '0.0':
+                    expr = du
+                else:
+                    expr = '(' + cx + ') + (' + du + ')'
+                txt += '  ' + pout[i] + ' = ' + expr + ';\n'
+            return txt
+        txt = head + '  {\n'
+        for i in range(0, nx):
+            ax = linComb(realPar[iA+i*nx:iA+(i+1)*nx], X)
+            bu = linComb(realPar[iB+i*ni:iB+(i+1)*ni], pin)
+            txt += '    double x' + str(i) + '_ = (' + ax + ') + (' + bu + ');\n'
+        for i in range(0, nx):
+            txt += '    ' + X[i] + ' = x' + str(i) + '_;\n'
+        return txt + '  }\n'
+
+    return None
@@ -0,0 +1,205 @@
+"""
+Optimization of the ordered block list before the code generation
+
+Only blocks without states and without side effects (OPT_PURE) are
+changed; all the other blocks (inputs, outputs, logging, communication,
+blocks with states) are kept as they are. The following commands are
+provided:
+
+  optBlocks      - Optimize an ordered block list
+  foldBlk        - Output values of a pure block with constant inputs
+  foldConst      - Replace the blocks with constant inputs by constants
+  mergeDup       - Merge identical blocks with the same inputs
+  removeDead     - Remove the blocks whose outputs are not used
+
+"""
+
+import copy
+from math import sin, cos, tan
+from numpy import array
+
+from supsisim.RCPblk import RCPblk
+
+# Blocks without states and side effects
+OPT_PURE = {'absV', 'constant', 'deadzone', 'lut', 'mxmult', 'prod', 'saturation',
+            'sinus', 'squareSignal', 'step', 'sum', 'trigo'}
+
+# Pure blocks computed at generation time if all their inputs are constant
+FOLD_BLOCKS = {'absV', 'deadzone', 'lut', 'mxmult', 'prod', 'saturation', 'sum', 'trigo'}
+
+def isPure(blk):
+    return blk.fcn in OPT_PURE and array(blk.nx).ravel().tolist() == [0, 0]
+
+def ports(p):
+    return array(p).ravel().tolist()
+
+def label(blk):
+    from supsisim.RCPgen import blkLabel
+    return blkLabel(blk)
+
+def foldBlk(blk, u):
+    """Output values of a pure block (same arithmetic as common_dev)
+
+    Call: foldBlk(blk, u)
+
+    Parameters
+    ----------
+    blk       : RCPblk (fcn in FOLD_BLOCKS)
+    u         : List of the input values
+
+    Returns
+    -------
+    y         : List of the output values
+    """
+    realPar = array(blk.realPar, dtype=float).ravel().tolist()
+    intPar = ports(blk.intPar)
+    if blk.fcn == 'sum':
+        y = 0.0
+        for g, v in zip(realPar, u):
+            y += g*v
+        return [y]
+    elif blk.fcn == 'prod':
+        y = 1.0
+        for v in u:
+            y *= v
+        return [y]
+    elif blk.fcn == 'absV':
+        return [abs(v) for v in u]
+    elif blk.fcn == 'saturation':
+        y = u[0]
+        if y > realPar[0]:
+            y = realPar[0]
+        if y < realPar[1]:
+            y = realPar[1]
+        return [y]
+    elif blk.fcn == 'deadzone':
+        if u[0] >= realPar[0] and u[0] <= realPar[1]:
+            return [0.0]
+        return [u[0]]
+    elif blk.fcn == 'trigo':
+        fcn = {1 : sin, 2 : cos, 3 : tan}.get(intPar[0])
+        return [fcn(u[0]) if fcn is not None else u[0]]
+    elif blk.fcn == 'lut':
+        y = realPar[0]
+        for c in realPar[1:intPar[0]]:
+            y = y*u[0] + c
+        return [y]
+    elif blk.fcn == 'mxmult':
+        nout, nin = intPar[0:2]
+        y = []
+        for i in range(0, nout):
+            val = 0.0
+            for k in range(0, nin):
+                val += realPar[i*nin+k]*u[k]
+            y.append(val)
+        return y
+    raise ValueError('Block ' + blk.fcn + ' cannot be folded')
+
+def constBlock(blk, node, val, name):
+    """Constant block replacing the output node of a folded block"""
+    cst = RCPblk('constant', [], [node], [0,0], 0, [val], [])
+    cst.name = name
+    cst.sysPath = blk.sysPath
+    cst.realParNames = ['Value']
+    cst.tsamp = blk.tsamp
+    return cst
+
+def foldConst(Blocks, msgs):
+    """Replace the pure blocks with constant inputs by constant blocks"""
+    values = {}
+    res = []
+    for blk in Blocks:
+        pin, pout = ports(blk.pin), ports(blk.pout)
+        if blk.fcn == 'constant' and isPure(blk):
+            values[pout[0]] = float(array(blk.realPar, dtype=float).ravel()[0])
+        elif blk.fcn in FOLD_BLOCKS and isPure(blk) and len(pin) != 0 and \
+             all(node in values for node in pin):
+            y = foldBlk(blk, [values[node] for node in pin])
+            for k, (node, val) in enumerate(zip(pout, y)):
+                name = blk.name if len(pout) == 1 or blk.name is None else blk.name + '_' + str(k)
+                res.append(constBlock(blk, node, val, name))
+                values[node] = val
+            msgs.append('Optimization: ' + label(blk) + ' folded into constant(s)')
+            continue
+        res.append(blk)
+    return res
+
+def mergeDup(Blocks, msgs):
+    """Merge the identical pure blocks with the same inputs"""
+    alias = {}
+    seen = {}
+    res = []
+    for blk in Blocks:
+        if isPure(blk):
+            pin = [alias.get(node, node) for node in ports(blk.pin)]
+            key = repr([blk.fcn, pin, len(ports(blk.pout)), ports(blk.realPar),
+                        ports(blk.intPar), blk.str, blk.tsamp])
+            first = seen.get(key)
+            if first is not None:
+                for node, node1 in zip(ports(blk.pout), ports(first.pout)):
+                    alias[node] = node1
+                msgs.append('Optimization: ' + label(blk) + ' merged into ' + label(first))
+                continue
+            seen[key] = blk
+        res.append(blk)
+
+    # Blocks without feed-through are placed first and can read merged nodes
+    for n, blk in enumerate(res):
+        pin = ports(blk.pin)
+        if any(node in alias for node in pin):
+            res[n] = copy.copy(blk)
+            res[n].pin = array([alias.get(node, node) for node in pin])
+    return res
+
+def removeDead(Blocks, msgs):
+    """Remove the pure blocks whose outputs reach no other block"""
+    producer = {}
+    for blk in Blocks:
+        for node in ports(blk.pout):
+            producer[node] = blk
+    live = set()
+    stack = []
+    for blk in Blocks:
+        if not isPure(blk):
+            live.add(id(blk))
+            stack += ports(blk.pin)
+    while len(stack) != 0:
+        blk = producer.get(stack.pop())
+        if blk is not None and id(blk) not in live:
+            live.add(id(blk))
+            stack += ports(blk.pin)
+
+    res = []
+    for blk in Blocks:
+        if id(blk) in live:
+            res.append(blk)
+        else:
+            msgs.append('Optimization: ' + label(blk) + ' removed (output not used)')
+    return res
+
+def optBlocks(Blocks):
+    """Optimize an ordered block list
+
+    Call: optBlocks(Blocks)
+
+    The pure blocks with constant inputs are folded into constant blocks,
+    identical pure blocks with the same inputs are merged and the pure
+    blocks whose outputs are not used are removed. The blocks of the
+    list are not modified (changed blocks are copies).
+
+    Parameters
+    ----------
+    Blocks    : Block list ordered by detBlkSeq
+
+    Returns
+    -------
+    Blocks    : Optimized block list (same execution order)
+    msgs      : List of messages describing the changes
+    """
+    msgs = []
+    N = len(Blocks)
+    Blocks = foldConst(Blocks, msgs)
+    Blocks = mergeDup(Blocks, msgs)
+    Blocks = removeDead(Blocks, msgs)
+    msgs.append('Optimization: ' + str(N) + ' -> ' + str(len(Blocks)) + ' blocks')
+    return Blocks, msgs
@@ -0,0 +1,207 @@
+"""
+Parameter files of the generated code
+
+A model generated with genCode(..., parFile=True) loads at start-up the
+parameters of a binary parameter file (option -P of the executable, see
+CodeGen/Common/include/parfile.h): the same executable can be run with
+many calibrations without code generation and compilation. The file
+holds one record per parameter, keyed by the block name and the
+parameter name (realParNames, "double<k>"/"int<k>" if not given).
+
+The following commands are provided:
+
+  parNames       - Names of the real and integer parameters of a block
+  parRecords     - Records of the parameters of a block list
+  writeParFile   - Write a parameter file
+  readParFile    - Read a parameter file
+  patchParFile   - Change parameters of a file
+
+Usage from the command line:
+
+  python3 -m supsisim.parfile dc_motor.par
+  python3 -m supsisim.parfile dc_motor.par PID_3.Kp=2.5 PID_3.Ti=0.1 -o tuned.par
+
+"""
+
+import sys
+import struct
+import argparse
+
+from numpy import array, size
+
+PAR_MAGIC = b'PYSIMPAR'
+PAR_VERSION = 1
+PAR_REAL = 0
+PAR_INT = 1
+
+# Little endian, as par_header and par_record of parfile.h
+HEADER = struct.Struct('<8sII48s')
+RECORD = struct.Struct('<80s40siid')
+
+def parNames(blk):
+    """Names of the real and integer parameters of a block
+
+    Call: realNames, intNames = parNames(blk)
+
+    The names are the ones of the generated code: realParNames if
+    given for all the real parameters, "double<k>" and "int<k>"
+    otherwise.
+    """
+    nreal = size(blk.realPar)
+    nint = size(blk.intPar)
+    if nreal == size(blk.realParNames):
+        realNames = [str(name) for name in blk.realParNames]
+    else:
+        realNames = ['double' + str(k) for k in range(0, nreal)]
+    return realNames, ['int' + str(k) for k in range(0, nint)]
+
+def parRecords(Blocks):
+    """Records of the parameters of a block list
+
+    Call: recs = parRecords(Blocks)
+
+    Parameters
+    ----------
+    Blocks    : Block list (RCPblk)
+
+    Returns
+    -------
+    recs      : List of (block, name, type, index, value), type is
+                PAR_REAL or PAR_INT
+    """
+    recs = []
+    for blk in Blocks:
+        realNames, intNames = parNames(blk)
+        for k, val in enumerate(array(blk.realPar, dtype=float).ravel().tolist()):
+            recs.append((blk.name, realNames[k], PAR_REAL, k, val))
+        for k, val in enumerate(array(blk.intPar).ravel().tolist()):
+            recs.append((blk.name, intNames[k], PAR_INT, k, float(val)))
+    return recs
+
+def encode(s, n, what):
+    b = str(s).encode()
+    if len(b) >= n:
+        raise ValueError(what + ' ' + str(s) + ' longer than ' + str(n-1) + ' characters')
+    return b
+
+def writeParFile(fname, model, recs):
+    """Write a parameter file
+
+    Call: writeParFile(fname, model, recs)
+
+    Parameters
+    ----------
+    fname     : File name (<model>.par)
+    model     : Model name
+    recs      : Records (see parRecords)
+
+    Returns
+    -------
+    skipped   : Records not written (names too long for the file)
+    """
+    data = []
+    skipped = []
+    for blk, name, typ, idx, val in recs:
+        try:
+            data.append(RECORD.pack(encode(blk, 80, 'Block name'), encode(name, 40, 'Parameter name'),
+                                    typ, idx, float(val)))
+        except ValueError:
+            skipped.append((blk, name, typ, idx, val))
+    with open(fname, 'wb') as f:
+        f.write(HEADER.pack(PAR_MAGIC, PAR_VERSION, len(data), str(model).encode()[0:47]))
+        f.write(b''.join(data))
+    return skipped
+
+def readParFile(fname):
+    """Read a parameter file
+
+    Call: model, recs = readParFile(fname)
+
+    Returns
+    -------
+    model     : Model name
+    recs      : Records (see parRecords)
+    """
+    with open(fname, 'rb') as f:
+        buf = f.read()
+    if len(buf) < HEADER.size:
+        raise ValueError(fname + ' is not a parameter file')
+    magic, version, nrec, model = HEADER.unpack_from(buf, 0)
+    if magic != PAR_MAGIC or version != PAR_VERSION:
+        raise ValueError(fname + ' is not a parameter file (version ' + str(PAR_VERSION) + ')')
+    if len(buf) < HEADER.size + nrec*RECORD.size:
+        raise ValueError(fname + ' truncated')
+    recs = []
+    for r in range(0, nrec):
+        blk, name, typ, idx, val = RECORD.unpack_from(buf, HEADER.size + r*RECORD.size)
+        recs.append((blk.rstrip(b'\0').decode(), name.rstrip(b'\0').decode(), typ, idx, val))
+    return model.rstrip(b'\0').decode(), recs
+
+def patchParFile(fname, values, out=None, only=False):
+    """Change parameters of a file
+
+    Call: patchParFile(fname, values, out, only)
+
+    Parameters
+    ----------
+    fname     : Parameter file
+    values    : dict '<block>.<name>' (or (block, name)) -> value
+    out       : File written (default: fname)
+    only      : write only the changed parameters (file applied over
+                the parameters of the model, see option -P)
+
+    Returns
+    -------
+    recs      : Records written
+    """
+    model, recs = readParFile(fname)
+    vals = {}
+    for key, val in values.items():
+        if isinstance(key, str):
+            key = tuple(key.rsplit('.', 1))
+        vals[key] = val
+    new = []
+    for blk, name, typ, idx, val in recs:
+        if (blk, name) in vals:
+            new.append((blk, name, typ, idx, float(vals.pop((blk, name)))))
+        elif not only:
+            new.append((blk, name, typ, idx, val))
+    if len(vals) != 0:
+        raise KeyError('Parameters not found in ' + fname + ': ' +
+                       ', '.join(['.'.join(key) for key in vals]))
+    writeParFile(out or fname, model, new)
+    return new
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m supsisim.parfile',
+                                     description='List or change the parameters of a parameter file')
+    parser.add_argument('file', help='parameter file (<model>.par)')
+    parser.add_argument('values', nargs='*', metavar='BLOCK.NAME=VALUE', help='parameters to change')
+    parser.add_argument('-o', '--out', default=None, help='file written (default: the parameter file)')
+    parser.add_argument('--only', action='store_true', help='write only the changed parameters')
+    args = parser.parse_args(argv)
+
+    if len(args.values) == 0:
+        model, recs = readParFile(args.file)
+        print('Model ' + model + ': ' + str(len(recs)) + ' parameters')
+        for blk, name, typ, idx, val in recs:
+            print('  %s.%s = %s' % (blk, name, repr(val) if typ == PAR_REAL else str(int(val))))
+        return 0
+    values = {}
+    for arg in args.values:
+        if '=' not in arg:
+            parser.error('expected BLOCK.NAME=VALUE: ' + arg)
+        key, val = arg.split('=', 1)
+        values[key] = float(val)
+    try:
+        patchParFile(args.file, values, args.out, args.only)
+    except KeyError as e:
+        print(e.args[0])
+        return 1
+    except (ValueError, OSError) as e:
+        print(str(e))
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
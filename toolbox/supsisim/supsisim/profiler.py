@@ -0,0 +1,78 @@
+"""
+Execution time profile of the generated code
+
+A model generated with genCode(..., profile=True) writes at the end of
+the run the file <model>_prof.json with the statistics of every block
+(min/mean/max in ns and a histogram, see CodeGen/Common/posix/profiler.c).
+The editor colours the blocks by their mean execution time.
+
+The following commands are provided:
+
+  loadProfile    - Read the profile written by a model
+  pathCosts      - Mean execution time of every system path
+  costColor      - Colour of a cost relative to the maximal one
+
+"""
+
+import json
+
+def loadProfile(fname):
+    """Read the profile written by a model
+
+    Call: loadProfile(fname)
+
+    Parameters
+    ----------
+    fname     : <model>_prof.json file
+
+    Returns
+    -------
+    prof      : dict with the keys 'model', 'unit', 'hist_edges', 'blocks'
+                (list of dict with 'index', 'name', 'sysPath', 'fcn',
+                'count', 'min', 'mean', 'max', 'hist'), the entry of the
+                whole ISR has index -1
+    """
+    with open(fname, 'r') as f:
+        return json.load(f)
+
+def pathCosts(prof):
+    """Mean execution time of every system path
+
+    Call: pathCosts(prof)
+
+    The time of a block is added to its system path and to the paths of
+    the subsystems containing it. Blocks executed only on some ticks
+    (slower rates) are weighted by their share of the ISR executions.
+
+    Parameters
+    ----------
+    prof      : Profile returned by loadProfile
+
+    Returns
+    -------
+    costs     : dict system path -> mean time per ISR (ns)
+    total     : mean time of the whole ISR (ns)
+    """
+    costs = {}
+    total = 0.0
+    nisr = 1
+    for blk in prof['blocks']:
+        if blk['index'] == -1:
+            total = blk['mean']
+            nisr = max(blk['count'], 1)
+    for blk in prof['blocks']:
+        if blk['index'] == -1:
+            continue
+        cost = blk['mean'] * blk['count'] / nisr
+        path = blk['sysPath']
+        while path != '':
+            costs[path] = costs.get(path, 0.0) + cost
+            path = path[0:path.rfind('/')]
+    return costs, total
+
+def costColor(cost, maxCost):
+    """Colour (r, g, b) of a cost, from green (0) to red (maxCost)"""
+    frac = 0.0 if maxCost <= 0 else min(max(cost / maxCost, 0.0), 1.0)
+    if frac < 0.5:
+        return (int(510 * frac), 200, 0)
+    return (255, int(200 * (2 - 2 * frac)), 0)
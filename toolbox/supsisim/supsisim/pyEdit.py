@@ -11,6 +11,7 @@ from supsisim.editor import Editor
 from supsisim.scene import Scene, GraphicsView
 from supsisim.dialg import IO_Dialog
 from supsisim.const import respath, pycmd, DP
+from supsisim import build
 
 import json
 
@@ -156,6 +157,14 @@ class NewEditorMainWindow(QMainWindow):
                                                statusTip = 'Generate C-Code',
                                                triggered = self.codegenAct)
 
+        self.showProfileAction = QAction('Show block profile',self,
+                                                statusTip = 'Colour the blocks by their execution time (profiled run)',
+                                                triggered = self.showProfileAct)
+
+        self.exportScriptAction = QAction('Export build script (tmp.py)',self,
+                                                statusTip = 'Export the code generation as python script',
+                                                triggered = self.exportScriptAct)
+
         self.setCodegenAction = QAction(QIcon(mypath+'settings.png'),
                                                 'Settings',self,
                                                 statusTip = 'Settings',
@@ -244,6 +253,8 @@ class NewEditorMainWindow(QMainWindow):
         simMenu = menubar.addMenu('&Simulation')
         simMenu.addAction(self.runAction)
         simMenu.addAction(self.codegenAction)
+        simMenu.addAction(self.exportScriptAction)
+        simMenu.addAction(self.showProfileAction)
 
         setMenu = menubar.addMenu('Se&ttings')
         setMenu.addAction(self.setCodegenAction)
@@ -430,6 +441,8 @@ class NewEditorMainWindow(QMainWindow):
         dialog = IO_Dialog(self)
         dialog.spbInput.setValue(item.inp)
         dialog.spbOutput.setValue(item.outp)
+        dialog.dims.setText(item.dims)
+        dialog.tsamp.setText(item.tsamp)
         if item.insetble==False:
             dialog.spbInput.setEnabled(False)
         if item.outsetble==False:
@@ -444,14 +457,22 @@ class NewEditorMainWindow(QMainWindow):
         helpTxt = item.helpTxt
         width = item.width
         res = dialog.exec()
+        dims = str(dialog.dims.text()).strip()
+        tsamp = str(dialog.tsamp.text()).strip()
         if res == 1 and (insetble or outsetble):
             item.remove()
             inp = dialog.spbInput.value()
             outp = dialog.spbOutput.value()
             b = Block(None, self.scene, name, inp, outp, insetble, outsetble,
                       icon, params, helpTxt, width, flip)
+            b.tsamp = tsamp
+            b.dims = dims
             b.setPos(self.scene.evpos)
             ok = True
+        elif res == 1 and (dims != item.dims or tsamp != item.tsamp):
+            item.dims = dims
+            item.tsamp = tsamp
+            ok = True
         else:
             ok = False
         return ok
@@ -474,6 +495,12 @@ class NewEditorMainWindow(QMainWindow):
     def codegenAct(self):
         self.scene.codegen(True)
 
+    def exportScriptAct(self):
+        self.scene.exportScript()
+
+    def showProfileAct(self):
+        self.scene.showProfile()
+
     def setrunAct(self):
         self.scene.runDlg()
 
@@ -500,6 +527,9 @@ class NewEditorMainWindow(QMainWindow):
                 event.ignore()
                 return
 
+        if self.notSubsystem:
+            build.shutdown()
+
         settings = QSettings('SUPSI', 'pysimCoder')
         recFolders = []
         for index in range(0, self.actFolders.count()):
@@ -34,6 +34,7 @@ try:
     )
     from PyQt6.QtGui import (
         QAction,
+        QColor,
         QDrag,
         QFont,
         QIcon,
@@ -101,6 +102,7 @@ except:
         QWidget
     )
     from PyQt5.QtGui import (
+        QColor,
         QDrag,
         QFont,
         QIcon,
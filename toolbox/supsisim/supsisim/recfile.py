@@ -0,0 +1,271 @@
+"""
+Recorded data of the plot and toFile blocks
+
+In binary mode (format 'bin' of plotBlk and toFileBlk) the blocks write
+a self-describing file (see CodeGen/Common/include/recorder.h): a header
+with the number of columns, the sampling time and the counters of the
+recorder, the names of the columns, then the rows (time and channels)
+as float64. In text mode the rows are written as text, with a comment
+line holding the names if given.
+
+The following commands are provided:
+
+  isRecFile      - Check for a binary recording
+  readHeader     - Header of a binary recording
+  readRecFile    - Data of a binary recording
+  loadData       - Data of a recording, binary or text
+  readEvents     - Events of a triggered capture
+  textToRec      - Convert a text recording into a binary one
+  main           - Command line interface
+
+Usage from the command line:
+
+  python3 -m supsisim.recfile data.bin
+  python3 -m supsisim.recfile data.bin -o data.txt
+
+"""
+
+import os
+import sys
+import struct
+import argparse
+import itertools
+
+import numpy as np
+
+REC_MAGIC = b'PYSIMREC'
+REC_VERSION = 1
+REC_CLOSED = 1
+REC_TIMEGEN = 2           # Time column generated from Tsamp (textToRec)
+CHUNK = 1 << 18           # Rows converted at once
+
+# Little endian, as rec_header of recorder.h
+HEADER = struct.Struct('<8sIIdQQQIIQ')
+
+def isRecFile(fname):
+    """True if fname is a binary recording"""
+    try:
+        with open(fname, 'rb') as f:
+            return f.read(len(REC_MAGIC)) == REC_MAGIC
+    except OSError:
+        return False
+
+def readHeader(fname):
+    """Header of a binary recording
+
+    Call: hd = readHeader(fname)
+
+    Returns
+    -------
+    hd        : dict with
+                'names'      : names of the columns (time first)
+                'Tsamp'      : sampling time of the model
+                'nrow'       : rows in the file
+                'dropped'    : rows dropped with the ring of the recorder full
+                'overflows'  : times the ring has been found full
+                'closed'     : False if the recording has not been closed
+                               (the counters are 0, nrow from the file size)
+                'offset'     : bytes before the first row
+    """
+    with open(fname, 'rb') as f:
+        buf = f.read(HEADER.size)
+        if len(buf) < HEADER.size:
+            raise ValueError(fname + ' is not a binary recording')
+        magic, version, ncol, Tsamp, nrow, dropped, overflows, nameLen, flags, res = HEADER.unpack(buf)
+        if magic != REC_MAGIC or version != REC_VERSION:
+            raise ValueError(fname + ' is not a binary recording (version ' + str(REC_VERSION) + ')')
+        names = f.read(nameLen)
+    if len(names) < nameLen or ncol == 0:
+        raise ValueError(fname + ' truncated')
+    names = [n.decode() for n in names.split(b'\0')][0:ncol]
+    offset = HEADER.size + nameLen
+    closed = (flags & REC_CLOSED) != 0
+    if not closed:
+        nrow = (os.path.getsize(fname) - offset) // (8*ncol)
+    return {'names' : names, 'Tsamp' : Tsamp, 'nrow' : nrow, 'dropped' : dropped,
+            'overflows' : overflows, 'closed' : closed, 'offset' : offset}
+
+def readRecFile(fname, mmap=False):
+    """Data of a binary recording
+
+    Call: data, hd = readRecFile(fname, mmap)
+
+    Parameters
+    ----------
+    fname     : File name
+    mmap      : Map the file instead of reading it (read only)
+
+    Returns
+    -------
+    data      : Array nrow x columns, time in the first column
+    hd        : Header (see readHeader)
+    """
+    hd = readHeader(fname)
+    ncol = len(hd['names'])
+    if hd['nrow'] == 0:
+        return np.zeros((0, ncol)), hd
+    if mmap:
+        data = np.memmap(fname, dtype='<f8', mode='r', offset=hd['offset'], shape=(hd['nrow'], ncol))
+    else:
+        with open(fname, 'rb') as f:
+            f.seek(hd['offset'])
+            data = np.fromfile(f, dtype='<f8', count=hd['nrow']*ncol)
+        if data.size < hd['nrow']*ncol:
+            raise ValueError(fname + ' truncated')
+        data = data.reshape(hd['nrow'], ncol)
+    return data, hd
+
+def loadData(fname):
+    """Data of a recording, binary or text
+
+    Call: data, names = loadData(fname)
+
+    Returns
+    -------
+    data      : Array rows x columns, time in the first column
+    names     : Names of the columns, None if not recorded
+    """
+    if isRecFile(fname):
+        data, hd = readRecFile(fname)
+        return data, hd['names']
+    names = None
+    with open(fname) as f:
+        line = f.readline()
+    if line.startswith('#'):
+        names = line[1:].replace(',', ' ').split()
+    data = np.loadtxt(fname, ndmin=2)
+    return data, names
+
+def readEvents(fname):
+    """Events of a triggered capture
+
+    Call: events, hd = readEvents(fname)
+
+    The capture block writes the columns t, event, k (sample from the
+    trigger) and the channels.
+
+    Returns
+    -------
+    events    : List of dict with
+                'event'      : number of the event
+                't0'         : time of the trigger (None if the trigger
+                               sample is missing)
+                't', 'k'     : time and sample from the trigger of the rows
+                'y'          : channels, rows x channels
+    hd        : Header (see readHeader)
+    """
+    data, hd = readRecFile(fname)
+    if hd['names'][1:3] != ['event', 'k']:
+        raise ValueError(fname + ' is not a capture')
+    events = []
+    for ev in np.unique(data[:, 1]):
+        x = data[data[:, 1] == ev]
+        trig = x[x[:, 2] == 0]
+        events.append({'event' : int(ev), 't0' : float(trig[0, 0]) if trig.shape[0] != 0 else None,
+                       't' : x[:, 0], 'k' : x[:, 2].astype(int), 'y' : x[:, 3:]})
+    return events, hd
+
+def newer(fname, src):
+    """True if fname exists and is not older than src"""
+    return os.path.isfile(fname) and os.path.getmtime(fname) >= os.path.getmtime(src)
+
+def textToRec(fname, out=None, Tsamp=None):
+    """Convert a text recording into a binary one
+
+    Call: out = textToRec(fname, out, Tsamp)
+
+    Parameters
+    ----------
+    fname     : Text file (rows of numbers, optional comment line with
+                the names of the columns)
+    out       : Binary file (default: <fname>.rec)
+    Tsamp     : None: the time is the first column of the text
+                > 0: the text holds only the channels, the time of the
+                row k is k*Tsamp
+
+    Returns
+    -------
+    out       : Binary file
+
+    The text is read by chunks of CHUNK rows. The conversion is skipped
+    if out is newer than fname and has been converted with the same
+    Tsamp.
+    """
+    out = out or fname + '.rec'
+    if newer(out, fname):
+        try:
+            with open(out, 'rb') as f:
+                hd = HEADER.unpack(f.read(HEADER.size))
+            if (Tsamp is None and not hd[8] & REC_TIMEGEN) or \
+               (Tsamp is not None and hd[8] & REC_TIMEGEN and hd[3] == float(Tsamp)):
+                return out
+        except (OSError, struct.error):
+            pass
+    names = None
+    nrow = 0
+    ncol = None
+    Tfile = 0.0 if Tsamp is None else float(Tsamp)
+    flags = REC_CLOSED | (0 if Tsamp is None else REC_TIMEGEN)
+    tmp = out + '.tmp'
+    with open(fname) as f, open(tmp, 'wb') as g:
+        while True:
+            lines = list(itertools.islice(f, CHUNK))
+            if len(lines) == 0:
+                break
+            if names is None and nrow == 0 and lines[0].startswith('#'):
+                names = lines[0][1:].replace(',', ' ').split()
+            rows = [line for line in lines if not line.startswith('#') and line.strip() != '']
+            if len(rows) == 0:
+                continue
+            x = np.loadtxt(rows, ndmin=2)
+            if Tsamp is not None:
+                x = np.column_stack((Tfile*np.arange(nrow, nrow + x.shape[0]), x))
+            if ncol is None:
+                ncol = x.shape[1]
+                if names is not None and Tsamp is not None:
+                    names = ['t'] + names
+                if names is None or len(names) != ncol:
+                    names = ['t'] + ['u' + str(k) for k in range(0, ncol-1)]
+                txt = b''.join([n.encode() + b'\0' for n in names])
+                txt += bytes((8 - len(txt) % 8) % 8)
+                if Tsamp is None and x.shape[0] > 1:
+                    Tfile = float(x[1, 0] - x[0, 0])
+                g.write(HEADER.pack(REC_MAGIC, REC_VERSION, ncol, Tfile, 0, 0, 0, len(txt), 0, 0))
+                g.write(txt)
+            elif x.shape[1] != ncol:
+                raise ValueError('Rows of different lengths in ' + fname)
+            g.write(np.ascontiguousarray(x, dtype='<f8').tobytes())
+            nrow += x.shape[0]
+        if ncol is None:
+            raise ValueError('No data in ' + fname)
+        # Number of rows, Tsamp estimated from the first rows if not given
+        g.seek(0)
+        g.write(HEADER.pack(REC_MAGIC, REC_VERSION, ncol, Tfile, nrow, 0, 0, len(txt), flags, 0))
+    os.replace(tmp, out)
+    return out
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m supsisim.recfile',
+                                     description='Show or convert a recording of the plot and toFile blocks')
+    parser.add_argument('file', help='recorded file')
+    parser.add_argument('-o', '--out', default=None, help='data written as text')
+    args = parser.parse_args(argv)
+
+    try:
+        data, names = loadData(args.file)
+        if isRecFile(args.file):
+            hd = readHeader(args.file)
+            print('Tsamp ' + repr(hd['Tsamp']) + ', ' + str(hd['nrow']) + ' rows, ' +
+                  str(hd['dropped']) + ' dropped, ' + str(hd['overflows']) + ' overflows' +
+                  ('' if hd['closed'] else ' (not closed)'))
+    except (ValueError, OSError) as e:
+        print(str(e))
+        return 1
+    print('Columns: ' + (' '.join(names) if names is not None else str(data.shape[1])))
+    if args.out is not None:
+        np.savetxt(args.out, data, fmt='%.17g', delimiter='\t',
+                   header='\t'.join(names) if names is not None else '')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+Registry of the block factories in resources/blocks/rcpBlk
+
+The registry maps the name of each factory function (cssBlk, FmuBlk,
+scopeStream, ...) to the module defining it (linear.cssBlk, ...). It is
+built by scanning the sources without importing them, cached on disk
+and rebuilt when the modification time of a folder or of a file changes.
+
+The following commands are provided:
+
+  blkRegistry    - Get the registry (factory name -> module)
+  scanFactories  - Scan the factory folder
+  factoriesIn    - Get the factory names used by a list of factory calls
+  importFactories - Import only the requested factories
+  importModule   - Import a factory module, reloaded if its source changed
+
+"""
+
+import os
+import re
+import sys
+import json
+import importlib
+
+REGISTRY_VERSION = 1
+
+defPattern = re.compile(r'^def\s+([A-Za-z_]\w*)\s*\(', re.MULTILINE)
+callPattern = re.compile(r'^\s*([A-Za-z_]\w*)\s*\(')
+
+def blkDir():
+    """Folder with the block factories (resources/blocks/rcpBlk)"""
+    return os.path.join(os.environ.get('PYSUPSICTRL', ''), 'resources', 'blocks', 'rcpBlk')
+
+def cacheFile():
+    """File used to store the registry"""
+    base = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'pysimCoder', 'blkRegistry.json')
+
+def dirStamp(dir1):
+    """Modification times of the factory folders and of their sources"""
+    stamp = {'.' : os.stat(dir1).st_mtime_ns}
+    for el in os.scandir(dir1):
+        if not el.is_dir():
+            continue
+        stamp[el.name] = el.stat().st_mtime_ns
+        for f in os.scandir(el.path):
+            if f.name.endswith('.py'):
+                stamp[el.name + '/' + f.name] = f.stat().st_mtime_ns
+    return stamp
+
+def scanFactories(dir1):
+    """Map every top level function of the factory sources to its module
+
+    Call: scanFactories(dir1)
+
+    Parameters
+    ----------
+    dir1      : Folder with one sub folder per library
+
+    Returns
+    -------
+    factories : dict factory name -> module name (e.g. 'linear.cssBlk')
+    """
+    factories = {}
+    for el in sorted(os.listdir(dir1)):
+        path = os.path.join(dir1, el)
+        if not os.path.isdir(path):
+            continue
+        for f in sorted(os.listdir(path)):
+            if not f.endswith('.py'):
+                continue
+            try:
+                with open(os.path.join(path, f), 'r', errors='replace') as fp:
+                    src = fp.read()
+            except OSError:
+                continue
+            for name in defPattern.findall(src):
+                factories.setdefault(name, el + '.' + f[:-3])
+    return factories
+
+_registry = {}
+_modStamp = {}
+
+def blkRegistry(dir1=None, fname=None):
+    """Return the registry of the block factories
+
+    Call: blkRegistry(dir1, fname)
+
+    The registry is kept in memory and on disk; it is rebuilt only if the
+    modification times of the folders or of the sources changed.
+
+    Parameters
+    ----------
+    dir1      : Folder of the factories (default: resources/blocks/rcpBlk)
+    fname     : Cache file (default: ~/.cache/pysimCoder/blkRegistry.json)
+
+    Returns
+    -------
+    factories : dict factory name -> module name
+    """
+    if dir1 is None:
+        dir1 = blkDir()
+    if fname is None:
+        fname = cacheFile()
+    dir1 = os.path.abspath(dir1)
+    stamp = dirStamp(dir1)
+
+    reg = _registry.get(dir1)
+    if reg is None:
+        try:
+            with open(fname, 'r') as f:
+                reg = json.load(f).get(dir1)
+        except (OSError, ValueError):
+            reg = None
+
+    if reg is None or reg.get('version') != REGISTRY_VERSION or reg.get('stamp') != stamp:
+        reg = {'version' : REGISTRY_VERSION, 'stamp' : stamp, 'factories' : scanFactories(dir1)}
+        try:
+            with open(fname, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        data[dir1] = reg
+        try:
+            os.makedirs(os.path.dirname(fname), exist_ok=True)
+            with open(fname, 'w') as f:
+                json.dump(data, f)
+        except OSError:
+            pass
+
+    _registry[dir1] = reg
+    return reg['factories']
+
+def factoriesIn(calls):
+    """Return the factory names used by a list of calls like 'cssBlk([1],[2], g1)'"""
+    names = []
+    for call in calls:
+        m = callPattern.match(call)
+        if m and m.group(1) not in names:
+            names.append(m.group(1))
+    return names
+
+def importFactories(ns, names, dir1=None):
+    """Import the requested factories into the dict ns
+
+    Call: importFactories(ns, names, dir1)
+
+    Only the modules defining the requested factories are imported, so
+    import errors in unrelated blocks have no effect.
+
+    Returns
+    -------
+    missing   : List of the names not found in the registry
+    """
+    reg = blkRegistry(dir1)
+    missing = []
+    for name in names:
+        modName = reg.get(name)
+        if modName is None:
+            missing.append(name)
+            continue
+        module = importModule(modName)
+        ns[name] = getattr(module, name)
+    return missing
+
+def importModule(modName):
+    """Import a factory module, reloaded if its source changed
+
+    Call: importModule(modName)
+
+    A long-lived process (the BuildWorker of supsisim.build) keeps the
+    imported factories: a module is reloaded when the modification time
+    of its source differs from the one of the last import, new modules
+    are found without restarting the process.
+
+    Returns
+    -------
+    module    : The imported module
+    """
+    module = sys.modules.get(modName)
+    if module is None:
+        importlib.invalidate_caches()
+        module = importlib.import_module(modName)
+    fname = getattr(module, '__file__', None)
+    if fname is None:
+        return module
+    try:
+        stamp = os.stat(fname).st_mtime_ns
+    except OSError:
+        return module
+    if _modStamp.setdefault(modName, stamp) != stamp:
+        module = importlib.reload(module)
+        _modStamp[modName] = stamp
+    return module
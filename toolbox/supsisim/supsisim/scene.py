@@ -8,9 +8,11 @@ from supsisim.connection import Connection
 from supsisim.dialg import RTgenDlg, SHVDlg
 from supsisim.const import VERSION, pyrun, TEMP, respath, BWmin
 from .shv import ShvClient
+from supsisim.build import diagramDict, solverOpts, exportScript, worker
+from supsisim.headless import blkInstance, blkEntry
+from supsisim.profiler import loadProfile, pathCosts, costColor
 from lxml import etree
 import os
-import subprocess
 import time
 import json
 
@@ -59,6 +61,11 @@ class Scene(QGraphicsScene):
         self.script = ''
         self.Tf = '10'
         self.prio = ''
+        self.solver = 'fixed'
+        self.rtol = '1e-6'
+        self.atol = '1e-8'
+        self.profile = False
+        self.parfile = False
 
         self.SHV = SHVInstance(self.mainw.filename)
     
@@ -91,8 +98,9 @@ class Scene(QGraphicsScene):
             }
         dataDict['init'] = init
 
-        keys = ['template', 'Ts', 'AddObj', 'script', 'Tf', 'prio']
-        vals = [self.template, self.Ts, self.addObjs, self.script, self.Tf, self.prio]
+        keys = ['template', 'Ts', 'AddObj', 'script', 'Tf', 'prio', 'solver', 'rtol', 'atol', 'profile', 'parfile']
+        vals = [self.template, self.Ts, self.addObjs, self.script, self.Tf, self.prio,
+                self.solver, self.rtol, self.atol, self.profile, self.parfile]
         dataDict['simulate'] = dict(zip(keys, vals))
 
         keys = ['used', 'ip', 'port', 'user', 'passwd', 'devid', 'mount', 'tree']
@@ -253,6 +261,13 @@ class Scene(QGraphicsScene):
             self.prio = dataDict['simulate']['prio']
         except:
             pass
+        # Solver settings, not available in older diagrams
+        sim = dataDict.get('simulate', {})
+        self.solver = sim.get('solver', 'fixed')
+        self.rtol = sim.get('rtol', '1e-6')
+        self.atol = sim.get('atol', '1e-8')
+        self.profile = sim.get('profile', False)
+        self.parfile = sim.get('parfile', False)
 
         """
         We need to access SHV field with try/except to keep support
@@ -297,6 +312,8 @@ class Scene(QGraphicsScene):
         b = Block(None, self, item['name'], item['inp'], item['outp'],
                   item['inset'], item['outset'], item['icon'],
                   item['params'], item['help'], item['width'], item['flip'] )
+        b.tsamp = item.get('tsamp', '')
+        b.dims = item.get('dims', '')
 
         b.setPos(item['pos'][0]+dx, item['pos'][1]+dy)
 
@@ -384,6 +401,12 @@ class Scene(QGraphicsScene):
         dialog.parscript.setText(self.script)
         dialog.Tf.setText(self.Tf)
         dialog.prio.setText(self.prio)
+        dialog.solver.setCurrentText(self.solver)
+        dialog.rtol.setText(self.rtol)
+        dialog.atol.setText(self.atol)
+        dialog.solverChanged(self.solver)
+        dialog.profile.setChecked(self.profile)
+        dialog.parfile.setChecked(self.parfile)
 
         # Check if there is a .py file with the same name as the template (when the settings window opens)
         script_path = os.path.join(path + 'CodeGen/templates', self.template.replace('.tmf', '.py'))
@@ -401,6 +424,11 @@ class Scene(QGraphicsScene):
         self.Ts = str(dialog.Ts.text())
         self.script = str(dialog.parscript.text())
         self.prio =  str(dialog.prio.text())
+        self.solver = str(dialog.solver.currentText())
+        self.rtol = str(dialog.rtol.text())
+        self.atol = str(dialog.atol.text())
+        self.profile = dialog.profile.isChecked()
+        self.parfile = dialog.parfile.isChecked()
         self.Tf = str(dialog.Tf.text())
 
     def SHVSetDlg(self):
@@ -518,233 +546,141 @@ class Scene(QGraphicsScene):
 
         return items
 
+    def setNodeIDs(self, dgmBlocks):
+        nid = 1
+        for item in dgmBlocks:
+            for thing in item.childItems():
+                if isinstance(thing, OutPort):
+                    thing.nodeID = str(nid)
+                    nid += 1
+
+        for item in dgmBlocks:
+            for thing in item.childItems():
+                if isinstance(thing, InPort):
+                    try:
+                        c = thing.connections[0]
+                    except:
+                        print('Problem in diagram: input signals probably not connected!')
+                    while not isinstance(c.port1, OutPort):
+                        try:
+                            c = c.port1.parent.port_in.connections[0]
+                        except (AttributeError, ValueError):
+                            raise ValueError('Problem in diagram: outputs connected together!')
+                    thing.nodeID = c.port1.nodeID
+
     def codegen(self, flag):
         dgmBlocks = self.findAllItems(self)
 
         # Clean Subsystems and reattach
         dgmBlocks = self.cleanBlkList(dgmBlocks)
         try:
-            nid = 1
-            for item in dgmBlocks:
-                for thing in item.childItems():
-                    if isinstance(thing, OutPort):
-                        thing.nodeID = str(nid)
-                        nid += 1
-
-            for item in dgmBlocks:
-                for thing in item.childItems():
-                    if isinstance(thing, InPort):
-                        try:
-                            c = thing.connections[0]
-                        except:
-                            print('Problem in diagram: input signals probably not connected!')
-                        while not isinstance(c.port1, OutPort):
-                            try:
-                                c = c.port1.parent.port_in.connections[0]
-                            except (AttributeError, ValueError):
-                                raise ValueError('Problem in diagram: outputs connected together!')
-                        thing.nodeID = c.port1.nodeID
+            self.setNodeIDs(dgmBlocks)
+            diagram = self.generateCCode(dgmBlocks)
 
-            self.generateCCode(dgmBlocks)
+            # Code generation and make in the build worker process
+            res = worker().build(diagram, './' + self.mainw.filename + '_gen', build = flag)
+            if res != 0:
+                raise ValueError('make failed')
 
             self.mainw.statusLabel.setText('Code generation OK!')
-            try:
-                os.mkdir('./' + self.mainw.filename + '_gen')
-            except:
-                pass
-            if flag:
-                cmd = pyrun + ' tmp.py'
-                try:
-                    p = subprocess.Popen(cmd, shell=True)
-                except:
-                    pass
-                p.wait()
 
             # Reset block diagram to previous state
             del(dgmBlocks)
             return True
 
-        except:
+        except Exception as e:
+            print(e)
             self.mainw.statusLabel.setText('Error by Code generation!')
             return False
 
-    def blkInstance(self, item):
-        ln = item.params.split('|')
-        txt = item.getCodeName().replace(' ','_') + ' = ' + ln[0] + '('
-        if item.inp != 0:
-            inp = '['
-            for thing in item.childItems():
-                if isinstance(thing, InPort):
-                    inp += thing.nodeID +','
-            inp = inp.rstrip(',') + ']'
-            txt += inp + ','
-
-        if item.outp != 0:
-            outp = '['
-            for thing in item.childItems():
-                if isinstance(thing, OutPort):
-                    outp += thing.nodeID +','
-            outp = outp.rstrip(',') + ']'
-            txt += outp +','
-        txt = txt.rstrip(',')
-        N = len(ln)
-        parArr = []
-        for n in range(1,N):
-            par = ln[n].split(':')
-            txt += ', ' + par[1].__str__()
-            parType = ""
-            try:
-                parType = str(par[2])
-                parType = parType.replace(' ','')
-            except:
-                parType = None
-
-            parArr.append((par[0], par[1], parType))
+    def blkNodes(self, item):
+        inNodes = []
+        outNodes = []
+        for thing in item.childItems():
+            if isinstance(thing, InPort):
+                inNodes.append(thing.nodeID)
+            elif isinstance(thing, OutPort):
+                outNodes.append(thing.nodeID)
+        return inNodes, outNodes
 
-        # Check if Block is PLOT
-        if ln[0] == 'plotBlk':
-            txt += ", '" + item.getCodeName().replace(' ','_') + "'"
-
-        txt += ')'
-        txt = txt.replace('(, ', '(')
-        return txt, parArr
+    def blkInstance(self, item):
+        inNodes, outNodes = self.blkNodes(item)
+        return blkInstance(item.getCodeName().replace(' ','_'), item.params, inNodes, outNodes)
 
     def generateCCode(self, items):
-        try:
-            f = open(self.script,'r')
-            txt = f.read()
-            f.close()
-            txt += '\n'
-        except:
-            txt = ''
-
-        dir1 = respath + 'blocks/rcpBlk'
-        txt += 'import os\n\n'
-
-        txt += 'from supsisim.RCPblk import RCPblk\n\n'
-        txt += 'dirs = os.listdir("' + dir1 + '")\n'
-        txt += 'for el in dirs:\n'
-        txt += '    files = os.listdir("' + dir1 + '" + "/" + el)\n'
-        txt += '    for f in files:\n'
-        txt += '        if not f.endswith(".py"):\n'
-        txt += '            continue\n'
-        txt += '        f = f.rstrip("*.py")\n'
-        txt += '        if True: #try:\n'
-        txt += '            cmd = "from " + el + "." + f + " import *"\n'
-        txt += '            exec(cmd)\n'
-        txt += '        #except:\n'
-        txt += '        #    print("import of block class failed " + cmd)\n'
-        txt += '        #    pass\n'
-
-        txt += 'from supsisim.RCPgen import *\n'
-        txt += 'from control import *\n'
-
-        blkList = []
-        realParNames = []
-        intParNames = []
-        sysPathList = []
+        blocks = []
         for item in items:
             if isinstance(item, Block):
- #               print(item)
-                blkList.append(item.getCodeName().replace(' ','_'))
-                blkText, blkPar = self.blkInstance(item)
-                txt += blkText + '\n'
-
-                blkRealNames = []
-                blkIntNames = []
-                for par in blkPar:
-                    if (par[2] == "double"):
-                        blkRealNames.append(par[0])
-                    elif (par[2] == "int"):
-                        blkIntNames.append(par[0])
-
-                sysPathList.append(item.syspath)
-                realParNames.append(tuple(blkRealNames))
-                intParNames.append(tuple(blkIntNames))
-
-        fname = self.mainw.filename
-        fn = open('tmp.py','w')
-        fn.write(txt)
-        fn.write('\n')
-
-        for item in blkList:
-            fn.write(item + '.name = \'' + item + '\'\n')
-
-        txt = '\nblks = ['
-        for item in blkList:
-            txt += item + ','
-        txt += ']\n\n'
-        fn.write(txt)
-
-        txt =  'realParNames = ' + str(tuple(realParNames)) + '\n'
-        txt += 'intParNames = ' + str(tuple(intParNames)) + '\n'
-        txt += 'sysPath = '+ str(sysPathList) + '\n\n'
-        fn.write(txt)
-
-        txt =  'tmp = 0\n'
-        txt += 'for item in realParNames:\n'
-        txt += '  for par in item:\n'
-        txt += '    blks[tmp].realParNames.append(par)\n'
-        txt += '  tmp += 1\n\n'
-        txt += 'tmp = 0\n'
-        txt += 'for item in intParNames:\n'
-        txt += '  for par in item:\n'
-        txt += '    blks[tmp].intParNames.append(par)\n'
-        txt += '  tmp += 1\n\n'
-        txt += 'tmp = 0\n'
-        txt += 'for item in sysPath:\n'
-        txt += '  blks[tmp].sysPath = item\n'
-        txt += '  tmp += 1\n\n'  
-        fn.write(txt)
-
-        txt =  'os.environ["SHV_USED"] = \"' + str(self.SHV.used) + '\"\n'
-        txt += 'os.environ["SHV_BROKER_IP"] = \"' + self.SHV.ip + '\"\n'
-        txt += 'os.environ["SHV_BROKER_PORT"] = \"' + self.SHV.port + '\"\n'
-        txt += 'os.environ["SHV_BROKER_USER"] = \"' + self.SHV.user + '\"\n'
-        txt += 'os.environ["SHV_BROKER_PASSWORD"] = \"' + self.SHV.passw + '\"\n'
-        txt += 'os.environ["SHV_BROKER_DEV_ID"] = \"' + self.SHV.devid + '\"\n'
-        txt += 'os.environ["SHV_BROKER_MOUNT"] = \"' + self.SHV.mount + "/" + self.SHV.devid + '\"\n'
-        txt += 'os.environ["SHV_TREE_TYPE"] = \"' + self.SHV.tree + '\"\n\n'
-        fn.write(txt)
-
-        fnm = './' + fname + '_gen'
-
-        fn.write('fname = ' + "'" + fname + "'\n")
-        fn.write('os.chdir("'+ fnm +'")\n')
-        fn.write('genCode(fname, ' + self.Ts + ', blks, "' + self.template + '")\n')
-        fn.write("genMake(fname, '" + self.template + "', addObj = '" + self.addObjs + "')\n")
-        fn.write('\nimport os\n')
-        fn.write('os.system("make clean")\n')
-        fn.write('os.system("make")\n')
-        fn.write('os.chdir("..")\n')
-        fn.close()
+                inNodes, outNodes = self.blkNodes(item)
+                entry = blkEntry(item.getCodeName().replace(' ','_'), item.params,
+                                 inNodes, outNodes, item.syspath)
+                if getattr(item, 'tsamp', '') != '':
+                    entry['tsamp'] = item.tsamp
+                if getattr(item, 'dims', '') != '':
+                    entry['dims'] = item.dims
+                blocks.append(entry)
+
+        shv = {'used' : self.SHV.used, 'ip' : self.SHV.ip, 'port' : self.SHV.port,
+               'user' : self.SHV.user, 'passw' : self.SHV.passw, 'devid' : self.SHV.devid,
+               'mount' : self.SHV.mount, 'tree' : self.SHV.tree}
+
+        cgOpts = solverOpts({'solver' : self.solver, 'rtol' : self.rtol, 'atol' : self.atol})
+        if self.profile:
+            cgOpts['profile'] = True
+        if self.parfile:
+            cgOpts['parFile'] = True
+        return diagramDict(self.mainw.filename, self.Ts, self.template, blocks,
+                           addObj = self.addObjs, script = self.script, shv = shv,
+                           cgOpts = cgOpts)
+
+    def exportScript(self):
+        # Export the generation as stand-alone python script (tmp.py)
+        dgmBlocks = self.findAllItems(self)
+        dgmBlocks = self.cleanBlkList(dgmBlocks)
+        try:
+            self.setNodeIDs(dgmBlocks)
+            diagram = self.generateCCode(dgmBlocks)
+            exportScript(diagram, './' + self.mainw.filename + '_gen')
+            self.mainw.statusLabel.setText('tmp.py exported')
+        except:
+            self.mainw.statusLabel.setText('Error by Code generation!')
 
     def simrun(self):
-        if self.codegen(False):
-            cmd  = '\n'
-            cmd += 'import matplotlib.pyplot as plt\n'
-            cmd += 'import numpy as np\n\n'
+        # The old executable is removed, the <model>_gen folder is kept
+        # for the code generation cache
+        try:
+            os.remove(self.mainw.filename)
+        except OSError:
+            pass
+        if self.codegen(True):
             prio = self.prio.replace(' ','')
             if prio != '':
                 prio = ' -p ' + prio
-            cmd += 'os.system("./' + self.mainw.filename + prio + ' -f ' + self.Tf + '")\n'
-            fnm = self.mainw.filename
-            cmd += 'os.system("' + 'rm -r ' + fnm + ' ' + fnm + '_gen' + '" )'
-
-            try:
-                os.mkdir(TEMP + '/' + self.mainw.filename + '_gen')
-            except:
-                pass
-            f = open('tmp.py','a')
-            f.write(cmd)
-            f.close()
-            cmd = pyrun + ' tmp.py'
+            cmd = './' + self.mainw.filename + prio + ' -f ' + self.Tf
             try:
                 os.system(cmd)
                 self.mainw.statusLabel.setText('Simulation finished')
             except:
                 pass
 
+    def showProfile(self):
+        # Colour the blocks by the mean execution time of the last run
+        blocks = [item for item in self.items() if isinstance(item, Block)]
+        fname = self.mainw.filename + '_prof.json'
+        try:
+            costs, total = pathCosts(loadProfile(fname))
+        except (OSError, ValueError, KeyError):
+            for item in blocks:
+                item.setCost(None, None)
+            self.mainw.statusLabel.setText('No block profile ' + fname)
+            return
+        paths = [item.syspath if item.syspath != '' else '/' + item.name for item in blocks]
+        maxCost = max([costs.get(p, 0.0) for p in paths], default=0.0)
+        for item, p in zip(blocks, paths):
+            cost = costs.get(p)
+            item.setCost(cost, costColor(cost, maxCost) if cost is not None else None)
+        self.mainw.statusLabel.setText('Block profile: ISR mean %.0f ns' % total)
+
     def debugInfo(self):
         items = self.items()
         dgmBlocks = []
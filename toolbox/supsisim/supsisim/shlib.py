@@ -0,0 +1,373 @@
+"""
+Models built as shared library (template shlib.tmf)
+
+The generated code is loaded with ctypes into the Python process: the
+signals and the real parameters of the blocks are NumPy arrays mapped
+on the memory of the model (no copy), the model is stepped N sampling
+periods per call. The following commands are provided:
+
+  ShlibModel     - Model loaded from <model>.so
+  ShlibBatch     - K instances of the model stepped in lockstep
+  buildShlib     - Generate and build a .dgm file as shared library
+
+Example:
+
+  m = ShlibModel('dc_motor.so')
+  m.init()
+  m.par('Gain_3')[0] = 2.0         # realPar of a block, changed in place
+  y = m.run(1000, [m.node(4)])     # 1000 samples of the node 4
+  m.end()
+
+  b = ShlibBatch('dc_motor.so')
+  P = b.parArray(50)               # 50 instances, parameters of the model
+  P[:, b.parIndex('Gain_3')] = np.linspace(0.5, 5.0, 50)
+  b.init(P)
+  y = b.run(1000, [b.node(4)])     # 50 x 1000 x 1
+  b.end()
+
+"""
+
+import os
+import shutil
+import ctypes
+import tempfile
+
+import numpy as np
+
+from supsisim.RCPgen import SHLIB_TEMPLATE
+
+c_int_p = ctypes.POINTER(ctypes.c_int)
+c_double_p = ctypes.POINTER(ctypes.c_double)
+
+def intArray(lib, name, n):
+    """Copy of the C table name[n] of ints"""
+    return np.ctypeslib.as_array((ctypes.c_int * n).in_dll(lib, name)).copy() if n > 0 else np.zeros(0, dtype=int)
+
+def strArray(lib, name, n):
+    """List of the C table name[n] of strings"""
+    return [s.decode() for s in (ctypes.c_char_p * n).in_dll(lib, name)] if n > 0 else []
+
+class ShlibModel:
+    """Model built with the template shlib.tmf
+
+    Call: m = ShlibModel(fname, private)
+
+    Parameters
+    ----------
+    fname     : <model>.so
+    private   : load a private copy of the library, so that many
+                instances of the same model can be used in the process
+                (the state of a model is in its static variables)
+
+    Attributes
+    ----------
+    model     : Model name
+    Tsamp     : Sampling time
+    signals   : All the signals (NumPy view of the signal array)
+    blocks    : Names of the blocks (as in the generated code)
+    paths     : System paths of the blocks
+    """
+
+    def __init__(self, fname, private=False):
+        fname = os.path.abspath(fname)
+        self.tmp = None
+        if private:
+            self.tmp = tempfile.mkdtemp(prefix='pysim_')
+            fname = shutil.copy(fname, self.tmp)
+        lib = ctypes.CDLL(fname)
+        self.lib = lib
+        self.model = ctypes.c_char_p.in_dll(lib, 'pysim_model').value.decode()
+        m = self.model
+
+        lib.pysim_init.restype = None
+        lib.pysim_end.restype = None
+        lib.pysim_step.argtypes = [ctypes.c_long]
+        lib.pysim_step.restype = None
+        lib.pysim_run.argtypes = [ctypes.c_long, c_int_p, ctypes.c_int, c_double_p]
+        lib.pysim_run.restype = None
+        lib.pysim_time.restype = ctypes.c_double
+        lib.pysim_tsamp.restype = ctypes.c_double
+        self.Tsamp = lib.pysim_tsamp()
+
+        N = ctypes.c_int.in_dll(lib, m + '_nblocks').value
+        nsig = ctypes.c_int.in_dll(lib, m + '_nsignals').value
+        nnodes = ctypes.c_int.in_dll(lib, m + '_nnodes').value
+        self.signals = np.ctypeslib.as_array(c_double_p.in_dll(lib, m + '_signals'), shape=(nsig,))
+        self.nodeSlot = intArray(lib, m + '_node_slot', nnodes+1)
+        self.nodeDim = intArray(lib, m + '_node_dim', nnodes+1)
+        self.blocks = strArray(lib, m + '_blk_name', N)
+        self.paths = strArray(lib, m + '_blk_path', N)
+
+        self.realPar = []
+        self.realParNames = []
+        pars = (c_double_p * N).in_dll(lib, m + '_blk_realPar') if N > 0 else []
+        npars = intArray(lib, m + '_blk_realParNum', N)
+        names = (ctypes.POINTER(ctypes.c_char_p) * N).in_dll(lib, m + '_blk_realParNames') if N > 0 else []
+        for n in range(0, N):
+            if npars[n] != 0:
+                self.realPar.append(np.ctypeslib.as_array(pars[n], shape=(int(npars[n]),)))
+                self.realParNames.append([names[n][k].decode() for k in range(0, npars[n])])
+            else:
+                self.realPar.append(np.zeros(0))
+                self.realParNames.append([])
+        nout = intArray(lib, m + '_blk_nout', N)
+        pout = intArray(lib, m + '_blk_pout', int(nout.sum()))
+        start = np.concatenate(([0], np.cumsum(nout)))
+        self.pout = [pout[start[n]:start[n+1]].tolist() for n in range(0, N)]
+
+        # Parameters at load time (the continuous blocks keep their states in realPar)
+        self.realPar0 = [p.copy() for p in self.realPar]
+        self.running = False
+
+    def blkIndex(self, name):
+        """Index of a block given by name (e.g. 'Gain_3') or system path"""
+        if name in self.blocks:
+            return self.blocks.index(name)
+        if name in self.paths:
+            return self.paths.index(name)
+        raise KeyError('Block ' + str(name) + ' not found in ' + self.model)
+
+    def par(self, name):
+        """Real parameters of a block (NumPy view, changes act at the next step)"""
+        return self.realPar[self.blkIndex(name)]
+
+    def node(self, n):
+        """Signal of the node n (NumPy view of its dimension)"""
+        if n <= 0 or n >= len(self.nodeSlot) or self.nodeSlot[n] < 0:
+            raise KeyError('Node ' + str(n) + ' not used in ' + self.model)
+        k = self.nodeSlot[n]
+        return self.signals[k:k+self.nodeDim[n]]
+
+    def output(self, name, k=0):
+        """Output k of a block given by name or system path (NumPy view)"""
+        return self.node(self.pout[self.blkIndex(name)][k])
+
+    def slots(self, sigs):
+        """Offsets in the signal array of nodes (int) and views (see node)"""
+        idx = []
+        for sig in sigs:
+            if isinstance(sig, np.ndarray):
+                off = (sig.__array_interface__['data'][0] - self.signals.__array_interface__['data'][0]) // 8
+                idx += list(range(off, off + sig.size))
+            else:
+                k = self.node(int(sig))
+                idx += self.slots([k])
+        return idx
+
+    @property
+    def t(self):
+        """Time of the next step"""
+        return self.lib.pysim_time()
+
+    def init(self):
+        """Initialize the blocks, the time starts from 0"""
+        if self.running:
+            self.end()
+        self.lib.pysim_init()
+        self.running = True
+
+    def step(self, n=1):
+        """Execute n sampling periods"""
+        self.lib.pysim_step(n)
+
+    def run(self, n, sigs):
+        """Execute n sampling periods and record signals
+
+        Call: y = m.run(n, sigs)
+
+        Parameters
+        ----------
+        n         : Number of sampling periods
+        sigs      : Signals to record: node numbers or views returned by
+                    node/output
+
+        Returns
+        -------
+        y         : Array n x (total width of the signals), row k holds
+                    the signals after the period k
+        """
+        idx = np.ascontiguousarray(self.slots(sigs), dtype=np.intc)
+        y = np.empty((n, len(idx)))
+        self.lib.pysim_run(n, idx.ctypes.data_as(c_int_p), len(idx), y.ctypes.data_as(c_double_p))
+        return y
+
+    def end(self):
+        """Terminate the blocks"""
+        if self.running:
+            self.lib.pysim_end()
+            self.running = False
+
+    def reset(self):
+        """Restore the parameters and states of the load time and initialize"""
+        self.end()
+        for p, p0 in zip(self.realPar, self.realPar0):
+            p[:] = p0
+        self.init()
+
+    def close(self):
+        """Terminate the model and remove the private copy of the library"""
+        self.end()
+        if self.tmp is not None:
+            shutil.rmtree(self.tmp, ignore_errors=True)
+            self.tmp = None
+
+    def __enter__(self):
+        self.init()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+class ShlibBatch(ShlibModel):
+    """K instances of a model built with the template shlib.tmf
+
+    Call: b = ShlibBatch(fname, private)
+
+    The instances are stepped in lockstep by one call into the library,
+    their real parameters, signals and states are rows of arrays owned
+    by this object (K x npar, K x nsignals, ...): the blocks of the model
+    are pointed to an instance before its step. The states kept by the
+    blocks in static variables of their C files are shared.
+
+    Parameters
+    ----------
+    fname     : <model>.so
+    private   : load a private copy of the library (default), the
+                library of a batch is not used by a ShlibModel
+
+    Attributes
+    ----------
+    parNames  : Names of the real parameters ('<block>.<name>')
+    par0      : Real parameters of the model (npar)
+    pars      : Real parameters of the instances (K x npar), changes
+                act at the next step
+    sigs      : Signals of the instances (K x nsignals)
+    """
+
+    def __init__(self, fname, private=True):
+        super().__init__(fname, private)
+        lib = self.lib
+        lib.pysim_batch_init.argtypes = [ctypes.c_int, c_double_p, c_double_p, ctypes.c_void_p, ctypes.c_void_p]
+        lib.pysim_batch_init.restype = ctypes.c_int
+        lib.pysim_batch_run.argtypes = [ctypes.c_long, c_double_p]
+        lib.pysim_batch_run.restype = None
+        lib.pysim_batch_end.restype = None
+        lib.pysim_batch_nstate.restype = ctypes.c_int
+        self.nstate = lib.pysim_batch_nstate()
+
+        self.parOffset = np.concatenate(([0], np.cumsum([p.size for p in self.realPar]))).astype(int)
+        self.parNames = [blk + '.' + name for blk, names in zip(self.blocks, self.realParNames) for name in names]
+        self.par0 = np.concatenate(self.realPar0) if len(self.realPar0) != 0 else np.zeros(0)
+        self.pars0 = None
+        self.pars = None
+        self.sigs = None
+
+    @property
+    def K(self):
+        """Number of instances"""
+        return 0 if self.pars is None else self.pars.shape[0]
+
+    def parIndex(self, name, k=0):
+        """Column of parameters for a block and a parameter (index or name)"""
+        n = self.blkIndex(name)
+        if isinstance(k, str):
+            k = self.realParNames[n].index(k)
+        if k < 0 or k >= self.realPar[n].size:
+            raise KeyError('Parameter ' + str(k) + ' not found in ' + str(name))
+        return int(self.parOffset[n]) + k
+
+    def parArray(self, K):
+        """K rows of the parameters of the model (K x npar)"""
+        return np.tile(self.par0, (K, 1))
+
+    def init(self, pars):
+        """Initialize the instances
+
+        Call: b.init(pars)
+
+        Parameters
+        ----------
+        pars      : Real parameters of the instances (K x npar), see
+                    parArray and parIndex; K is the number of instances
+        """
+        pars = np.array(pars, dtype=float, ndmin=2)
+        if pars.shape[1] != self.par0.size:
+            raise ValueError('Parameters of ' + self.model + ': ' + str(self.par0.size) + ' columns expected')
+        if self.running:
+            self.end()
+        K = pars.shape[0]
+        self.pars0 = pars.copy()
+        self.pars = np.ascontiguousarray(pars)
+        self.sigs = np.zeros((K, self.signals.size))
+        self.ptrs = (ctypes.c_void_p * max(K*len(self.blocks), 1))()
+        self.state = np.zeros((K, self.nstate), dtype=np.uint8)
+        res = self.lib.pysim_batch_init(K, self.pars.ctypes.data_as(c_double_p), self.sigs.ctypes.data_as(c_double_p),
+                                        self.ptrs, self.state.ctypes.data_as(ctypes.c_void_p))
+        if res != 0:
+            raise MemoryError('Initialization of the instances of ' + self.model + ' failed')
+        self.running = True
+
+    def step(self, n=1):
+        """Execute n sampling periods of all the instances"""
+        self.lib.pysim_batch_run(n, None)
+
+    def run(self, n, sigs=None):
+        """Execute n sampling periods of all the instances and record signals
+
+        Call: y = b.run(n, sigs)
+
+        Parameters
+        ----------
+        n         : Number of sampling periods
+        sigs      : Signals to record (see ShlibModel.run), all the
+                    signals if None
+
+        Returns
+        -------
+        y         : Array K x n x (total width of the signals)
+        """
+        y = np.empty((self.K, n, self.signals.size))
+        self.lib.pysim_batch_run(n, y.ctypes.data_as(c_double_p))
+        if sigs is None:
+            return y
+        return y[:, :, self.slots(sigs)]
+
+    def end(self):
+        """Terminate the instances"""
+        if self.running:
+            self.lib.pysim_batch_end()
+            self.running = False
+
+    def reset(self):
+        """Initialize again the instances with the parameters given to init"""
+        self.init(self.pars0)
+
+    def __enter__(self):
+        return self
+
+def buildShlib(fname, outdir=None, cgOpts=None):
+    """Generate and build a .dgm file as shared library
+
+    Call: buildShlib(fname, outdir, cgOpts)
+
+    Parameters
+    ----------
+    fname     : .dgm file
+    outdir    : Folder for the generated files (default: <model>_gen in
+                the folder of the .dgm file), <model>.so is built in its
+                parent folder
+    cgOpts    : Additional keyword arguments of genCode
+
+    Returns
+    -------
+    so        : Path of <model>.so
+    """
+    from supsisim.headless import buildDgm
+
+    name, res, msg = buildDgm(fname, outdir, SHLIB_TEMPLATE, True, cgOpts)
+    if res != 0:
+        raise RuntimeError('Build of ' + fname + ' failed: ' + (msg or 'make exit code ' + str(res)))
+    model = os.path.basename(fname).split('.')[0]
+    if outdir is None:
+        outdir = os.path.join(os.path.dirname(os.path.abspath(fname)), model + '_gen')
+    return os.path.join(os.path.dirname(os.path.abspath(outdir)), model + '.so')
@@ -0,0 +1,280 @@
+"""
+Parameter sweeps over one compiled simulation
+
+The executable of a model generated with genCode(..., parFile=True) and
+the template sim.tmf is run once per point of a design, with the
+parameters of the point given in a parameter file (option -P, see
+parfile.py) and the final time given with -f: no code generation and no
+compilation per point. The runs are executed in parallel (at most one
+per core), every run in its own folder, and their outputs are collected
+in NumPy arrays. The following commands are provided:
+
+  gridDesign     - Full factorial design of parameter values
+  randomDesign   - Uniform random design of parameter values
+  readOutput     - Numeric table of the output of a run
+  sweep          - Run the executable over a design
+  main           - Command line interface
+
+Example:
+
+  names, vals = gridDesign({'PID_3.Kp' : [1.0, 2.0, 4.0], 'PID_3.Ti' : [0.1, 0.2]})
+  res = sweep('dc_motor', names, vals, Tf=2.0, timeout=60)
+  Y = res['Y']                       # 6 x samples x columns of the print block
+
+Usage from the command line:
+
+  python3 -m supsisim.sweep dc_motor -f 2 --grid PID_3.Kp=1,2,4 --grid PID_3.Ti=0.1,0.2 -o res.npz
+  python3 -m supsisim.sweep dc_motor -f 2 --random PID_3.Kp=0.5:5 -n 100 --seed 1 -o res.npz
+
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import itertools
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from supsisim.parfile import patchParFile, readParFile
+
+def gridDesign(axes):
+    """Full factorial design of parameter values
+
+    Call: names, vals = gridDesign(axes)
+
+    Parameters
+    ----------
+    axes      : dict '<block>.<name>' -> list of values
+
+    Returns
+    -------
+    names     : Parameter names
+    vals      : Array npoints x nparameters (the last parameter varies
+                fastest)
+    """
+    names = list(axes)
+    vals = np.array(list(itertools.product(*[list(axes[name]) for name in names])), dtype=float)
+    return names, vals.reshape(-1, len(names))
+
+def randomDesign(ranges, n, seed=None):
+    """Uniform random design of parameter values
+
+    Call: names, vals = randomDesign(ranges, n, seed)
+
+    Parameters
+    ----------
+    ranges    : dict '<block>.<name>' -> (low, high)
+    n         : Number of points
+    seed      : Seed of the random generator
+
+    Returns
+    -------
+    names     : Parameter names
+    vals      : Array n x nparameters
+    """
+    names = list(ranges)
+    rng = np.random.default_rng(seed)
+    low = np.array([ranges[name][0] for name in names], dtype=float)
+    high = np.array([ranges[name][1] for name in names], dtype=float)
+    return names, low + (high - low) * rng.random((n, len(names)))
+
+def readOutput(txt):
+    """Numeric table of the output of a run (rows of numbers separated by
+    blanks, as written by the print and toFile blocks); the lines which
+    are not numeric are skipped"""
+    rows = []
+    for line in txt.splitlines():
+        try:
+            row = [float(v) for v in line.split()]
+        except ValueError:
+            continue
+        if len(row) != 0:
+            rows.append(row)
+    if len(rows) == 0:
+        return np.zeros((0, 0))
+    width = len(rows[0])
+    if any(len(row) != width for row in rows):
+        raise ValueError('Rows of different lengths in the output')
+    return np.array(rows)
+
+def runOne(exe, parFile, names, vals, rundir, Tf, timeout, output):
+    """One run of the sweep, returns (status, exit code, data, error, time)"""
+    os.makedirs(rundir, exist_ok=True)
+    pars = os.path.join(rundir, 'sweep.par')
+    t0 = time.perf_counter()
+    try:
+        patchParFile(parFile, dict(zip(names, vals)), pars, only=True)
+        res = subprocess.run([exe, '-f', repr(float(Tf)), '-P', pars], cwd=rundir,
+                             capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return 'timeout', None, None, 'no exit after ' + str(timeout) + ' s', time.perf_counter() - t0
+    except (OSError, KeyError, ValueError) as e:
+        return 'failed', None, None, str(e.args[0] if isinstance(e, KeyError) else e), time.perf_counter() - t0
+    dt = time.perf_counter() - t0
+    if res.returncode != 0:
+        return 'failed', res.returncode, None, res.stderr.strip()[-500:], dt
+    try:
+        if output is None:
+            data = readOutput(res.stdout)
+        else:
+            with open(os.path.join(rundir, output)) as f:
+                data = readOutput(f.read())
+    except (OSError, ValueError) as e:
+        return 'failed', res.returncode, None, str(e), dt
+    return 'ok', res.returncode, data, '', dt
+
+def sweep(exe, names, vals, Tf, parFile=None, output=None, workdir=None, jobs=None, timeout=None):
+    """Run the executable over a design
+
+    Call: res = sweep(exe, names, vals, Tf, parFile, output, workdir, jobs, timeout)
+
+    Parameters
+    ----------
+    exe       : Executable built with sim.tmf and parFile=True
+    names     : Parameter names ('<block>.<name>', see gridDesign)
+    vals      : Array npoints x nparameters
+    Tf        : Final time of the runs (option -f)
+    parFile   : Parameter file of the model (default: <model>_gen/<model>.par
+                in the folder of the executable)
+    output    : Output file written by the model in the folder of the run,
+                None for the standard output (print block)
+    workdir   : Folder of the runs (run_<k>, kept), a temporary folder
+                removed at the end if None
+    jobs      : Maximal number of parallel runs (default and limit: the
+                number of cores)
+    timeout   : Time limit of a run in s, None for no limit
+
+    Returns
+    -------
+    res       : dict with
+                'names', 'values'  : the design
+                'status'           : 'ok', 'failed' or 'timeout' per run
+                'returncode'       : exit codes (-1 if not terminated)
+                'error', 'time'    : error message and duration per run
+                'data'             : output table per run (None if failed)
+                'Y'                : outputs npoints x rows x columns (NaN
+                                     for the failed runs), None if the
+                                     tables have different shapes
+                'table'            : all the rows of the outputs in one
+                                     table, columns run, parameters, outputs
+    """
+    exe = os.path.abspath(exe)
+    model = os.path.basename(exe)
+    if parFile is None:
+        parFile = os.path.join(os.path.dirname(exe), model + '_gen', model + '.par')
+    parFile = os.path.abspath(parFile)
+    known = set(blk + '.' + name for blk, name, typ, idx, val in readParFile(parFile)[1])
+    missing = [name for name in names if name not in known]
+    if len(missing) != 0:
+        raise KeyError('Parameters not found in ' + parFile + ': ' + ', '.join(missing))
+    vals = np.array(vals, dtype=float).reshape(-1, len(names))
+    npts = vals.shape[0]
+    ncpu = os.cpu_count() or 1
+    jobs = max(1, min(jobs or ncpu, ncpu, max(npts, 1)))
+
+    tmp = workdir is None
+    workdir = tempfile.mkdtemp(prefix='sweep_') if tmp else os.path.abspath(workdir)
+    dirs = [os.path.join(workdir, 'run_%05d' % k) for k in range(0, npts)]
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            runs = list(pool.map(lambda k: runOne(exe, parFile, names, vals[k], dirs[k], Tf, timeout, output),
+                                 range(0, npts)))
+    finally:
+        if tmp:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    res = {'names' : list(names), 'values' : vals,
+           'status' : [r[0] for r in runs],
+           'returncode' : np.array([-1 if r[1] is None else r[1] for r in runs], dtype=int),
+           'data' : [r[2] for r in runs],
+           'error' : [r[3] for r in runs],
+           'time' : np.array([r[4] for r in runs])}
+
+    ok = [d for d in res['data'] if d is not None]
+    shapes = set(d.shape for d in ok)
+    if len(ok) != 0 and len(shapes) == 1:
+        Y = np.full((npts,) + ok[0].shape, np.nan)
+        for k, d in enumerate(res['data']):
+            if d is not None:
+                Y[k] = d
+        res['Y'] = Y
+    else:
+        res['Y'] = None
+
+    widths = set(d.shape[1] for d in ok if d.size != 0)
+    if len(widths) == 1:
+        parts = [np.hstack((np.full((d.shape[0], 1), float(k)), np.tile(vals[k], (d.shape[0], 1)), d))
+                 for k, d in enumerate(res['data']) if d is not None and d.size != 0]
+        res['table'] = np.vstack(parts)
+    else:
+        res['table'] = np.zeros((0, 1 + len(names)))
+    return res
+
+def parseAxis(arg):
+    """'<block>.<name>=v1,v2,...' or '<block>.<name>=low:high'"""
+    if '=' not in arg:
+        raise ValueError('expected BLOCK.NAME=VALUES: ' + arg)
+    name, val = arg.split('=', 1)
+    if ':' in val:
+        return name, tuple(float(v) for v in val.split(':', 1))
+    return name, [float(v) for v in val.split(',')]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m supsisim.sweep',
+                                     description='Run a simulation executable over a design of parameters')
+    parser.add_argument('exe', help='executable built with sim.tmf and a parameter file')
+    parser.add_argument('-f', '--final-time', type=float, required=True, help='final time of the runs')
+    parser.add_argument('--grid', action='append', default=[], metavar='BLOCK.NAME=V1,V2,...',
+                        help='values of a parameter (full factorial design)')
+    parser.add_argument('--random', action='append', default=[], metavar='BLOCK.NAME=LOW:HIGH',
+                        help='range of a parameter (uniform random design)')
+    parser.add_argument('-n', '--points', type=int, default=10, help='points of the random design')
+    parser.add_argument('--seed', type=int, default=None, help='seed of the random design')
+    parser.add_argument('-P', '--parfile', default=None, help='parameter file of the model')
+    parser.add_argument('--output', default=None, help='output file of the model (default: standard output)')
+    parser.add_argument('-w', '--workdir', default=None, help='folder of the runs (default: temporary)')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='parallel runs (default: number of cores)')
+    parser.add_argument('--timeout', type=float, default=None, help='time limit of a run in s')
+    parser.add_argument('-o', '--out', default=None, help='results written as .npz')
+    args = parser.parse_args(argv)
+
+    try:
+        if len(args.grid) != 0 and len(args.random) != 0:
+            parser.error('use either --grid or --random')
+        if len(args.grid) != 0:
+            names, vals = gridDesign(dict(parseAxis(a) for a in args.grid))
+        elif len(args.random) != 0:
+            names, vals = randomDesign(dict(parseAxis(a) for a in args.random), args.points, args.seed)
+        else:
+            parser.error('no parameters to sweep')
+    except (ValueError, TypeError) as e:
+        parser.error(str(e))
+
+    try:
+        res = sweep(args.exe, names, vals, args.final_time, args.parfile, args.output,
+                    args.workdir, args.jobs, args.timeout)
+    except KeyError as e:
+        print(e.args[0])
+        return 1
+    except (ValueError, OSError) as e:
+        print(str(e))
+        return 1
+    nok = res['status'].count('ok')
+    print('Sweep: ' + str(nok) + ' of ' + str(len(res['status'])) + ' runs ok, ' +
+          '%.2f s per run' % (res['time'].mean() if len(res['time']) != 0 else 0.0))
+    for k, (st, err) in enumerate(zip(res['status'], res['error'])):
+        if st != 'ok':
+            print('  run ' + str(k) + ' ' + st + ': ' + err)
+    if args.out is not None:
+        np.savez(args.out, names=np.array(res['names']), values=res['values'],
+                 status=np.array(res['status']), returncode=res['returncode'],
+                 table=res['table'], **({'Y' : res['Y']} if res['Y'] is not None else {}))
+    return 0 if nok == len(res['status']) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,276 @@
+#include <pyblock.h>
+#include <stdio.h>
+#include <stdlib.h>
+
+#undef CONF_SHV_USED
+
+#ifdef CONF_SHV_USED
+#include <shv_tree.h>
+#include <shv_pysim.h>
+#include <shv_methods.h>
+#include <shv_com.h>
+#include <ulut/ul_utdefs.h>
+
+#define CONF_SHV_TREE_TYPE 0
+#undef CONF_SHV_TREE_STATIC
+#endif /* CONF_SHV_USED */
+
+/* Function prototypes */
+
+void constant(int Flag, python_block *block);
+void css(int Flag, python_block *block);
+void dss(int Flag, python_block *block);
+void plot(int Flag, python_block *block);
+void printBlk(int Flag, python_block *block);
+void satur(int Flag, python_block *block);
+void scope(int Flag, python_block *block);
+void sinus(int Flag, python_block *block);
+void sum(int Flag, python_block *block);
+
+double refmodel_get_tsamp(void)
+{
+  return (0.01);
+}
+
+python_block block_refmodel[9];
+
+static int nx_0[] = {0, 0};
+static double realPar_1[] = {1.5};
+static char *realParNames_1[] = {"Value"};
+static int nx_1[] = {0, 0};
+static double realPar_2[] = {1.0, 0.5, 0.0, 0.1, 1e-05};
+static char *realParNames_2[] = {"Amp", "Freq", "Phase", "Bias", "Delay"};
+static int nx_2[] = {0, 0};
+static double realPar_3[] = {0.0, 0.0, 1.0, -2.0, -3.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0, 0.0};
+static char *realParNames_3[] = {"double0", "double1", "double2", "double3", "double4", "double5", "double6", "double7", "double8", "double9", "double10", "double11"};
+static int intPar_3[] = {2, 1, 1, 1, 5, 7, 9, 10};
+static char *intParNames_3[] = {"int0", "int1", "int2", "int3", "int4", "int5", "int6", "int7"};
+static int nx_3[] = {2, 0};
+static double realPar_4[] = {0.9, 1.0, 2.0, 0.5, 0.0};
+static char *realParNames_4[] = {"double0", "double1", "double2", "double3", "double4"};
+static int intPar_4[] = {1, 1, 1, 0, 1, 2, 3, 4};
+static char *intParNames_4[] = {"int0", "int1", "int2", "int3", "int4", "int5", "int6", "int7"};
+static int nx_4[] = {0, 1};
+static double realPar_5[] = {3000.0, -3000.0};
+static char *realParNames_5[] = {"Upper", "Lower"};
+static int nx_5[] = {0, 0};
+static double realPar_6[] = {1.0, -1.0, 0.3333333333333333};
+static char *realParNames_6[] = {"double0", "double1", "double2"};
+static int nx_6[] = {0, 0};
+static int nx_7[] = {0, 0};
+static int intPar_8[] = {1, 10, 0};
+static char *intParNames_8[] = {"int0", "int1", "int2"};
+static int nx_8[] = {0, 0};
+
+/* Nodes */
+static double Node_1[] = {0.0};
+static double Node_2[] = {0.0};
+static double Node_3[] = {0.0};
+static double Node_4[] = {0.0};
+static double Node_5[] = {0.0};
+static double Node_6[] = {0.0};
+
+/* Input and outputs */
+static void *outptr_1[] = {&Node_1};
+static void *outptr_2[] = {&Node_2};
+static void *inptr_3[]  = {&Node_3};
+static void *outptr_3[] = {&Node_4};
+static void *inptr_4[]  = {&Node_4};
+static void *outptr_4[] = {&Node_5};
+static void *inptr_5[]  = {&Node_5};
+static void *outptr_5[] = {&Node_6};
+static void *inptr_6[]  = {&Node_1,&Node_2,&Node_6};
+static void *outptr_6[] = {&Node_3};
+static void *inptr_7[]  = {&Node_4,&Node_5,&Node_6};
+static void *inptr_8[]  = {&Node_3};
+
+
+/* Initialization function */
+
+void refmodel_init(void)
+{
+
+/* Block definition */
+
+  block_refmodel[0].nin  = 0;
+  block_refmodel[0].nout = 0;
+  block_refmodel[0].nx   = nx_0;
+  block_refmodel[0].u    = NULL;
+  block_refmodel[0].y    = NULL;
+  block_refmodel[0].realPar = NULL;
+  block_refmodel[0].realParNum = 0;
+  block_refmodel[0].realParNames = NULL;
+  block_refmodel[0].intPar = NULL;
+  block_refmodel[0].intParNum = 0;
+  block_refmodel[0].intParNames = NULL;
+  block_refmodel[0].str = "";
+  block_refmodel[0].ptrPar = NULL;
+
+  block_refmodel[1].nin  = 0;
+  block_refmodel[1].nout = 1;
+  block_refmodel[1].nx   = nx_1;
+  block_refmodel[1].u    = NULL;
+  block_refmodel[1].y    = outptr_1;
+  block_refmodel[1].realPar = realPar_1;
+  block_refmodel[1].realParNum = 1;
+  block_refmodel[1].realParNames = realParNames_1;
+  block_refmodel[1].intPar = NULL;
+  block_refmodel[1].intParNum = 0;
+  block_refmodel[1].intParNames = NULL;
+  block_refmodel[1].str = "";
+  block_refmodel[1].ptrPar = NULL;
+
+  block_refmodel[2].nin  = 0;
+  block_refmodel[2].nout = 1;
+  block_refmodel[2].nx   = nx_2;
+  block_refmodel[2].u    = NULL;
+  block_refmodel[2].y    = outptr_2;
+  block_refmodel[2].realPar = realPar_2;
+  block_refmodel[2].realParNum = 5;
+  block_refmodel[2].realParNames = realParNames_2;
+  block_refmodel[2].intPar = NULL;
+  block_refmodel[2].intParNum = 0;
+  block_refmodel[2].intParNames = NULL;
+  block_refmodel[2].str = "";
+  block_refmodel[2].ptrPar = NULL;
+
+  block_refmodel[3].nin  = 1;
+  block_refmodel[3].nout = 1;
+  block_refmodel[3].nx   = nx_3;
+  block_refmodel[3].u    = inptr_3;
+  block_refmodel[3].y    = outptr_3;
+  block_refmodel[3].realPar = realPar_3;
+  block_refmodel[3].realParNum = 12;
+  block_refmodel[3].realParNames = realParNames_3;
+  block_refmodel[3].intPar = intPar_3;
+  block_refmodel[3].intParNum = 8;
+  block_refmodel[3].intParNames = intParNames_3;
+  block_refmodel[3].str = "";
+  block_refmodel[3].ptrPar = NULL;
+
+  block_refmodel[4].nin  = 1;
+  block_refmodel[4].nout = 1;
+  block_refmodel[4].nx   = nx_4;
+  block_refmodel[4].u    = inptr_4;
+  block_refmodel[4].y    = outptr_4;
+  block_refmodel[4].realPar = realPar_4;
+  block_refmodel[4].realParNum = 5;
+  block_refmodel[4].realParNames = realParNames_4;
+  block_refmodel[4].intPar = intPar_4;
+  block_refmodel[4].intParNum = 8;
+  block_refmodel[4].intParNames = intParNames_4;
+  block_refmodel[4].str = "";
+  block_refmodel[4].ptrPar = NULL;
+
+  block_refmodel[5].nin  = 1;
+  block_refmodel[5].nout = 1;
+  block_refmodel[5].nx   = nx_5;
+  block_refmodel[5].u    = inptr_5;
+  block_refmodel[5].y    = outptr_5;
+  block_refmodel[5].realPar = realPar_5;
+  block_refmodel[5].realParNum = 2;
+  block_refmodel[5].realParNames = realParNames_5;
+  block_refmodel[5].intPar = NULL;
+  block_refmodel[5].intParNum = 0;
+  block_refmodel[5].intParNames = NULL;
+  block_refmodel[5].str = "";
+  block_refmodel[5].ptrPar = NULL;
+
+  block_refmodel[6].nin  = 3;
+  block_refmodel[6].nout = 1;
+  block_refmodel[6].nx   = nx_6;
+  block_refmodel[6].u    = inptr_6;
+  block_refmodel[6].y    = outptr_6;
+  block_refmodel[6].realPar = realPar_6;
+  block_refmodel[6].realParNum = 3;
+  block_refmodel[6].realParNames = realParNames_6;
+  block_refmodel[6].intPar = NULL;
+  block_refmodel[6].intParNum = 0;
+  block_refmodel[6].intParNames = NULL;
+  block_refmodel[6].str = "";
+  block_refmodel[6].ptrPar = NULL;
+
+  block_refmodel[7].nin  = 3;
+  block_refmodel[7].nout = 0;
+  block_refmodel[7].nx   = nx_7;
+  block_refmodel[7].u    = inptr_7;
+  block_refmodel[7].y    = NULL;
+  block_refmodel[7].realPar = NULL;
+  block_refmodel[7].realParNum = 0;
+  block_refmodel[7].realParNames = NULL;
+  block_refmodel[7].intPar = NULL;
+  block_refmodel[7].intParNum = 0;
+  block_refmodel[7].intParNames = NULL;
+  block_refmodel[7].str = "Plot_6";
+  block_refmodel[7].ptrPar = NULL;
+
+  block_refmodel[8].nin  = 1;
+  block_refmodel[8].nout = 0;
+  block_refmodel[8].nx   = nx_8;
+  block_refmodel[8].u    = inptr_8;
+  block_refmodel[8].y    = NULL;
+  block_refmodel[8].realPar = NULL;
+  block_refmodel[8].realParNum = 0;
+  block_refmodel[8].realParNames = NULL;
+  block_refmodel[8].intPar = intPar_8;
+  block_refmodel[8].intParNum = 3;
+  block_refmodel[8].intParNames = intParNames_8;
+  block_refmodel[8].str = "";
+  block_refmodel[8].ptrPar = NULL;
+
+
+/* Set initial outputs */
+
+  printBlk(CG_INIT, &block_refmodel[0]);
+  constant(CG_INIT, &block_refmodel[1]);
+  sinus(CG_INIT, &block_refmodel[2]);
+  css(CG_INIT, &block_refmodel[3]);
+  dss(CG_INIT, &block_refmodel[4]);
+  satur(CG_INIT, &block_refmodel[5]);
+  sum(CG_INIT, &block_refmodel[6]);
+  plot(CG_INIT, &block_refmodel[7]);
+  scope(CG_INIT, &block_refmodel[8]);
+}
+
+/* ISR function */
+
+void refmodel_isr(double t)
+{
+int i;
+double h;
+
+  printBlk(CG_OUT, &block_refmodel[0]);
+  constant(CG_OUT, &block_refmodel[1]);
+  sinus(CG_OUT, &block_refmodel[2]);
+  css(CG_OUT, &block_refmodel[3]);
+  dss(CG_OUT, &block_refmodel[4]);
+  satur(CG_OUT, &block_refmodel[5]);
+  sum(CG_OUT, &block_refmodel[6]);
+  plot(CG_OUT, &block_refmodel[7]);
+  scope(CG_OUT, &block_refmodel[8]);
+
+  dss(CG_STUPD, &block_refmodel[4]);
+
+  h = refmodel_get_tsamp()/10;
+
+  block_refmodel[3].realPar[0] = h;
+  for(i=0;i<10;i++){
+    css(CG_OUT, &block_refmodel[3]);
+    css(CG_STUPD, &block_refmodel[3]);
+  }
+}
+/* Termination function */
+
+void refmodel_end(void)
+{
+  printBlk(CG_END, &block_refmodel[0]);
+  constant(CG_END, &block_refmodel[1]);
+  sinus(CG_END, &block_refmodel[2]);
+  css(CG_END, &block_refmodel[3]);
+  dss(CG_END, &block_refmodel[4]);
+  satur(CG_END, &block_refmodel[5]);
+  sum(CG_END, &block_refmodel[6]);
+  plot(CG_END, &block_refmodel[7]);
+  scope(CG_END, &block_refmodel[8]);
+}
+
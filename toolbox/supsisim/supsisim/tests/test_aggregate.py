@@ -0,0 +1,142 @@
+import sys
+import os
+import shutil
+import tempfile
+import subprocess
+import unittest
+from unittest.mock import patch
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+from toolbox.supsisim.supsisim.RCPblk import RCPblk
+from toolbox.supsisim.supsisim.RCPgen import genCode
+from toolbox.supsisim.supsisim.recfile import loadData, readRecFile
+from toolbox.supsisim.supsisim.aggregate import aggMask, aggPars, aggNames, aggregate
+from toolbox.supsisim.supsisim.tests.test_parfile import CODEGEN
+
+
+"""
+
+Unit Tests for the windowed aggregation (aggregate.c, supsisim.aggregate)
+
+The models aggregate a ramp (k at t = 0.1 k) and a square wave (high from 0.1 to 0.4 in every
+second). The following scenarios are tested:
+
+   - `test_pars`:            Masks, parameters and names of the statistics, aggregation of
+                             recorded data.
+
+   - `test_block`:           The aggregate block holds the statistics of the last complete window
+                             on its output.
+
+   - `test_sinks`:           The toFile block in text and binary format writes one row per window
+                             with the time of the last sample, equal to the aggregation of the
+                             samples recorded without window.
+
+"""
+
+
+def aggBlocks(sink):
+    blks = []
+    b = RCPblk('squareSignal', [], [1], [0,0], 0, [1.0, 1.0, 0.45, 0.0, 0.05], [])
+    b.name = 'Square_0'; blks.append(b)
+    b = RCPblk('constant', [], [2], [0,0], 0, [1.0], [])
+    b.name = 'Const_1'; blks.append(b)
+    b = RCPblk('dss', [2], [3], [0,1], 1, [1.0, 1.0, 1.0, 0.0, 0.0], [1, 1, 1, 0, 1, 2, 3, 4])
+    b.name = 'Int_2'; blks.append(b)
+    return blks + sink
+
+
+@unittest.skipIf(shutil.which('gcc') is None, 'gcc not found')
+class TestAggregate(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def run_model(self, sink, Tf):
+        with patch('sys.stdout'):
+            genCode('m', 0.1, aggBlocks(sink), 'sim.tmf', cache=False)
+        dev = os.path.join(CODEGEN, 'Common', 'common_dev')
+        posix = os.path.join(CODEGEN, 'Common', 'posix')
+        cmd = ['gcc', '-DMODEL=m', '-I' + os.path.join(CODEGEN, 'Common', 'include'),
+               '-I' + os.path.join(CODEGEN, 'LinuxRT', 'include'),
+               'm.c', os.path.join(CODEGEN, 'src', 'linux_main.c'),
+               os.path.join(posix, 'toFile.c'), os.path.join(posix, 'recorder.c')] + \
+              [os.path.join(dev, f) for f in ['aggregate.c', 'input.c', 'linear.c', 'matop.c', 'output.c']] + \
+              ['-o', 'm', '-lm', '-lpthread']
+        res = subprocess.run(cmd, capture_output=True, text=True)
+        self.assertEqual(res.returncode, 0, res.stderr)
+        res = subprocess.run(['./m', '-f', str(Tf)], capture_output=True, text=True)
+        self.assertEqual(res.returncode, 0, res.stderr)
+        return res.stdout
+
+
+    def test_pars(self):
+
+        """ Parameters and aggregation in Python. """
+
+        self.assertEqual(aggMask('all'), 31)
+        self.assertEqual(aggMask('mean, max'), 5)
+        self.assertEqual(aggMask(['min', 'last']), 18)
+        self.assertRaises(ValueError, aggMask, 'median')
+        self.assertRaises(ValueError, aggMask, 0)
+        self.assertEqual(aggPars(1), [])
+        self.assertEqual(aggPars(8, 'rms'), [8, 8])
+        self.assertEqual(aggNames(['a', 'b'], 'mean,max'), ['a_mean', 'a_max', 'b_mean', 'b_max'])
+        y = aggregate(np.array([[1.0, -3.0], [3.0, 4.0], [2.0, 0.0]]), 2, 'all')
+        np.testing.assert_allclose(y, [[2, 1, 3, np.sqrt(5), 3, 0.5, -3, 4, 3.5355339, 4]])
+
+
+    def test_block(self):
+
+        """ Aggregate block. """
+
+        b = RCPblk('aggregate', [3, 1], [4], [0,0], 1, [], [4, aggMask('mean,min,max,last'), 2])
+        b.name = 'Aggregate_3'; b.dimPin[:] = 0; b.dimPout[:] = 8; sink = [b]
+        b = RCPblk('print', [3, 1, 4], [], [0,0], 1, [], [])
+        b.name = 'Print_4'; b.dimPin[:] = [1, 1, 8]; sink.append(b)
+        y = np.array([[float(v) for v in line.split()] for line in self.run_model(sink, 1.25).splitlines()])
+        self.assertEqual(y.shape, (13, 11))
+        agg = aggregate(y[:, 1:3], 4, 'mean,min,max,last')
+        np.testing.assert_array_equal(y[:3, 3:], 0)
+        for k in range(3, 13):
+            np.testing.assert_allclose(y[k, 3:], agg[(k - 3) // 4], atol=1e-6)
+        np.testing.assert_allclose(agg[1, :4], [5.5, 4, 7, 7])
+
+
+    def test_sinks(self):
+
+        """ toFile with window. """
+
+        sink = []
+        for k, (fname, ipar) in enumerate([('raw.bin', [1, 0]),
+                                           ('agg.txt', [0, 0, 0, 4, 31]),
+                                           ('agg.bin', [1, 0, 0, 4, aggMask('min,max')])]):
+            b = RCPblk('toFile', [3, 1], [], [0,0], 1, [], ipar, fname + '|ramp,sq')
+            b.name = 'ToFile_%d' % (k + 3); b.dimPin[:] = 0; sink.append(b)
+        self.run_model(sink, 2.05)
+        raw, hd = readRecFile('raw.bin')
+        self.assertEqual(raw.shape, (21, 3))
+
+        x, names = loadData('agg.txt')
+        self.assertEqual(names, ['t'] + aggNames(['ramp', 'sq']))
+        np.testing.assert_allclose(x[:, 0], raw[3::4, 0], atol=1e-6)
+        np.testing.assert_allclose(x[:, 1:], aggregate(raw[:, 1:], 4), atol=1e-6)
+
+        x, hd = readRecFile('agg.bin')
+        self.assertEqual(hd['names'], ['t', 'ramp_min', 'ramp_max', 'sq_min', 'sq_max'])
+        self.assertAlmostEqual(hd['Tsamp'], 0.4)
+        self.assertEqual(x.shape, (5, 5))
+        np.testing.assert_array_equal(x[:, 0], raw[3::4, 0])
+        np.testing.assert_array_equal(x[:, 1:], aggregate(raw[:, 1:], 4, 'min,max'))
+        np.testing.assert_array_equal(x[:, 3], [0, 0, 0, 0, 0])
+        np.testing.assert_array_equal(x[:, 4], [1, 1, 1, 1, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+import sys
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+from toolbox.supsisim.supsisim.headless import dgmToDiagram
+from toolbox.supsisim.supsisim.bench.synth import synthDgm, writeDgm
+from toolbox.supsisim.supsisim.bench.run import benchDgm, compare, noScopes
+
+
+"""
+
+Unit Tests for the benchmark suite (bench/synth.py and bench/run.py)
+
+The following scenarios are tested:
+
+   - `test_chain`:           A chain of n sum blocks is connected from the source to the null block.
+
+   - `test_tree`:            Every block of the fan-out tree drives the blocks of the next level,
+                             every leaf drives a null block.
+
+   - `test_mimo`:            The MIMO css blocks are connected port by port, the system is defined
+                             in the script of the diagram.
+
+   - `test_subsys`:          The chain split over nested subsystems is flattened into the same chain,
+                             the blocks inside the subsystems get their system path.
+
+   - `test_noScopes`:        The interactive scopes (also inside subsystems) are replaced by null blocks.
+
+   - `test_benchDgm`:        Without make, the block sequence and the code generation are timed
+                             and the C file is generated.
+
+   - `test_compare`:         Slower phases and lower throughput beyond the tolerance are regressions.
+
+"""
+
+
+class TestBench(unittest.TestCase):
+
+    def test_chain(self):
+
+        """ Chain of sum blocks. """
+
+        data, script = synthDgm('chain', 5)
+        self.assertEqual(script, '')
+        d = dgmToDiagram('/tmp/chain5.dgm', data)
+        calls = {b['name'].split('_')[0] : b['call'] for b in d['blocks']}
+        self.assertEqual(len(d['blocks']), 7)
+        # Sum1 reads the sine wave, every sum block the previous one
+        sine = calls['Sine'].split('([')[1].split(']')[0]
+        self.assertTrue(calls['Sum1'].startswith('sumBlk([' + sine + '],'))
+        for k in range(2, 6):
+            out = calls['Sum' + str(k-1)].split('],[')[1].split(']')[0]
+            self.assertTrue(calls['Sum' + str(k)].startswith('sumBlk([' + out + '],'))
+        self.assertEqual(calls['Null'], 'nullBlk([' + calls['Sum5'].split('],[')[1].split(']')[0] + '])')
+
+
+    def test_tree(self):
+
+        """ Fan-out tree. """
+
+        data, script = synthDgm('tree', 6, fanout=2)
+        d = dgmToDiagram('/tmp/tree6.dgm', data)
+        calls = {b['name'].split('_')[0] : b['call'] for b in d['blocks']}
+        outs = {name : call.split('],[')[1].split(']')[0] for name, call in calls.items() if name.startswith('Sum')}
+        ins = {name : call.split('([')[1].split(']')[0] for name, call in calls.items() if name != 'Sine'}
+        # Sum1 <- Sine, Sum2/Sum3 <- Sum1, Sum4/Sum5 <- Sum2, Sum6 <- Sum3
+        self.assertEqual(ins['Sum2'], outs['Sum1'])
+        self.assertEqual(ins['Sum3'], outs['Sum1'])
+        self.assertEqual(ins['Sum4'], outs['Sum2'])
+        self.assertEqual(ins['Sum5'], outs['Sum2'])
+        self.assertEqual(ins['Sum6'], outs['Sum3'])
+        leaves = sorted([ins[name] for name in ins if name.startswith('Null')])
+        self.assertEqual(leaves, sorted([outs['Sum' + str(k)] for k in [4, 5, 6]]))
+
+
+    def test_mimo(self):
+
+        """ MIMO css blocks. """
+
+        data, script = synthDgm('mimo', 3, 'm3', nio=3, order=2)
+        self.assertEqual(data['simulate']['script'], 'm3_par.py')
+        self.assertIn('order = 2', script)
+        d = dgmToDiagram('/tmp/m3.dgm', data)
+        calls = {b['name'].split('_')[0] : b['call'] for b in d['blocks']}
+        sine = calls['Sine'].split('([')[1].split(']')[0]
+        self.assertEqual(calls['LTI1'].split('],[')[0], 'cssBlk([' + ','.join([sine]*3))
+        out1 = calls['LTI1'].split('],[')[1].split(']')[0]
+        self.assertEqual(calls['LTI2'].split('],[')[0], 'cssBlk([' + out1)
+        self.assertEqual(calls['LTI2'].split(',  ')[1], 'sysM')
+        out3 = calls['LTI3'].split('],[')[1].split(']')[0]
+        self.assertEqual(calls['Null'], 'nullBlk([' + out3 + '])')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            writeDgm(os.path.join(tmp, 'm3.dgm'), data, script)
+            self.assertTrue(os.path.isfile(os.path.join(tmp, 'm3_par.py')))
+
+
+    def test_subsys(self):
+
+        """ Nested subsystems. """
+
+        data, script = synthDgm('subsys', 9, depth=2)
+        self.assertEqual(len(data['subsystems']), 1)
+        self.assertEqual(len(data['subsystems'][0]['subitems']['subsystems']), 1)
+        d = dgmToDiagram('/tmp/subsys9.dgm', data)
+        calls = {b['name'].split('_')[0] : b['call'] for b in d['blocks']}
+        paths = {b['name'].split('_')[0] : b['sysPath'] for b in d['blocks']}
+        self.assertEqual(len(d['blocks']), 11)
+        for k in range(2, 10):
+            out = calls['Sum' + str(k-1)].split('],[')[1].split(']')[0]
+            self.assertTrue(calls['Sum' + str(k)].startswith('sumBlk([' + out + '],'))
+        self.assertEqual(paths['Sum1'], '/Sum1')
+        self.assertEqual(paths['Sum4'], '/Subsystem2/Sum4')
+        self.assertEqual(paths['Sum9'], '/Subsystem2/Sum9')
+        self.assertEqual(calls['Null'], 'nullBlk([' + calls['Sum9'].split('],[')[1].split(']')[0] + '])')
+
+
+    def test_noScopes(self):
+
+        """ Interactive scopes replaced. """
+
+        data, script = synthDgm('subsys', 4, depth=1)
+        inner = data['subsystems'][0]['subitems']
+        inner['blocks'][1]['params'] = 'scopeStream'
+        data['blocks'][-1]['params'] = 'scopeStream|Timed: 1'
+        d = noScopes(data)
+        self.assertEqual(d['blocks'][-1]['params'], 'nullBlk')
+        self.assertEqual(d['subsystems'][0]['subitems']['blocks'][1]['params'], 'nullBlk')
+        # The original is not changed
+        self.assertEqual(inner['blocks'][1]['params'], 'scopeStream')
+
+
+    @patch.dict(os.environ, {'SHV_USED' : 'False', 'SHV_TREE_TYPE' : 'GAVL'})
+    def test_benchDgm(self):
+
+        """ Timing of detBlkSeq and genCode. """
+
+        if not os.path.isdir(os.path.join(os.environ.get('PYSUPSICTRL', ''), 'resources')):
+            self.skipTest('PYSUPSICTRL not set')
+        with tempfile.TemporaryDirectory() as tmp:
+            data, script = synthDgm('mimo', 4, 'mimo4')
+            fname = writeDgm(os.path.join(tmp, 'mimo4.dgm'), data, script)
+            res = benchDgm(fname, data, os.path.join(tmp, 'out'), build=False, repeat=2)
+            self.assertEqual(res['error'], '')
+            self.assertEqual(res['blocks'], 6)
+            self.assertGreater(res['detBlkSeq'], 0)
+            self.assertGreater(res['genCode'], 0)
+            self.assertIsNone(res['make'])
+            self.assertIsNone(res['steps_per_s'])
+            self.assertTrue(os.path.isfile(os.path.join(tmp, 'out', 'mimo4_gen', 'mimo4.c')))
+
+            res = benchDgm(os.path.join(tmp, 'missing.dgm'), None, tmp, build=False)
+            self.assertNotEqual(res['error'], '')
+
+
+    def test_compare(self):
+
+        """ Regressions. """
+
+        ref = {'results' : [{'name' : 'a', 'genCode' : 1.0, 'make' : 2.0, 'steps_per_s' : 1000.0},
+                            {'name' : 'b', 'genCode' : 1.0}]}
+        new = {'results' : [{'name' : 'a', 'genCode' : 1.5, 'make' : 2.1, 'steps_per_s' : 500.0},
+                            {'name' : 'c', 'genCode' : 9.0}]}
+        rows = {(r[0], r[1]) : r for r in compare(ref, new, 0.2)}
+        self.assertEqual(sorted(rows), [('a', 'genCode'), ('a', 'make'), ('a', 'steps_per_s')])
+        self.assertTrue(rows[('a', 'genCode')][5])
+        self.assertFalse(rows[('a', 'make')][5])
+        self.assertAlmostEqual(rows[('a', 'steps_per_s')][4], 2.0)
+        self.assertTrue(rows[('a', 'steps_per_s')][5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import sys
+import os
+import shutil
+import tempfile
+import subprocess
+import unittest
+from unittest.mock import patch
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+from toolbox.supsisim.supsisim.RCPblk import RCPblk
+from toolbox.supsisim.supsisim.RCPgen import genCode
+from toolbox.supsisim.supsisim.recfile import readEvents
+from toolbox.supsisim.supsisim.tests.test_parfile import CODEGEN
+
+
+"""
+
+Unit Tests for the triggered capture block (capture.c, recfile.readEvents)
+
+The model records a square wave (high from 0.1 to 0.4 in every second) and a ramp (k at t = 0.1 k)
+with the capture block. The following scenarios are tested:
+
+   - `test_rising`:          Every rising edge writes the pre-trigger, trigger and post-trigger samples
+                             of one event, with fewer pre-trigger samples at the start; the number of
+                             events can be limited.
+
+   - `test_level`:           With a level trigger and no post-trigger samples every sample above the
+                             level is an event.
+
+"""
+
+
+def captureBlocks(rpar, ipar):
+    blks = []
+    b = RCPblk('squareSignal', [], [1], [0,0], 0, [1.0, 1.0, 0.45, 0.0, 0.05], [])
+    b.name = 'Square_0'; blks.append(b)
+    b = RCPblk('constant', [], [2], [0,0], 0, [1.0], [])
+    b.name = 'Const_1'; blks.append(b)
+    b = RCPblk('dss', [2], [3], [0,1], 1, [1.0, 1.0, 1.0, 0.0, 0.0], [1, 1, 1, 0, 1, 2, 3, 4])
+    b.name = 'Int_2'; blks.append(b)
+    b = RCPblk('capture', [1, 3], [], [0,0], 1, rpar, ipar, 'cap.bin|sq,ramp')
+    b.name = 'Capture_3'; b.dimPin[:] = 0; blks.append(b)
+    return blks
+
+
+@unittest.skipIf(shutil.which('gcc') is None, 'gcc not found')
+class TestCapture(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def run_model(self, rpar, ipar, Tf):
+        with patch('sys.stdout'):
+            genCode('m', 0.1, captureBlocks(rpar, ipar), 'sim.tmf', cache=False)
+        dev = os.path.join(CODEGEN, 'Common', 'common_dev')
+        posix = os.path.join(CODEGEN, 'Common', 'posix')
+        cmd = ['gcc', '-DMODEL=m', '-I' + os.path.join(CODEGEN, 'Common', 'include'),
+               '-I' + os.path.join(CODEGEN, 'LinuxRT', 'include'),
+               'm.c', os.path.join(CODEGEN, 'src', 'linux_main.c'),
+               os.path.join(posix, 'capture.c'), os.path.join(posix, 'recorder.c')] + \
+              [os.path.join(dev, f) for f in ['input.c', 'linear.c', 'matop.c']] + \
+              ['-o', 'm', '-lm', '-lpthread']
+        res = subprocess.run(cmd, capture_output=True, text=True)
+        self.assertEqual(res.returncode, 0, res.stderr)
+        res = subprocess.run(['./m', '-f', str(Tf)], capture_output=True, text=True)
+        self.assertEqual(res.returncode, 0, res.stderr)
+        return readEvents('cap.bin')
+
+
+    def test_rising(self):
+
+        """ Rising edges. """
+
+        events, hd = self.run_model([0.5, 0.0, 0.0], [2, 2, 3, 0, 0], 3.05)
+        self.assertEqual(hd['names'], ['t', 'event', 'k', 'sq', 'ramp'])
+        self.assertEqual([ev['event'] for ev in events], [0, 1, 2])
+        self.assertEqual(events[0]['k'].tolist(), [-1, 0, 1, 2, 3])
+        np.testing.assert_allclose([ev['t0'] for ev in events], [0.1, 1.1, 2.1])
+        ev = events[1]
+        self.assertEqual(ev['k'].tolist(), [-2, -1, 0, 1, 2, 3])
+        np.testing.assert_array_equal(ev['y'][:, 0], [0, 0, 1, 1, 1, 1])
+        np.testing.assert_array_equal(ev['y'][:, 1], [9, 10, 11, 12, 13, 14])
+        np.testing.assert_allclose(ev['t'], 0.1*np.arange(9, 15))
+
+        # At most 2 events
+        events, hd = self.run_model([0.5, 0.0, 0.0], [2, 2, 3, 2, 0], 3.05)
+        self.assertEqual(len(events), 2)
+
+
+    def test_level(self):
+
+        """ Level trigger. """
+
+        events, hd = self.run_model([0.5, 0.0, 0.0], [0, 1, 0, 0, 1], 2.05)
+        ramp = [ev['y'][ev['k'] == 0, 1][0] for ev in events]
+        self.assertEqual(ramp, [1, 2, 3, 4, 11, 12, 13, 14])
+        self.assertEqual(hd['dropped'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
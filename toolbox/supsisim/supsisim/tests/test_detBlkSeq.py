@@ -0,0 +1,142 @@
+import sys
+import os
+import time
+import unittest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+from toolbox.supsisim.supsisim.RCPblk import RCPblk
+from toolbox.supsisim.supsisim.RCPgen import detBlkSeq, detSCC, AlgebraicLoopError
+
+
+"""
+
+Unit Tests for the block sequence of RCPgen.py
+
+This file contains unit tests for the `detBlkSeq` and `detSCC` functions in the RCPgen.py file.
+The following scenarios are tested:
+
+   - `test_order_feedthrough_chain`:      Blocks with direct feed-through are ordered after the blocks driving them,
+                                          independently of the order of the input list.
+
+   - `test_no_feedthrough_first`:         Blocks without direct feed-through (uy=0) are placed before the other blocks,
+                                          blocks without inputs and outputs are placed at the beginning.
+
+   - `test_loop_broken_by_state`:         A feedback loop containing a block without direct feed-through is not an algebraic loop.
+
+   - `test_algebraic_loops_reported`:     Every algebraic loop is reported as a separate strongly connected component,
+                                          blocks downstream of a loop are not reported.
+                                          Expected error message contains the name and the system path of the blocks.
+
+   - `test_self_loop`:                    A block feeding its own input is reported as algebraic loop.
+
+   - `test_large_chain`:                  A chain of 20000 blocks given in reverse order is ordered in linear time.
+
+"""
+
+
+def blk(name, pin, pout, uy=1, sysPath=''):
+    b = RCPblk('sum', pin, pout, [0, 0], uy, [1.0], [])
+    b.name = name
+    b.sysPath = sysPath
+    return b
+
+
+class TestBlockSequence(unittest.TestCase):
+
+    def test_order_feedthrough_chain(self):
+
+        """ Blocks with direct feed-through are ordered after the blocks driving them. """
+
+        src = blk('src', [], [1], uy=0)
+        b1 = blk('b1', [1], [2])
+        b2 = blk('b2', [2], [3])
+        b3 = blk('b3', [2, 3], [4])
+        out = blk('out', [4], [])
+        seq = detBlkSeq(4, [out, b3, b2, b1, src])
+        names = [b.name for b in seq]
+        self.assertEqual(names, ['src', 'b1', 'b2', 'b3', 'out'])
+
+
+    def test_no_feedthrough_first(self):
+
+        """ Blocks without direct feed-through are placed first. """
+
+        b1 = blk('b1', [1], [2])
+        st = blk('state', [2], [1], uy=0)
+        iso1 = blk('iso1', [], [], uy=0)
+        iso2 = blk('iso2', [], [], uy=0)
+        seq = detBlkSeq(2, [b1, iso1, st, iso2])
+        names = [b.name for b in seq]
+        self.assertEqual(names, ['iso2', 'iso1', 'state', 'b1'])
+
+
+    def test_loop_broken_by_state(self):
+
+        """ A feedback loop through a block without feed-through is not an algebraic loop. """
+
+        b1 = blk('b1', [3], [1])
+        b2 = blk('b2', [1], [2])
+        st = blk('state', [2], [3], uy=0)
+        seq = detBlkSeq(3, [b2, b1, st])
+        self.assertEqual([b.name for b in seq], ['state', 'b1', 'b2'])
+
+
+    def test_algebraic_loops_reported(self):
+
+        """ Every algebraic loop is reported with the system path of its blocks. """
+
+        a1 = blk('a1', [2], [1], sysPath='/Sub/a1')
+        a2 = blk('a2', [1], [2], sysPath='/Sub/a2')
+        c1 = blk('c1', [4, 5], [3])
+        c2 = blk('c2', [3], [4])
+        c3 = blk('c3', [4], [5])
+        down = blk('down', [2], [6])
+        free = blk('free', [], [7], uy=0)
+
+        with self.assertRaises(AlgebraicLoopError) as ctx:
+            detBlkSeq(7, [a1, a2, c1, c2, c3, down, free])
+
+        loops = [sorted(b.name for b in loop) for loop in ctx.exception.loops]
+        self.assertEqual(sorted(loops), [['a1', 'a2'], ['c1', 'c2', 'c3']])
+        self.assertIn('a1 [/Sub/a1] (sum)', str(ctx.exception))
+        self.assertIsInstance(ctx.exception, ValueError)
+
+
+    def test_self_loop(self):
+
+        """ A block feeding its own input is an algebraic loop. """
+
+        b1 = blk('b1', [1], [1])
+        with self.assertRaises(AlgebraicLoopError) as ctx:
+            detBlkSeq(1, [b1])
+        self.assertEqual(len(ctx.exception.loops), 1)
+        self.assertEqual(ctx.exception.loops[0][0].name, 'b1')
+
+
+    def test_detSCC(self):
+
+        """ detSCC returns only the components containing a cycle. """
+
+        succ = [[1], [2], [0, 3], [], [4]]
+        scc = detSCC([0, 1, 2, 3, 4], succ)
+        self.assertEqual(sorted(sorted(c) for c in scc), [[0, 1, 2], [4]])
+
+
+    def test_large_chain(self):
+
+        """ A long chain given in reverse order is ordered in linear time. """
+
+        N = 20000
+        blocks = [blk('src', [], [1], uy=0)]
+        for n in range(1, N):
+            blocks.append(blk('b' + str(n), [n], [n+1]))
+        blocks.reverse()
+
+        t0 = time.perf_counter()
+        seq = detBlkSeq(N, blocks)
+        self.assertLess(time.perf_counter() - t0, 5.0)
+        self.assertEqual(seq[0].name, 'src')
+        self.assertEqual([b.name for b in seq[1:4]], ['b1', 'b2', 'b3'])
+
+
+if __name__ == '__main__':
+    unittest.main()
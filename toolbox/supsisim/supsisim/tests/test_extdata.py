@@ -0,0 +1,121 @@
+import sys
+import os
+import shutil
+import tempfile
+import subprocess
+import unittest
+from unittest.mock import patch
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+from toolbox.supsisim.supsisim.RCPblk import RCPblk
+from toolbox.supsisim.supsisim.RCPgen import genCode
+from toolbox.supsisim.supsisim.recfile import textToRec, readRecFile
+from toolbox.supsisim.supsisim.tests.test_parfile import CODEGEN
+
+
+"""
+
+Unit Tests for the external data in binary format (extdataBin.c, recfile.textToRec)
+
+The following scenarios are tested:
+
+   - `test_convert`:         A text file without time column is converted with the time k*Tsamp,
+                             the conversion is done again only if the text or Tsamp change.
+
+   - `test_hold`:            The rows of a file at 0.2 s are held by a model at 0.1 s and repeated
+                             with the period of the file.
+
+   - `test_linear`:          Linear interpolation between time-stamped rows, the last row is held
+                             at the end of a non periodic file.
+
+"""
+
+
+def writeText(fname, rows, names=None):
+    with open(fname, 'w') as f:
+        if names is not None:
+            f.write('# ' + ','.join(names) + '\n')
+        for row in rows:
+            f.write('\t'.join(['%.17g' % v for v in row]) + '\n')
+
+
+class TestExtdata(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def run_model(self, fname, ipar, Tf):
+        blks = []
+        b = RCPblk('extdataBin', [], [1, 2], [0,0], 0, [], ipar, fname)
+        b.name = 'Ext_0'; blks.append(b)
+        b = RCPblk('print', [1, 2], [], [0,0], 1, [], [])
+        b.name = 'Print_1'; blks.append(b)
+        with patch('sys.stdout'):
+            genCode('m', 0.1, blks, 'sim.tmf', cache=False)
+        dev = os.path.join(CODEGEN, 'Common', 'common_dev')
+        cmd = ['gcc', '-DMODEL=m', '-I' + os.path.join(CODEGEN, 'Common', 'include'),
+               '-I' + os.path.join(CODEGEN, 'LinuxRT', 'include'),
+               'm.c', os.path.join(CODEGEN, 'src', 'linux_main.c'),
+               os.path.join(CODEGEN, 'Common', 'posix', 'extdataBin.c'),
+               os.path.join(dev, 'output.c'), '-o', 'm', '-lm']
+        res = subprocess.run(cmd, capture_output=True, text=True)
+        self.assertEqual(res.returncode, 0, res.stderr)
+        res = subprocess.run(['./m', '-f', str(Tf)], capture_output=True, text=True)
+        self.assertEqual(res.returncode, 0, res.stderr)
+        return np.array([[float(v) for v in line.split()] for line in res.stdout.splitlines()])
+
+
+    def test_convert(self):
+
+        """ Conversion of text files. """
+
+        writeText('d.txt', [[1.0, 10.0], [2.0, 20.0], [3.0, 30.0]], ['a', 'b'])
+        rec = textToRec('d.txt', Tsamp=0.5)
+        x, hd = readRecFile(rec)
+        self.assertEqual(hd['names'], ['t', 'a', 'b'])
+        self.assertEqual(hd['Tsamp'], 0.5)
+        np.testing.assert_array_equal(x, [[0.0, 1.0, 10.0], [0.5, 2.0, 20.0], [1.0, 3.0, 30.0]])
+        mtime = os.path.getmtime(rec)
+        self.assertEqual(textToRec('d.txt', Tsamp=0.5), rec)
+        self.assertEqual(os.path.getmtime(rec), mtime)
+        # Another Tsamp or the time in the first column
+        self.assertEqual(readRecFile(textToRec('d.txt', Tsamp=0.25))[0][2, 0], 0.5)
+        x, hd = readRecFile(textToRec('d.txt'))
+        self.assertEqual(hd['names'], ['a', 'b'])
+        np.testing.assert_array_equal(x[:, 0], [1.0, 2.0, 3.0])
+        self.assertEqual(hd['Tsamp'], 1.0)
+
+
+    @unittest.skipIf(shutil.which('gcc') is None, 'gcc not found')
+    def test_hold(self):
+
+        """ Hold and periodic data. """
+
+        writeText('d.txt', [[1.0, -1.0], [2.0, -2.0], [3.0, -3.0]])
+        rec = textToRec('d.txt', Tsamp=0.2)
+        y = self.run_model(rec, [2, 0, 0, 0, 1], 1.25)
+        np.testing.assert_array_equal(y[:, 1], [1, 1, 2, 2, 3, 3, 1, 1, 2, 2, 3, 3, 1])
+        np.testing.assert_array_equal(y[:, 2], -y[:, 1])
+
+
+    @unittest.skipIf(shutil.which('gcc') is None, 'gcc not found')
+    def test_linear(self):
+
+        """ Linear interpolation. """
+
+        writeText('d.txt', [[0.0, 0.0, 1.0], [0.4, 4.0, 1.0], [0.6, 0.0, 3.0]])
+        rec = textToRec('d.txt')
+        y = self.run_model(rec, [2, 0, 0, 1, 0], 0.95)
+        np.testing.assert_allclose(y[:, 1], [0, 1, 2, 3, 4, 2, 0, 0, 0, 0], atol=1e-12)
+        np.testing.assert_allclose(y[:, 2], [1, 1, 1, 1, 1, 2, 3, 3, 3, 3], atol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,639 @@
+import sys
+import os
+import shutil
+import tempfile
+import subprocess
+import unittest
+from unittest.mock import patch
+from numpy import asmatrix, hstack, array, exp, cos, arange
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+from toolbox.supsisim.supsisim.RCPblk import RCPblk
+from toolbox.supsisim.supsisim.RCPgen import genCode, fmtPar, detSignals, detRates, detPartitions, detDims, \
+    detDerivPath, resolveOpts
+
+
+"""
+
+Regression Tests for the C code emitted by RCPgen.py
+
+This file contains regression tests for the `genCode` function in the RCPgen.py file.
+The reference file data/genCode_refmodel.c has been generated with the previous emitter of
+`genCode` (string concatenation and one write per line) after the block scheduler of detBlkSeq
+was replaced, so the block order is the one of the new scheduler and not the one of the
+original genCode (plot and sum are swapped); the function prototypes, emitted from a set in
+arbitrary order, are sorted. The following scenarios are tested:
+
+   - `test_byte_identical`:      The C code generated for a model with constant, continuous and discrete states,
+                                 parameter names and string parameters is byte-identical to the reference file.
+
+   - `test_cache_unchanged`:     A second generation with the same blocks and settings is skipped and the C file
+                                 keeps its modification time.
+
+   - `test_cache_changed`:       After a parameter change the C file is regenerated, after a change of the
+                                 sampling time too.
+
+   - `test_signals`:             With signals=True the nodes are placed in one array ordered by execution,
+                                 the Node_N names remain available as macros.
+
+   - `test_detSignals_reuse`:    Only signals between stateless blocks executed in sequence share a slot,
+                                 signals read by other blocks or by blocks executed before the writer keep their own slot.
+
+   - `test_inline`:              With inline=True the constant, sinus, sum and dss blocks are emitted as C statements
+                                 with folded parameters, the other blocks keep the generic call.
+
+   - `test_detRates`:            Blocks without sample time inherit the fastest rate of their inputs (also through
+                                 blocks without feed-through), sample times not multiple of Tsamp raise a ValueError.
+
+   - `test_multirate`:           The blocks of a slower rate are executed only on their ticks of the base rate counter.
+
+   - `test_rateTasks`:           With rateTasks=True every rate gets its own function and the signals crossing
+                                 the rates are read through the rate transition buffers.
+
+   - `test_detPartitions`:       Blocks with feed-through connected together stay in the same partition, plants
+                                 without feed-through are separated from their controllers, continuous plants with
+                                 feed-through are not, the load is balanced.
+
+   - `test_partitions`:          With partitions=2 every partition gets one function per phase, the signals of the
+                                 other partitions are read through copies taken after the barrier of the phase.
+
+   - `test_detDims`:             Output dimensions are propagated to the elementwise blocks, wrong input dimensions
+                                 and inputs of different widths raise a ValueError.
+
+   - `test_vector`:              Vector signals are declared as arrays, the blocks get the dimensions of their ports,
+                                 each vector signal gets its own slots in the signal array.
+
+   - `test_varstep`:             With solver='dopri5' the continuous states are placed in one state vector integrated
+                                 by the variable step solver, continuous blocks without derivatives keep the fixed step.
+
+   - `test_varstep_loop`:        The stateless blocks between the continuous blocks are evaluated at every stage
+                                 of the variable step solver: coupled loops of integrators follow the analytic
+                                 solution, blocks with discrete states break the paths.
+
+   - `test_varstep_reuse`:       With the variable step solver the signal slots are not reused: the inputs of the
+                                 blocks evaluated at every stage are not overwritten by the blocks executed later.
+
+   - `test_profile`:             With profile=True every block call of the ISR is enclosed by the profiler timestamps,
+                                 the table holds the names and system paths, the statistics are written at the end.
+
+   - `test_shlib`:              With the template shlib.tmf the signals are placed in one array without slot reuse,
+                                 the tables of the nodes, of the block names, of the parameters and of the state
+                                 outside the blocks are exported.
+
+   - `test_resolveOpts`:         An option is turned off by the first condition of the table holding, with one
+                                 message; conditions not yet known have no effect.
+
+   - `test_fmtPar`:              Parameters are formatted with full precision, integers and matrices are flattened.
+
+"""
+
+data_dir = os.path.join(os.path.dirname(__file__), 'data')
+CODEGEN = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'CodeGen'))
+
+
+def refBlocks():
+    blks = []
+    b = RCPblk('constant', [], [1], [0,0], 0, [1.5], [])
+    b.name = 'Const_0'; b.realParNames = ['Value']; blks.append(b)
+    b = RCPblk('sinus', [], [2], [0,0], 0, [1.0, 0.5, 0.0, 0.1, 1e-05], [])
+    b.name = 'Sine_1'; b.realParNames = ['Amp', 'Freq', 'Phase', 'Bias', 'Delay']; blks.append(b)
+    b = RCPblk('sum', [1, 2, 6], [3], [0,0], 1, [1, -1, 0.3333333333333333], [])
+    b.name = 'Sum_2'; blks.append(b)
+    rp = hstack((asmatrix([0.0]), asmatrix([[0.0, 1.0, -2.0, -3.0]]), asmatrix([[0.0, 1.0]]),
+                 asmatrix([[1.0, 0.0]]), asmatrix([[0.0]]), asmatrix([[0.0, 0.0]])))
+    b = RCPblk('css', [3], [4], [2,0], 0, rp, [2, 1, 1, 1, 5, 7, 9, 10])
+    b.name = 'LTI_3'; b.sysPath = '/Sub/LTI'; blks.append(b)
+    rp = hstack((asmatrix([[0.9]]), asmatrix([[1.0]]), asmatrix([[2.0]]), asmatrix([[0.5]]), asmatrix([[0.0]])))
+    b = RCPblk('dss', [4], [5], [0,1], 1, rp, [1, 1, 1, 0, 1, 2, 3, 4])
+    b.name = 'DSS_4'; blks.append(b)
+    b = RCPblk('satur', [5], [6], [0,0], 1, [3000.0, -3000.0], [])
+    b.name = 'SAT_5'; b.realParNames = ['Upper', 'Lower']; blks.append(b)
+    b = RCPblk('plot', [4, 5, 6], [], [0,0], 1, [], [], 'Plot_6')
+    b.name = 'Plot_6'; blks.append(b)
+    b = RCPblk('scope', [3], [], [0,0], 1, [], [1, 10, 0])
+    b.name = 'Scope_7'; blks.append(b)
+    b = RCPblk('printBlk', [], [], [0,0], 0, [], [])
+    b.name = 'Iso_8'; blks.append(b)
+    return blks
+
+
+class TestGenCode(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def test_byte_identical(self):
+
+        """ The emitted C code is byte-identical to the reference file. """
+
+        genCode('refmodel', 0.01, refBlocks(), 'sim.tmf')
+
+        with open('refmodel.c', 'rb') as f:
+            generated = f.read()
+        with open(os.path.join(data_dir, 'genCode_refmodel.c'), 'rb') as f:
+            reference = f.read()
+
+        self.assertEqual(generated, reference)
+
+
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def test_cache_unchanged(self):
+
+        """ An unchanged model is not regenerated. """
+
+        self.assertTrue(genCode('refmodel', 0.01, refBlocks(), 'sim.tmf'))
+        mtime = os.stat('refmodel.c').st_mtime_ns
+        with patch('sys.stdout'):
+            self.assertFalse(genCode('refmodel', 0.01, refBlocks(), 'sim.tmf'))
+        self.assertEqual(os.stat('refmodel.c').st_mtime_ns, mtime)
+
+
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def test_cache_changed(self):
+
+        """ A parameter or a setting change regenerates the C file. """
+
+        genCode('refmodel', 0.01, refBlocks(), 'sim.tmf')
+        blks = refBlocks()
+        blks[5].realPar[0] = 10.0
+        with patch('sys.stdout'):
+            self.assertTrue(genCode('refmodel', 0.01, blks, 'sim.tmf'))
+        with open('refmodel.c') as f:
+            self.assertIn('static double realPar_5[] = {10.0, -3000.0};', f.read())
+        with patch('sys.stdout'):
+            self.assertTrue(genCode('refmodel', 0.02, blks, 'sim.tmf'))
+
+
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def test_signals(self):
+
+        """ Signals in one contiguous array. """
+
+        genCode('refmodel', 0.01, refBlocks(), 'sim.tmf', signals=True)
+        with open('refmodel.c') as f:
+            txt = f.read()
+        self.assertIn('static double signals[6] CG_SIGNALS_ALIGN;', txt)
+        self.assertNotIn('static double Node_', txt)
+        # Sum_2 is executed after Const_0, Sine_1, LTI_3, DSS_4 (no feed-through) and SAT_5
+        self.assertIn('#define Node_3 (&signals[5])', txt)
+        self.assertIn('static void *inptr_6[]  = {&signals[0],&signals[1],&signals[4]};', txt)
+
+
+    def test_detSignals_reuse(self):
+
+        """ Slots are shared only by signals with disjoint lifetimes. """
+
+        def blk(fcn, pin, pout, nx=[0,0]):
+            return RCPblk(fcn, pin, pout, nx, 1, [], [])
+
+        blks = [blk('constant', [], [1]),
+                blk('sum', [1], [2]),
+                blk('sum', [2], [3]),
+                blk('sum', [3], [4]),
+                blk('sum', [4], [5]),
+                blk('print', [5], [])]
+        slots, nslots = detSignals(blks, reuse=False)
+        self.assertEqual(slots, {1 : 0, 2 : 1, 3 : 2, 4 : 3, 5 : 4})
+        self.assertEqual(nslots, 5)
+
+        slots, nslots = detSignals(blks, reuse=True)
+        self.assertEqual(nslots, 3)
+        self.assertEqual(slots[1], slots[3])
+        self.assertNotEqual(slots[1], slots[2])
+        self.assertNotEqual(slots[3], slots[4])
+        self.assertNotIn(slots[5], [slots[1], slots[2], slots[3], slots[4]])
+
+        # A block with states keeps its input until the state update
+        blks[3] = blk('dss', [3], [4], [0,1])
+        slots, nslots = detSignals(blks, reuse=True)
+        self.assertEqual(nslots, 5)
+
+
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def test_inline(self):
+
+        """ Common blocks inlined with folded parameters. """
+
+        with patch('sys.stdout'):
+            genCode('refmodel', 0.01, refBlocks(), 'sim.tmf', inline=True)
+        with open('refmodel.c') as f:
+            txt = f.read()
+        self.assertIn('#include <math.h>', txt)
+        self.assertIn('  Node_1[0] = 1.5;', txt)
+        self.assertIn('  Node_3[0] = Node_1[0] - Node_2[0] + 0.3333333333333333*Node_6[0];', txt)
+        self.assertIn('  Node_5[0] = (2.0*realPar_4[4]) + (0.5*Node_4[0]);', txt)
+        self.assertIn('    double x0_ = (0.9*realPar_4[4]) + (Node_4[0]);', txt)
+        self.assertNotIn('sum(CG_OUT', txt)
+        self.assertNotIn('dss(CG_', txt)
+        self.assertIn('  css(CG_OUT, &block_refmodel[3]);', txt)
+        self.assertIn('  satur(CG_OUT, &block_refmodel[5]);', txt)
+
+
+    def rateBlocks(self):
+        blks = [RCPblk('constant', [], [1], [0,0], 0, [1.0], []),
+                RCPblk('dss', [1], [2], [0,1], 0, [1.0, 1.0, 1.0, 0.0, 0.0], [1, 1, 1, 0, 1, 2, 3, 4]),
+                RCPblk('sum', [2], [3], [0,0], 1, [2.0], []),
+                RCPblk('print', [2, 3], [], [0,0], 1, [], []),
+                RCPblk('print', [3], [], [0,0], 1, [], [])]
+        for n, blk in enumerate(blks):
+            blk.name = 'B' + str(n)
+        blks[2].tsamp = 0.05
+        return blks
+
+
+    def test_detRates(self):
+
+        """ Rates inherited through the graph. """
+
+        blks = self.rateBlocks()
+        self.assertEqual(detRates(blks, 0.01), [1, 1, 5, 1, 5])
+        blks[0].tsamp = 0.02
+        blks[4].tsamp = 0.1
+        self.assertEqual(detRates(blks, 0.01), [2, 2, 5, 2, 10])
+        blks[2].tsamp = 0.015
+        with self.assertRaises(ValueError):
+            detRates(blks, 0.01)
+
+
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def test_multirate(self):
+
+        """ Slow blocks executed on their ticks. """
+
+        with patch('sys.stdout'):
+            genCode('mrmodel', 0.01, self.rateBlocks(), 'sim.tmf', cache=False)
+        with open('mrmodel.c') as f:
+            txt = f.read()
+        self.assertIn('static int rateCnt = 0;', txt)
+        self.assertIn('  if (rateCnt % 5 == 0) {\n    sum(CG_OUT, &block_mrmodel[2]);\n  }\n'
+                      '  print(CG_OUT, &block_mrmodel[3]);\n'
+                      '  if (rateCnt % 5 == 0) {\n    print(CG_OUT, &block_mrmodel[4]);\n  }\n', txt)
+        self.assertIn('  rateCnt = (rateCnt + 1) % 5;\n}', txt)
+        self.assertIn('static void *inptr_2[]  = {&Node_2};', txt)
+
+
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def test_rateTasks(self):
+
+        """ One function per rate with rate transition buffers. """
+
+        with patch('sys.stdout'):
+            genCode('mrmodel', 0.01, self.rateBlocks(), 'sim.tmf', cache=False, rateTasks=True)
+        with open('mrmodel.c') as f:
+            txt = f.read()
+        self.assertIn('static const int rateFactor[2] = {1, 5};', txt)
+        self.assertIn('static void isr_rate_1(void)\n{\n  sum(CG_OUT, &block_mrmodel[2]);\n'
+                      '  print(CG_OUT, &block_mrmodel[4]);\n', txt)
+        # fast -> slow: copied at the release of the slow rate
+        self.assertIn('static void *inptr_2[]  = {&RtIn_1_2};', txt)
+        self.assertIn('    RtIn_1_2[0] = Node_2[0];\n', txt)
+        # slow -> fast: published at the release of the slow rate
+        self.assertIn('static void *inptr_3[]  = {&Node_2,&RtPub_3};', txt)
+        self.assertIn('    RtPub_3[0] = Node_3[0];\n', txt)
+        self.assertIn('void mrmodel_isr_rate(int k, double t)', txt)
+
+
+    def partBlocks(self):
+        blks = []
+        for k in range(0, 2):
+            r, e, u, y = 4*k+1, 4*k+2, 4*k+3, 4*k+4
+            blks += [RCPblk('constant', [], [r], [0,0], 0, [1.0], []),
+                     RCPblk('dss', [u], [y], [0,1], 0, [0.5, 1.0, 1.0, 0.0, 0.0], [1, 1, 1, 0, 1, 2, 3, 4]),
+                     RCPblk('sum', [r, y], [e], [0,0], 1, [1.0, -1.0], []),
+                     RCPblk('dss', [e], [u], [0,1], 1, [0.9, 1.0, 0.1, 2.0, 0.0], [1, 1, 1, 0, 1, 2, 3, 4])]
+        blks.append(RCPblk('print', [4, 8], [], [0,0], 1, [], []))
+        for n, blk in enumerate(blks):
+            blk.name = 'B' + str(n)
+        return blks
+
+
+    def test_detPartitions(self):
+
+        """ Feed-through chains kept together, balanced load. """
+
+        blks = self.partBlocks()
+        part, nparts = detPartitions(blks, 2)
+        self.assertEqual(nparts, 2)
+        self.assertEqual(part[2], part[3])
+        self.assertEqual(part[6], part[7])
+        self.assertNotEqual(part[2], part[6])
+        self.assertEqual(part, [0, 0, 0, 0, 1, 1, 1, 1, 0])
+        # A controller with feed-through reading the sum of both loops joins them
+        blks[7].pin = [2]
+        part, nparts = detPartitions(blks, 2)
+        self.assertEqual(part[2], part[7])
+        self.assertEqual(detPartitions(blks[2:4], 4), ([0, 0], 1))
+        # A continuous plant with feed-through stays with the blocks reading it
+        blks = self.partBlocks()
+        rp = hstack((asmatrix([[-1.0]]), asmatrix([[1.0]]), asmatrix([[1.0]]), asmatrix([[0.5]]), asmatrix([[0.0]])))
+        blks[5] = RCPblk('css', [7], [8], [1,0], 1, rp, [1, 1, 1, 0, 1, 2, 3, 4])
+        blks.append(RCPblk('dss', [8], [10], [0,1], 0, [0.5, 1.0, 1.0, 0.0, 0.0], [1, 1, 1, 0, 1, 2, 3, 4]))
+        part, nparts = detPartitions(blks, 2)
+        self.assertEqual(nparts, 2)
+        self.assertEqual(part[9], part[5])
+
+
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def test_partitions(self):
+
+        """ One function per partition and phase, copies of the remote signals. """
+
+        with patch('sys.stdout'):
+            genCode('ptmodel', 0.01, self.partBlocks(), 'sim.tmf', cache=False, partitions=2)
+        with open('ptmodel.c') as f:
+            txt = f.read()
+        self.assertIn('  return (2);', txt)
+        self.assertIn('  static const int sync[3] = {0, 1, 0};', txt)
+        self.assertIn('static void part_1_0(void)\n{\n  constant(CG_OUT, &block_ptmodel[5]);\n'
+                      '  dss(CG_OUT, &block_ptmodel[6]);\n}', txt)
+        # print of partition 0 reads the plant output of partition 1
+        self.assertIn('static void *inptr_3[]  = {&Node_4,&PtIn_0_8};', txt)
+        self.assertIn('static void part_0_1(void)\n{\n  PtIn_0_8[0] = Node_8[0];\n', txt)
+        self.assertIn('    for(p=0;p<2;p++) ptmodel_part_step(p, phase);', txt)
+
+
+    def vecBlocks(self):
+        blks = [RCPblk('constant', [], [1], [0,0], 0, [1.0, 2.0, 3.0], []),
+                RCPblk('constant', [], [2], [0,0], 0, [0.5], []),
+                RCPblk('sum', [1, 2], [3], [0,0], 1, [1, -1], []),
+                RCPblk('print', [3], [], [0,0], 1, [], [])]
+        blks[0].dimPout[:] = 3
+        blks[2].dimPin[:] = 0
+        blks[2].dimPout[:] = 0
+        blks[3].dimPin[:] = 0
+        for n, blk in enumerate(blks):
+            blk.name = 'B' + str(n)
+        return blks
+
+
+    def test_detDims(self):
+
+        """ Dimensions propagated and checked. """
+
+        blks = self.vecBlocks()
+        dimIn, dimOut, dims = detDims(blks)
+        self.assertEqual(dims, {1 : 3, 2 : 1, 3 : 3})
+        self.assertEqual(dimIn[2], [3, 1])
+        self.assertEqual(dimOut[2], [3])
+        self.assertEqual(dimIn[3], [3])
+        # A scalar input expected
+        blks[3].dimPin[:] = 1
+        with self.assertRaises(ValueError):
+            detDims(blks)
+        # Vectors of different widths
+        blks = self.vecBlocks()
+        blks[1].dimPout[:] = 2
+        with self.assertRaises(ValueError):
+            detDims(blks)
+
+
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def test_vector(self):
+
+        """ Vector signals declared as arrays. """
+
+        with patch('sys.stdout'):
+            genCode('vecmodel', 0.01, self.vecBlocks(), 'sim.tmf', cache=False)
+        with open('vecmodel.c') as f:
+            txt = f.read()
+        self.assertIn('static double Node_1[3] = {0.0};', txt)
+        self.assertIn('static double Node_2[] = {0.0};', txt)
+        self.assertIn('static int dimIn_2[] = {3, 1};', txt)
+        self.assertIn('.dimOut = dimOut_2', txt)
+        self.assertIn('.dimIn = NULL', txt)
+
+        with patch('sys.stdout'):
+            genCode('vecmodel', 0.01, self.vecBlocks(), 'sim.tmf', cache=False, signals=True, reuse=True)
+        with open('vecmodel.c') as f:
+            txt = f.read()
+        self.assertIn('static double signals[7] CG_SIGNALS_ALIGN;', txt)
+
+
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def test_varstep(self):
+
+        """ One state vector for the variable step solver. """
+
+        with patch('sys.stdout'):
+            genCode('refmodel', 0.01, refBlocks(), 'sim.tmf', cache=False, solver='dopri5', rtol=1e-5)
+        with open('refmodel.c') as f:
+            txt = f.read()
+        self.assertIn('#include <pyblock.h>\n#include <odesolver.h>\n', txt)
+        self.assertIn('static double contX[2];', txt)
+        self.assertIn('.xc = &contX[0];', txt)
+        self.assertIn('css(CG_DERIV, &block_refmodel[', txt)
+        self.assertIn('static ode_solver solver = {2, contX, contDX, contWork, refmodel_deriv, 1e-05, 1e-08, 0.0, 0, 0};', txt)
+        self.assertIn('  ode_dopri5(&solver, refmodel_get_tsamp());\n}', txt)
+        self.assertNotIn('h = refmodel_get_tsamp()', txt)
+
+        blks = refBlocks()
+        blks.append(RCPblk('contBlk', [1], [9], [1,0], 0, [0.0], []))
+        blks[-1].name = 'Cont'
+        with patch('sys.stdout'):
+            genCode('refmodel', 0.01, blks, 'sim.tmf', cache=False, solver='dopri5')
+        with open('refmodel.c') as f:
+            txt = f.read()
+        self.assertNotIn('odesolver', txt)
+        self.assertIn('h = refmodel_get_tsamp()/10;', txt)
+
+        with self.assertRaises(ValueError):
+            genCode('refmodel', 0.01, refBlocks(), 'sim.tmf', cache=False, solver='euler')
+
+
+    def loopBlocks(self):
+        # x' = -x and the oscillator x1' = x2, x2' = -x1 through sum blocks
+        blks = []
+        b = RCPblk('integral', [2], [1], [1,0], 0, [0.0, 1.0], [])
+        b.name = 'Int_0'; blks.append(b)
+        b = RCPblk('sum', [1], [2], [0,0], 1, [-1.0], [])
+        b.name = 'Gain_1'; blks.append(b)
+        b = RCPblk('integral', [5], [3], [1,0], 0, [0.0, 1.0], [])
+        b.name = 'Int_2'; blks.append(b)
+        b = RCPblk('sum', [3], [4], [0,0], 1, [-1.0], [])
+        b.name = 'Gain_3'; blks.append(b)
+        b = RCPblk('integral', [4], [5], [1,0], 0, [0.0, 0.0], [])
+        b.name = 'Int_4'; blks.append(b)
+        b = RCPblk('print', [1, 3], [], [0,0], 1, [], [])
+        b.name = 'Print_5'; blks.append(b)
+        return blks
+
+
+    @unittest.skipIf(shutil.which('gcc') is None, 'gcc not found')
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def test_varstep_loop(self):
+
+        """ Algebraic paths between the continuous blocks. """
+
+        self.assertEqual(detDerivPath(self.loopBlocks(), [1] * 6), [1, 3])
+        # A discrete state breaks the path
+        blks = self.loopBlocks()
+        blks[1] = RCPblk('dss', [1], [2], [0,1], 1, [0.0, 0.0, 0.0, -1.0, 0.0], [1, 1, 1, 0, 1, 2, 3, 4])
+        self.assertEqual(detDerivPath(blks, [1] * 6), [3])
+
+        with patch('sys.stdout'):
+            genCode('m', 0.1, self.loopBlocks(), 'sim.tmf', cache=False, solver='dopri5', rtol=1e-9, atol=1e-12)
+        with open('m.c') as f:
+            txt = f.read()
+        self.assertIn('static void m_deriv(void)\n{\n  integral(CG_OUT, &block_m[', txt)
+        dev = os.path.join(CODEGEN, 'Common', 'common_dev')
+        cmd = ['gcc', '-DMODEL=m', '-I' + os.path.join(CODEGEN, 'Common', 'include'),
+               '-I' + os.path.join(CODEGEN, 'LinuxRT', 'include'),
+               'm.c', os.path.join(CODEGEN, 'src', 'linux_main.c')] + \
+              [os.path.join(dev, f) for f in ['linear.c', 'matop.c', 'output.c', 'odesolver.c']] + \
+              ['-o', 'm', '-lm']
+        res = subprocess.run(cmd, capture_output=True, text=True)
+        self.assertEqual(res.returncode, 0, res.stderr)
+        res = subprocess.run(['./m', '-f', '1.05'], capture_output=True, text=True)
+        self.assertEqual(res.returncode, 0, res.stderr)
+        y = array([[float(v) for v in line.split()] for line in res.stdout.splitlines()])
+        t = 0.1 * arange(len(y))
+        self.assertEqual(len(y), 11)
+        self.assertTrue(abs(y[:, 0] - t).max() < 1e-6)
+        self.assertTrue(abs(y[:, 1] - exp(-t)).max() < 1e-5)
+        self.assertTrue(abs(y[:, 2] - cos(t)).max() < 1e-5)
+
+
+    def reuseBlocks(self):
+        # x' = -x + (1 - x) and 2 |step| computed after the sum of the loop
+        blks = []
+        b = RCPblk('constant', [], [1], [0,0], 0, [1.0], [])
+        b.name = 'Const_0'; blks.append(b)
+        b = RCPblk('sum', [1, 3], [2], [0,0], 1, [1.0, -1.0], [])
+        b.name = 'Sum_1'; blks.append(b)
+        b = RCPblk('css', [2], [3], [1,0], 0, [0.0, -1.0, 1.0, 1.0, 0.0, 0.0], [1, 1, 1, 1, 2, 3, 4, 5])
+        b.name = 'LTI_2'; blks.append(b)
+        b = RCPblk('step', [], [4], [0,0], 0, [0.0, 0.0, 3.0], [])
+        b.name = 'Step_3'; blks.append(b)
+        b = RCPblk('absV', [4], [5], [0,0], 1, [], [])
+        b.name = 'Abs_4'; blks.append(b)
+        b = RCPblk('sum', [5], [6], [0,0], 1, [2.0], [])
+        b.name = 'Gain_5'; blks.append(b)
+        b = RCPblk('print', [3, 6], [], [0,0], 1, [], [])
+        b.name = 'Print_6'; blks.append(b)
+        return blks
+
+
+    @unittest.skipIf(shutil.which('gcc') is None, 'gcc not found')
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def test_varstep_reuse(self):
+
+        """ No slot reuse with the variable step solver. """
+
+        with patch('sys.stdout'):
+            genCode('m', 0.1, self.reuseBlocks(), 'sim.tmf', cache=False, signals=True, reuse=True,
+                    solver='dopri5', rtol=1e-9, atol=1e-12)
+        with open('m.c') as f:
+            txt = f.read()
+        self.assertIn('static double signals[6] CG_SIGNALS_ALIGN;', txt)
+        dev = os.path.join(CODEGEN, 'Common', 'common_dev')
+        cmd = ['gcc', '-DMODEL=m', '-I' + os.path.join(CODEGEN, 'Common', 'include'),
+               '-I' + os.path.join(CODEGEN, 'LinuxRT', 'include'),
+               'm.c', os.path.join(CODEGEN, 'src', 'linux_main.c')] + \
+              [os.path.join(dev, f) for f in ['input.c', 'linear.c', 'matop.c', 'nonlinear.c', 'output.c',
+                                              'odesolver.c']] + \
+              ['-o', 'm', '-lm']
+        res = subprocess.run(cmd, capture_output=True, text=True)
+        self.assertEqual(res.returncode, 0, res.stderr)
+        res = subprocess.run(['./m', '-f', '0.45'], capture_output=True, text=True)
+        self.assertEqual(res.returncode, 0, res.stderr)
+        y = array([[float(v) for v in line.split()] for line in res.stdout.splitlines()])
+        t = 0.1 * arange(len(y))
+        self.assertEqual(len(y), 5)
+        self.assertTrue(abs(y[:, 1] - (1 - exp(-2*t))/2).max() < 1e-5)
+        self.assertTrue(abs(y[:, 2] - 6).max() < 1e-9)
+
+
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def test_profile(self):
+
+        """ Timestamps around the block calls. """
+
+        genCode('refmodel', 0.01, refBlocks(), 'sim.tmf', cache=False, profile=True)
+        with open('refmodel.c') as f:
+            txt = f.read()
+        self.assertIn('#include <profiler.h>\n', txt)
+        self.assertIn('static prof_entry prof_refmodel[10] = {\n  {"Iso_8", "", "printBlk"},\n  {"Const_0", "", "constant"},\n', txt)
+        self.assertIn('  {"LTI_3", "/Sub/LTI", "css"},\n', txt)
+        self.assertIn('  {"ISR", "", "isr"}\n};', txt)
+        self.assertIn('  { PROF_BEGIN();\n  constant(CG_OUT, &block_refmodel[1]);\n'
+                      '  PROF_END(prof_refmodel, 1); }\n', txt)
+        # Continuous blocks in the integration loop
+        self.assertIn('    { PROF_BEGIN();\n    css(CG_STUPD, &block_refmodel[3]);\n'
+                      '    PROF_END(prof_refmodel, 3); }\n', txt)
+        self.assertIn('  prof_commit(prof_refmodel, 10);\n}', txt)
+        self.assertIn('  prof_dump("refmodel_prof.json", "refmodel", prof_refmodel, 10);\n', txt)
+        self.assertIn('  prof_init(prof_refmodel, 10);\n', txt)
+
+        with patch('sys.stdout'):
+            genCode('refmodel', 0.01, refBlocks(), 'sim.tmf', cache=False, profile=True, partitions=2)
+        with open('refmodel.c') as f:
+            self.assertNotIn('PROF_BEGIN', f.read())
+
+
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def test_shlib(self):
+
+        """ Tables of the shared library. """
+
+        with patch('sys.stdout'):
+            genCode('refmodel', 0.01, refBlocks(), 'shlib.tmf', cache=False, reuse=True, inline=True)
+        with open('refmodel.c') as f:
+            txt = f.read()
+        self.assertIn('static double signals[6] CG_SIGNALS_ALIGN;\n', txt)
+        self.assertNotIn('{ double ', txt)
+        self.assertIn('const int refmodel_nblocks = 9;\n', txt)
+        self.assertIn('double * const refmodel_signals = signals;\n', txt)
+        self.assertIn('const int refmodel_node_slot[] = {-1, 0, 1, 5, 2, 3, 4};\n', txt)
+        self.assertIn('const int refmodel_node_dim[] = {0, 1, 1, 1, 1, 1, 1};\n', txt)
+        self.assertIn('const char * const refmodel_blk_path[] = {"", "", "", "/Sub/LTI", "", "", "", "", ""};\n', txt)
+        self.assertIn('double * const refmodel_blk_realPar[] = {NULL, realPar_1, realPar_2, realPar_3, '
+                      'realPar_4, realPar_5, realPar_6, NULL, NULL};\n', txt)
+        self.assertIn('const int refmodel_blk_nout[] = {0, 1, 1, 1, 1, 1, 1, 0, 0};\n', txt)
+        self.assertIn('const int refmodel_blk_pout[] = {1, 2, 4, 5, 6, 3};\n', txt)
+        self.assertIn('const int refmodel_nstate = 0;\n', txt)
+
+        # Same tables with the option and another template, state of the solver
+        with patch('sys.stdout'):
+            genCode('refmodel', 0.01, refBlocks(), 'sim.tmf', cache=False, shlib=True, solver='dopri5')
+        with open('refmodel.c') as f:
+            txt = f.read()
+        self.assertIn('const int refmodel_nblocks = 9;\n', txt)
+        self.assertIn('void * const refmodel_state[] = {&contX, &contDX, &contWork, &solver};\n', txt)
+
+
+    def test_resolveOpts(self):
+
+        """ Options not compatible with the settings. """
+
+        with patch('sys.stdout') as out:
+            opts = resolveOpts({'reuse' : True, 'inline' : True, 'profile' : False},
+                               {'shlib' : True, 'partitions' : True})
+        self.assertEqual(opts, {'reuse' : False, 'inline' : False, 'profile' : False})
+        self.assertEqual([c.args[0] for c in out.write.call_args_list if c.args[0] != '\n'],
+                         ['Signal slot reuse not used with the shared library',
+                          'Inline code generation not used with the shared library'])
+        with patch('sys.stdout'):
+            self.assertEqual(resolveOpts({'reuse' : True, 'optimize' : True}, {'multirate' : False}),
+                             {'reuse' : True, 'optimize' : True})
+            self.assertEqual(resolveOpts({'partitions' : True}, {'multirate' : True}), {'partitions' : False})
+
+
+    def test_fmtPar(self):
+
+        """ Parameters keep full precision and are flattened. """
+
+        self.assertEqual(fmtPar([0.1, 1e-05, 1/3]), '0.1, 1e-05, 0.3333333333333333')
+        self.assertEqual(fmtPar([2, 1, -1]), '2, 1, -1')
+        self.assertEqual(fmtPar(asmatrix([[1.0, 2.0]])), '1.0, 2.0')
+        self.assertEqual(fmtPar([]), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
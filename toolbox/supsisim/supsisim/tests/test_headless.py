@@ -0,0 +1,152 @@
+import sys
+import os
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+from toolbox.supsisim.supsisim.headless import blkInstance, dgmToDiagram, buildAll
+
+
+"""
+
+Unit Tests for the headless code generation (headless.py)
+
+The following scenarios are tested:
+
+   - `test_blkInstance`:     The factory call of a block is created as in the editor,
+                             the names of the real and integer parameters are returned.
+
+   - `test_subsystem`:       A diagram with a subsystem is flattened, the IO blocks are removed
+                             and the inputs of the internal blocks are connected to the outside blocks.
+                             Expected node numbering and system paths are the ones of the editor.
+
+   - `test_flip`:            The ports of a flipped block are found at the mirrored positions.
+
+   - `test_not_connected`:   An unconnected input raises a ValueError.
+
+   - `test_solver`:          The solver settings of the diagram are passed to genCode,
+                             the options of the command line override them.
+
+   - `test_buildAll`:        Two diagrams are generated in parallel without make,
+                             each one into its own output folder.
+
+"""
+
+
+def blk(name, inp, outp, params, pos, flip=False):
+    return {'name' : name, 'inp' : inp, 'outp' : outp, 'inset' : False, 'outset' : False,
+            'icon' : 'IO', 'params' : params, 'help' : '', 'width' : 80, 'flip' : flip, 'pos' : pos}
+
+
+def conn(pos1, pos2):
+    return {'pos1' : pos1, 'pos2' : pos2, 'points' : []}
+
+
+def makeDgm():
+    # Two constants -> Subsystem (in_1, in_2 -> Sum -> out_1) -> Print
+    conns = [conn([40.0, 0.0], [160.0, 30.0]),
+             conn([40.0, 100.0], [160.0, 70.0]),
+             conn([240.0, 50.0], [360.0, 50.0])]
+    inner = {'blocks' : [blk('in_1', 0, 1, 'IOBlk', [0.0, 0.0]),
+                         blk('in_2', 0, 1, 'IOBlk', [0.0, 100.0]),
+                         blk('Sum', 2, 1, 'sumBlk|Gains: [1,-1]', [200.0, 50.0]),
+                         blk('out_1', 1, 0, 'IOBlk', [400.0, 50.0])],
+             'connections' : conns, 'subsystems' : []}
+    subs = blk('Subsystem', 2, 1, 'SubsystemBlk', [200.0, 50.0])
+    return {'simulate' : {'template' : 'sim.tmf', 'Ts' : '0.01', 'AddObj' : '', 'script' : '',
+                          'Tf' : '10', 'prio' : ''},
+            'blocks' : [blk('Const', 0, 1, 'constBlk|Value: 1: double', [0.0, 0.0]),
+                        blk('Const2', 0, 1, 'constBlk|Value: 2: double', [0.0, 100.0]),
+                        blk('Print', 1, 0, 'printBlk', [400.0, 50.0])],
+            'connections' : conns,
+            'subsystems' : [{'block' : subs, 'subitems' : inner}]}
+
+
+class TestHeadless(unittest.TestCase):
+
+    def test_blkInstance(self):
+
+        """ Factory call as created by the editor. """
+
+        txt, pars = blkInstance('Sat_2', 'saturBlk|Upper saturation: 10: double|Lower saturation: -10: double',
+                                ['3'], ['4'])
+        self.assertEqual(txt, 'Sat_2 = saturBlk([3],[4],  10,  -10)')
+        self.assertEqual([p[2] for p in pars], ['double', 'double'])
+
+        txt, pars = blkInstance('Plot_0', 'plotBlk', ['1', '2'], [])
+        self.assertEqual(txt, "Plot_0 = plotBlk([1,2], 'Plot_0')")
+
+
+    def test_subsystem(self):
+
+        """ Subsystems are flattened and connected. """
+
+        d = dgmToDiagram('/tmp/model.dgm', makeDgm())
+        self.assertEqual(d['model'], 'model')
+        blocks = {b['name'] : b for b in d['blocks']}
+        self.assertEqual(sorted(blocks), ['Const2_1', 'Const_0', 'Print_2', 'Sum_3'])
+        self.assertEqual(blocks['Const_0']['call'], 'constBlk([1],  1)')
+        self.assertEqual(blocks['Const_0']['realParNames'], ('Value',))
+        self.assertEqual(blocks['Sum_3']['call'], 'sumBlk([1,2],[3],  [1,-1])')
+        self.assertEqual(blocks['Sum_3']['sysPath'], '/Subsystem/Sum')
+        self.assertEqual(blocks['Print_2']['call'], 'printBlk([3])')
+        self.assertEqual(blocks['Print_2']['sysPath'], '/Print')
+
+
+    def test_flip(self):
+
+        """ Ports of flipped blocks are mirrored. """
+
+        dgm = {'blocks' : [blk('Const', 0, 1, 'constBlk|Value: 1: double', [0.0, 0.0], flip=True),
+                           blk('Print', 1, 0, 'printBlk', [-200.0, 0.0])],
+               'connections' : [conn([-40.0, 0.0], [-240.0, 0.0])]}
+        d = dgmToDiagram('flip.dgm', dgm)
+        self.assertEqual(d['blocks'][1]['call'], 'printBlk([1])')
+
+
+    def test_not_connected(self):
+
+        """ An unconnected input raises an error. """
+
+        dgm = {'blocks' : [blk('Print', 1, 0, 'printBlk', [0.0, 0.0])], 'connections' : []}
+        with self.assertRaises(ValueError):
+            dgmToDiagram('err.dgm', dgm)
+
+
+    def test_solver(self):
+
+        """ Solver settings of the diagram. """
+
+        dgm = makeDgm()
+        self.assertEqual(dgmToDiagram('/tmp/model.dgm', dgm)['cgOpts'], {})
+        dgm['simulate'].update({'solver' : 'dopri5', 'rtol' : '1e-4', 'atol' : ''})
+        self.assertEqual(dgmToDiagram('/tmp/model.dgm', dgm)['cgOpts'], {'solver' : 'dopri5', 'rtol' : 1e-4})
+        d = dgmToDiagram('/tmp/model.dgm', dgm, cgOpts = {'solver' : 'fixed'})
+        self.assertEqual(d['cgOpts']['solver'], 'fixed')
+
+
+    @patch.dict(os.environ, {'SHV_USED' : 'False', 'SHV_TREE_TYPE' : 'GAVL'})
+    def test_buildAll(self):
+
+        """ Diagrams are generated in parallel into separate folders. """
+
+        if not os.path.isdir(os.path.join(os.environ.get('PYSUPSICTRL', ''), 'resources')):
+            self.skipTest('PYSUPSICTRL not set')
+        with tempfile.TemporaryDirectory() as tmp:
+            files = []
+            for name in ['m1', 'm2']:
+                fname = os.path.join(tmp, name + '.dgm')
+                with open(fname, 'w') as f:
+                    json.dump(makeDgm(), f)
+                files.append(fname)
+
+            res = buildAll(files, os.path.join(tmp, 'out'), build=False, jobs=2)
+            self.assertEqual([r[1] for r in res], [0, 0], str(res))
+            for name in ['m1', 'm2']:
+                self.assertTrue(os.path.isfile(os.path.join(tmp, 'out', name + '_gen', name + '.c')))
+                self.assertTrue(os.path.isfile(os.path.join(tmp, 'out', name + '_gen', 'Makefile')))
+
+
+if __name__ == '__main__':
+    unittest.main()
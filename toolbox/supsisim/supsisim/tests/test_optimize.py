@@ -0,0 +1,146 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+from toolbox.supsisim.supsisim.RCPblk import RCPblk
+from toolbox.supsisim.supsisim.RCPgen import genCode
+from toolbox.supsisim.supsisim.optimize import optBlocks, foldBlk
+
+
+"""
+
+Unit Tests for the optimization of the block list (optimize.py)
+
+The following scenarios are tested:
+
+   - `test_fold`:        A chain of pure blocks fed by constants is replaced by one constant block
+                         with the value computed as in the C code, the unused sources are removed
+                         and equal folded constants are merged.
+
+   - `test_foldBlk`:     The folded values of sum, prod, saturation, lut and mxmult blocks.
+
+   - `test_merge`:       Two identical blocks with the same inputs are merged, the readers of the removed
+                         block (also a block with states executed first) are connected to the kept one.
+
+   - `test_dead`:        Pure blocks reaching no sink are removed, blocks with states or side effects are kept
+                         even if their outputs are not used. The blocks of the original list are not modified.
+
+   - `test_genCode`:     With optimize=True the generated code contains only the remaining blocks,
+                         the folded constant is merged with the identical source constant.
+
+"""
+
+
+def blk(fcn, pin, pout, realPar=[], intPar=[], nx=[0,0], uy=1, name=None):
+    b = RCPblk(fcn, pin, pout, nx, uy, realPar, intPar)
+    b.name = name
+    return b
+
+
+class TestOptimize(unittest.TestCase):
+
+    def test_fold(self):
+
+        """ Constant chains are folded. """
+
+        blks = [blk('constant', [], [1], [2.0], uy=0, name='C1'),
+                blk('constant', [], [2], [0.25], uy=0, name='C2'),
+                blk('sum', [1, 2], [3], [1, -3], name='Sum'),
+                blk('saturation', [3], [4], [10.0, 0.2], name='Sat'),
+                blk('sinus', [], [5], [1.0, 1.0, 0.0, 0.0, 0.0], uy=0, name='Sine'),
+                blk('prod', [4, 5], [6], name='Prod'),
+                blk('print', [6], [], name='Print')]
+        with patch('sys.stdout'):
+            res, msgs = optBlocks(blks)
+        # Sum and Sat are both folded to 1.25, the two constants are merged
+        self.assertEqual([b.name for b in res], ['Sum', 'Sine', 'Prod', 'Print'])
+        self.assertEqual(res[0].fcn, 'constant')
+        self.assertEqual(res[0].realPar.tolist(), [1.25])
+        self.assertEqual(res[0].pout.tolist(), [3])
+        self.assertEqual(res[2].pin.tolist(), [3, 5])
+        self.assertIn('Optimization: Sum (sum) folded into constant(s)', msgs)
+        self.assertIn('Optimization: C1 (constant) removed (output not used)', msgs)
+        self.assertEqual(msgs[-1], 'Optimization: 7 -> 4 blocks')
+
+
+    def test_foldBlk(self):
+
+        """ Values computed as in the C blocks. """
+
+        self.assertEqual(foldBlk(blk('sum', [1, 2, 3], [4], [1, -1, 0.5]), [1.0, 2.0, 3.0]), [0.5])
+        self.assertEqual(foldBlk(blk('prod', [1, 2], [3]), [3.0, -2.0]), [-6.0])
+        self.assertEqual(foldBlk(blk('saturation', [1], [2], [1.0, -1.0]), [-3.0]), [-1.0])
+        self.assertEqual(foldBlk(blk('lut', [1], [2], [[1.0, 0.0, 2.0]], [3]), [3.0]), [11.0])
+        self.assertEqual(foldBlk(blk('mxmult', [1, 2], [3, 4], [[1.0, 2.0, 3.0, 4.0]], [2, 2]), [1.0, 1.0]),
+                         [3.0, 7.0])
+
+
+    def test_merge(self):
+
+        """ Duplicated blocks are merged. """
+
+        blks = [blk('dss', [5], [6], [0.5, 1.0, 1.0, 0.0, 0.0], [1, 1, 1, 0, 1, 2, 3, 4], nx=[0,1], uy=0, name='DSS'),
+                blk('sinus', [], [1], [1.0, 1.0, 0.0, 0.0, 0.0], uy=0, name='S1'),
+                blk('sinus', [], [2], [1.0, 1.0, 0.0, 0.0, 0.0], uy=0, name='S2'),
+                blk('absV', [1], [3], name='Abs1'),
+                blk('absV', [2], [5], name='Abs2'),
+                blk('print', [1, 2, 3, 5, 6], [], name='Print')]
+        with patch('sys.stdout'):
+            res, msgs = optBlocks(blks)
+        self.assertEqual([b.name for b in res], ['DSS', 'S1', 'Abs1', 'Print'])
+        self.assertEqual(res[0].pin.tolist(), [3])
+        self.assertEqual(res[3].pin.tolist(), [1, 1, 3, 3, 6])
+        self.assertIn('Optimization: Abs2 (absV) merged into Abs1 (absV)', msgs)
+        self.assertEqual(blks[0].pin.tolist(), [5])
+
+
+    def test_dead(self):
+
+        """ Unused pure blocks are removed. """
+
+        blks = [blk('constant', [], [1], [1.0], uy=0, name='C'),
+                blk('extdata', [], [2], uy=0, name='Ext'),
+                blk('sinus', [], [3], [1.0, 1.0, 0.0, 0.0, 0.0], uy=0, name='Sine'),
+                blk('sum', [2, 3], [4], [1, 1], name='Sum'),
+                blk('trigo', [4], [5], [], [1], name='Sin'),
+                blk('discretePID', [3], [6], [1.0, 0.0, 0.0, -1.0, 1.0, 0.0, 0.0], name='PID'),
+                blk('print', [1], [], name='Print')]
+        with patch('sys.stdout'):
+            res, msgs = optBlocks(blks)
+        self.assertEqual([b.name for b in res], ['C', 'Ext', 'Sine', 'PID', 'Print'])
+        self.assertIn('Optimization: Sin (trigo) removed (output not used)', msgs)
+        self.assertIn('Optimization: Sum (sum) removed (output not used)', msgs)
+
+
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def test_genCode(self):
+
+        """ Only the remaining blocks are generated. """
+
+        blks = [blk('constant', [], [1], [2.0], uy=0, name='C1'),
+                blk('absV', [1], [2], name='Abs'),
+                blk('sum', [1], [3], [1], name='Unused'),
+                blk('print', [2], [], name='Print')]
+        cwd = os.getcwd()
+        tmp = tempfile.mkdtemp()
+        try:
+            os.chdir(tmp)
+            with patch('sys.stdout'):
+                genCode('optmodel', 0.01, blks, 'sim.tmf', cache=False, optimize=True)
+            with open('optmodel.c') as f:
+                txt = f.read()
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(tmp)
+        self.assertIn('python_block block_optmodel[2];', txt)
+        self.assertIn('static double realPar_0[] = {2.0};', txt)
+        self.assertIn('static void *inptr_1[]  = {&Node_1};', txt)
+        self.assertNotIn('sum(CG_OUT', txt)
+        self.assertNotIn('absV(CG_OUT', txt)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,200 @@
+import sys
+import os
+import shutil
+import tempfile
+import subprocess
+import unittest
+from unittest.mock import patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+from toolbox.supsisim.supsisim.RCPblk import RCPblk
+from toolbox.supsisim.supsisim.RCPgen import genCode
+from toolbox.supsisim.supsisim.parfile import parRecords, writeParFile, readParFile, patchParFile, \
+    PAR_REAL, PAR_INT
+
+
+"""
+
+Unit Tests for the parameter files (parfile.py, option -P of linux_main.c)
+
+The following scenarios are tested:
+
+   - `test_records`:         One record per real and integer parameter, named after realParNames
+                             or "double<k>"/"int<k>".
+
+   - `test_roundtrip`:       A written file is read back with the same records, names too long
+                             for the file are skipped.
+
+   - `test_patch`:           Patched parameters keep their records, with only=True the file holds
+                             only them, unknown parameters raise a KeyError.
+
+   - `test_genCode`:         With parFile=True the table of the blocks and <model>_par_load are
+                             generated, <model>.par is written and the blocks are not inlined.
+
+   - `test_load`:            The executable built with linux_main.c runs with the parameters of the
+                             files given with -P, applied in order.
+
+   - `test_optimize`:        With the parameter file the blocks are not optimized: a constant that
+                             would be folded keeps its record and can be patched with -P.
+
+"""
+
+CODEGEN = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'CodeGen'))
+
+
+def parBlocks():
+    blks = []
+    b = RCPblk('constant', [], [1], [0,0], 0, [1.0], [])
+    b.name = 'Const_0'; b.realParNames = ['Value']; blks.append(b)
+    b = RCPblk('dss', [1], [2], [0,1], 1, [1.0, 1.0, 1.0, 0.0, 0.0], [1, 1, 1, 0, 1, 2, 3, 4])
+    b.name = 'Int_1'; blks.append(b)
+    b = RCPblk('sum', [1, 2], [3], [0,0], 1, [1, 2], [])
+    b.name = 'Sum_2'; blks.append(b)
+    b = RCPblk('print', [3], [], [0,0], 1, [], [])
+    b.name = 'Print_3'; blks.append(b)
+    return blks
+
+
+class TestParFile(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+
+    def test_records(self):
+
+        """ Records of a block list. """
+
+        recs = parRecords(parBlocks())
+        self.assertEqual(len(recs), 16)
+        self.assertEqual(recs[0], ('Const_0', 'Value', PAR_REAL, 0, 1.0))
+        self.assertEqual(recs[1], ('Int_1', 'double0', PAR_REAL, 0, 1.0))
+        self.assertEqual(recs[6], ('Int_1', 'int0', PAR_INT, 0, 1.0))
+        self.assertEqual(recs[-1], ('Sum_2', 'double1', PAR_REAL, 1, 2.0))
+
+
+    def test_roundtrip(self):
+
+        """ Write and read. """
+
+        recs = parRecords(parBlocks())
+        self.assertEqual(writeParFile('m.par', 'm', recs + [('B' * 90, 'x', PAR_REAL, 0, 1.0)]),
+                         [('B' * 90, 'x', PAR_REAL, 0, 1.0)])
+        self.assertEqual(os.path.getsize('m.par'), 64 + 136 * 16)
+        model, back = readParFile('m.par')
+        self.assertEqual(model, 'm')
+        self.assertEqual(back, recs)
+        with open('bad.par', 'wb') as f:
+            f.write(b'NOTAPAR!' + bytes(56))
+        with self.assertRaises(ValueError):
+            readParFile('bad.par')
+
+
+    def test_patch(self):
+
+        """ Patch of a file. """
+
+        writeParFile('m.par', 'm', parRecords(parBlocks()))
+        patchParFile('m.par', {'Const_0.Value' : 3.0, ('Int_1', 'int3') : 2}, 'p.par')
+        recs = readParFile('p.par')[1]
+        self.assertEqual(len(recs), 16)
+        self.assertEqual(recs[0][4], 3.0)
+        self.assertEqual(recs[9], ('Int_1', 'int3', PAR_INT, 3, 2.0))
+        recs = patchParFile('m.par', {'Sum_2.double1' : 10.0}, only=True)
+        self.assertEqual(readParFile('m.par')[1], [('Sum_2', 'double1', PAR_REAL, 1, 10.0)])
+        with self.assertRaises(KeyError):
+            patchParFile('m.par', {'Foo_9.x' : 1.0})
+
+
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def test_genCode(self):
+
+        """ Generated table and parameter file. """
+
+        with patch('sys.stdout'):
+            genCode('m', 0.1, parBlocks(), 'sim.tmf', cache=False, parFile=True, inline=True)
+        with open('m.c') as f:
+            txt = f.read()
+        self.assertIn('#include <parfile.h>\n', txt)
+        self.assertIn('  {"Const_0", realPar_0, 1, realParNames_0, NULL, 0, NULL},\n', txt)
+        self.assertIn('  {"Int_1", realPar_1, 5, realParNames_1, intPar_1, 8, intParNames_1},\n', txt)
+        self.assertIn('  return (par_load(fname, "m", parBlocks, 3, verbose));\n', txt)
+        self.assertIn('  constant(CG_OUT, &block_m[0]);\n', txt)
+        self.assertEqual(readParFile('m.par')[1], parRecords(parBlocks()))
+
+        # The missing parameter file is written again
+        os.remove('m.par')
+        with patch('sys.stdout'):
+            genCode('m', 0.1, parBlocks(), 'sim.tmf', parFile=True)
+            genCode('m', 0.1, parBlocks(), 'sim.tmf', parFile=True)
+            os.remove('m.par')
+            genCode('m', 0.1, parBlocks(), 'sim.tmf', parFile=True)
+        self.assertTrue(os.path.isfile('m.par'))
+
+
+    def build(self, blks, **opts):
+        with patch('sys.stdout'):
+            genCode('m', 0.1, blks, 'sim.tmf', cache=False, parFile=True, **opts)
+        dev = os.path.join(CODEGEN, 'Common', 'common_dev')
+        cmd = ['gcc', '-DMODEL=m', '-I' + os.path.join(CODEGEN, 'Common', 'include'),
+               '-I' + os.path.join(CODEGEN, 'LinuxRT', 'include'),
+               'm.c', os.path.join(CODEGEN, 'src', 'linux_main.c'),
+               os.path.join(CODEGEN, 'Common', 'posix', 'parfile.c')] + \
+              [os.path.join(dev, f) for f in ['input.c', 'linear.c', 'matop.c', 'output.c']] + \
+              ['-o', 'm', '-lm']
+        res = subprocess.run(cmd, capture_output=True, text=True)
+        self.assertEqual(res.returncode, 0, res.stderr)
+
+    def run_model(self, *args):
+        out = subprocess.run(['./m', '-f', '0.3'] + list(args), capture_output=True, text=True)
+        return [float(line.split()[1]) for line in out.stdout.splitlines()], out.stderr
+
+
+    @unittest.skipIf(shutil.which('gcc') is None, 'gcc not found')
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def test_load(self):
+
+        """ Option -P of the executable. """
+
+        self.build(parBlocks())
+        run = self.run_model
+        self.assertEqual(run()[0], [1.0, 3.0, 5.0])
+        patchParFile('m.par', {'Const_0.Value' : 3.0}, 'a.par', only=True)
+        patchParFile('m.par', {'Sum_2.double1' : 10.0, 'Const_0.Value' : 2.0}, 'b.par', only=True)
+        self.assertEqual(run('-P', 'a.par')[0], [3.0, 9.0, 15.0])
+        self.assertEqual(run('-P', 'a.par', '-P', 'b.par')[0], [2.0, 22.0, 42.0])
+        # Records of other models and unknown parameters are skipped
+        writeParFile('c.par', 'other', [('Const_0', 'Value', PAR_REAL, 0, 4.0), ('Foo_9', 'x', PAR_REAL, 0, 1.0)])
+        y, err = run('-P', 'c.par')
+        self.assertEqual(y, [4.0, 12.0, 20.0])
+        self.assertIn('written for the model other', err)
+        self.assertIn('Foo_9.x not found', err)
+
+
+    @unittest.skipIf(shutil.which('gcc') is None, 'gcc not found')
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def test_optimize(self):
+
+        """ Parameter file and optimization. """
+
+        blks = []
+        b = RCPblk('constant', [], [1], [0,0], 0, [1.0], [])
+        b.name = 'Const_0'; b.realParNames = ['Value']; blks.append(b)
+        b = RCPblk('sum', [1], [2], [0,0], 1, [2.0], [])
+        b.name = 'Gain_1'; blks.append(b)
+        b = RCPblk('print', [2], [], [0,0], 1, [], [])
+        b.name = 'Print_2'; blks.append(b)
+        self.build(blks, optimize=True)
+        self.assertEqual(readParFile('m.par')[1], parRecords(blks))
+        self.assertEqual(self.run_model()[0], [2.0, 2.0, 2.0])
+        patchParFile('m.par', {'Const_0.Value' : 3.0, 'Gain_1.double0' : -1.0}, 'a.par', only=True)
+        self.assertEqual(self.run_model('-P', 'a.par')[0], [-3.0, -3.0, -3.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import sys
+import os
+import json
+import tempfile
+import unittest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+from toolbox.supsisim.supsisim.profiler import loadProfile, pathCosts, costColor
+
+
+"""
+
+Unit Tests for the execution time profile (profiler.py)
+
+The following scenarios are tested:
+
+   - `test_pathCosts`:   The mean time of the blocks is added to their system path and to the
+                         subsystems containing them, blocks of slower rates are weighted by
+                         their share of the ISR executions.
+
+   - `test_costColor`:   The colour goes from green (no cost) to red (maximal cost).
+
+"""
+
+
+def entry(index, name, path, count, mean):
+    return {'index' : index, 'name' : name, 'sysPath' : path, 'fcn' : 'f', 'count' : count,
+            'min' : mean, 'mean' : mean, 'max' : mean, 'hist' : []}
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_pathCosts(self):
+
+        """ Block times summed into the subsystems. """
+
+        prof = {'model' : 'm', 'unit' : 'ns', 'hist_edges' : [],
+                'blocks' : [entry(0, 'Const_0', '/Const', 100, 10.0),
+                            entry(1, 'Sum_1', '/Sub/Sum', 100, 30.0),
+                            entry(2, 'PID_2', '/Sub/Inner/PID', 50, 120.0),
+                            entry(-1, 'ISR', '', 100, 100.0)]}
+        with tempfile.TemporaryDirectory() as tmp:
+            fname = os.path.join(tmp, 'm_prof.json')
+            with open(fname, 'w') as f:
+                json.dump(prof, f)
+            costs, total = pathCosts(loadProfile(fname))
+        self.assertEqual(total, 100.0)
+        self.assertEqual(costs, {'/Const' : 10.0, '/Sub/Sum' : 30.0, '/Sub/Inner/PID' : 60.0,
+                                 '/Sub/Inner' : 60.0, '/Sub' : 90.0})
+
+
+    def test_costColor(self):
+
+        """ Green to red. """
+
+        self.assertEqual(costColor(0.0, 10.0), (0, 200, 0))
+        self.assertEqual(costColor(5.0, 10.0), (255, 200, 0))
+        self.assertEqual(costColor(10.0, 10.0), (255, 0, 0))
+        self.assertEqual(costColor(1.0, 0.0), (0, 200, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
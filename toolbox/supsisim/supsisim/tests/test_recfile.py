@@ -0,0 +1,152 @@
+import sys
+import os
+import shutil
+import tempfile
+import subprocess
+import unittest
+from unittest.mock import patch
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+from toolbox.supsisim.supsisim.RCPblk import RCPblk
+from toolbox.supsisim.supsisim.RCPgen import genCode
+from toolbox.supsisim.supsisim.recfile import HEADER, REC_MAGIC, REC_VERSION, REC_CLOSED, \
+    isRecFile, readHeader, readRecFile, loadData
+from toolbox.supsisim.supsisim.tests.test_parfile import CODEGEN
+
+
+"""
+
+Unit Tests for the recordings of the plot and toFile blocks (recfile.py, recorder.c)
+
+The following scenarios are tested:
+
+   - `test_read`:            A binary recording is read (copied or mapped), the rows of a recording
+                             not closed are counted from the file size, text files are read too.
+
+   - `test_record`:          The toFile block in binary mode records time and all the elements of its
+                             inputs at full precision, with the names and Tsamp in the header.
+
+   - `test_drop`:            With a ring of 2 rows and drop set every row is either written or
+                             counted as dropped.
+
+"""
+
+
+def writeRec(fname, names, data, Tsamp=0.1, closed=True):
+    txt = b''.join([n.encode() + b'\0' for n in names])
+    txt += bytes((8 - len(txt) % 8) % 8)
+    with open(fname, 'wb') as f:
+        f.write(HEADER.pack(REC_MAGIC, REC_VERSION, len(names), Tsamp, data.shape[0] if closed else 0,
+                            3, 1, len(txt), REC_CLOSED if closed else 0, 0))
+        f.write(txt)
+        f.write(np.asarray(data, dtype='<f8').tobytes())
+
+
+def recBlocks(ipar, fname):
+    blks = []
+    b = RCPblk('constant', [], [1], [0,0], 0, [1.0], [])
+    b.name = 'Const_0'; blks.append(b)
+    b = RCPblk('dss', [1], [2], [0,1], 1, [1.0, 1.0, 1.0, 0.0, 0.0], [1, 1, 1, 0, 1, 2, 3, 4])
+    b.name = 'Int_1'; blks.append(b)
+    b = RCPblk('constant', [], [3], [0,0], 0, [1/3, 2/3], [])
+    b.name = 'Vec_2'; b.dimPout[0] = 2; blks.append(b)
+    b = RCPblk('toFile', [2, 3], [], [0,0], 1, [], ipar, fname)
+    b.name = 'File_3'; b.dimPin[:] = 0; blks.append(b)
+    return blks
+
+
+class TestRecFile(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def build(self, blks):
+        with patch('sys.stdout'):
+            genCode('m', 0.1, blks, 'sim.tmf', cache=False)
+        dev = os.path.join(CODEGEN, 'Common', 'common_dev')
+        posix = os.path.join(CODEGEN, 'Common', 'posix')
+        cmd = ['gcc', '-DMODEL=m', '-I' + os.path.join(CODEGEN, 'Common', 'include'),
+               '-I' + os.path.join(CODEGEN, 'LinuxRT', 'include'),
+               'm.c', os.path.join(CODEGEN, 'src', 'linux_main.c'),
+               os.path.join(posix, 'toFile.c'), os.path.join(posix, 'recorder.c')] + \
+              [os.path.join(dev, f) for f in ['aggregate.c', 'input.c', 'linear.c', 'matop.c']] + \
+              ['-o', 'm', '-lm', '-lpthread']
+        res = subprocess.run(cmd, capture_output=True, text=True)
+        self.assertEqual(res.returncode, 0, res.stderr)
+
+
+    def test_read(self):
+
+        """ Binary and text files. """
+
+        data = np.arange(12.0).reshape(4, 3) / 7
+        writeRec('a.bin', ['t', 'x', 'speed'], data)
+        self.assertTrue(isRecFile('a.bin'))
+        hd = readHeader('a.bin')
+        self.assertEqual(hd['names'], ['t', 'x', 'speed'])
+        self.assertEqual((hd['nrow'], hd['dropped'], hd['overflows'], hd['offset']), (4, 3, 1, 80))
+        self.assertTrue(hd['closed'])
+        np.testing.assert_array_equal(readRecFile('a.bin')[0], data)
+        np.testing.assert_array_equal(readRecFile('a.bin', mmap=True)[0], data)
+        # Not closed: the last complete row is the last one
+        writeRec('b.bin', ['t', 'x', 'speed'], data, closed=False)
+        with open('b.bin', 'ab') as f:
+            f.write(bytes(8))
+        np.testing.assert_array_equal(readRecFile('b.bin')[0], data)
+        self.assertFalse(readHeader('b.bin')['closed'])
+        # Text
+        with open('c.txt', 'w') as f:
+            f.write('# t\tx,speed\n0.0\t1.0\t2.0\t\n0.1\t3.0\t4.0\t\n')
+        self.assertFalse(isRecFile('c.txt'))
+        x, names = loadData('c.txt')
+        self.assertEqual(names, ['t', 'x', 'speed'])
+        np.testing.assert_array_equal(x, [[0.0, 1.0, 2.0], [0.1, 3.0, 4.0]])
+        with self.assertRaises(ValueError):
+            readHeader('c.txt')
+
+
+    @unittest.skipIf(shutil.which('gcc') is None, 'gcc not found')
+    def test_record(self):
+
+        """ Binary recording of the toFile block. """
+
+        self.build(recBlocks([1, 0], 'rec.bin|pos,a'))
+        res = subprocess.run(['./m', '-f', '0.4'], capture_output=True, text=True)
+        self.assertEqual(res.returncode, 0, res.stderr)
+        x, hd = readRecFile('rec.bin')
+        self.assertEqual(hd['names'], ['t', 'pos', 'a', 'u2'])
+        self.assertAlmostEqual(hd['Tsamp'], 0.1)
+        self.assertTrue(hd['closed'])
+        self.assertEqual(hd['dropped'], 0)
+        self.assertEqual(x.shape, (4, 4))
+        np.testing.assert_allclose(x[:, 0], 0.1*np.arange(4))
+        np.testing.assert_array_equal(x[:, 1], np.arange(4.0))
+        np.testing.assert_array_equal(x[:, 2], 1/3)
+        np.testing.assert_array_equal(x[:, 3], 2/3)
+
+
+    @unittest.skipIf(shutil.which('gcc') is None, 'gcc not found')
+    def test_drop(self):
+
+        """ Dropped rows. """
+
+        self.build(recBlocks([1, 1, 2], 'rec.bin'))
+        res = subprocess.run(['./m', '-f', '1000'], capture_output=True, text=True)
+        self.assertEqual(res.returncode, 0, res.stderr)
+        x, hd = readRecFile('rec.bin')
+        self.assertEqual(hd['nrow'] + hd['dropped'], 10000)
+        self.assertEqual(x.shape[0], hd['nrow'])
+        self.assertEqual(hd['overflows'] == 0, hd['dropped'] == 0)
+        # The rows written are in order
+        self.assertTrue(np.all(np.diff(x[:, 1]) > 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
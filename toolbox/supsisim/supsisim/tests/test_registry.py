@@ -0,0 +1,155 @@
+import sys
+import os
+import time
+import tempfile
+import unittest
+from unittest.mock import patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+from toolbox.supsisim.supsisim import registry
+
+
+"""
+
+Unit Tests for the block factory registry (registry.py)
+
+The following scenarios are tested:
+
+   - `test_scan`:                 The top level functions of the factory sources are mapped to their module,
+                                  nested functions and non python files are ignored.
+
+   - `test_cache_invalidation`:   The registry is read back from the cache file and rebuilt when a source
+                                  file is modified or a new file is added.
+
+   - `test_factoriesIn`:          The factory names are extracted from the factory calls without duplicates.
+
+   - `test_importFactories`:      Only the modules of the requested factories are imported,
+                                  a broken module of another block has no effect.
+
+   - `test_reload`:               A factory modified after its import is reloaded at the next import, as
+                                  in the long-lived build worker.
+
+   - `test_pysimcoder_blocks`:    The registry of resources/blocks/rcpBlk contains the standard factories.
+
+"""
+
+
+def writeFile(fname, txt):
+    with open(fname, 'w') as f:
+        f.write(txt)
+
+
+class TestRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir1 = os.path.join(self.tmp.name, 'rcpBlk')
+        self.cache = os.path.join(self.tmp.name, 'cache', 'reg.json')
+        os.makedirs(os.path.join(self.dir1, 'regtstlib'))
+        writeFile(os.path.join(self.dir1, 'regtstlib', 'regtstBlk.py'),
+                  'def regtstBlk(pin, pout):\n    def inner():\n        pass\n    return (pin, pout)\n\n'
+                  'def regtstHelper(x):\n    return x\n')
+        writeFile(os.path.join(self.dir1, 'regtstlib', 'brokenBlk.py'),
+                  'import module_which_does_not_exist\n\ndef brokenBlk():\n    pass\n')
+        writeFile(os.path.join(self.dir1, 'regtstlib', 'notes.txt'), 'def notAFactory():\n')
+        registry._registry.clear()
+
+    def tearDown(self):
+        if self.dir1 in sys.path:
+            sys.path.remove(self.dir1)
+        for mod in [m for m in sys.modules if m.startswith('regtstlib')]:
+            del sys.modules[mod]
+        registry._registry.clear()
+        registry._modStamp.clear()
+        self.tmp.cleanup()
+
+
+    def test_scan(self):
+
+        """ Top level functions are mapped to their module. """
+
+        reg = registry.scanFactories(self.dir1)
+        self.assertEqual(reg, {'regtstBlk' : 'regtstlib.regtstBlk',
+                               'regtstHelper' : 'regtstlib.regtstBlk',
+                               'brokenBlk' : 'regtstlib.brokenBlk'})
+
+
+    def test_cache_invalidation(self):
+
+        """ The cached registry is rebuilt after a modification of the sources. """
+
+        reg = registry.blkRegistry(self.dir1, self.cache)
+        self.assertTrue(os.path.isfile(self.cache))
+        self.assertIn('regtstBlk', reg)
+
+        registry._registry.clear()
+        reg = registry.blkRegistry(self.dir1, self.cache)
+        self.assertIn('regtstBlk', reg)
+
+        fname = os.path.join(self.dir1, 'regtstlib', 'newBlk.py')
+        writeFile(fname, 'def newBlk():\n    pass\n')
+        reg = registry.blkRegistry(self.dir1, self.cache)
+        self.assertEqual(reg['newBlk'], 'regtstlib.newBlk')
+
+        writeFile(fname, 'def newBlk2():\n    pass\n')
+        t = time.time() + 10
+        os.utime(fname, (t, t))
+        registry._registry.clear()
+        reg = registry.blkRegistry(self.dir1, self.cache)
+        self.assertNotIn('newBlk', reg)
+        self.assertEqual(reg['newBlk2'], 'regtstlib.newBlk')
+
+
+    def test_factoriesIn(self):
+
+        """ Factory names are extracted from the calls. """
+
+        calls = ['constBlk([], [1], 1.0)', ' sumBlk([1, 2], [3], [1, -1])', 'constBlk([], [2], 2.0)', 'g1']
+        self.assertEqual(registry.factoriesIn(calls), ['constBlk', 'sumBlk'])
+
+
+    def test_importFactories(self):
+
+        """ Only the modules of the requested factories are imported. """
+
+        sys.path.append(self.dir1)
+        ns = {}
+        with patch.dict(os.environ, {'XDG_CACHE_HOME' : os.path.join(self.tmp.name, 'cache')}):
+            missing = registry.importFactories(ns, ['regtstBlk', 'unknownBlk'], self.dir1)
+        self.assertEqual(missing, ['unknownBlk'])
+        self.assertEqual(ns['regtstBlk']([1], [2]), ([1], [2]))
+        self.assertNotIn('regtstlib.brokenBlk', sys.modules)
+
+
+    def test_reload(self):
+
+        """ Modified factories are reloaded. """
+
+        sys.path.append(self.dir1)
+        ns = {}
+        with patch.dict(os.environ, {'XDG_CACHE_HOME' : os.path.join(self.tmp.name, 'cache')}):
+            registry.importFactories(ns, ['regtstBlk'], self.dir1)
+            self.assertEqual(ns['regtstBlk']([1], [2]), ([1], [2]))
+            module = registry.importModule('regtstlib.regtstBlk')
+            self.assertIs(module, sys.modules['regtstlib.regtstBlk'])
+
+            fname = os.path.join(self.dir1, 'regtstlib', 'regtstBlk.py')
+            writeFile(fname, 'def regtstBlk(pin, pout):\n    return (pout, pin)\n')
+            t = time.time() + 10
+            os.utime(fname, (t, t))
+            registry.importFactories(ns, ['regtstBlk'], self.dir1)
+            self.assertEqual(ns['regtstBlk']([1], [2]), ([2], [1]))
+
+
+    def test_pysimcoder_blocks(self):
+
+        """ The standard factories are found in resources/blocks/rcpBlk. """
+
+        if not os.path.isdir(registry.blkDir()):
+            self.skipTest('PYSUPSICTRL not set')
+        reg = registry.scanFactories(registry.blkDir())
+        self.assertEqual(reg['cssBlk'], 'linear.cssBlk')
+        self.assertEqual(reg['sumBlk'], 'Math.sumBlk')
+
+
+if __name__ == '__main__':
+    unittest.main()
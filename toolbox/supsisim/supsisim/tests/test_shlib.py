@@ -0,0 +1,218 @@
+import sys
+import os
+import shutil
+import tempfile
+import subprocess
+import unittest
+from unittest.mock import patch
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+from toolbox.supsisim.supsisim.RCPblk import RCPblk
+from toolbox.supsisim.supsisim.RCPgen import genCode
+from toolbox.supsisim.supsisim.shlib import ShlibModel, ShlibBatch
+
+
+"""
+
+Unit Tests for the models built as shared library (shlib.py)
+
+The model (constant -> discrete integrator -> sum) is generated with the template shlib.tmf
+and compiled with gcc together with CodeGen/src/shlib_main.c and the C files of its blocks.
+The following scenarios are tested:
+
+   - `test_tables`:          The blocks, the nodes and the real parameters are found by name,
+                             the signals and the parameters are views of the memory of the model.
+
+   - `test_run`:             The recorded signals are the ones of every sampling period,
+                             a parameter changed in place acts at the next step.
+
+   - `test_reset`:           Parameters and states come back to the values of the load time.
+
+   - `test_private`:         Two private copies of the library have independent states.
+
+   - `test_batch`:           K instances with their own parameters are stepped in lockstep,
+                             the recorded signals are K x n x width, reset restores the states.
+
+   - `test_optimize`:        With optimize=True the constants are not folded, all the blocks and
+                             their parameters stay in the tables.
+
+"""
+
+CODEGEN = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'CodeGen'))
+
+
+def shlibBlocks():
+    blks = []
+    b = RCPblk('constant', [], [1], [0,0], 0, [1.0], [])
+    b.name = 'Const_0'; b.realParNames = ['Value']; blks.append(b)
+    b = RCPblk('dss', [1], [2], [0,1], 1, [1.0, 1.0, 1.0, 0.0, 0.0], [1, 1, 1, 0, 1, 2, 3, 4])
+    b.name = 'Int_1'; b.sysPath = '/Sub/Int'; blks.append(b)
+    b = RCPblk('sum', [1, 2], [3], [0,0], 1, [1, 2], [])
+    b.name = 'Sum_2'; blks.append(b)
+    b = RCPblk('toNull', [3], [], [0,0], 1, [], [])
+    b.name = 'Null_3'; blks.append(b)
+    return blks
+
+
+@unittest.skipIf(shutil.which('gcc') is None, 'gcc not found')
+class TestShlib(unittest.TestCase):
+
+    @classmethod
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.chdir(cls.tmp)
+        try:
+            with patch('sys.stdout'):
+                genCode('intmod', 0.1, shlibBlocks(), 'shlib.tmf', cache=False)
+        finally:
+            os.chdir(cwd)
+        dev = os.path.join(CODEGEN, 'Common', 'common_dev')
+        cls.so = os.path.join(cls.tmp, 'intmod.so')
+        cmd = ['gcc', '-shared', '-fPIC', '-DMODEL=intmod',
+               '-I' + os.path.join(CODEGEN, 'Common', 'include'),
+               '-I' + os.path.join(CODEGEN, 'LinuxRT', 'include'),
+               os.path.join(cls.tmp, 'intmod.c'), os.path.join(CODEGEN, 'src', 'shlib_main.c')] + \
+              [os.path.join(dev, f) for f in ['input.c', 'linear.c', 'matop.c', 'toNull.c']] + \
+              ['-o', cls.so, '-lm']
+        res = subprocess.run(cmd, capture_output=True, text=True)
+        if res.returncode != 0:
+            shutil.rmtree(cls.tmp)
+            raise AssertionError('Model not compiled: ' + res.stderr)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+
+    def test_tables(self):
+
+        """ Blocks, nodes and parameters. """
+
+        m = ShlibModel(self.so, private=True)
+        try:
+            self.assertEqual(m.model, 'intmod')
+            self.assertAlmostEqual(m.Tsamp, 0.1)
+            self.assertEqual(m.blocks, ['Const_0', 'Int_1', 'Sum_2', 'Null_3'])
+            self.assertEqual(m.blkIndex('/Sub/Int'), 1)
+            self.assertEqual(m.realParNames[0], ['Value'])
+            np.testing.assert_array_equal(m.par('Sum_2'), [1.0, 2.0])
+            self.assertEqual(m.pout[2], [3])
+            self.assertEqual(m.signals.size, 3)
+            with self.assertRaises(KeyError):
+                m.par('Missing_9')
+            # Views on the memory of the model
+            m.init()
+            m.step(3)
+            self.assertAlmostEqual(m.t, 0.3)
+            self.assertAlmostEqual(m.output('Int_1')[0], 2.0)
+            self.assertAlmostEqual(m.node(3)[0], 5.0)
+            self.assertEqual(m.slots([m.node(3), 2]), [int(m.nodeSlot[3]), int(m.nodeSlot[2])])
+        finally:
+            m.close()
+
+
+    def test_run(self):
+
+        """ Recorded signals and parameters changed in place. """
+
+        with ShlibModel(self.so, private=True) as m:
+            y = m.run(5, [2, 3])
+            self.assertEqual(y.shape, (5, 2))
+            np.testing.assert_allclose(y[:, 0], np.arange(5))
+            np.testing.assert_allclose(y[:, 1], 1 + 2*np.arange(5))
+            m.par('Const_0')[0] = 2.0
+            y = m.run(2, [m.output('Int_1')])
+            np.testing.assert_allclose(y[:, 0], [5.0, 7.0])
+
+
+    def test_reset(self):
+
+        """ Reset of parameters and states. """
+
+        with ShlibModel(self.so, private=True) as m:
+            m.par('Const_0')[0] = 3.0
+            m.step(4)
+            m.reset()
+            self.assertEqual(m.par('Const_0')[0], 1.0)
+            np.testing.assert_allclose(m.run(3, [2])[:, 0], [0.0, 1.0, 2.0])
+
+
+    def test_private(self):
+
+        """ Independent instances. """
+
+        with ShlibModel(self.so, private=True) as a, ShlibModel(self.so, private=True) as b:
+            b.par('Const_0')[0] = -1.0
+            a.step(10)
+            b.step(10)
+            self.assertAlmostEqual(a.node(2)[0], 9.0)
+            self.assertAlmostEqual(b.node(2)[0], -9.0)
+
+
+    def test_batch(self):
+
+        """ Batch of instances. """
+
+        b = ShlibBatch(self.so)
+        try:
+            self.assertEqual(b.parNames[0], 'Const_0.Value')
+            self.assertEqual(b.parIndex('Sum_2', 1), 7)
+            self.assertEqual(b.parIndex('Const_0', 'Value'), 0)
+            P = b.parArray(3)
+            self.assertEqual(P.shape, (3, 8))
+            P[:, b.parIndex('Const_0')] = [1.0, 2.0, 3.0]
+            with self.assertRaises(ValueError):
+                b.init(P[:, 1:])
+            b.init(P)
+            self.assertEqual(b.K, 3)
+            y = b.run(4)
+            self.assertEqual(y.shape, (3, 4, 3))
+            y = y[:, :, b.slots([2])][:, :, 0]
+            np.testing.assert_allclose(y, np.outer([1.0, 2.0, 3.0], np.arange(4)))
+            # Parameter of one instance changed in place
+            b.pars[0, b.parIndex('Sum_2', 1)] = 10.0
+            y = b.run(2, [3])
+            np.testing.assert_allclose(y[:, :, 0], [[41.0, 51.0], [18.0, 22.0], [27.0, 33.0]])
+            b.reset()
+            np.testing.assert_allclose(b.run(2, [2])[:, :, 0], [[0.0, 1.0], [0.0, 2.0], [0.0, 3.0]])
+            b.end()
+        finally:
+            b.close()
+
+
+@patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+class TestShlibOptimize(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+
+    def test_optimize(self):
+
+        """ No optimization of the tables. """
+
+        blks = []
+        b = RCPblk('constant', [], [1], [0,0], 0, [1.0], [])
+        b.name = 'Const_0'; b.realParNames = ['Value']; blks.append(b)
+        b = RCPblk('sum', [1], [2], [0,0], 1, [2.0], [])
+        b.name = 'Gain_1'; blks.append(b)
+        b = RCPblk('toNull', [2], [], [0,0], 1, [], [])
+        b.name = 'Null_2'; blks.append(b)
+        with patch('sys.stdout'):
+            genCode('m', 0.1, blks, 'shlib.tmf', cache=False, optimize=True)
+        with open('m.c') as f:
+            txt = f.read()
+        self.assertIn('const char * const m_blk_name[] = {"Const_0", "Gain_1", "Null_2"};\n', txt)
+        self.assertIn('const int m_blk_realParNum[] = {1, 1, 0};\n', txt)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import sys
+import os
+import shutil
+import tempfile
+import subprocess
+import unittest
+from unittest.mock import patch
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+from toolbox.supsisim.supsisim.RCPgen import genCode
+from toolbox.supsisim.supsisim.parfile import writeParFile, parRecords
+from toolbox.supsisim.supsisim.sweep import gridDesign, randomDesign, readOutput, sweep
+from toolbox.supsisim.supsisim.tests.test_parfile import parBlocks, CODEGEN
+
+
+"""
+
+Unit Tests for the parameter sweeps (sweep.py)
+
+The following scenarios are tested:
+
+   - `test_designs`:         The grid design holds all the combinations, the random design
+                             stays in the ranges and is reproducible with a seed.
+
+   - `test_readOutput`:      The numeric rows of the output are read, the other lines skipped.
+
+   - `test_failures`:        Runs with an exit code, without exit before the timeout or with an
+                             unreadable output are reported, the other runs are collected.
+
+   - `test_sweep`:           The executable of a model (print block) is run for every point of
+                             a grid, the outputs are stacked and put in one table.
+
+"""
+
+
+class TestSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+
+    def test_designs(self):
+
+        """ Grid and random designs. """
+
+        names, vals = gridDesign({'A_0.x' : [1, 2, 3], 'B_1.y' : [10, 20]})
+        self.assertEqual(names, ['A_0.x', 'B_1.y'])
+        self.assertEqual(vals.shape, (6, 2))
+        np.testing.assert_array_equal(vals[:3], [[1, 10], [1, 20], [2, 10]])
+        names, vals = randomDesign({'A_0.x' : (1.0, 2.0), 'B_1.y' : (-5.0, 0.0)}, 50, seed=3)
+        self.assertEqual(vals.shape, (50, 2))
+        self.assertTrue(np.all((vals[:, 0] >= 1.0) & (vals[:, 0] < 2.0)))
+        self.assertTrue(np.all((vals[:, 1] >= -5.0) & (vals[:, 1] < 0.0)))
+        np.testing.assert_array_equal(vals, randomDesign({'A_0.x' : (1.0, 2.0), 'B_1.y' : (-5.0, 0.0)}, 50, 3)[1])
+
+
+    def test_readOutput(self):
+
+        """ Output tables. """
+
+        y = readOutput('Model started\n0.0\t1.5\t\n0.1\t2.5\t\n\n')
+        np.testing.assert_array_equal(y, [[0.0, 1.5], [0.1, 2.5]])
+        self.assertEqual(readOutput('').shape, (0, 0))
+        with self.assertRaises(ValueError):
+            readOutput('1 2\n3\n')
+
+
+    def test_failures(self):
+
+        """ Failed runs and timeouts. """
+
+        writeParFile('m.par', 'm', parRecords(parBlocks()))
+        # The script answers according to the value of Const_0.Value in its parameter file
+        with open('m', 'w') as f:
+            f.write('#!/bin/sh\n'
+                    'v=$(python3 -m supsisim.parfile "$4" | tail -1 | cut -d= -f2 | tr -d " ")\n'
+                    'case $v in\n'
+                    '  1.0) echo "0.0 1.0";;\n'
+                    '  2.0) echo "boom" >&2; exit 3;;\n'
+                    '  3.0) sleep 10;;\n'
+                    '  4.0) echo "1 2"; echo "3";;\n'
+                    'esac\n')
+        os.chmod('m', 0o755)
+        env = {'PYTHONPATH' : os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))}
+        with patch.dict(os.environ, env):
+            res = sweep('m', *gridDesign({'Const_0.Value' : [1, 2, 3, 4]}), 1.0, 'm.par', timeout=3)
+        self.assertEqual(res['status'], ['ok', 'failed', 'timeout', 'failed'])
+        self.assertEqual(res['returncode'].tolist(), [0, 3, -1, 0])
+        self.assertIn('boom', res['error'][1])
+        self.assertIn('different lengths', res['error'][3])
+        self.assertEqual(res['Y'].shape, (4, 1, 2))
+        self.assertTrue(np.isnan(res['Y'][1]).all())
+        np.testing.assert_array_equal(res['table'], [[0.0, 1.0, 0.0, 1.0]])
+        with self.assertRaises(KeyError):
+            sweep('m', ['Foo_9.x'], [[1.0]], 1.0, 'm.par')
+
+
+    @unittest.skipIf(shutil.which('gcc') is None, 'gcc not found')
+    @patch.dict(os.environ, {'SHV_USED': 'False', 'SHV_TREE_TYPE': 'GAVL'})
+    def test_sweep(self):
+
+        """ Sweep of a model. """
+
+        os.mkdir('m_gen')
+        os.chdir('m_gen')
+        with patch('sys.stdout'):
+            genCode('m', 0.1, parBlocks(), 'sim.tmf', cache=False, parFile=True)
+        dev = os.path.join(CODEGEN, 'Common', 'common_dev')
+        cmd = ['gcc', '-DMODEL=m', '-I' + os.path.join(CODEGEN, 'Common', 'include'),
+               '-I' + os.path.join(CODEGEN, 'LinuxRT', 'include'),
+               'm.c', os.path.join(CODEGEN, 'src', 'linux_main.c'),
+               os.path.join(CODEGEN, 'Common', 'posix', 'parfile.c')] + \
+              [os.path.join(dev, f) for f in ['input.c', 'linear.c', 'matop.c', 'output.c']] + \
+              ['-o', '../m', '-lm']
+        res = subprocess.run(cmd, capture_output=True, text=True)
+        os.chdir('..')
+        self.assertEqual(res.returncode, 0, res.stderr)
+
+        names, vals = gridDesign({'Const_0.Value' : [1.0, 2.0], 'Sum_2.double1' : [1.0, 10.0]})
+        res = sweep('m', names, vals, 0.3, workdir='runs', jobs=64)
+        self.assertEqual(res['status'], ['ok'] * 4)
+        self.assertTrue(os.path.isfile(os.path.join('runs', 'run_00003', 'sweep.par')))
+        self.assertEqual(res['Y'].shape, (4, 3, 2))
+        np.testing.assert_allclose(res['Y'][:, :, 1], [[1, 2, 3], [1, 11, 21], [2, 4, 6], [2, 22, 42]])
+        self.assertEqual(res['table'].shape, (12, 5))
+        np.testing.assert_allclose(res['table'][4], [1.0, 1.0, 10.0, 0.1, 11.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))
+from toolbox.supsisim.supsisim import recfile
+from toolbox.supsisim.supsisim.viewer import openData, minMax, rawMinMax, Pyramid, DataViewer
+from toolbox.supsisim.supsisim.recfile import readHeader, textToRec
+from toolbox.supsisim.supsisim.tests.test_recfile import writeRec
+
+
+"""
+
+Unit Tests for the viewer of large recordings (viewer.py)
+
+The following scenarios are tested:
+
+   - `test_text`:            A text recording is converted once into a binary file with its names,
+                             converted again only if the text changes.
+
+   - `test_minmax`:          The min/max of groups of rows keep the extremes and their times.
+
+   - `test_window`:          The points of a window from the pyramid hold the extremes of the window,
+                             two points per pixel in time order; short windows give the rows.
+
+   - `test_viewer`:          The lines of the plot are decimated again when the x limits change.
+
+"""
+
+
+def bigData(n=300000):
+    t = 0.001*np.arange(n)
+    y = np.column_stack((np.sin(t), np.cos(3*t)))
+    y[123457, 0] = 5.0
+    y[200001, 1] = -7.0
+    return np.column_stack((t, y))
+
+
+class TestViewer(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+
+    def test_text(self):
+
+        """ Conversion of a text recording. """
+
+        with open('d.txt', 'w') as f:
+            f.write('# t\tx,y\n')
+            for k in range(0, 10):
+                f.write('%f\t%f\t%f\t\n' % (0.1*k, k, -k))
+        with patch.object(recfile, 'CHUNK', 4):
+            data, names, rec = openData('d.txt')
+        self.assertEqual(rec, 'd.txt.rec')
+        self.assertEqual(names, ['t', 'x', 'y'])
+        self.assertEqual(data.shape, (10, 3))
+        np.testing.assert_array_equal(data[:, 2], -np.arange(10.0))
+        self.assertAlmostEqual(readHeader(rec)['Tsamp'], 0.1)
+        # Not converted again while newer than the text
+        mtime = os.path.getmtime(rec)
+        self.assertEqual(textToRec('d.txt'), rec)
+        self.assertEqual(os.path.getmtime(rec), mtime)
+        os.utime('d.txt', (mtime + 10, mtime + 10))
+        with open('d.txt', 'a') as f:
+            f.write('1.0\t10.0\t-10.0\n')
+        self.assertEqual(openData('d.txt')[0].shape, (11, 3))
+
+
+    def test_minmax(self):
+
+        """ Min/max of groups. """
+
+        x = np.array([[0.0, 1.0, 5.0], [1.0, 3.0, 4.0], [2.0, -1.0, 6.0], [3.0, 2.0, 2.0], [4.0, 0.5, 9.0]])
+        tmn, mn, tmx, mx = minMax(*rawMinMax(x), 2)
+        np.testing.assert_array_equal(mn, [[1.0, 4.0], [-1.0, 2.0], [0.5, 9.0]])
+        np.testing.assert_array_equal(tmn, [[0.0, 1.0], [2.0, 3.0], [4.0, 4.0]])
+        np.testing.assert_array_equal(mx, [[3.0, 5.0], [2.0, 6.0], [0.5, 9.0]])
+        np.testing.assert_array_equal(tmx, [[1.0, 0.0], [3.0, 2.0], [4.0, 4.0]])
+
+
+    def test_window(self):
+
+        """ Decimated windows. """
+
+        x = bigData()
+        writeRec('a.bin', ['t', 's', 'c'], x, Tsamp=0.001)
+        data = openData('a.bin')[0]
+        p = Pyramid(data, 'a.bin.lod.npz')
+        self.assertEqual([lev[0].shape[0] for lev in p.levels], [4688, 74])
+        self.assertTrue(os.path.isfile('a.bin.lod.npz'))
+        for t0, t1 in [(0.0, 300.0), (100.0, 140.0), (123.0, 124.5)]:
+            xs, ys = p.window(t0, t1, 500)
+            self.assertTrue(500 <= xs.shape[0] <= 1000)
+            self.assertTrue(np.all(np.diff(xs, axis=0) >= 0))
+            inside = x[(x[:, 0] >= t0) & (x[:, 0] <= t1)]
+            np.testing.assert_array_equal(ys.max(axis=0), inside[:, 1:].max(axis=0))
+            np.testing.assert_array_equal(ys.min(axis=0), inside[:, 1:].min(axis=0))
+        self.assertEqual(ys.max(axis=0)[0], 5.0)
+        # Less rows than pixels: the rows themselves
+        xs, ys = p.window(10.0, 10.1, 500)
+        self.assertTrue(xs[0, 0] <= 10.0 and xs[-1, 0] >= 10.1 and xs.shape[0] <= 103)
+        k = int(round(xs[0, 0] / 0.001))
+        np.testing.assert_array_equal(ys, x[k:k+xs.shape[0], 1:])
+        # Pyramid from the cache
+        q = Pyramid(data, 'a.bin.lod.npz')
+        np.testing.assert_array_equal(q.levels[1][2], p.levels[1][2])
+
+
+    def test_viewer(self):
+
+        """ Decimation on zoom. """
+
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+
+        writeRec('a.bin', ['t', 's', 'c'], bigData(), Tsamp=0.001)
+        v = DataViewer('a.bin')
+        try:
+            self.assertEqual([line.get_label() for line in v.lines], ['s', 'c'])
+            n = len(v.lines[0].get_xdata())
+            self.assertLessEqual(n, 2*v.npix())
+            v.ax.set_xlim(150.0, 150.2)
+            xd = v.lines[0].get_xdata()
+            self.assertLessEqual(len(xd), 203)
+            self.assertLessEqual(xd[0], 150.0)
+            self.assertGreaterEqual(xd[-1], 150.2)
+        finally:
+            plt.close(v.ax.figure)
+
+
+if __name__ == '__main__':
+    unittest.main()
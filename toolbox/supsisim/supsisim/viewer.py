@@ -0,0 +1,258 @@
+"""
+Viewer of large recordings
+
+The data of a binary recording (see recfile.py) are mapped in memory
+instead of being read; a text recording is converted once into a
+binary file next to it (<file>.rec, see recfile.textToRec), used again
+while newer than the text. The plot shows the data decimated to the width of the axes: for
+every pixel the minimum and the maximum of each channel in the pixel
+(min/max decimation), recomputed at every zoom or pan. A pyramid of the
+min/max of blocks of LOD_FACTOR, LOD_FACTOR**2, ... rows is computed
+once (and saved in <file>.lod.npz): the rows read for a view are at
+most about LOD_FACTOR per pixel, whatever the size of the file and the
+width of the view.
+
+The following commands are provided:
+
+  openData       - Mapped data of a recording
+  minMax         - Min/max of groups of rows
+  Pyramid        - Min/max pyramid of a recording
+  DataViewer     - Plot of a recording with decimation on zoom
+  viewData       - Show a recording
+  main           - Command line interface
+
+Usage from the command line:
+
+  python3 -m supsisim.viewer /tmp/Plot_3
+
+"""
+
+import os
+import sys
+import argparse
+
+import numpy as np
+
+from supsisim.recfile import isRecFile, readRecFile, textToRec, newer
+
+LOD_FACTOR = 64           # Rows of a block of a level of the pyramid
+LOD_MIN = 4096            # Blocks of the coarsest level
+CHUNK = 1 << 18           # Rows reduced at once
+
+def openData(fname):
+    """Mapped data of a recording
+
+    Call: data, names, rec = openData(fname)
+
+    Returns
+    -------
+    data      : Array rows x columns (np.memmap, read only), time first
+    names     : Names of the columns
+    rec       : Binary file mapped (fname or the converted text)
+    """
+    rec = fname if isRecFile(fname) else textToRec(fname)
+    data, hd = readRecFile(rec, mmap=True)
+    return data, hd['names'], rec
+
+def minMax(tmn, mn, tmx, mx, g):
+    """Min/max of groups of rows
+
+    Call: tmn, mn, tmx, mx = minMax(tmn, mn, tmx, mx, g)
+
+    Parameters
+    ----------
+    tmn, mn   : Time and value of the minima, rows x channels
+    tmx, mx   : Time and value of the maxima, rows x channels
+    g         : Rows of a group (the last group can be shorter)
+
+    Returns
+    -------
+    The minima and the maxima of the groups, groups x channels
+    """
+    n, nch = mn.shape
+    nb = -(-n // g)
+    pad = nb*g - n
+    res = []
+    for tv, v, arg in [(tmn, mn, np.argmin), (tmx, mx, np.argmax)]:
+        if pad != 0:
+            tv = np.concatenate((tv, np.repeat(tv[-1:], pad, axis=0)))
+            v = np.concatenate((v, np.repeat(v[-1:], pad, axis=0)))
+        tv = tv.reshape(nb, g, nch)
+        v = v.reshape(nb, g, nch)
+        i = arg(v, axis=1)[:, None, :]
+        res += [np.take_along_axis(tv, i, 1)[:, 0, :], np.take_along_axis(v, i, 1)[:, 0, :]]
+    return tuple(res)
+
+def rawMinMax(data):
+    """Rows of data as minima and maxima (time broadcast to the channels)"""
+    y = np.asarray(data[:, 1:], dtype=float)
+    t = np.broadcast_to(np.asarray(data[:, 0:1], dtype=float), y.shape)
+    return t, y, t, y
+
+class Pyramid:
+    """Min/max pyramid of a recording
+
+    Call: p = Pyramid(data, cache)
+
+    Parameters
+    ----------
+    data      : Array rows x columns, time first (np.memmap)
+    cache     : File of the pyramid (.npz), None for no cache
+
+    Level k (k >= 1) holds the min/max of the blocks of LOD_FACTOR**k
+    rows: t0 (time of the first row of the blocks), tmn, mn, tmx, mx
+    (blocks x channels). Level 0 is data.
+    """
+
+    def __init__(self, data, cache=None):
+        self.data = data
+        self.levels = []
+        if cache is not None and os.path.isfile(cache):
+            try:
+                with np.load(cache) as z:
+                    if int(z['nrow']) == data.shape[0]:
+                        for k in range(0, int(z['nlev'])):
+                            self.levels.append(tuple(z[s + str(k)] for s in ['t0', 'tmn', 'mn', 'tmx', 'mx']))
+                        return
+            except (OSError, KeyError, ValueError):
+                self.levels = []
+        self.build()
+        if cache is not None and len(self.levels) != 0:
+            arrs = {'nrow' : data.shape[0], 'nlev' : len(self.levels)}
+            for k, lev in enumerate(self.levels):
+                for s, a in zip(['t0', 'tmn', 'mn', 'tmx', 'mx'], lev):
+                    arrs[s + str(k)] = a
+            try:
+                np.savez(cache, **arrs)
+            except OSError:
+                pass
+
+    def build(self):
+        n = self.data.shape[0]
+        if n <= LOD_MIN:
+            return
+        # First level by chunks of whole blocks of the data
+        step = (CHUNK // LOD_FACTOR) * LOD_FACTOR
+        parts = []
+        for i in range(0, n, step):
+            chunk = self.data[i:i+step]
+            parts.append((np.asarray(chunk[::LOD_FACTOR, 0], dtype=float),) +
+                         minMax(*rawMinMax(chunk), LOD_FACTOR))
+        self.levels.append(tuple(np.concatenate([p[j] for p in parts]) for j in range(0, 5)))
+        while self.levels[-1][0].shape[0] > LOD_MIN:
+            t0, tmn, mn, tmx, mx = self.levels[-1]
+            self.levels.append((t0[::LOD_FACTOR],) + minMax(tmn, mn, tmx, mx, LOD_FACTOR))
+
+    def window(self, t0, t1, npix):
+        """Min/max points of the rows between t0 and t1 for npix pixels
+
+        Call: x, y = p.window(t0, t1, npix)
+
+        Returns
+        -------
+        x, y      : Time and value of the points, points x channels (two
+                    points per pixel, in time order; the rows themselves
+                    if there are less than 2*npix rows)
+
+        Only the rows of the window (or of the coarsest level with at
+        least npix blocks in the window) are read.
+        """
+        t = self.data[:, 0]
+        i0 = max(int(np.searchsorted(t, t0, 'right')) - 1, 0)
+        i1 = min(int(np.searchsorted(t, t1, 'left')) + 1, self.data.shape[0])
+        if i1 - i0 <= 2*npix:
+            chunk = np.asarray(self.data[i0:i1], dtype=float)
+            y = chunk[:, 1:]
+            return np.broadcast_to(chunk[:, 0:1], y.shape).copy(), y
+        src = None
+        for k in range(len(self.levels)-1, -1, -1):
+            lt0 = self.levels[k][0]
+            j0 = max(int(np.searchsorted(lt0, t0, 'right')) - 1, 0)
+            j1 = min(int(np.searchsorted(lt0, t1, 'left')) + 1, lt0.shape[0])
+            if j1 - j0 >= npix:
+                src = tuple(a[j0:j1] for a in self.levels[k][1:])
+                break
+        if src is None:
+            src = rawMinMax(self.data[i0:i1])
+        n = src[1].shape[0]
+        tmn, mn, tmx, mx = minMax(*src, -(-n // npix))
+        first = tmn <= tmx
+        x = np.empty((2*tmn.shape[0], tmn.shape[1]))
+        y = np.empty(x.shape)
+        x[0::2] = np.where(first, tmn, tmx)
+        y[0::2] = np.where(first, mn, mx)
+        x[1::2] = np.where(first, tmx, tmn)
+        y[1::2] = np.where(first, mx, mn)
+        return x, y
+
+class DataViewer:
+    """Plot of a recording with decimation on zoom
+
+    Call: v = DataViewer(fname, ax)
+
+    Parameters
+    ----------
+    fname     : Recording, binary or text
+    ax        : Matplotlib axes (default: a new figure)
+
+    The lines are computed again from the pyramid at every change of the
+    limits of the x axis (zoom, pan, home).
+    """
+
+    def __init__(self, fname, ax=None):
+        import matplotlib.pyplot as plt
+
+        self.data, self.names, rec = openData(fname)
+        cache = rec + '.lod.npz'
+        if os.path.isfile(cache) and not newer(cache, rec):
+            os.remove(cache)
+        self.pyr = Pyramid(self.data, cache)
+        if ax is None:
+            fig, ax = plt.subplots()
+        self.ax = ax
+        n = self.data.shape[0]
+        self.tlim = (float(self.data[0, 0]), float(self.data[n-1, 0])) if n != 0 else (0.0, 1.0)
+        x, y = self.pyr.window(self.tlim[0], self.tlim[1], self.npix()) if n != 0 else \
+            (np.zeros((0, len(self.names)-1)), np.zeros((0, len(self.names)-1)))
+        self.lines = [ax.plot(x[:, k], y[:, k], label=self.names[k+1])[0] for k in range(0, y.shape[1])]
+        ax.set_xlim(*self.tlim)
+        ax.grid()
+        if y.shape[1] > 1:
+            ax.legend()
+        ax.callbacks.connect('xlim_changed', self.update)
+
+    def npix(self):
+        return max(int(self.ax.bbox.width), 100)
+
+    def update(self, ax=None):
+        """Decimated lines of the visible window"""
+        if self.data.shape[0] == 0:
+            return
+        t0, t1 = self.ax.get_xlim()
+        x, y = self.pyr.window(t0, t1, self.npix())
+        for k, line in enumerate(self.lines):
+            line.set_data(x[:, k], y[:, k])
+        self.ax.figure.canvas.draw_idle()
+
+def viewData(fname):
+    """Show a recording (blocking)"""
+    import matplotlib.pyplot as plt
+
+    v = DataViewer(fname)
+    plt.show()
+    return v
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m supsisim.viewer',
+                                     description='Show a recording of the plot and toFile blocks')
+    parser.add_argument('file', help='recorded file, binary or text')
+    args = parser.parse_args(argv)
+    try:
+        viewData(args.file)
+    except (ValueError, OSError) as e:
+        print(str(e))
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())